@@ -0,0 +1,38 @@
+"""
+Покрывает ли найденный в базе знаний фрагмент вопрос пользователя.
+Без тяжёлых зависимостей (моделей, FAISS, Gradio), поэтому проверяется отдельно от приложения.
+"""
+import re
+from typing import FrozenSet
+
+_WORD_RE = re.compile(r"\w{4,}")
+
+# Порог доли покрытых слов вопроса, с которого чанк считается ответом на него. Подобран на чанках
+# нормативных текстов (ПП РФ № 354, № 491, ЖК РФ): чанк по теме вопроса даёт 0.5–1.0, на другую тему — не больше 0.6
+COVERAGE_THRESHOLD = 0.75
+
+# Основы вопросительных и служебных слов: они есть почти в любом тексте и о теме вопроса не говорят
+QUESTION_STOP_STEMS = frozenset({
+    "какой", "какая", "какое", "какие", "каким", "каков", "когда", "почем", "зачем", "сколь", "котор",
+    "можно", "нужно", "надо", "должн", "долже", "обяза", "если", "чтобы", "этот", "этом", "этого",
+    "меня", "нашем", "наше", "наши", "свой", "своем", "есть", "будет", "быть", "через", "после",
+    "также", "более", "менее", "прошу", "пожал", "здрав", "добры", "спаси", "подск", "скажи",
+})
+
+
+def stems(text: str) -> FrozenSet[str]:
+    """Основы значимых слов: первые 5 букв слов от 4 букв, «ё» приравнена к «е»."""
+    return frozenset(w[:5] for w in _WORD_RE.findall(text.lower().replace("ё", "е")))
+
+
+def question_coverage(question: str, chunk: str) -> float:
+    """
+    Доля основ значимых слов вопроса, встречающихся во фрагменте (0.0 … 1.0).
+    Сравнивается с одним лучшим по релевантности чанком, а не со всем контекстом:
+    в склейке из десятков чанков слова вопроса найдутся почти всегда.
+    Вопрос меньше чем из двух значимых слов ничего не покрывает.
+    """
+    q_stems = stems(question) - QUESTION_STOP_STEMS
+    if len(q_stems) < 2 or not chunk:
+        return 0.0
+    return len(q_stems & stems(chunk)) / len(q_stems)
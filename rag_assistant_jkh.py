@@ -1,23 +1,35 @@
 import os
 import re
+import sys
 import warnings
 import numpy as np
 import faiss
 import json
 import random
 import time
-from typing import List, Dict, Tuple, Optional, Type, Any
+import heapq
+import hashlib
+import unicodedata
+import copy
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+from string import Formatter
+from itertools import chain, count
+from typing import List, Dict, Tuple, Optional, Type, Any, NamedTuple, Iterator, Collection, FrozenSet
 from pathlib import Path
 from sentence_transformers import SentenceTransformer
 import nltk
 from nltk.tokenize import sent_tokenize
-from transformers import AutoTokenizer, AutoModelForCausalLM, BitsAndBytesConfig
+from transformers import AutoTokenizer, AutoModelForCausalLM, BitsAndBytesConfig, DynamicCache
 import torch
 from torch.cuda.amp import autocast
 import gradio as gr
 from ddgs import DDGS
 from functools import wraps
 import psutil
+from context_coverage import COVERAGE_THRESHOLD, question_coverage
 torch.cuda.empty_cache()
 device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
 
@@ -175,12 +187,143 @@ except Exception as e:
 # Базовый класс агента
 # ---------------------------
 
+class SearchHit(NamedTuple):
+    """Результат веб-поиска, прошедший фильтр чёрного списка."""
+    body: str
+    href: str
+    weight: int
+    body_key: bytes  # ключ дедупликации (RAGAgent._body_key), считается один раз при разборе выдачи
+
+
 class RAGAgent:
-    def __init__(self, name: str, keywords: List[str]):
+    # Официальные источники (вес 3 при ранжировании веб-поиска)
+    OFFICIAL_DOMAINS = frozenset({
+        "cbr.ru", "government.ru", "kremlin.ru", "rosstat.gov.ru", "minfin.gov.ru",
+        "fas.gov.ru", "gji.ru", "rospotrebnadzor.ru", "rosreestr.gov.ru",
+        "minstroyrf.ru", "fgis-tarif.ru", "consultant.ru", "garant.ru",
+        "pravo.gov.ru", "gkh.ru"
+    })
+    # Государственные порталы (вес 2)
+    GOV_SUFFIXES = (".gov.ru", ".gkh.ru")
+    # Форумы, блоги и прочие ненадёжные источники — общий чёрный список для всех агентов
+    # (домен отсекается вместе с поддоменами)
+    BLACKLISTED_DOMAINS = frozenset({
+        "otvet.mail.ru", "ask.fm", "irecommend.ru", "pikabu.ru",
+        "zen.yandex.ru", "thequestion.ru", "quora.com", "reddit.com",
+        "fishki.net", "yaplakal.com"
+    })
+    # Подстроки, по которым домен считается блогом или форумом
+    BLACKLISTED_MARKERS = ("blog", "forum")
+    # Дополнительные поисковые запросы агента, {q} — исходный запрос
+    SEARCH_QUERY_TEMPLATES: Tuple[str, ...] = ()
+    # Ключевые слова, при которых в промпт добавляется блок расчёта пени
+    PENALTY_KEYWORDS: Tuple[str, ...] = (
+        "пени", "неустойка", "штраф за просрочку",
+        "ставка цб", "9.5%", "ключевая ставка",
+    )
+    # Системный промт агента: поля {context_text}, {web_results}, {extra}, {role_instruction}
+    # и условные блоки вроде {penalty_block}; собирается в _build_prompt
+    PROMPT_TEMPLATE = ""
+    # Блок с расчётом пени — подставляется, если запрос упоминает PENALTY_KEYWORDS
+    PENALTY_BLOCK = ""
+    # Служебные токены системного сообщения Saiga/LLaMA-3
+    WRAP_SYSTEM_PROMPT = True
+    # Указание по аудитории ответа для каждой роли (неизвестная роль — «смешанная»)
+    ROLE_INSTRUCTIONS = {
+        "житель": "Ответ ориентирован на жителя. Давайте пошаговые действия с ссылками на НПА.",
+        "исполнитель": "Ответ ориентирован на УК/ТСН. Включайте судебную практику и процедуры.",
+        "смешанная": "Разделите ответ на две части: для жителя и для исполнителя."
+    }
+    # Сколько последних собранных промтов хранит агент
+    PROMPT_CACHE_SIZE = 128
+    _SYSTEM_HEADER = "<|begin_of_text|><|start_header_id|>system<|end_header_id|>\n"
+    _EOT = "<|eot_id|>"
+    # Префикс строки результата по признаку weight >= 2
+    _SOURCE_PREFIXES = ("", "[ОФИЦИАЛЬНЫЙ ИСТОЧНИК] ")
+    # Кэш ответов DDGS, общий для всех агентов процесса: ключ запроса -> (срок годности, результаты)
+    WEB_CACHE_TTL = 3600
+    WEB_CACHE_SIZE = 512
+    _web_cache: "OrderedDict[bytes, Tuple[float, Tuple[Tuple[str, str], ...]]]" = OrderedDict()
+    # Запросы Gradio обрабатываются в разных потоках — LRU-перестановки кэша делаем под блокировкой
+    _web_cache_lock = threading.Lock()
+    # Пул потоков для параллельных запросов к DDGS, тоже общий для всех агентов
+    WEB_SEARCH_WORKERS = 8
+    # Сколько запросов одного поиска держать в работе одновременно
+    WEB_SEARCH_BATCH = 4
+    _web_pool = ThreadPoolExecutor(max_workers=WEB_SEARCH_WORKERS, thread_name_prefix="web-search")
+    # Размыкатель цепи: после стольких неудачных поисков подряд DDGS не опрашивается WEB_BREAKER_COOLDOWN секунд.
+    # Состояние общее для всех агентов — недоступность DDGS затрагивает всех
+    WEB_BREAKER_THRESHOLD = 3
+    WEB_BREAKER_COOLDOWN = 60
+    _web_failures = 0
+    _web_blocked_until = 0.0
+    # Единственный повтор поиска после сбоя DDGS — через фиксированную паузу плюс случайный разброс до стольких же секунд
+    WEB_RETRY_DELAY = 0.25
+    # Сессии DDGS потоков пула (см. _fetch_ddgs_text)
+    _ddgs_local = threading.local()
+    # Семантический кэш выдачи агента: перефразированный вопрос получает готовый результат без DDGS
+    SEMANTIC_CACHE_TTL = 900
+    SEMANTIC_CACHE_SIZE = 512
+    # Минимальное косинусное сходство эмбеддингов вопросов для попадания в кэш
+    SEMANTIC_CACHE_THRESHOLD = 0.93
+    # Доля основ значимых слов вопроса в лучшем чанке базы знаний, с которой веб-поиск не нужен
+    CONTEXT_COVERAGE_THRESHOLD = COVERAGE_THRESHOLD
+    # Подставляется вместо результатов веб-поиска, если он пропущен
+    WEB_SEARCH_SKIPPED = "Не требуется: вопрос полностью покрыт контекстной информацией."
+    # Сколько секунд промты используют одну и ту же выборку примеров из обратной связи
+    FEEDBACK_EXTRA_TTL = 300
+    # Порог сходства слов двух сниппетов (коэффициент Жаккара), с которого второй считается дубликатом
+    NEAR_DUPLICATE_JACCARD = 0.8
+    # Не больше стольких поисковых запросов (исходный + шаблоны + синонимы) на один вопрос
+    MAX_SEARCH_QUERIES = 8
+    # Карты терминов и ключевые слова по классам агентов (см. _shared_term_map)
+    _term_map_cache: Dict[type, Tuple[Dict, FrozenSet[str]]] = {}
+
+    def __init__(self, name: str, keywords: Collection[str]):
         self.name = name
-        self.keywords = [kw.lower() for kw in keywords]
+        # Ключевые слова множеством — для подсчёта совпадений пересечением
+        self.keyword_set = frozenset(kw.lower() for kw in keywords)
+        self.keywords = list(self.keyword_set)
+        # Все ключевые слова — одна альтернация: matches проверяет вхождение любого из них за один проход re
+        self._keyword_re = self._compile_phrases(self.keyword_set)
         self.feedback_data = []
+        # Блок примеров из обратной связи: (срок годности, текст), см. improve_prompt_from_feedback
+        self._feedback_extra: Tuple[float, str] = (0.0, "")
         self.confidence_threshold = 0.7
+        # Таблица весов источников: официальный домен -> 3
+        self._domain_weights = dict.fromkeys(self.OFFICIAL_DOMAINS, 3)
+        # Все ключевые слова пени — одна альтернация, проверка за один проход re.
+        # Фразы, содержащие другое ключевое слово («расчет пени» ⊃ «пени»), на результат не влияют — отбрасываем
+        penalty_keywords = [
+            kw for kw in self.PENALTY_KEYWORDS
+            if not any(other != kw and other in kw for other in self.PENALTY_KEYWORDS)
+        ]
+        self._penalty_re = re.compile("|".join(map(re.escape, penalty_keywords)))
+        # Чёрный список доменов — кортеж для str.endswith: одна проверка на C-уровне при любом размере списка
+        self._blacklist_suffixes = tuple(sorted(self.BLACKLISTED_DOMAINS))
+        # Вердикты по уже встречавшимся доменам: домен -> вес или None (чёрный список)
+        self._domain_verdicts: Dict[str, Optional[int]] = {}
+        # Кэши агента ниже (кроме _last_search) агент разделяет между потоками Gradio: чтение с
+        # перестановкой, обход и вытеснение выполняются под этой блокировкой
+        self._cache_lock = threading.Lock()
+        # Последний успешный веб-поиск агента: ((запрос, max_results), срок годности, результат).
+        # Кортеж заменяется целиком одним присваиванием, поэтому блокировка ему не нужна
+        self._last_search: Tuple[Optional[Tuple[str, int]], float, str] = (None, 0.0, "")
+        # Успешные поиски агента: ключ нормализованного запроса -> (срок годности, max_results, эмбеддинг, результат)
+        self._search_cache: "OrderedDict[bytes, Tuple[float, int, np.ndarray, str]]" = OrderedDict()
+        # Готовые промты по хешу входных данных: ключ -> (срок годности, промт)
+        self._prompt_cache: "OrderedDict[bytes, Tuple[float, str]]" = OrderedDict()
+        # Синонимы терминов для расширения запросов: все (для поиска) и первые 2 (для подстановки)
+        term_map = getattr(self, "term_map", {})
+        self._term_synonyms = {term: tuple(data.get("synonyms", [])) for term, data in term_map.items()}
+        self._syn_top2 = {term: syns[:2] for term, syns in self._term_synonyms.items()}
+        self._build_term_matcher()
+        # Итоговый шаблон промта с обёрткой Saiga — склеивается один раз, а не при каждой сборке
+        if self.PROMPT_TEMPLATE and self.WRAP_SYSTEM_PROMPT:
+            self._prompt_template = f"{self._SYSTEM_HEADER}{self.PROMPT_TEMPLATE}{self._EOT}"
+        else:
+            self._prompt_template = self.PROMPT_TEMPLATE
+        self._prompt_prefix = next(Formatter().parse(self._prompt_template))[0] if self._prompt_template else ""
         self.load_feedback()
 
     """def matches(self, query: str) -> bool:
@@ -192,18 +335,490 @@ class RAGAgent:
         q = query.lower()
         # Проверяем, содержит ли запрос ЛЮБОЕ из ключевых слов как подстроку
         # Это делает систему устойчивой к опечаткам, склонениям и частичным совпадениям
-        return any(kw in q for kw in self.keywords)
+        return self._keyword_re is not None and self._keyword_re.search(q) is not None
+
+    @staticmethod
+    def _compile_phrases(phrases: Collection[str]) -> Optional["re.Pattern[str]"]:
+        """
+        Регулярка «любая из фраз как подстрока» или None для пустого набора.
+        Фразы собираются в префиксное дерево: у общих начал одна ветка, поэтому в каждой позиции
+        запроса re проверяет лишь несколько первых букв, а не сотни альтернатив подряд
+        (плоская альтернация из сотен ключевых слов медленнее даже цикла any(kw in q)).
+        """
+        if not phrases:
+            return None
+        trie: Dict[str, dict] = {}
+        for phrase in phrases:
+            node = trie
+            for ch in phrase:
+                node = node.setdefault(ch, {})
+            node[""] = {}  # здесь заканчивается фраза
+
+        def build(node: Dict[str, dict]) -> str:
+            branches = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch]
+            if not branches:
+                return ""
+            body = branches[0] if len(branches) == 1 else "(?:%s)" % "|".join(branches)
+            # Фраза кончается в этом узле — продолжение необязательно
+            return "(?:%s)?" % body if "" in node else body
+
+        return re.compile(build(trie))
        
-    def _build_prompt(self, summary: str, context_text: str, role: str = "смешанная") -> str:
-        raise NotImplementedError("Каждый агент должен реализовать свой _build_prompt")
+    def _build_prompt(self, summary: str, context_text: str, role: str = "смешанная",
+                      top_chunk: Optional[str] = None) -> str:
+        """
+        Формирует системный промт агента по его PROMPT_TEMPLATE — одним format_map,
+        без пошаговых склеек строк. Условные блоки (пени и т.п.) даёт _prompt_blocks.
+        top_chunk — самый релевантный чанк контекста: если он покрывает вопрос, веб-поиск не выполняется.
+        """
+        if not self.PROMPT_TEMPLATE:
+            raise NotImplementedError("Каждый агент должен задать PROMPT_TEMPLATE или реализовать свой _build_prompt")
+        extra = self.improve_prompt_from_feedback()
+
+        # Те же входные данные — тот же промт: пропускаем и веб-поиск, и сборку шаблона
+        key = hashlib.blake2b(
+            "\x1f".join((summary, context_text, role, extra, top_chunk or "")).encode("utf-8"), digest_size=16
+        ).digest()
+        with self._cache_lock:
+            cached = self._prompt_cache.get(key)
+            if cached is not None and cached[0] > time.time():
+                self._prompt_cache.move_to_end(key)
+                return cached[1]
+
+        q_lower = summary.lower()
+        if self._context_covers(q_lower, top_chunk):
+            web_results = self.WEB_SEARCH_SKIPPED
+            cacheable = True
+        else:
+            # Кэшируем только промты с успешным веб-поиском: сообщение об ошибке не должно застрять в кэше
+            web_results, cacheable = self._search_web(summary)
+
+        fields = self._prompt_blocks(q_lower)
+        fields.update(
+            context_text=context_text,
+            web_results=web_results,
+            extra=extra,
+            role_instruction=self.get_role_instruction(role),
+        )
+        # Шаблон уже обёрнут в формат Saiga/LLaMA-3 (см. __init__)
+        system_prompt = self._prompt_template.format_map(fields)
+
+        # Веб-результаты внутри промта устаревают так же, как в кэше DDGS
+        if cacheable:
+            with self._cache_lock:
+                self._prompt_cache[key] = (time.time() + self.WEB_CACHE_TTL, system_prompt)
+                self._prompt_cache.move_to_end(key)
+                if len(self._prompt_cache) > self.PROMPT_CACHE_SIZE:
+                    self._prompt_cache.popitem(last=False)
+        return system_prompt
+
+    def _context_covers(self, q_lower: str, top_chunk: Optional[str]) -> bool:
+        """
+        Покрывает ли лучший по релевантности чанк базы знаний вопрос: в нём есть не меньше
+        CONTEXT_COVERAGE_THRESHOLD значимых слов вопроса (по основе). Тогда веб-поиск не выполняется.
+        Весь склеенный контекст для этого не годится — в нём слова вопроса найдутся почти всегда.
+        """
+        return bool(top_chunk) and question_coverage(q_lower, top_chunk) >= self.CONTEXT_COVERAGE_THRESHOLD
+
+    def prompt_prefix(self) -> str:
+        """
+        Неизменное начало системного промта: заголовок и жёсткие правила до первого подставляемого поля.
+        Одинаково для всех запросов к агенту — по нему RAGSystem переиспользует KV-кэш модели.
+        """
+        return self._prompt_prefix
+
+    def _prompt_blocks(self, q_lower: str) -> Dict[str, str]:
+        """Условные блоки промта, которые зависят от текста запроса."""
+        return {"penalty_block": self.PENALTY_BLOCK if self._penalty_re.search(q_lower) else ""}
 
     def get_role_instruction(self, role: str) -> str:
-        base = {
-            "житель": "Ответ ориентирован на жителя. Давайте пошаговые действия с ссылками на НПА.",
-            "исполнитель": "Ответ ориентирован на УК/ТСН. Включайте судебную практику и процедуры.",
-            "смешанная": "Разделите ответ на две части: для жителя и для исполнителя."
+        return self.ROLE_INSTRUCTIONS.get(role, self.ROLE_INSTRUCTIONS["смешанная"])
+
+    def _shared_term_map(self) -> Tuple[Dict, FrozenSet[str]]:
+        """
+        Карта терминов агента и множество её ключевых слов.
+        Строятся один раз на класс и переиспользуются всеми его экземплярами (карта не изменяется).
+        """
+        cls = type(self)
+        cached = RAGAgent._term_map_cache.get(cls)
+        if cached is None:
+            term_map = self._intern_term_map(self._build_term_map())
+            cached = RAGAgent._term_map_cache[cls] = (term_map, self._flatten_term_map(term_map))
+        return cached
+
+    @staticmethod
+    def _intern_term_map(term_map: Dict) -> Dict:
+        """
+        Термины и синонимы у агентов во многом совпадают («капремонт», «управляющая компания» и т.п.):
+        интернируем их, чтобы карты всех агентов ссылались на одни и те же строки,
+        а списки синонимов заменяем неизменяемыми кортежами.
+        """
+        return {
+            sys.intern(term): {**data, "synonyms": tuple(map(sys.intern, data.get("synonyms", ())))}
+            for term, data in term_map.items()
+        }
+
+    def _flatten_term_map(self, term_map: Dict) -> FrozenSet[str]:
+        """Преобразует структурированный словарь в множество уникальных ключевых слов (в нижнем регистре)."""
+        return frozenset(sys.intern(kw.lower()) for kw in self._iter_term_map_keywords(term_map))
+
+    @staticmethod
+    def _iter_term_map_keywords(term_map: Dict) -> Iterator[str]:
+        """Термины карты, их синонимы и контексты (ключи, если контексты заданы словарём)."""
+        for term, data in term_map.items():
+            yield term  # оригинальный ключ
+            yield from data.get("synonyms", [])
+            contexts = data.get("contexts", [])
+            if isinstance(contexts, (dict, list)):
+                yield from contexts
+
+    # ---- Веб-поиск ----
+    def _perform_web_search(self, query: str, max_results: int = 3) -> str:
+        """
+        Улучшенный веб-поиск: приоритет официальным источникам, фильтрация, ранжирование.
+        Источники и дополнительные запросы задаются атрибутами класса агента
+        (OFFICIAL_DOMAINS, GOV_SUFFIXES, SEARCH_QUERY_TEMPLATES).
+        """
+        return self._search_web(query, max_results)[0]
+
+    def _search_web(self, query: str, max_results: int = 3) -> Tuple[str, bool]:
+        """
+        Веб-поиск с признаком успеха: (текст для промта, True) — выдача получена (в том числе из кэша
+        или пустая), (сообщение, False) — поиск не выполнен из-за ошибки или отключения DDGS.
+        """
+        # Повтор того же запроса (ретрай, уточнение в диалоге) — отдаём прошлый результат без расширения и кэша
+        last_key, last_expires, last_result = self._last_search
+        if last_key == (query, max_results) and last_expires > time.time():
+            return last_result, True
+
+        # Тот же вопрос в другом регистре/с другими пробелами, затем близкий по смыслу — из кэша агента
+        search_key = self._web_cache_key(f"{max_results}\x1f{query}")
+        hit = self._search_cache_get(search_key)
+        if hit is None:
+            query_embedding = self._embed_query(query)
+            hit = self._semantic_cache_get(query_embedding, max_results)
+        if hit is not None:
+            expires, result = hit
+            self._last_search = ((query, max_results), expires, result)
+            return result, True
+
+        # DDGS недавно стабильно падал — не ждём таймаутов и пауз ретрая, сразу отвечаем без веб-поиска
+        if RAGAgent._web_blocked_until > time.time():
+            return "Не удалось выполнить веб-поиск. Попробуйте позже.", False
+
+        # Генерируем расширенные поисковые запросы на основе терминов
+        expanded_queries = self._expand_search_query(query)
+        top_size = max_results * 4
+
+        for attempt in range(2):
+            pending = {}
+            # Выдачу каждая попытка собирает заново: после частичного сбоя повтор не должен
+            # второй раз класть в кучу уже разобранные сниппеты и завышать счёт официальных
+            # Лучшие попарно различные сниппеты по весу — ограниченная мин-куча (вес, -номер, сниппет, слова):
+            # в памяти не больше top_size результатов, а при равном весе остаются пришедшие раньше
+            top_hits: List[Tuple[int, int, SearchHit, FrozenSet[str]]] = []
+            order = count()
+            # Наибольший вес, с которым уже встречался сниппет (по ключу): повтор не тяжелее отбрасываем до кучи,
+            # иначе одинаковые сниппеты из разных расширенных запросов вытеснили бы из неё разные результаты.
+            # Более весомая копия (тот же текст с официального сайта) проходит и заменяет прежнюю в _offer_hit
+            seen_weights: Dict[bytes, int] = {}
+            try:
+                # Запросы, которых нет в кэше, отправляем в DDGS параллельно, но не больше WEB_SEARCH_BATCH
+                # вперёд: после досрочного выхода оставшиеся запросы так и не уходят в сеть.
+                # Ответы разбираем в исходном порядке — ранжирование не зависит от скорости сети
+                cached = {q: self._web_cache_get(q) for q in expanded_queries}
+                for i, q in enumerate(expanded_queries):
+                    for ahead in expanded_queries[i:i + self.WEB_SEARCH_BATCH]:
+                        if cached[ahead] is None and ahead not in pending:
+                            pending[ahead] = self._web_pool.submit(self._fetch_ddgs_text, ahead)
+                    results = cached[q]
+                    if results is None:
+                        results = self._web_cache_put(q, pending[q].result())
+                    for body, href in results:
+                        if not href:
+                            continue
+
+                        try:
+                            domain = urlsplit(href).hostname  # уже в нижнем регистре и без порта
+                        except ValueError:
+                            continue
+                        if not domain:
+                            continue
+
+                        # Пропускаем чёрный список
+                        weight = self._classify_domain(domain)
+                        if weight is None:
+                            continue
+
+                        body_key = self._body_key(body)
+                        if seen_weights.get(body_key, -1) >= weight:
+                            continue
+                        seen_weights[body_key] = weight
+                        entry = (weight, -next(order), SearchHit(body, href, weight, body_key), self._body_tokens(body))
+                        self._offer_hit(top_hits, entry, top_size)
+
+                    # Уже есть max_results разных официальных сниппетов: выше их ничто не встанет,
+                    # поэтому остальные запросы выдачу не изменят
+                    if sum(e[0] >= 3 for e in top_hits) >= max_results:
+                        break
+
+                # Почти одинаковые сниппеты отсеяны ещё до обрезки кучи, так что лучшие max_results — разные
+                unique_results = [e[2] for e in sorted(top_hits, reverse=True)[:max_results]]
+
+                if unique_results:
+                    result = "\n\n".join(
+                        f"{self._SOURCE_PREFIXES[hit.weight >= 2]}• {hit.body}\n  Источник: {hit.href}"
+                        for hit in unique_results
+                    )
+                else:
+                    result = "По вашему запросу ничего не найдено в надёжных источниках."
+                self._last_search = ((query, max_results), time.time() + self.WEB_CACHE_TTL, result)
+                self._search_cache_put(search_key, max_results, query_embedding, result)
+                RAGAgent._web_failures = 0
+                return result, True
+
+            except Exception as e:
+                if attempt == 0:
+                    # Попытка повторяется один раз, поэтому пауза фиксированная, а не растущая: сбой DDGS
+                    # обычно кратковременный, а разброс не даёт повторам разных агентов совпасть по времени
+                    time.sleep(self.WEB_RETRY_DELAY * (1 + random.random()))
+                    continue
+                RAGAgent._web_failures += 1
+                if RAGAgent._web_failures >= self.WEB_BREAKER_THRESHOLD:
+                    RAGAgent._web_blocked_until = time.time() + self.WEB_BREAKER_COOLDOWN
+                    RAGAgent._web_failures = 0
+                return f"Ошибка веб-поиска: {str(e)}", False
+            finally:
+                # После досрочного выхода или ошибки ещё не начатые запросы не нужны
+                for future in pending.values():
+                    future.cancel()
+
+        return "Не удалось выполнить веб-поиск. Попробуйте позже.", False
+
+    @classmethod
+    def _fetch_ddgs_text(cls, q: str) -> List[Dict[str, str]]:
+        """
+        Один запрос к DDGS — выполняется в потоке пула.
+        У каждого потока своя постоянная сессия, поэтому HTTP-соединения переиспользуются между запросами.
+        """
+        ddgs = getattr(cls._ddgs_local, "session", None)
+        if ddgs is None:
+            ddgs = cls._ddgs_local.session = DDGS(timeout=10)
+        try:
+            return ddgs.text(q, max_results=5)
+        except Exception:
+            # После сетевой ошибки сессию не переиспользуем — следующий запрос откроет новую
+            cls._ddgs_local.session = None
+            raise
+
+    @staticmethod
+    def _body_key(body: str) -> bytes:
+        """
+        Ключ дедупликации сниппета: 8-байтовый blake2b от первых 100 символов
+        без учёта регистра и пробелов (стабилен между процессами, в отличие от hash()).
+        """
+        return hashlib.blake2b(" ".join(body.split())[:100].lower().encode("utf-8"), digest_size=8).digest()
+
+    @staticmethod
+    def _body_tokens(body: str) -> FrozenSet[str]:
+        """Множество первых 80 слов сниппета в нижнем регистре — для поиска почти одинаковых текстов."""
+        return frozenset(re.findall(r"\w+", body.lower())[:80])
+
+    def _is_near_duplicate(self, tokens: FrozenSet[str], other: FrozenSet[str]) -> bool:
+        """Сниппеты почти совпадают: коэффициент Жаккара их слов не ниже NEAR_DUPLICATE_JACCARD."""
+        if not tokens or not other:
+            return False
+        return len(tokens & other) >= self.NEAR_DUPLICATE_JACCARD * len(tokens | other)
+
+    def _offer_hit(self, top_hits: List[Tuple[int, int, SearchHit, FrozenSet[str]]],
+                   entry: Tuple[int, int, SearchHit, FrozenSet[str]], top_size: int) -> None:
+        """
+        Кладёт сниппет в ограниченную кучу лучших, сохраняя её записи попарно различными.
+        Совпадающий (тот же ключ) или почти одинаковый с уже лежащим сниппет (перепечатка, другая обрезка)
+        остаётся в одном экземпляре — более весомом, — поэтому дубликаты не вытесняют из кучи разные результаты.
+        """
+        dups = [
+            i for i, other in enumerate(top_hits)
+            if other[2].body_key == entry[2].body_key or self._is_near_duplicate(entry[3], other[3])
+        ]
+        if dups:
+            if any(top_hits[i] > entry for i in dups):
+                return
+            for i in reversed(dups):
+                top_hits[i] = top_hits[-1]
+                top_hits.pop()
+            heapq.heapify(top_hits)
+        if len(top_hits) < top_size:
+            heapq.heappush(top_hits, entry)
+        elif entry > top_hits[0]:
+            heapq.heapreplace(top_hits, entry)
+
+    @staticmethod
+    def _web_cache_key(q: str) -> bytes:
+        """Стабильный ключ кэша: хеш нормализованного запроса (регистр и лишние пробелы не важны)."""
+        return hashlib.blake2b(" ".join(q.lower().split()).encode("utf-8"), digest_size=16).digest()
+
+    def _web_cache_get(self, q: str) -> Optional[Tuple[Tuple[str, str], ...]]:
+        """Возвращает закэшированные результаты DDGS по запросу или None, если их нет или они устарели."""
+        key = self._web_cache_key(q)
+        with self._web_cache_lock:
+            entry = self._web_cache.get(key)
+            if entry is None:
+                return None
+            expires, results = entry
+            if expires < time.time():
+                del self._web_cache[key]
+                return None
+            self._web_cache.move_to_end(key)
+            return results
+
+    def _web_cache_put(self, q: str, raw_results) -> Tuple[Tuple[str, str], ...]:
+        """Сохраняет ответ DDGS в кэш в виде пар (body, href) — заголовки в ответе не используются — и возвращает их."""
+        results = tuple((r['body'], r.get('href', '')) for r in raw_results)
+        key = self._web_cache_key(q)
+        with self._web_cache_lock:
+            self._web_cache[key] = (time.time() + self.WEB_CACHE_TTL, results)
+            # Вытесняем самые давно использованные запросы
+            while len(self._web_cache) > self.WEB_CACHE_SIZE:
+                self._web_cache.popitem(last=False)
+        return results
+
+    @staticmethod
+    def _embed_query(query: str) -> np.ndarray:
+        """Нормализованный эмбеддинг вопроса той же моделью, что и поиск по базе знаний."""
+        emb = embedding_model.encode([query], prompt_name="search_query", convert_to_numpy=True, normalize_embeddings=True)
+        return emb[0].astype('float32')
+
+    def _search_cache_get(self, key: bytes) -> Optional[Tuple[float, str]]:
+        """Точное попадание в кэш поиска агента: (срок годности, результат) или None."""
+        with self._cache_lock:
+            entry = self._search_cache.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.time():
+                del self._search_cache[key]
+                return None
+            self._search_cache.move_to_end(key)
+            return entry[0], entry[3]
+
+    def _semantic_cache_get(self, query_embedding: np.ndarray, max_results: int) -> Optional[Tuple[float, str]]:
+        """
+        Ищет в кэше поиска вопрос, близкий по смыслу (косинус >= SEMANTIC_CACHE_THRESHOLD).
+        Эмбеддинги нормализованы, поэтому косинус — это скалярное произведение.
+        """
+        now = time.time()
+        with self._cache_lock:
+            for key in [key for key, entry in self._search_cache.items() if entry[0] < now]:
+                del self._search_cache[key]
+            candidates = [(key, entry) for key, entry in self._search_cache.items() if entry[1] == max_results]
+            if not candidates:
+                return None
+            scores = np.stack([entry[2] for _, entry in candidates]) @ query_embedding
+            best = int(np.argmax(scores))
+            if scores[best] < self.SEMANTIC_CACHE_THRESHOLD:
+                return None
+            key, (expires, _, _, result) = candidates[best]
+            self._search_cache.move_to_end(key)
+            return expires, result
+
+    def _search_cache_put(self, key: bytes, max_results: int, query_embedding: np.ndarray, result: str) -> None:
+        """Запоминает успешный результат поиска, вытесняя самые давно использованные записи."""
+        with self._cache_lock:
+            self._search_cache[key] = (time.time() + self.SEMANTIC_CACHE_TTL, max_results, query_embedding, result)
+            while len(self._search_cache) > self.SEMANTIC_CACHE_SIZE:
+                self._search_cache.popitem(last=False)
+
+    def _classify_domain(self, domain: str) -> Optional[int]:
+        """
+        Вес источника для домена или None, если домен в чёрном списке.
+        Одни и те же сайты приходят почти в каждой выдаче, поэтому вердикт запоминается.
+        """
+        # Чтение словаря атомарно, поэтому частый случай — известный домен — обходится без блокировки
+        try:
+            return self._domain_verdicts[domain]
+        except KeyError:
+            pass
+        if domain.endswith(self._blacklist_suffixes) or any(m in domain for m in self.BLACKLISTED_MARKERS):
+            verdict = None
+        else:
+            verdict = self._source_weight(domain)
+        with self._cache_lock:
+            if len(self._domain_verdicts) >= 4096:
+                self._domain_verdicts.clear()
+            self._domain_verdicts[domain] = verdict
+        return verdict
+
+    def _source_weight(self, domain: str) -> int:
+        """
+        Вес источника: 3 — официальный домен (или его поддомен), 2 — государственный портал, 1 — прочие.
+        Официальные домены ищутся по таблице для самого домена и его родительских доменов.
+        """
+        labels = domain.split('.')
+        for i in range(len(labels) - 1):
+            weight = self._domain_weights.get('.'.join(labels[i:]))
+            if weight:
+                return weight
+        return 2 if domain.endswith(self.GOV_SUFFIXES) else 1
+
+    def _expand_search_query(self, query: str) -> List[str]:
+        """
+        Генерирует несколько вариантов поискового запроса для лучшего покрытия темы:
+        исходный запрос, запросы агента (_template_queries) и варианты с синонимами.
+        Дубликаты убираются с сохранением порядка, всего не больше MAX_SEARCH_QUERIES запросов.
+        """
+        queries = {}
+        for q in chain((query,), self._template_queries(query), self._synonym_queries(query)):
+            queries.setdefault(q, None)
+            if len(queries) >= self.MAX_SEARCH_QUERIES:
+                break  # Остальные варианты даже не генерируем
+        return list(queries)
+
+    def _template_queries(self, query: str) -> Iterator[str]:
+        """Запросы по нормативным актам и практике из шаблонов агента."""
+        return (template.format(q=query) for template in self.SEARCH_QUERY_TEMPLATES)
+
+    def _synonym_queries(self, query: str) -> Iterator[str]:
+        """Варианты запроса с синонимами терминов из словаря, найденных в запросе."""
+        hit_terms = self._find_terms(self._normalize_text(query))
+        for term, top2 in self._syn_top2.items():
+            if term in hit_terms:
+                for synonym in top2:  # Берем первые 2 синонима
+                    yield query.replace(term, synonym) if term in query else query + " " + synonym
+
+    def _build_term_matcher(self):
+        """
+        Готовит поиск всех терминов и синонимов за один проход регулярки.
+        В каждой позиции запроса lookahead находит самую длинную из строк словаря,
+        а более короткие строки, совпавшие в той же позиции, — её префиксы; их термины
+        заранее собраны в _match_terms. Результат совпадает с проверкой «подстрока in запрос».
+        Строки словаря нормализуются (_normalize_text) один раз здесь, так как сравниваются
+        с так же нормализованным запросом (иначе «ГИС ЖКХ», «ОДПУ» и т.п. не находились бы никогда).
+        """
+        owners: Dict[str, set] = {}
+        for term, synonyms in self._term_synonyms.items():
+            for text in (term, *synonyms):
+                if text:
+                    owners.setdefault(self._normalize_text(text), set()).add(term)
+        self._match_terms: Dict[str, frozenset] = {
+            text: frozenset().union(*(owners[text[:k]] for k in range(1, len(text) + 1) if text[:k] in owners))
+            for text in owners
         }
-        return base.get(role, base["смешанная"])
+        alternatives = sorted(owners, key=len, reverse=True)
+        self._term_re = re.compile("(?=(%s))" % "|".join(map(re.escape, alternatives))) if alternatives else None
+
+    @staticmethod
+    def _normalize_text(text: str) -> str:
+        """NFKC + casefold: неразрывные пробелы, лигатуры и регистр не мешают сравнению строк."""
+        return unicodedata.normalize("NFKC", text).casefold()
+
+    def _find_terms(self, q_norm: str) -> set:
+        """Термины словаря, которые (сами или через синоним) встречаются в нормализованном запросе."""
+        if self._term_re is None:
+            return set()
+        hits = set()
+        for m in self._term_re.finditer(q_norm):
+            hits |= self._match_terms[m.group(1)]
+        return hits
 
     # ---- Обучение агента ----
     def add_feedback(self, query: str, ideal_answer: str, rating: float = 1.0):
@@ -214,6 +829,7 @@ class RAGAgent:
                 "rating": rating,
                 "timestamp": time.time()
             })
+            self._feedback_extra = (0.0, "")  # Новый пример — пересобрать блок при следующем промте
         self._save_feedback()
 
     def _save_feedback(self):
@@ -231,6 +847,18 @@ class RAGAgent:
                 self.feedback_data = []
 
     def improve_prompt_from_feedback(self) -> str:
+        """
+        Блок с примерами удачных ответов. Выборка примеров обновляется раз в FEEDBACK_EXTRA_TTL секунд
+        (или после add_feedback), поэтому промты одного вопроса совпадают и попадают в _prompt_cache.
+        """
+        expires, extra = self._feedback_extra
+        if expires > time.time():
+            return extra
+        extra = self._sample_feedback_examples()
+        self._feedback_extra = (time.time() + self.FEEDBACK_EXTRA_TTL, extra)
+        return extra
+
+    def _sample_feedback_examples(self) -> str:
         if len(self.feedback_data) < 3:
             return ""
         examples = random.sample(self.feedback_data, min(3, len(self.feedback_data)))
@@ -255,10 +883,20 @@ class RAGAgent:
 # ---------------------------
 
 class TariffAgent(RAGAgent):
+    SEARCH_QUERY_TEMPLATES = (
+        "{q} ПП РФ 354",
+        "{q} ЖК РФ",
+        "{q} судебная практика",
+        "{q} региональный тариф",
+    )
+    PENALTY_KEYWORDS = (
+        "пени", "пеня", "неустойка", "штраф за просрочку",
+        "ставка цб", "9.5%", "ключевая ставка",
+    )
+
     def __init__(self):
         # Расширенный и структурированный словарь с синонимами и контекстами
-        self.term_map = self._build_term_map()
-        keywords = self._flatten_term_map(self.term_map)
+        self.term_map, keywords = self._shared_term_map()
         
         super().__init__("Тарифы и начисления", keywords)
 
@@ -359,178 +997,52 @@ class TariffAgent(RAGAgent):
             "неправильный тариф": {"synonyms": ["не соответствует региональному", "повышение тарифа", "обоснование тарифа"], "norm_refs": [], "contexts": []},
         }
 
-    def _flatten_term_map(self, term_map: Dict) -> List[str]:
-        """Преобразует структурированный словарь в плоский список уникальных ключевых слов."""
-        keywords = set()
-        for term, data in term_map.items():
-            keywords.add(term.lower())  # оригинальный ключ
-            for synonym in data.get("synonyms", []):
-                keywords.add(synonym.lower())
-            # Добавляем ключи из контекстов
-            contexts = data.get("contexts", [])
-            if isinstance(contexts, dict):
-                for ctx_key in contexts.keys():
-                    keywords.add(ctx_key.lower())
-            elif isinstance(contexts, list):
-                for ctx in contexts:
-                    keywords.add(ctx.lower())
-        return list(keywords)
-
-    def _perform_web_search(self, query: str, max_results: int = 3) -> str:
-        """
-        Улучшенный веб-поиск: приоритет официальным источникам, фильтрация, ранжирование.
-        Выполняется ДО формирования промпта, а не внутри него.
-        """
-        OFFICIAL_DOMAINS = {
-            "cbr.ru", "government.ru", "kremlin.ru", "rosstat.gov.ru", "minfin.gov.ru",
-            "fas.gov.ru", "gji.ru", "rospotrebnadzor.ru", "rosreestr.gov.ru",
-            "minstroyrf.ru", "fgis-tarif.ru", "consultant.ru", "garant.ru",
-            "pravo.gov.ru", "gkh.ru"
-        }
-
-        BLACKLISTED_DOMAINS = {
-            "otvet.mail.ru", "ask.fm", "irecommend.ru", "pikabu.ru",
-            "zen.yandex.ru", "thequestion.ru", "quora.com", "reddit.com",
-            "fishki.net", "yaplakal.com", "blog", "forum"
-        }
-
-        # Генерируем расширенные поисковые запросы на основе терминов
-        expanded_queries = self._expand_search_query(query)
-        all_results = []
-
-        for attempt in range(2):
-            try:
-                with DDGS(timeout=10) as ddgs:
-                    for q in expanded_queries:
-                        results = ddgs.text(q, max_results=5)
-                        for r in results:
-                            href = r.get('href', '')
-                            if not href:
-                                continue
-                            
-                            try:
-                                domain = href.split('/')[2].lower()
-                            except IndexError:
-                                continue
-
-                            # Пропускаем чёрный список
-                            if any(bad in domain for bad in BLACKLISTED_DOMAINS):
-                                continue
-
-                            # Оцениваем вес источника
-                            weight = 0
-                            if any(official in domain for official in OFFICIAL_DOMAINS):
-                                weight = 3  # Официальный источник
-                            elif any(gov in domain for gov in [".gov.ru", ".gkh.ru"]):
-                                weight = 2  # Государственный портал
-                            else:
-                                weight = 1  # Обычный источник
-
-                            snippet = {
-                                "body": r['body'],
-                                "href": href,
-                                "title": r.get('title', ''),
-                                "weight": weight
-                            }
-                            all_results.append(snippet)
-
-                    # Сортируем по весу и убираем дубликаты
-                    all_results = sorted(all_results, key=lambda x: x['weight'], reverse=True)
-                    seen_bodies = set()
-                    unique_results = []
-                    for r in all_results:
-                        body_hash = hash(r['body'][:100])  # Хешируем начало сниппета
-                        if body_hash not in seen_bodies:
-                            seen_bodies.add(body_hash)
-                            unique_results.append(r)
-                            if len(unique_results) >= max_results:
-                                break
-
-                    if unique_results:
-                        formatted = []
-                        for r in unique_results:
-                            prefix = "[ОФИЦИАЛЬНЫЙ ИСТОЧНИК] " if r['weight'] >= 2 else ""
-                            formatted.append(
-                                f"{prefix}• {r['body']}\n  Источник: {r['href']}\n"
-                            )
-                        return "\n".join(formatted).strip()
-                    else:
-                        return "По вашему запросу ничего не найдено в надёжных источниках."
-
-            except Exception as e:
-                if attempt == 0:
-                    time.sleep(2)
-                    continue
-                return f"Ошибка веб-поиска: {str(e)}"
-
-        return "Не удалось выполнить веб-поиск. Попробуйте позже."
-
-    def _expand_search_query(self, query: str) -> List[str]:
-        """Генерирует несколько вариантов поискового запроса для лучшего покрытия темы."""
-        queries = [query]
-        # Добавляем ключевые нормативные акты
-        queries.append(f"{query} ПП РФ 354")
-        queries.append(f"{query} ЖК РФ")
-        queries.append(f"{query} судебная практика")
-        queries.append(f"{query} региональный тариф")
-        # Добавляем синонимы из словаря
-        for term, data in self.term_map.items():
-            if term in query.lower() or any(syn in query.lower() for syn in data.get("synonyms", [])):
-                for synonym in data.get("synonyms", [])[:2]:  # Берем первые 2 синонима
-                    queries.append(query.replace(term, synonym))
-        return list(set(queries))  # Убираем дубликаты
-
-    def _build_prompt(self, summary: str, context_text: str, role: str = "смешанная") -> str:
-        """
-        Формирует системный промт для агента 'Тарифы и начисления'.
-        Итоговый ответ: краткий вывод + ссылки на законы и постановления из контекста.
-        """
-        # Динамические обновления (например, свежие постановления по тарифам)
-        extra = self.improve_prompt_from_feedback()
-        web_results = self._perform_web_search(summary)
-    
-        # Проверка, нужен ли расчёт пени
-        penalty_keywords = ["пени", "пеня", "неустойка", "штраф за просрочку", "ставка цб", "9.5%", "ключевая ставка"]
-        q_lower = summary.lower()
-        should_calculate_penalty = any(kw in q_lower for kw in penalty_keywords)
-    
-        # Системный промт
-        system_prompt = (
-            "Ты — экспертный ИИ-ассистент по тарифам и начислениям в сфере ЖКХ. "
-            "Отвечай строго по закону, без выдуманных данных. "
-            "Структура ответа всегда: краткий вывод → нормативная база.\n\n"
-            "**ЖЕСТКИЕ ПРАВИЛА:**\n"
-            "1. НИКАКИХ ГАЛЛЮЦИНАЦИЙ: если информации нет, ответь: 'Недостаточно данных для точного ответа. Обратитесь в управляющую компанию.'\n"
-            "2. В кратком выводе — 2–3 предложения по сути.\n"
-            "3. В нормативной базе перечисляй только реально найденные законы, статьи ЖК РФ, ФЗ или постановления (с номерами и датами).\n"
-            "4. Не добавляй формулы и примеры, если пользователь не спрашивал про расчёт.\n\n"
-            f"### Контекстная информация:\n{context_text}\n\n"
-            f"### Результаты веб-поиска:\n{web_results}\n\n"
-            f"### Дополнительные обновления:\n{extra}\n\n"
-        )
-    
-        # Если вопрос про пени — добавляем блок с формулой
-        if should_calculate_penalty:
-            system_prompt += (
-                "\n**Если в вопросе упомянуты пени — добавь формулу:**\n"
-                "- Пени = Сумма долга × Дни просрочки × (Ключевая ставка ЦБ РФ / 300 / 100)\n"
-                "- Основание: ЖК РФ ст. 155.1, ПП РФ №354, ПП РФ №329.\n"
-                "- Начало начисления: с 31-го дня после срока оплаты.\n"
-            )
-    
-        # Оборачиваем в формат Saiga/LLaMA-3
-        system_prompt_formatted = (
-            "<|begin_of_text|><|start_header_id|>system<|end_header_id|>\n"
-            f"{system_prompt}<|eot_id|>"
-        )
+    # Системный промт для агента 'Тарифы и начисления'.
+    # Итоговый ответ: краткий вывод + ссылки на законы и постановления из контекста.
+    PROMPT_TEMPLATE = (
+        "Ты — экспертный ИИ-ассистент по тарифам и начислениям в сфере ЖКХ. Отвечай строго по закону, "
+        "без выдуманных данных. Структура ответа всегда: краткий вывод → нормативная база.\n\n"
+        "**ЖЕСТКИЕ ПРАВИЛА:**\n"
+        "1. НИКАКИХ ГАЛЛЮЦИНАЦИЙ: если информации нет, ответь: 'Недостаточно данных для точного ответа. "
+        "Обратитесь в управляющую компанию.'\n"
+        "2. В кратком выводе — 2–3 предложения по сути.\n"
+        "3. В нормативной базе перечисляй только реально найденные законы, статьи ЖК РФ, "
+        "ФЗ или постановления (с номерами и датами).\n"
+        "4. Не добавляй формулы и примеры, если пользователь не спрашивал про расчёт.\n\n"
+        "### Контекстная информация:\n"
+        "{context_text}\n\n"
+        "### Результаты веб-поиска:\n"
+        "{web_results}\n\n"
+        "### Дополнительные обновления:\n"
+        "{extra}\n\n"
+        "{penalty_block}"
+    )
+    PENALTY_BLOCK = (
+        "\n**Если в вопросе упомянуты пени — добавь формулу:**\n"
+        "- Пени = Сумма долга × Дни просрочки × (Ключевая ставка ЦБ РФ / 300 / 100)\n"
+        "- Основание: ЖК РФ ст. 155.1, ПП РФ №354, ПП РФ №329.\n"
+        "- Начало начисления: с 31-го дня после срока оплаты.\n"
+    )
 
-        return system_prompt_formatted
 
 class NormativeAgent(RAGAgent):
+    OFFICIAL_DOMAINS = RAGAgent.OFFICIAL_DOMAINS | {"ksrf.ru", "vsrf.ru"}
+    GOV_SUFFIXES = (".gov.ru", ".gkh.ru", ".ksrf.ru", ".vsrf.ru")
+    SEARCH_QUERY_TEMPLATES = (
+        "{q} ПП РФ 354",
+        "{q} ЖК РФ",
+        "{q} Минстрой России разъяснения",
+        "{q} судебная практика ВС РФ",
+        "{q} Конституционный Суд РФ",
+    )
+    PENALTY_KEYWORDS = (
+        "пени", "пеня", "неустойка", "штраф за просрочку",
+        "ставка цб", "9.5%", "ключевая ставка",
+    )
+
     def __init__(self):
         # Расширенный и структурированный словарь с синонимами и контекстами
-        self.term_map = self._build_term_map()
-        keywords = self._flatten_term_map(self.term_map)
+        self.term_map, keywords = self._shared_term_map()
         
         super().__init__("Нормативные документы", keywords)
 
@@ -634,174 +1146,57 @@ class NormativeAgent(RAGAgent):
             }
         }
 
-    def _flatten_term_map(self, term_map: Dict) -> List[str]:
-        """Преобразует структурированный словарь в плоский список уникальных ключевых слов."""
-        keywords = set()
-        for term, data in term_map.items():
-            keywords.add(term.lower())  # оригинальный ключ
-            for synonym in data.get("synonyms", []):
-                keywords.add(synonym.lower())
-            # Добавляем ключи из контекстов
-            contexts = data.get("contexts", [])
-            if isinstance(contexts, dict):
-                for ctx_key in contexts.keys():
-                    keywords.add(ctx_key.lower())
-            elif isinstance(contexts, list):
-                for ctx in contexts:
-                    keywords.add(ctx.lower())
-        return list(keywords)
-
-    def _perform_web_search(self, query: str, max_results: int = 3) -> str:
-        """
-        Улучшенный веб-поиск: приоритет официальным источникам, фильтрация, ранжирование.
-        Выполняется ВНУТРИ _build_prompt, как в оригинальной архитектуре.
-        """
-        OFFICIAL_DOMAINS = {
-            "cbr.ru", "government.ru", "kremlin.ru", "rosstat.gov.ru", "minfin.gov.ru",
-            "fas.gov.ru", "gji.ru", "rospotrebnadzor.ru", "rosreestr.gov.ru",
-            "minstroyrf.ru", "fgis-tarif.ru", "consultant.ru", "garant.ru",
-            "pravo.gov.ru", "gkh.ru", "ksrf.ru", "vsrf.ru"
-        }
-
-        BLACKLISTED_DOMAINS = {
-            "otvet.mail.ru", "ask.fm", "irecommend.ru", "pikabu.ru",
-            "zen.yandex.ru", "thequestion.ru", "quora.com", "reddit.com",
-            "fishki.net", "yaplakal.com", "blog", "forum"
-        }
-
-        # Генерируем расширенные поисковые запросы
-        expanded_queries = self._expand_search_query(query)
-        all_results = []
-
-        for attempt in range(2):
-            try:
-                with DDGS(timeout=10) as ddgs:
-                    for q in expanded_queries:
-                        results = ddgs.text(q, max_results=5)
-                        for r in results:
-                            href = r.get('href', '')
-                            if not href:
-                                continue
-                            
-                            try:
-                                domain = href.split('/')[2].lower()
-                            except IndexError:
-                                continue
-
-                            if any(bad in domain for bad in BLACKLISTED_DOMAINS):
-                                continue
-
-                            weight = 3 if any(official in domain for official in OFFICIAL_DOMAINS) else \
-                                     2 if any(gov in domain for gov in [".gov.ru", ".gkh.ru", ".ksrf.ru", ".vsrf.ru"]) else 1
-
-                            snippet = {
-                                "body": r['body'],
-                                "href": href,
-                                "title": r.get('title', ''),
-                                "weight": weight
-                            }
-                            all_results.append(snippet)
-
-                    all_results = sorted(all_results, key=lambda x: x['weight'], reverse=True)
-                    seen_bodies = set()
-                    unique_results = []
-                    for r in all_results:
-                        body_hash = hash(r['body'][:100])
-                        if body_hash not in seen_bodies:
-                            seen_bodies.add(body_hash)
-                            unique_results.append(r)
-                            if len(unique_results) >= max_results:
-                                break
-
-                    if unique_results:
-                        formatted = []
-                        for r in unique_results:
-                            prefix = "[ОФИЦИАЛЬНЫЙ ИСТОЧНИК] " if r['weight'] >= 2 else ""
-                            formatted.append(f"{prefix}• {r['body']}\n  Источник: {r['href']}\n")
-                        return "\n".join(formatted).strip()
-                    else:
-                        return "По вашему запросу ничего не найдено в надёжных источниках."
-
-            except Exception as e:
-                if attempt == 0:
-                    time.sleep(2)
-                    continue
-                return f"Ошибка веб-поиска: {str(e)}"
-
-        return "Не удалось выполнить веб-поиск. Попробуйте позже."
+    # Агент: Нормативные документы (ЖКХ).
+    # Системный промт для Saiga/LLaMA-3 8B:
+    # - Ответ = краткий вывод + ссылки на законы и постановления
+    # - Приоритет официальных источников
+    # - Никаких галлюцинаций
+    # - Формулы пени только при запросе
+    PROMPT_TEMPLATE = (
+        "Ты — эксперт по нормативным документам в сфере ЖКХ. "
+        "Давай только точные ответы на основе контекста и найденных законов.\n\n"
+        "**ЖЕСТКИЕ ПРАВИЛА:**\n"
+        "1. Если нет данных — ответ: 'Недостаточно данных для точного ответа.'\n"
+        "2. Все утверждения сопровождай ссылками на законы и постановления (ЖК РФ, ФЗ, ПП РФ).\n"
+        "3. Структура ответа фиксирована: \n"
+        "   - Краткий вывод (2–3 предложения)\n"
+        "   - Нормативная база (списком, только из найденного контента)\n"
+        "4. Никаких длинных пояснений и 'портянок'.\n"
+        "5. Формулы пени — только если они прямо упомянуты в вопросе.\n\n"
+        "### Контекст:\n"
+        "{context_text}\n\n"
+        "### Веб-поиск:\n"
+        "{web_results}\n\n"
+        "### Обновления:\n"
+        "{extra}\n\n"
+        "{penalty_block}"
+    )
+    PENALTY_BLOCK = (
+        "\n**Расчёт пени:**\n"
+        "- Пени = Сумма долга × Дни просрочки × (Ключевая ставка ЦБ РФ / 300 / 100)\n"
+        "- Основание: ЖК РФ ст. 155.1, ПП РФ №354, ПП РФ №329\n"
+        "- Начало начисления: с 31-го дня после срока оплаты.\n"
+    )
 
-    def _expand_search_query(self, query: str) -> List[str]:
-        """Генерирует несколько вариантов поискового запроса для лучшего покрытия темы."""
-        queries = [query]
-        queries.append(f"{query} ПП РФ 354")
-        queries.append(f"{query} ЖК РФ")
-        queries.append(f"{query} Минстрой России разъяснения")
-        queries.append(f"{query} судебная практика ВС РФ")
-        queries.append(f"{query} Конституционный Суд РФ")
-        # Добавляем синонимы
-        for term, data in self.term_map.items():
-            if term in query.lower() or any(syn in query.lower() for syn in data.get("synonyms", [])):
-                for synonym in data.get("synonyms", [])[:2]:
-                    new_q = query.replace(term, synonym) if term in query else query + " " + synonym
-                    queries.append(new_q)
-        return list(set(queries))
-
-    def _build_prompt(self, summary: str, context_text: str, role: str = "смешанная") -> str:
-        """
-        Агент: Нормативные документы (ЖКХ).
-        Формирует системный промт для Saiga/LLaMA-3 8B:
-        - Ответ = краткий вывод + ссылки на законы и постановления
-        - Приоритет официальных источников
-        - Никаких галлюцинаций
-        - Формулы пени только при запросе
-        """
-        extra = self.improve_prompt_from_feedback()
-        web_results = self._perform_web_search(summary)
-    
-        # Проверка на упоминание пени
-        penalty_keywords = ["пени", "пеня", "неустойка", "штраф за просрочку", "ставка цб", "9.5%", "ключевая ставка"]
-        q_lower = summary.lower()
-        should_calculate_penalty = any(kw in q_lower for kw in penalty_keywords)
-    
-        # --- SYSTEM PROMPT ---
-        system_prompt = (
-            "Ты — эксперт по нормативным документам в сфере ЖКХ. "
-            "Давай только точные ответы на основе контекста и найденных законов.\n\n"
-            "**ЖЕСТКИЕ ПРАВИЛА:**\n"
-            "1. Если нет данных — ответ: 'Недостаточно данных для точного ответа.'\n"
-            "2. Все утверждения сопровождай ссылками на законы и постановления (ЖК РФ, ФЗ, ПП РФ).\n"
-            "3. Структура ответа фиксирована: \n"
-            "   - Краткий вывод (2–3 предложения)\n"
-            "   - Нормативная база (списком, только из найденного контента)\n"
-            "4. Никаких длинных пояснений и 'портянок'.\n"
-            "5. Формулы пени — только если они прямо упомянуты в вопросе.\n\n"
-            f"### Контекст:\n{context_text}\n\n"
-            f"### Веб-поиск:\n{web_results}\n\n"
-            f"### Обновления:\n{extra}\n\n"
-        )
-    
-        # Добавляем формулу пени при необходимости
-        if should_calculate_penalty:
-            system_prompt += (
-                "\n**Расчёт пени:**\n"
-                "- Пени = Сумма долга × Дни просрочки × (Ключевая ставка ЦБ РФ / 300 / 100)\n"
-                "- Основание: ЖК РФ ст. 155.1, ПП РФ №354, ПП РФ №329\n"
-                "- Начало начисления: с 31-го дня после срока оплаты.\n"
-            )
-    
-        # Обертка для Saiga/LLaMA-3
-        system_prompt_formatted = (
-            "<|begin_of_text|><|start_header_id|>system<|end_header_id|>\n"
-            f"{system_prompt}<|eot_id|>"
-        )
-    
-        return system_prompt_formatted
 
 class TechnicalAgent(RAGAgent):
+    OFFICIAL_DOMAINS = RAGAgent.OFFICIAL_DOMAINS | {"rosconsumnadzor.ru"}
+    GOV_SUFFIXES = (".gov.ru", ".gkh.ru", ".rospotrebnadzor.ru")
+    SEARCH_QUERY_TEMPLATES = (
+        "{q} СанПиН 1.2.3685-21",
+        "{q} ПП РФ 354 раздел 6",
+        "{q} Правила технической эксплуатации ЖКХ",
+        "{q} норматив температуры отопления",
+        "{q} давление воды норма",
+    )
+    PENALTY_KEYWORDS = (
+        "пени", "пеня", "неустойка", "штраф за просрочку",
+        "ставка цб", "9.5%", "ключевая ставка",
+    )
+
     def __init__(self):
         # Расширенный и структурированный словарь с синонимами и контекстами
-        self.term_map = self._build_term_map()
-        keywords = self._flatten_term_map(self.term_map)
+        self.term_map, keywords = self._shared_term_map()
         
         super().__init__("Технические регламенты", keywords)
 
@@ -890,184 +1285,63 @@ class TechnicalAgent(RAGAgent):
             },
         }
 
-    def _flatten_term_map(self, term_map: Dict) -> List[str]:
-        """Преобразует структурированный словарь в плоский список уникальных ключевых слов."""
-        keywords = set()
-        for term, data in term_map.items():
-            keywords.add(term.lower())  # оригинальный ключ
-            for synonym in data.get("synonyms", []):
-                keywords.add(synonym.lower())
-            # Добавляем ключи из контекстов
-            contexts = data.get("contexts", [])
-            if isinstance(contexts, dict):
-                for ctx_key in contexts.keys():
-                    keywords.add(ctx_key.lower())
-            elif isinstance(contexts, list):
-                for ctx in contexts:
-                    keywords.add(ctx.lower())
-        return list(keywords)
-
-    def _perform_web_search(self, query: str, max_results: int = 3) -> str:
-        """
-        Улучшенный веб-поиск: приоритет официальным источникам, фильтрация, ранжирование.
-        Выполняется ВНУТРИ _build_prompt, как в оригинальной архитектуре.
-        """
-        OFFICIAL_DOMAINS = {
-            "cbr.ru", "government.ru", "kremlin.ru", "rosstat.gov.ru", "minfin.gov.ru",
-            "fas.gov.ru", "gji.ru", "rospotrebnadzor.ru", "rosreestr.gov.ru",
-            "minstroyrf.ru", "fgis-tarif.ru", "consultant.ru", "garant.ru",
-            "pravo.gov.ru", "gkh.ru", "rospotrebnadzor.ru", "rosconsumnadzor.ru"
-        }
-
-        BLACKLISTED_DOMAINS = {
-            "otvet.mail.ru", "ask.fm", "irecommend.ru", "pikabu.ru",
-            "zen.yandex.ru", "thequestion.ru", "quora.com", "reddit.com",
-            "fishki.net", "yaplakal.com", "blog", "forum"
-        }
-
-        # Генерируем расширенные поисковые запросы
-        expanded_queries = self._expand_search_query(query)
-        all_results = []
-
-        for attempt in range(2):
-            try:
-                with DDGS(timeout=10) as ddgs:
-                    for q in expanded_queries:
-                        results = ddgs.text(q, max_results=5)
-                        for r in results:
-                            href = r.get('href', '')
-                            if not href:
-                                continue
-                            
-                            try:
-                                domain = href.split('/')[2].lower()
-                            except IndexError:
-                                continue
-
-                            if any(bad in domain for bad in BLACKLISTED_DOMAINS):
-                                continue
-
-                            weight = 3 if any(official in domain for official in OFFICIAL_DOMAINS) else \
-                                     2 if any(gov in domain for gov in [".gov.ru", ".gkh.ru", ".rospotrebnadzor.ru"]) else 1
-
-                            snippet = {
-                                "body": r['body'],
-                                "href": href,
-                                "title": r.get('title', ''),
-                                "weight": weight
-                            }
-                            all_results.append(snippet)
-
-                    all_results = sorted(all_results, key=lambda x: x['weight'], reverse=True)
-                    seen_bodies = set()
-                    unique_results = []
-                    for r in all_results:
-                        body_hash = hash(r['body'][:100])
-                        if body_hash not in seen_bodies:
-                            seen_bodies.add(body_hash)
-                            unique_results.append(r)
-                            if len(unique_results) >= max_results:
-                                break
-
-                    if unique_results:
-                        formatted = []
-                        for r in unique_results:
-                            prefix = "[ОФИЦИАЛЬНЫЙ ИСТОЧНИК] " if r['weight'] >= 2 else ""
-                            formatted.append(f"{prefix}• {r['body']}\n  Источник: {r['href']}\n")
-                        return "\n".join(formatted).strip()
-                    else:
-                        return "По вашему запросу ничего не найдено в надёжных источниках."
-
-            except Exception as e:
-                if attempt == 0:
-                    time.sleep(2)
-                    continue
-                return f"Ошибка веб-поиска: {str(e)}"
-
-        return "Не удалось выполнить веб-поиск. Попробуйте позже."
+    # Агент: Технические регламенты (ЖКХ).
+    # Системный промт для Saiga/LLaMA-3 8B:
+    # - Ответ = краткий вывод + нормативные требования
+    # - Приоритет официальных источников (СанПиН, ПП РФ, Правила эксплуатации)
+    # - Жесткая структура, никаких "портянок"
+    PROMPT_TEMPLATE = (
+        "Ты — эксперт по техническому обслуживанию и качеству коммунальных услуг. "
+        "Давай ответы только на основе официальных норм (СанПиН, ПП РФ, Правила эксплуатации).\n\n"
+        "**ЖЕСТКИЕ ПРАВИЛА:**\n"
+        "1. Если данных нет — ответ: 'Недостаточно данных для точного ответа.'\n"
+        "2. Все утверждения обязательно подкрепляй ссылками (напр. [ПП РФ №354, п. 59], [СанПиН 1.2.3685-21, п. 3.4]).\n"
+        "3. Структура ответа фиксирована: \n"
+        "   - Краткий вывод (2–3 предложения)\n"
+        "   - Нормативные требования (списком, с точными пунктами)\n"
+        "   - Порядок действий (акт, замеры, обращение, сроки, перерасчет)\n"
+        "4. Никаких длинных рассуждений.\n"
+        "5. Формулы пени — только если прямо спросят.\n\n"
+        "### Контекст:\n"
+        "{context_text}\n\n"
+        "### Веб-поиск:\n"
+        "{web_results}\n\n"
+        "### Обновления:\n"
+        "{extra}\n\n"
+        "{penalty_block}\n"
+        "### Ключевые акты (для справки):\n"
+        "- СанПиН 1.2.3685-21 (гигиенические требования)\n"
+        "- ПП РФ №354 (раздел 6 — качество коммунальных услуг)\n"
+        "- ПП РФ №491 (содержание общего имущества)\n"
+        "- Правила технической эксплуатации жилищного фонда (Минстрой РФ)\n\n"
+        "{role_instruction}"
+    )
+    PENALTY_BLOCK = (
+        "\n**Расчет пени (только при запросе):**\n"
+        "- Пени = Сумма долга × Дни просрочки × (Ключевая ставка ЦБ РФ / 300 / 100)\n"
+        "- Основание: ЖК РФ ст. 155.1, ПП РФ №354, ПП РФ №329\n"
+        "- Начало начисления: с 31-го дня после срока оплаты.\n"
+    )
 
-    def _expand_search_query(self, query: str) -> List[str]:
-        """Генерирует несколько вариантов поискового запроса для лучшего покрытия темы."""
-        queries = [query]
-        queries.append(f"{query} СанПиН 1.2.3685-21")
-        queries.append(f"{query} ПП РФ 354 раздел 6")
-        queries.append(f"{query} Правила технической эксплуатации ЖКХ")
-        queries.append(f"{query} норматив температуры отопления")
-        queries.append(f"{query} давление воды норма")
-        # Добавляем синонимы
-        for term, data in self.term_map.items():
-            if term in query.lower() or any(syn in query.lower() for syn in data.get("synonyms", [])):
-                for synonym in data.get("synonyms", [])[:2]:
-                    new_q = query.replace(term, synonym) if term in query else query + " " + synonym
-                    queries.append(new_q)
-        return list(set(queries))
-
-    def _build_prompt(self, summary: str, context_text: str, role: str = "смешанная") -> str:
-        """
-        Агент: Технические регламенты (ЖКХ).
-        Формирует системный промт для Saiga/LLaMA-3 8B:
-        - Ответ = краткий вывод + нормативные требования
-        - Приоритет официальных источников (СанПиН, ПП РФ, Правила эксплуатации)
-        - Жесткая структура, никаких "портянок"
-        """
-        extra = self.improve_prompt_from_feedback()
-        web_results = self._perform_web_search(summary)
-    
-        # Проверка на упоминание пени (редко, но оставим)
-        penalty_keywords = ["пени", "пеня", "неустойка", "штраф за просрочку", "ставка цб", "9.5%", "ключевая ставка"]
-        q_lower = summary.lower()
-        should_calculate_penalty = any(kw in q_lower for kw in penalty_keywords)
-    
-        # --- SYSTEM PROMPT ---
-        system_prompt = (
-            "Ты — эксперт по техническому обслуживанию и качеству коммунальных услуг. "
-            "Давай ответы только на основе официальных норм (СанПиН, ПП РФ, Правила эксплуатации).\n\n"
-            "**ЖЕСТКИЕ ПРАВИЛА:**\n"
-            "1. Если данных нет — ответ: 'Недостаточно данных для точного ответа.'\n"
-            "2. Все утверждения обязательно подкрепляй ссылками (напр. [ПП РФ №354, п. 59], [СанПиН 1.2.3685-21, п. 3.4]).\n"
-            "3. Структура ответа фиксирована: \n"
-            "   - Краткий вывод (2–3 предложения)\n"
-            "   - Нормативные требования (списком, с точными пунктами)\n"
-            "   - Порядок действий (акт, замеры, обращение, сроки, перерасчет)\n"
-            "4. Никаких длинных рассуждений.\n"
-            "5. Формулы пени — только если прямо спросят.\n\n"
-            f"### Контекст:\n{context_text}\n\n"
-            f"### Веб-поиск:\n{web_results}\n\n"
-            f"### Обновления:\n{extra}\n\n"
-        )
-    
-        # Блок пени (если требуется)
-        if should_calculate_penalty:
-            system_prompt += (
-                "\n**Расчет пени (только при запросе):**\n"
-                "- Пени = Сумма долга × Дни просрочки × (Ключевая ставка ЦБ РФ / 300 / 100)\n"
-                "- Основание: ЖК РФ ст. 155.1, ПП РФ №354, ПП РФ №329\n"
-                "- Начало начисления: с 31-го дня после срока оплаты.\n"
-            )
-    
-        # Справочник нормативки
-        system_prompt += (
-            "\n### Ключевые акты (для справки):\n"
-            "- СанПиН 1.2.3685-21 (гигиенические требования)\n"
-            "- ПП РФ №354 (раздел 6 — качество коммунальных услуг)\n"
-            "- ПП РФ №491 (содержание общего имущества)\n"
-            "- Правила технической эксплуатации жилищного фонда (Минстрой РФ)\n\n"
-            f"{self.get_role_instruction(role)}"
-        )
-    
-        # Обертка для Saiga/LLaMA-3
-        system_prompt_formatted = (
-            "<|begin_of_text|><|start_header_id|>system<|end_header_id|>\n"
-            f"{system_prompt}<|eot_id|>"
-        )
-    
-        return system_prompt_formatted
 
 class MeterAgent(RAGAgent):
+    OFFICIAL_DOMAINS = RAGAgent.OFFICIAL_DOMAINS | {"rostech.ru", "rosaccred.ru"}
+    GOV_SUFFIXES = (".gov.ru", ".gkh.ru", ".rostech.ru")
+    SEARCH_QUERY_TEMPLATES = (
+        "{q} ФЗ 261",
+        "{q} ПП РФ 354 раздел 5",
+        "{q} поверка счетчиков",
+        "{q} техническая невозможность установки ИПУ",
+        "{q} правила учета коммунальных ресурсов Минстрой",
+    )
+    PENALTY_KEYWORDS = (
+        "пени", "пеня", "неустойка", "штраф за просрочку",
+        "ставка цб", "9.5%", "ключевая ставка",
+    )
+
     def __init__(self):
         # Расширенный и структурированный словарь с синонимами и контекстами
-        self.term_map = self._build_term_map()
-        keywords = self._flatten_term_map(self.term_map)
+        self.term_map, keywords = self._shared_term_map()
         
         super().__init__("Приборы учёта", keywords)
 
@@ -1146,185 +1420,70 @@ class MeterAgent(RAGAgent):
             },
         }
 
-    def _flatten_term_map(self, term_map: Dict) -> List[str]:
-        """Преобразует структурированный словарь в плоский список уникальных ключевых слов."""
-        keywords = set()
-        for term, data in term_map.items():
-            keywords.add(term.lower())  # оригинальный ключ
-            for synonym in data.get("synonyms", []):
-                keywords.add(synonym.lower())
-            # Добавляем ключи из контекстов
-            contexts = data.get("contexts", [])
-            if isinstance(contexts, dict):
-                for ctx_key in contexts.keys():
-                    keywords.add(ctx_key.lower())
-            elif isinstance(contexts, list):
-                for ctx in contexts:
-                    keywords.add(ctx.lower())
-        return list(keywords)
-
-    def _perform_web_search(self, query: str, max_results: int = 3) -> str:
-        """
-        Улучшенный веб-поиск: приоритет официальным источникам, фильтрация, ранжирование.
-        Выполняется ВНУТРИ _build_prompt, как в оригинальной архитектуре.
-        """
-        OFFICIAL_DOMAINS = {
-            "cbr.ru", "government.ru", "kremlin.ru", "rosstat.gov.ru", "minfin.gov.ru",
-            "fas.gov.ru", "gji.ru", "rospotrebnadzor.ru", "rosreestr.gov.ru",
-            "minstroyrf.ru", "fgis-tarif.ru", "consultant.ru", "garant.ru",
-            "pravo.gov.ru", "gkh.ru", "rostech.ru", "rosaccred.ru"
-        }
-
-        BLACKLISTED_DOMAINS = {
-            "otvet.mail.ru", "ask.fm", "irecommend.ru", "pikabu.ru",
-            "zen.yandex.ru", "thequestion.ru", "quora.com", "reddit.com",
-            "fishki.net", "yaplakal.com", "blog", "forum"
-        }
-
-        # Генерируем расширенные поисковые запросы
-        expanded_queries = self._expand_search_query(query)
-        all_results = []
-
-        for attempt in range(2):
-            try:
-                with DDGS(timeout=10) as ddgs:
-                    for q in expanded_queries:
-                        results = ddgs.text(q, max_results=5)
-                        for r in results:
-                            href = r.get('href', '')
-                            if not href:
-                                continue
-                            
-                            try:
-                                domain = href.split('/')[2].lower()
-                            except IndexError:
-                                continue
-
-                            if any(bad in domain for bad in BLACKLISTED_DOMAINS):
-                                continue
-
-                            weight = 3 if any(official in domain for official in OFFICIAL_DOMAINS) else \
-                                     2 if any(gov in domain for gov in [".gov.ru", ".gkh.ru", ".rostech.ru"]) else 1
-
-                            snippet = {
-                                "body": r['body'],
-                                "href": href,
-                                "title": r.get('title', ''),
-                                "weight": weight
-                            }
-                            all_results.append(snippet)
-
-                    all_results = sorted(all_results, key=lambda x: x['weight'], reverse=True)
-                    seen_bodies = set()
-                    unique_results = []
-                    for r in all_results:
-                        body_hash = hash(r['body'][:100])
-                        if body_hash not in seen_bodies:
-                            seen_bodies.add(body_hash)
-                            unique_results.append(r)
-                            if len(unique_results) >= max_results:
-                                break
-
-                    if unique_results:
-                        formatted = []
-                        for r in unique_results:
-                            prefix = "[ОФИЦИАЛЬНЫЙ ИСТОЧНИК] " if r['weight'] >= 2 else ""
-                            formatted.append(f"{prefix}• {r['body']}\n  Источник: {r['href']}\n")
-                        return "\n".join(formatted).strip()
-                    else:
-                        return "По вашему запросу ничего не найдено в надёжных источниках."
-
-            except Exception as e:
-                if attempt == 0:
-                    time.sleep(2)
-                    continue
-                return f"Ошибка веб-поиска: {str(e)}"
-
-        return "Не удалось выполнить веб-поиск. Попробуйте позже."
+    # Агент: Приборы учета.
+    # Системный промт для Saiga/LLaMA-3 8B:
+    # - Фокус: ИПУ/ОДПУ (обязанности, установка, поверка, передача показаний, последствия).
+    # - Жесткая структура.
+    # - Только официальные источники (ФЗ, ПП РФ, приказы Минстроя/Ростехнадзора).
+    # Вопрос пользователя добавляется отдельно в generate_answer_chat.
+    PROMPT_TEMPLATE = (
+        "Ты — эксперт по приборам учета коммунальных ресурсов. Дай точный, "
+        "юридически обоснованный и структурированный ответ, используя ТОЛЬКО контекст, найденные законы и обновления.\n\n"
+        "**ЖЕСТКИЕ ПРАВИЛА:**\n"
+        "1. Если данных нет — отвечай: 'Недостаточно данных для точного ответа.'\n"
+        "2. Все выводы подтверждай ссылками ([ФЗ №261-ФЗ, ст. 13], [ПП РФ №354, п. 31], [ФЗ №102-ФЗ, ст. 8]).\n"
+        "3. Соблюдай структуру ответа.\n"
+        "4. Формулы пени только если прямо спросят.\n"
+        "5. Приоритет источников: ФЗ > ПП РФ > Приказы Минстроя/Ростехнадзора > разъяснения.\n\n"
+        "### Контекст:\n"
+        "{context_text}\n\n"
+        "### Веб-поиск:\n"
+        "{web_results}\n\n"
+        "### Дополнительные обновления:\n"
+        "{extra}\n\n"
+        "### Структура ответа:\n"
+        "- Краткий вывод\n"
+        "- Нормативное обоснование (точные статьи/пункты)\n"
+        "- Пошаговая инструкция (установка, поверка, передача показаний, ответственность, последствия)\n"
+        "- Судебная практика\n"
+        "{penalty_block}\n"
+        "### Ключевые нормативные акты (справочно):\n"
+        "- ФЗ №261-ФЗ «Об энергосбережении» (ст. 13 — обязанность установки ИПУ)\n"
+        "- ФЗ №102-ФЗ «Об обеспечении единства измерений» (поверка)\n"
+        "- ПП РФ №354 (раздел 5 — расчёт, раздел 31 — приборы учета)\n"
+        "- ПП РФ №491 (общее имущество, ОДПУ)\n"
+        "- Приказы Минстроя и Ростехнадзора (акты обследования, поверка, замена)\n\n"
+        "{role_instruction}"
+    )
+    PENALTY_BLOCK = (
+        "\n**Расчет пени (актуальная формула):**\n"
+        "- Формула: Пени = Долг × Дни просрочки × (Ключевая ставка ЦБ / 300 / 100)\n"
+        "- База: [ЖК РФ, ст. 155.1]\n"
+        "- Ограничение: ≤ 9.5% годовых [ФЗ №44-ФЗ, ПП РФ №329]\n"
+        "- Начало начисления: с 31-го дня после срока оплаты.\n"
+    )
 
-    def _expand_search_query(self, query: str) -> List[str]:
-        """Генерирует несколько вариантов поискового запроса для лучшего покрытия темы."""
-        queries = [query]
-        queries.append(f"{query} ФЗ 261")
-        queries.append(f"{query} ПП РФ 354 раздел 5")
-        queries.append(f"{query} поверка счетчиков")
-        queries.append(f"{query} техническая невозможность установки ИПУ")
-        queries.append(f"{query} правила учета коммунальных ресурсов Минстрой")
-        # Добавляем синонимы
-        for term, data in self.term_map.items():
-            if term in query.lower() or any(syn in query.lower() for syn in data.get("synonyms", [])):
-                for synonym in data.get("synonyms", [])[:2]:
-                    new_q = query.replace(term, synonym) if term in query else query + " " + synonym
-                    queries.append(new_q)
-        return list(set(queries))
-
-    def _build_prompt(self, summary: str, context_text: str, role: str = "смешанная") -> str:
-        """
-        Агент: Приборы учета.
-        Формирует системный промт для Saiga/LLaMA-3 8B:
-        - Фокус: ИПУ/ОДПУ (обязанности, установка, поверка, передача показаний, последствия).
-        - Жесткая структура.
-        - Только официальные источники (ФЗ, ПП РФ, приказы Минстроя/Ростехнадзора).
-        Вопрос пользователя добавляется отдельно в generate_answer_chat.
-        """
-        extra = self.improve_prompt_from_feedback()
-        web_results = self._perform_web_search(summary)
-    
-        penalty_keywords = ["пени", "пеня", "неустойка", "штраф за просрочку", "ставка цб", "9.5%", "ключевая ставка"]
-        q_lower = summary.lower()
-        should_calculate_penalty = any(kw in q_lower for kw in penalty_keywords)
-    
-        # --- SYSTEM PROMPT ---
-        system_prompt = (
-            "Ты — эксперт по приборам учета коммунальных ресурсов. "
-            "Дай точный, юридически обоснованный и структурированный ответ, "
-            "используя ТОЛЬКО контекст, найденные законы и обновления.\n\n"
-            "**ЖЕСТКИЕ ПРАВИЛА:**\n"
-            "1. Если данных нет — отвечай: 'Недостаточно данных для точного ответа.'\n"
-            "2. Все выводы подтверждай ссылками ([ФЗ №261-ФЗ, ст. 13], [ПП РФ №354, п. 31], [ФЗ №102-ФЗ, ст. 8]).\n"
-            "3. Соблюдай структуру ответа.\n"
-            "4. Формулы пени только если прямо спросят.\n"
-            "5. Приоритет источников: ФЗ > ПП РФ > Приказы Минстроя/Ростехнадзора > разъяснения.\n\n"
-            f"### Контекст:\n{context_text}\n\n"
-            f"### Веб-поиск:\n{web_results}\n\n"
-            f"### Дополнительные обновления:\n{extra}\n\n"
-            "### Структура ответа:\n"
-            "- Краткий вывод\n"
-            "- Нормативное обоснование (точные статьи/пункты)\n"
-            "- Пошаговая инструкция (установка, поверка, передача показаний, ответственность, последствия)\n"
-            "- Судебная практика\n"
-        )
-    
-        if should_calculate_penalty:
-            system_prompt += (
-                "\n**Расчет пени (актуальная формула):**\n"
-                "- Формула: Пени = Долг × Дни просрочки × (Ключевая ставка ЦБ / 300 / 100)\n"
-                "- База: [ЖК РФ, ст. 155.1]\n"
-                "- Ограничение: ≤ 9.5% годовых [ФЗ №44-ФЗ, ПП РФ №329]\n"
-                "- Начало начисления: с 31-го дня после срока оплаты.\n"
-            )
-    
-        system_prompt += (
-            "\n### Ключевые нормативные акты (справочно):\n"
-            "- ФЗ №261-ФЗ «Об энергосбережении» (ст. 13 — обязанность установки ИПУ)\n"
-            "- ФЗ №102-ФЗ «Об обеспечении единства измерений» (поверка)\n"
-            "- ПП РФ №354 (раздел 5 — расчёт, раздел 31 — приборы учета)\n"
-            "- ПП РФ №491 (общее имущество, ОДПУ)\n"
-            "- Приказы Минстроя и Ростехнадзора (акты обследования, поверка, замена)\n\n"
-            f"{self.get_role_instruction(role)}"
-        )
-    
-        return (
-            "<|begin_of_text|><|start_header_id|>system<|end_header_id|>\n"
-            f"{system_prompt}<|eot_id|>"
-        )
 
 
 class DebtAgent(RAGAgent):
+    OFFICIAL_DOMAINS = RAGAgent.OFFICIAL_DOMAINS | {"fssp.gov.ru", "vsrf.ru", "ksrf.ru"}
+    GOV_SUFFIXES = (".gov.ru", ".gkh.ru", ".fssp.gov.ru")
+    SEARCH_QUERY_TEMPLATES = (
+        "{q} ЖК РФ ст 155.1",
+        "{q} ПП РФ 329 пени",
+        "{q} ФЗ 44-ФЗ ключевая ставка",
+        "{q} судебная практика по долгам ЖКХ",
+        "{q} ограничение выезда за долги ФССП",
+    )
+    PENALTY_KEYWORDS = (
+        "пени", "пеня", "неустойка", "штраф за просрочку",
+        "ставка цб", "ключевая ставка", "расчет пени",
+        "проценты за просрочку", "начисление пени",
+    )
+
     def __init__(self):
         # Расширенный и структурированный словарь с синонимами и контекстами
-        self.term_map = self._build_term_map()
-        keywords = self._flatten_term_map(self.term_map)
+        self.term_map, keywords = self._shared_term_map()
         
         super().__init__("Задолженности", keywords)
 
@@ -1403,190 +1562,71 @@ class DebtAgent(RAGAgent):
             },
         }
 
-    def _flatten_term_map(self, term_map: Dict) -> List[str]:
-        """Преобразует структурированный словарь в плоский список уникальных ключевых слов."""
-        keywords = set()
-        for term, data in term_map.items():
-            keywords.add(term.lower())  # оригинальный ключ
-            for synonym in data.get("synonyms", []):
-                keywords.add(synonym.lower())
-            # Добавляем ключи из контекстов
-            contexts = data.get("contexts", [])
-            if isinstance(contexts, dict):
-                for ctx_key in contexts.keys():
-                    keywords.add(ctx_key.lower())
-            elif isinstance(contexts, list):
-                for ctx in contexts:
-                    keywords.add(ctx.lower())
-        return list(keywords)
+    # Агент: Задолженности.
+    # Системный промт для Saiga/LLaMA-3 8B:
+    # - Фокус: задолженность, пени, сроки оплаты, взыскание, судебная практика.
+    # - Жесткая структура.
+    # - Только официальные источники (ЖК РФ, ПП РФ, ФЗ, ГПК).
+    # Вопрос пользователя добавляется отдельно в generate_answer_chat.
+    PROMPT_TEMPLATE = (
+        "Ты — эксперт по задолженностям и взысканию долгов в сфере ЖКХ. Дай точный, "
+        "юридически обоснованный и структурированный ответ, используя ТОЛЬКО контекст, "
+        "результаты поиска и обновления.\n\n"
+        "**ЖЕСТКИЕ ПРАВИЛА:**\n"
+        "1. Если данных нет — отвечай: 'Недостаточно данных для точного ответа.'\n"
+        "2. Все ссылки обязательны ([ЖК РФ, ст. 155.1], [ПП РФ №354, п. 118], [ГПК РФ, ст. 122]).\n"
+        "3. Соблюдай структуру ответа.\n"
+        "4. Формулы пени только если есть ключевые слова.\n"
+        "5. Приоритет источников: ЖК РФ > ПП РФ > ФЗ > судебная практика.\n\n"
+        "### Контекст:\n"
+        "{context_text}\n\n"
+        "### Веб-поиск:\n"
+        "{web_results}\n\n"
+        "### Дополнительные обновления:\n"
+        "{extra}\n\n"
+        "### Структура ответа:\n"
+        "- Краткий вывод\n"
+        "- Нормативное обоснование (точные статьи)\n"
+        "- Расчет пени (если применимо)\n"
+        "- Сроки оплаты и взыскания\n"
+        "- Судебная практика\n"
+        "{penalty_block}\n"
+        "### Ключевые нормативные акты (справочно):\n"
+        "- ЖК РФ (ст. 155 — сроки оплаты, ст. 155.1 — пени, ст. 158 — взыскание)\n"
+        "- ПП РФ №354 (раздел 8 — порядок расчетов)\n"
+        "- ПП РФ №329 (порядок начисления пени с 2024 года)\n"
+        "- ФЗ №44-ФЗ (ограничение ставки ЦБ до 9.5% до 2027 г.)\n"
+        "- ФЗ №229-ФЗ (исполнительное производство)\n"
+        "- ГПК РФ (приказное производство, взыскание через суд)\n\n"
+        "{role_instruction}"
+    )
+    PENALTY_BLOCK = (
+        "\n**Расчет пени (актуальная формула):**\n"
+        "- Пени = Долг × Дни просрочки × (Ключевая ставка ЦБ / 300 / 100)\n"
+        "- Основание: [ЖК РФ, ст. 155.1]\n"
+        "- Лимит: ≤ 9.5% годовых [ФЗ №44-ФЗ, ПП РФ №329]\n"
+        "- Начало: с 31-го дня после срока оплаты.\n"
+    )
 
-    def _perform_web_search(self, query: str, max_results: int = 3) -> str:
-        """
-        Улучшенный веб-поиск: приоритет официальным источникам, фильтрация, ранжирование.
-        Выполняется ВНУТРИ _build_prompt, как в оригинальной архитектуре.
-        """
-        OFFICIAL_DOMAINS = {
-            "cbr.ru", "government.ru", "kremlin.ru", "rosstat.gov.ru", "minfin.gov.ru",
-            "fas.gov.ru", "gji.ru", "rospotrebnadzor.ru", "rosreestr.gov.ru",
-            "minstroyrf.ru", "fgis-tarif.ru", "consultant.ru", "garant.ru",
-            "pravo.gov.ru", "gkh.ru", "fssp.gov.ru", "vsrf.ru", "ksrf.ru"
-        }
-
-        BLACKLISTED_DOMAINS = {
-            "otvet.mail.ru", "ask.fm", "irecommend.ru", "pikabu.ru",
-            "zen.yandex.ru", "thequestion.ru", "quora.com", "reddit.com",
-            "fishki.net", "yaplakal.com", "blog", "forum"
-        }
-
-        # Генерируем расширенные поисковые запросы
-        expanded_queries = self._expand_search_query(query)
-        all_results = []
-
-        for attempt in range(2):
-            try:
-                with DDGS(timeout=10) as ddgs:
-                    for q in expanded_queries:
-                        results = ddgs.text(q, max_results=5)
-                        for r in results:
-                            href = r.get('href', '')
-                            if not href:
-                                continue
-                            
-                            try:
-                                domain = href.split('/')[2].lower()
-                            except IndexError:
-                                continue
-
-                            if any(bad in domain for bad in BLACKLISTED_DOMAINS):
-                                continue
-
-                            weight = 3 if any(official in domain for official in OFFICIAL_DOMAINS) else \
-                                     2 if any(gov in domain for gov in [".gov.ru", ".gkh.ru", ".fssp.gov.ru"]) else 1
-
-                            snippet = {
-                                "body": r['body'],
-                                "href": href,
-                                "title": r.get('title', ''),
-                                "weight": weight
-                            }
-                            all_results.append(snippet)
-
-                    all_results = sorted(all_results, key=lambda x: x['weight'], reverse=True)
-                    seen_bodies = set()
-                    unique_results = []
-                    for r in all_results:
-                        body_hash = hash(r['body'][:100])
-                        if body_hash not in seen_bodies:
-                            seen_bodies.add(body_hash)
-                            unique_results.append(r)
-                            if len(unique_results) >= max_results:
-                                break
-
-                    if unique_results:
-                        formatted = []
-                        for r in unique_results:
-                            prefix = "[ОФИЦИАЛЬНЫЙ ИСТОЧНИК] " if r['weight'] >= 2 else ""
-                            formatted.append(f"{prefix}• {r['body']}\n  Источник: {r['href']}\n")
-                        return "\n".join(formatted).strip()
-                    else:
-                        return "По вашему запросу ничего не найдено в надёжных источниках."
-
-            except Exception as e:
-                if attempt == 0:
-                    time.sleep(2)
-                    continue
-                return f"Ошибка веб-поиска: {str(e)}"
-
-        return "Не удалось выполнить веб-поиск. Попробуйте позже."
-
-    def _expand_search_query(self, query: str) -> List[str]:
-        """Генерирует несколько вариантов поискового запроса для лучшего покрытия темы."""
-        queries = [query]
-        queries.append(f"{query} ЖК РФ ст 155.1")
-        queries.append(f"{query} ПП РФ 329 пени")
-        queries.append(f"{query} ФЗ 44-ФЗ ключевая ставка")
-        queries.append(f"{query} судебная практика по долгам ЖКХ")
-        queries.append(f"{query} ограничение выезда за долги ФССП")
-        # Добавляем синонимы
-        for term, data in self.term_map.items():
-            if term in query.lower() or any(syn in query.lower() for syn in data.get("synonyms", [])):
-                for synonym in data.get("synonyms", [])[:2]:
-                    new_q = query.replace(term, synonym) if term in query else query + " " + synonym
-                    queries.append(new_q)
-        return list(set(queries))
-
-    def _build_prompt(self, summary: str, context_text: str, role: str = "смешанная") -> str:
-        """
-        Агент: Задолженности.
-        Формирует системный промт для Saiga/LLaMA-3 8B:
-        - Фокус: задолженность, пени, сроки оплаты, взыскание, судебная практика.
-        - Жесткая структура.
-        - Только официальные источники (ЖК РФ, ПП РФ, ФЗ, ГПК).
-        Вопрос пользователя добавляется отдельно в generate_answer_chat.
-        """
-        extra = self.improve_prompt_from_feedback()
-        web_results = self._perform_web_search(summary)
-    
-        penalty_keywords = [
-            "пени", "пеня", "неустойка", "штраф за просрочку",
-            "ставка цб", "ключевая ставка", "расчет пени",
-            "проценты за просрочку", "начисление пени"
-        ]
-        q_lower = summary.lower()
-        should_calculate_penalty = any(kw in q_lower for kw in penalty_keywords)
-    
-        # --- SYSTEM PROMPT ---
-        system_prompt = (
-            "Ты — эксперт по задолженностям и взысканию долгов в сфере ЖКХ. "
-            "Дай точный, юридически обоснованный и структурированный ответ, "
-            "используя ТОЛЬКО контекст, результаты поиска и обновления.\n\n"
-            "**ЖЕСТКИЕ ПРАВИЛА:**\n"
-            "1. Если данных нет — отвечай: 'Недостаточно данных для точного ответа.'\n"
-            "2. Все ссылки обязательны ([ЖК РФ, ст. 155.1], [ПП РФ №354, п. 118], [ГПК РФ, ст. 122]).\n"
-            "3. Соблюдай структуру ответа.\n"
-            "4. Формулы пени только если есть ключевые слова.\n"
-            "5. Приоритет источников: ЖК РФ > ПП РФ > ФЗ > судебная практика.\n\n"
-            f"### Контекст:\n{context_text}\n\n"
-            f"### Веб-поиск:\n{web_results}\n\n"
-            f"### Дополнительные обновления:\n{extra}\n\n"
-            "### Структура ответа:\n"
-            "- Краткий вывод\n"
-            "- Нормативное обоснование (точные статьи)\n"
-            "- Расчет пени (если применимо)\n"
-            "- Сроки оплаты и взыскания\n"
-            "- Судебная практика\n"
-        )
-    
-        if should_calculate_penalty:
-            system_prompt += (
-                "\n**Расчет пени (актуальная формула):**\n"
-                "- Пени = Долг × Дни просрочки × (Ключевая ставка ЦБ / 300 / 100)\n"
-                "- Основание: [ЖК РФ, ст. 155.1]\n"
-                "- Лимит: ≤ 9.5% годовых [ФЗ №44-ФЗ, ПП РФ №329]\n"
-                "- Начало: с 31-го дня после срока оплаты.\n"
-            )
-    
-        system_prompt += (
-            "\n### Ключевые нормативные акты (справочно):\n"
-            "- ЖК РФ (ст. 155 — сроки оплаты, ст. 155.1 — пени, ст. 158 — взыскание)\n"
-            "- ПП РФ №354 (раздел 8 — порядок расчетов)\n"
-            "- ПП РФ №329 (порядок начисления пени с 2024 года)\n"
-            "- ФЗ №44-ФЗ (ограничение ставки ЦБ до 9.5% до 2027 г.)\n"
-            "- ФЗ №229-ФЗ (исполнительное производство)\n"
-            "- ГПК РФ (приказное производство, взыскание через суд)\n\n"
-            f"{self.get_role_instruction(role)}"
-        )
-    
-        return (
-            "<|begin_of_text|><|start_header_id|>system<|end_header_id|>\n"
-            f"{system_prompt}<|eot_id|>"
-        )
 
 class DisclosureAgent(RAGAgent):
+    OFFICIAL_DOMAINS = RAGAgent.OFFICIAL_DOMAINS | {"dom.gosuslugi.ru", "gkh354.ru", "gjirf.ru"}
+    GOV_SUFFIXES = (".gov.ru", ".gkh.ru", ".gosuslugi.ru")
+    SEARCH_QUERY_TEMPLATES = (
+        "{q} ПП РФ 731",
+        "{q} ГИС ЖКХ сроки загрузки",
+        "{q} Приказ Минстроя 48/414",
+        "{q} ФЗ 209-ФЗ раскрытие информации",
+        "{q} судебная практика по отказу в предоставлении информации ЖКХ",
+    )
+    PENALTY_KEYWORDS = (
+        "пени", "пеня", "неустойка", "штраф за просрочку",
+        "ставка цб", "ключевая ставка", "расчет пени",
+    )
+
     def __init__(self):
         # Расширенный и структурированный словарь с синонимами и контекстами
-        self.term_map = self._build_term_map()
-        keywords = self._flatten_term_map(self.term_map)
+        self.term_map, keywords = self._shared_term_map()
         
         super().__init__("Раскрытие информации", keywords)
 
@@ -1670,187 +1710,70 @@ class DisclosureAgent(RAGAgent):
             },
         }
 
-    def _flatten_term_map(self, term_map: Dict) -> List[str]:
-        """Преобразует структурированный словарь в плоский список уникальных ключевых слов."""
-        keywords = set()
-        for term, data in term_map.items():
-            keywords.add(term.lower())  # оригинальный ключ
-            for synonym in data.get("synonyms", []):
-                keywords.add(synonym.lower())
-            # Добавляем ключи из контекстов
-            contexts = data.get("contexts", [])
-            if isinstance(contexts, dict):
-                for ctx_key in contexts.keys():
-                    keywords.add(ctx_key.lower())
-            elif isinstance(contexts, list):
-                for ctx in contexts:
-                    keywords.add(ctx.lower())
-        return list(keywords)
-
-    def _perform_web_search(self, query: str, max_results: int = 3) -> str:
-        """
-        Улучшенный веб-поиск: приоритет официальным источникам, фильтрация, ранжирование.
-        Выполняется ВНУТРИ _build_prompt, как в оригинальной архитектуре.
-        """
-        OFFICIAL_DOMAINS = {
-            "cbr.ru", "government.ru", "kremlin.ru", "rosstat.gov.ru", "minfin.gov.ru",
-            "fas.gov.ru", "gji.ru", "rospotrebnadzor.ru", "rosreestr.gov.ru",
-            "minstroyrf.ru", "fgis-tarif.ru", "consultant.ru", "garant.ru",
-            "pravo.gov.ru", "gkh.ru", "dom.gosuslugi.ru", "gkh354.ru", "gjirf.ru"
-        }
-
-        BLACKLISTED_DOMAINS = {
-            "otvet.mail.ru", "ask.fm", "irecommend.ru", "pikabu.ru",
-            "zen.yandex.ru", "thequestion.ru", "quora.com", "reddit.com",
-            "fishki.net", "yaplakal.com", "blog", "forum"
-        }
-
-        # Генерируем расширенные поисковые запросы
-        expanded_queries = self._expand_search_query(query)
-        all_results = []
-
-        for attempt in range(2):
-            try:
-                with DDGS(timeout=10) as ddgs:
-                    for q in expanded_queries:
-                        results = ddgs.text(q, max_results=5)
-                        for r in results:
-                            href = r.get('href', '')
-                            if not href:
-                                continue
-                            
-                            try:
-                                domain = href.split('/')[2].lower()
-                            except IndexError:
-                                continue
-
-                            if any(bad in domain for bad in BLACKLISTED_DOMAINS):
-                                continue
-
-                            weight = 3 if any(official in domain for official in OFFICIAL_DOMAINS) else \
-                                     2 if any(gov in domain for gov in [".gov.ru", ".gkh.ru", ".gosuslugi.ru"]) else 1
-
-                            snippet = {
-                                "body": r['body'],
-                                "href": href,
-                                "title": r.get('title', ''),
-                                "weight": weight
-                            }
-                            all_results.append(snippet)
-
-                    all_results = sorted(all_results, key=lambda x: x['weight'], reverse=True)
-                    seen_bodies = set()
-                    unique_results = []
-                    for r in all_results:
-                        body_hash = hash(r['body'][:100])
-                        if body_hash not in seen_bodies:
-                            seen_bodies.add(body_hash)
-                            unique_results.append(r)
-                            if len(unique_results) >= max_results:
-                                break
-
-                    if unique_results:
-                        formatted = []
-                        for r in unique_results:
-                            prefix = "[ОФИЦИАЛЬНЫЙ ИСТОЧНИК] " if r['weight'] >= 2 else ""
-                            formatted.append(f"{prefix}• {r['body']}\n  Источник: {r['href']}\n")
-                        return "\n".join(formatted).strip()
-                    else:
-                        return "По вашему запросу ничего не найдено в надёжных источниках."
-
-            except Exception as e:
-                if attempt == 0:
-                    time.sleep(2)
-                    continue
-                return f"Ошибка веб-поиска: {str(e)}"
-
-        return "Не удалось выполнить веб-поиск. Попробуйте позже."
+    # Агент: Раскрытие информации.
+    # Системный промт для Saiga/LLaMA-3 8B:
+    # - Фокус: раскрытие информации УК/РСО, ГИС ЖКХ, сроки, форматы, ответственность
+    # - Жесткая структура
+    # - Только официальные источники (ФЗ, ПП РФ, Приказы Минстроя)
+    PROMPT_TEMPLATE = (
+        "Ты — эксперт по раскрытию информации в сфере ЖКХ. Дай точный, "
+        "структурированный и юридически обоснованный ответ, используя ТОЛЬКО контекст, "
+        "результаты поиска и обновления.\n\n"
+        "**ЖЕСТКИЕ ПРАВИЛА:**\n"
+        "1. Если данных нет — отвечай: 'Недостаточно данных для точного ответа.'\n"
+        "2. Все утверждения обязательны со ссылками ([ПП РФ №731, п. 3], [ФЗ №209-ФЗ, ст. 161], "
+        "[Приказ Минстроя №74/пр]).\n"
+        "3. Ответ строго по структуре.\n"
+        "4. Формулы пени только если есть ключевые слова.\n"
+        "5. Приоритет источников: ФЗ > ПП РФ > Приказы Минстроя > разъяснения надзорных органов.\n\n"
+        "### Контекст:\n"
+        "{context_text}\n\n"
+        "### Веб-поиск:\n"
+        "{web_results}\n\n"
+        "### Дополнительные обновления:\n"
+        "{extra}\n\n"
+        "### Структура ответа:\n"
+        "- Краткий вывод\n"
+        "- Нормативное обоснование (точные статьи и пункты)\n"
+        "- Пошаговая инструкция (как раскрывать, где публиковать, кто отвечает)\n"
+        "- Сроки и ответственность\n"
+        "- Судебная практика\n"
+        "{penalty_block}\n"
+        "### Ключевые нормативные акты (справочно):\n"
+        "- ФЗ №209-ФЗ (обязанность раскрытия информации)\n"
+        "- ПП РФ №731 (стандарты раскрытия: структура, сроки, каналы)\n"
+        "- Приказ Минстроя №48/пр, №414 (годовая отчетность УК)\n"
+        "- Приказ Минстроя №74/пр (загрузка данных в ГИС ЖКХ)\n"
+        "- ФЗ №59-ФЗ (сроки ответа на запросы граждан — 30 дней)\n\n"
+        "{role_instruction}"
+    )
+    PENALTY_BLOCK = (
+        "\n**Расчет пени (актуальная формула):**\n"
+        "- Пени = Долг × Дни просрочки × (Ключевая ставка ЦБ / 300 / 100)\n"
+        "- Основание: [ЖК РФ, ст. 155.1]\n"
+        "- Ограничение: ≤ 9.5% годовых [ФЗ №44-ФЗ, ПП РФ №329]\n"
+        "- Начало: с 31-го дня после срока оплаты.\n"
+    )
 
-    def _expand_search_query(self, query: str) -> List[str]:
-        """Генерирует несколько вариантов поискового запроса для лучшего покрытия темы."""
-        queries = [query]
-        queries.append(f"{query} ПП РФ 731")
-        queries.append(f"{query} ГИС ЖКХ сроки загрузки")
-        queries.append(f"{query} Приказ Минстроя 48/414")
-        queries.append(f"{query} ФЗ 209-ФЗ раскрытие информации")
-        queries.append(f"{query} судебная практика по отказу в предоставлении информации ЖКХ")
-        # Добавляем синонимы
-        for term, data in self.term_map.items():
-            if term in query.lower() or any(syn in query.lower() for syn in data.get("synonyms", [])):
-                for synonym in data.get("synonyms", [])[:2]:
-                    new_q = query.replace(term, synonym) if term in query else query + " " + synonym
-                    queries.append(new_q)
-        return list(set(queries))
-
-    def _build_prompt(self, summary: str, context_text: str, role: str = "смешанная") -> str:
-        """
-        Агент: Раскрытие информации.
-        Формирует системный промт для Saiga/LLaMA-3 8B:
-        - Фокус: раскрытие информации УК/РСО, ГИС ЖКХ, сроки, форматы, ответственность
-        - Жесткая структура
-        - Только официальные источники (ФЗ, ПП РФ, Приказы Минстроя)
-        """
-        extra = self.improve_prompt_from_feedback()
-        web_results = self._perform_web_search(summary)
-    
-        penalty_keywords = [
-            "пени", "пеня", "неустойка", "штраф за просрочку",
-            "ставка цб", "ключевая ставка", "расчет пени"
-        ]
-        q_lower = summary.lower()
-        should_calculate_penalty = any(kw in q_lower for kw in penalty_keywords)
-    
-        # --- SYSTEM PROMPT ---
-        system_prompt = (
-            "Ты — эксперт по раскрытию информации в сфере ЖКХ. "
-            "Дай точный, структурированный и юридически обоснованный ответ, "
-            "используя ТОЛЬКО контекст, результаты поиска и обновления.\n\n"
-            "**ЖЕСТКИЕ ПРАВИЛА:**\n"
-            "1. Если данных нет — отвечай: 'Недостаточно данных для точного ответа.'\n"
-            "2. Все утверждения обязательны со ссылками ([ПП РФ №731, п. 3], [ФЗ №209-ФЗ, ст. 161], [Приказ Минстроя №74/пр]).\n"
-            "3. Ответ строго по структуре.\n"
-            "4. Формулы пени только если есть ключевые слова.\n"
-            "5. Приоритет источников: ФЗ > ПП РФ > Приказы Минстроя > разъяснения надзорных органов.\n\n"
-            f"### Контекст:\n{context_text}\n\n"
-            f"### Веб-поиск:\n{web_results}\n\n"
-            f"### Дополнительные обновления:\n{extra}\n\n"
-            "### Структура ответа:\n"
-            "- Краткий вывод\n"
-            "- Нормативное обоснование (точные статьи и пункты)\n"
-            "- Пошаговая инструкция (как раскрывать, где публиковать, кто отвечает)\n"
-            "- Сроки и ответственность\n"
-            "- Судебная практика\n"
-        )
-    
-        if should_calculate_penalty:
-            system_prompt += (
-                "\n**Расчет пени (актуальная формула):**\n"
-                "- Пени = Долг × Дни просрочки × (Ключевая ставка ЦБ / 300 / 100)\n"
-                "- Основание: [ЖК РФ, ст. 155.1]\n"
-                "- Ограничение: ≤ 9.5% годовых [ФЗ №44-ФЗ, ПП РФ №329]\n"
-                "- Начало: с 31-го дня после срока оплаты.\n"
-            )
-    
-        system_prompt += (
-            "\n### Ключевые нормативные акты (справочно):\n"
-            "- ФЗ №209-ФЗ (обязанность раскрытия информации)\n"
-            "- ПП РФ №731 (стандарты раскрытия: структура, сроки, каналы)\n"
-            "- Приказ Минстроя №48/пр, №414 (годовая отчетность УК)\n"
-            "- Приказ Минстроя №74/пр (загрузка данных в ГИС ЖКХ)\n"
-            "- ФЗ №59-ФЗ (сроки ответа на запросы граждан — 30 дней)\n\n"
-            f"{self.get_role_instruction(role)}"
-        )
-    
-        return (
-            "<|begin_of_text|><|start_header_id|>system<|end_header_id|>\n"
-            f"{system_prompt}<|eot_id|>"
-        )
 
 class IoTAgent(RAGAgent):
+    OFFICIAL_DOMAINS = RAGAgent.OFFICIAL_DOMAINS | {"digital.gov.ru", "roskomnadzor.ru", "fct.gov.ru"}
+    GOV_SUFFIXES = (".gov.ru", ".gkh.ru", ".roskomnadzor.ru")
+    SEARCH_QUERY_TEMPLATES = (
+        "{q} ФЗ 152-ФЗ IoT",
+        "{q} ПП РФ 689 персональные данные",
+        "{q} умные счётчики ЖКХ",
+        "{q} интеграция API датчиков ЖКХ",
+        "{q} уведомления в Telegram датчики протечки",
+    )
+    PENALTY_KEYWORDS = (
+        "пени", "пеня", "неустойка", "штраф за просрочку",
+        "ставка цб", "ключевая ставка", "расчет пени",
+    )
+
     def __init__(self):
         # Расширенный и структурированный словарь с синонимами и контекстами
-        self.term_map = self._build_term_map()
-        keywords = self._flatten_term_map(self.term_map)
+        self.term_map, keywords = self._shared_term_map()
         
         super().__init__("IoT и мониторинг", keywords)
 
@@ -1934,195 +1857,78 @@ class IoTAgent(RAGAgent):
             },
         }
 
-    def _flatten_term_map(self, term_map: Dict) -> List[str]:
-        """Преобразует структурированный словарь в плоский список уникальных ключевых слов."""
-        keywords = set()
-        for term, data in term_map.items():
-            keywords.add(term.lower())  # оригинальный ключ
-            for synonym in data.get("synonyms", []):
-                keywords.add(synonym.lower())
-            # Добавляем ключи из контекстов
-            contexts = data.get("contexts", [])
-            if isinstance(contexts, dict):
-                for ctx_key in contexts.keys():
-                    keywords.add(ctx_key.lower())
-            elif isinstance(contexts, list):
-                for ctx in contexts:
-                    keywords.add(ctx.lower())
-        return list(keywords)
-
-    def _perform_web_search(self, query: str, max_results: int = 3) -> str:
-        """
-        Улучшенный веб-поиск: приоритет официальным источникам, фильтрация, ранжирование.
-        Выполняется ВНУТРИ _build_prompt, как в оригинальной архитектуре.
-        """
-        OFFICIAL_DOMAINS = {
-            "cbr.ru", "government.ru", "kremlin.ru", "rosstat.gov.ru", "minfin.gov.ru",
-            "fas.gov.ru", "gji.ru", "rospotrebnadzor.ru", "rosreestr.gov.ru",
-            "minstroyrf.ru", "fgis-tarif.ru", "consultant.ru", "garant.ru",
-            "pravo.gov.ru", "gkh.ru", "digital.gov.ru", "roskomnadzor.ru", "fct.gov.ru"
-        }
-
-        BLACKLISTED_DOMAINS = {
-            "otvet.mail.ru", "ask.fm", "irecommend.ru", "pikabu.ru",
-            "zen.yandex.ru", "thequestion.ru", "quora.com", "reddit.com",
-            "fishki.net", "yaplakal.com", "blog", "forum"
-        }
-
-        # Генерируем расширенные поисковые запросы
-        expanded_queries = self._expand_search_query(query)
-        all_results = []
-
-        for attempt in range(2):
-            try:
-                with DDGS(timeout=10) as ddgs:
-                    for q in expanded_queries:
-                        results = ddgs.text(q, max_results=5)
-                        for r in results:
-                            href = r.get('href', '')
-                            if not href:
-                                continue
-                            
-                            try:
-                                domain = href.split('/')[2].lower()
-                            except IndexError:
-                                continue
-
-                            if any(bad in domain for bad in BLACKLISTED_DOMAINS):
-                                continue
-
-                            weight = 3 if any(official in domain for official in OFFICIAL_DOMAINS) else \
-                                     2 if any(gov in domain for gov in [".gov.ru", ".gkh.ru", ".roskomnadzor.ru"]) else 1
-
-                            snippet = {
-                                "body": r['body'],
-                                "href": href,
-                                "title": r.get('title', ''),
-                                "weight": weight
-                            }
-                            all_results.append(snippet)
-
-                    all_results = sorted(all_results, key=lambda x: x['weight'], reverse=True)
-                    seen_bodies = set()
-                    unique_results = []
-                    for r in all_results:
-                        body_hash = hash(r['body'][:100])
-                        if body_hash not in seen_bodies:
-                            seen_bodies.add(body_hash)
-                            unique_results.append(r)
-                            if len(unique_results) >= max_results:
-                                break
-
-                    if unique_results:
-                        formatted = []
-                        for r in unique_results:
-                            prefix = "[ОФИЦИАЛЬНЫЙ ИСТОЧНИК] " if r['weight'] >= 2 else ""
-                            formatted.append(f"{prefix}• {r['body']}\n  Источник: {r['href']}\n")
-                        return "\n".join(formatted).strip()
-                    else:
-                        return "По вашему запросу ничего не найдено в надёжных источниках."
-
-            except Exception as e:
-                if attempt == 0:
-                    time.sleep(2)
-                    continue
-                return f"Ошибка веб-поиска: {str(e)}"
-
-        return "Не удалось выполнить веб-поиск. Попробуйте позже."
+    # Агент: IoT и цифровой мониторинг.
+    # Системный промт для Saiga/LLaMA-3 8B:
+    # - Фокус: IoT, цифровой мониторинг, интеграции, уведомления
+    # - Правовые аспекты: ФЗ-152, ПП РФ №689
+    # - Жёсткая структура и ссылки на нормативные акты
+    PROMPT_TEMPLATE = (
+        "Ты — эксперт по IoT и цифровому мониторингу в ЖКХ. Дай точный, "
+        "структурированный и юридически обоснованный ответ, используя ТОЛЬКО контекст, веб-результаты и обновления.\n\n"
+        "**ЖЕСТКИЕ ПРАВИЛА:**\n"
+        "1. Если данных нет — отвечай: 'Недостаточно данных для точного ответа.'\n"
+        "2. Все утверждения сопровождай ссылками на нормативные акты ([ФЗ №152-ФЗ, ст. 9], [ПП РФ №689, п. 4]).\n"
+        "3. Структура ответа: "
+        "Краткий вывод → Техническое решение → Нормативные требования → Рекомендации по внедрению.\n"
+        "4. Формулы пени только при наличии ключевых слов.\n"
+        "5. Приоритет источников: ФЗ > ПП РФ > технические стандарты.\n\n"
+        "### Контекст:\n"
+        "{context_text}\n\n"
+        "### Веб-поиск:\n"
+        "{web_results}\n\n"
+        "### Дополнительные обновления:\n"
+        "{extra}\n\n"
+        "### Структура ответа:\n"
+        "- Краткий вывод\n"
+        "- Техническое решение / возможности:\n"
+        "  * Устройства и технологии\n"
+        "  * Интеграция (API, вебхуки, протоколы)\n"
+        "  * Настройка уведомлений (Telegram, WhatsApp, SMS)\n"
+        "- Нормативные требования:\n"
+        "  * Законодательство по обработке данных [ФЗ №152-ФЗ]\n"
+        "  * Согласие жильцов [ФЗ №152-ФЗ, ст. 9]\n"
+        "  * Меры безопасности [ПП РФ №689]\n"
+        "- Рекомендации по внедрению:\n"
+        "  * Этапы подключения\n"
+        "  * Избежание юридических рисков\n"
+        "  * Примеры успешных кейсов (если есть в контексте)\n"
+        "{penalty_block}\n"
+        "### Ключевые нормативные акты:\n"
+        "- ФЗ №152-ФЗ «О персональных данных»\n"
+        "- ПП РФ №689 «Об утверждении требований к защите персональных данных»\n"
+        "- ФЗ №149-ФЗ «Об информации, ИТ и защите информации»\n"
+        "- ФЗ №261-ФЗ (умные счетчики, IoT)\n"
+        "- ПП РФ №354 (интеграция показаний счетчиков)\n\n"
+        "{role_instruction}"
+    )
+    PENALTY_BLOCK = (
+        "\n**Расчет пени (актуальная формула):**\n"
+        "- Пени = Сумма долга × Дни просрочки × (Ключевая ставка ЦБ / 300 / 100)\n"
+        "- Основание: [ЖК РФ, ст. 155.1]\n"
+        "- Ограничение: ≤ 9.5% годовых [ФЗ №44-ФЗ, ПП РФ №329]\n"
+        "- Начало: с 31-го дня после срока оплаты.\n"
+    )
 
-    def _expand_search_query(self, query: str) -> List[str]:
-        """Генерирует несколько вариантов поискового запроса для лучшего покрытия темы."""
-        queries = [query]
-        queries.append(f"{query} ФЗ 152-ФЗ IoT")
-        queries.append(f"{query} ПП РФ 689 персональные данные")
-        queries.append(f"{query} умные счётчики ЖКХ")
-        queries.append(f"{query} интеграция API датчиков ЖКХ")
-        queries.append(f"{query} уведомления в Telegram датчики протечки")
-        # Добавляем синонимы
-        for term, data in self.term_map.items():
-            if term in query.lower() or any(syn in query.lower() for syn in data.get("synonyms", [])):
-                for synonym in data.get("synonyms", [])[:2]:
-                    new_q = query.replace(term, synonym) if term in query else query + " " + synonym
-                    queries.append(new_q)
-        return list(set(queries))
-
-    def _build_prompt(self, summary: str, context_text: str, role: str = "смешанная") -> str:
-        """
-        Агент: IoT и цифровой мониторинг.
-        Формирует системный промт для Saiga/LLaMA-3 8B:
-        - Фокус: IoT, цифровой мониторинг, интеграции, уведомления
-        - Правовые аспекты: ФЗ-152, ПП РФ №689
-        - Жёсткая структура и ссылки на нормативные акты
-        """
-        extra = self.improve_prompt_from_feedback()
-        web_results = self._perform_web_search(summary)
-    
-        penalty_keywords = [
-            "пени", "пеня", "неустойка", "штраф за просрочку",
-            "ставка цб", "ключевая ставка", "расчет пени"
-        ]
-        should_calculate_penalty = any(kw in summary.lower() for kw in penalty_keywords)
-    
-        # --- SYSTEM PROMPT ---
-        system_prompt = (
-            "Ты — эксперт по IoT и цифровому мониторингу в ЖКХ. "
-            "Дай точный, структурированный и юридически обоснованный ответ, "
-            "используя ТОЛЬКО контекст, веб-результаты и обновления.\n\n"
-            "**ЖЕСТКИЕ ПРАВИЛА:**\n"
-            "1. Если данных нет — отвечай: 'Недостаточно данных для точного ответа.'\n"
-            "2. Все утверждения сопровождай ссылками на нормативные акты ([ФЗ №152-ФЗ, ст. 9], [ПП РФ №689, п. 4]).\n"
-            "3. Структура ответа: Краткий вывод → Техническое решение → Нормативные требования → Рекомендации по внедрению.\n"
-            "4. Формулы пени только при наличии ключевых слов.\n"
-            "5. Приоритет источников: ФЗ > ПП РФ > технические стандарты.\n\n"
-            f"### Контекст:\n{context_text}\n\n"
-            f"### Веб-поиск:\n{web_results}\n\n"
-            f"### Дополнительные обновления:\n{extra}\n\n"
-            "### Структура ответа:\n"
-            "- Краткий вывод\n"
-            "- Техническое решение / возможности:\n"
-            "  * Устройства и технологии\n"
-            "  * Интеграция (API, вебхуки, протоколы)\n"
-            "  * Настройка уведомлений (Telegram, WhatsApp, SMS)\n"
-            "- Нормативные требования:\n"
-            "  * Законодательство по обработке данных [ФЗ №152-ФЗ]\n"
-            "  * Согласие жильцов [ФЗ №152-ФЗ, ст. 9]\n"
-            "  * Меры безопасности [ПП РФ №689]\n"
-            "- Рекомендации по внедрению:\n"
-            "  * Этапы подключения\n"
-            "  * Избежание юридических рисков\n"
-            "  * Примеры успешных кейсов (если есть в контексте)\n"
-        )
-    
-        if should_calculate_penalty:
-            system_prompt += (
-                "\n**Расчет пени (актуальная формула):**\n"
-                "- Пени = Сумма долга × Дни просрочки × (Ключевая ставка ЦБ / 300 / 100)\n"
-                "- Основание: [ЖК РФ, ст. 155.1]\n"
-                "- Ограничение: ≤ 9.5% годовых [ФЗ №44-ФЗ, ПП РФ №329]\n"
-                "- Начало: с 31-го дня после срока оплаты.\n"
-            )
-    
-        system_prompt += (
-            "\n### Ключевые нормативные акты:\n"
-            "- ФЗ №152-ФЗ «О персональных данных»\n"
-            "- ПП РФ №689 «Об утверждении требований к защите персональных данных»\n"
-            "- ФЗ №149-ФЗ «Об информации, ИТ и защите информации»\n"
-            "- ФЗ №261-ФЗ (умные счетчики, IoT)\n"
-            "- ПП РФ №354 (интеграция показаний счетчиков)\n\n"
-            f"{self.get_role_instruction(role)}"
-        )
-    
-        return (
-            "<|begin_of_text|><|start_header_id|>system<|end_header_id|>\n"
-            f"{system_prompt}<|eot_id|>"
-        )
 
         
 class MeetingAgent(RAGAgent):
+    OFFICIAL_DOMAINS = RAGAgent.OFFICIAL_DOMAINS | {"dom.gosuslugi.ru", "gjirf.ru", "vsrf.ru"}
+    GOV_SUFFIXES = (".gov.ru", ".gkh.ru", ".gosuslugi.ru", ".vsrf.ru")
+    SEARCH_QUERY_TEMPLATES = (
+        "{q} ЖК РФ ст 44-48",
+        "{q} ПП РФ 416",
+        "{q} электронное голосование ГИС ЖКХ",
+        "{q} оспаривание решения ОСС судебная практика",
+        "{q} протокол общего собрания форма",
+    )
+    PENALTY_KEYWORDS = (
+        "пени", "пеня", "неустойка", "штраф за просрочку",
+        "ставка цб", "ключевая ставка", "расчет пени",
+    )
+
     def __init__(self):
         # Расширенный и структурированный словарь с синонимами и контекстами
-        self.term_map = self._build_term_map()
-        keywords = self._flatten_term_map(self.term_map)
+        self.term_map, keywords = self._shared_term_map()
         
         super().__init__("Общие собрания", keywords)
 
@@ -2206,187 +2012,70 @@ class MeetingAgent(RAGAgent):
             },
         }
 
-    def _flatten_term_map(self, term_map: Dict) -> List[str]:
-        """Преобразует структурированный словарь в плоский список уникальных ключевых слов."""
-        keywords = set()
-        for term, data in term_map.items():
-            keywords.add(term.lower())  # оригинальный ключ
-            for synonym in data.get("synonyms", []):
-                keywords.add(synonym.lower())
-            # Добавляем ключи из контекстов
-            contexts = data.get("contexts", [])
-            if isinstance(contexts, dict):
-                for ctx_key in contexts.keys():
-                    keywords.add(ctx_key.lower())
-            elif isinstance(contexts, list):
-                for ctx in contexts:
-                    keywords.add(ctx.lower())
-        return list(keywords)
-
-    def _perform_web_search(self, query: str, max_results: int = 3) -> str:
-        """
-        Улучшенный веб-поиск: приоритет официальным источникам, фильтрация, ранжирование.
-        Выполняется ВНУТРИ _build_prompt, как в оригинальной архитектуре.
-        """
-        OFFICIAL_DOMAINS = {
-            "cbr.ru", "government.ru", "kremlin.ru", "rosstat.gov.ru", "minfin.gov.ru",
-            "fas.gov.ru", "gji.ru", "rospotrebnadzor.ru", "rosreestr.gov.ru",
-            "minstroyrf.ru", "fgis-tarif.ru", "consultant.ru", "garant.ru",
-            "pravo.gov.ru", "gkh.ru", "dom.gosuslugi.ru", "gjirf.ru", "vsrf.ru"
-        }
-
-        BLACKLISTED_DOMAINS = {
-            "otvet.mail.ru", "ask.fm", "irecommend.ru", "pikabu.ru",
-            "zen.yandex.ru", "thequestion.ru", "quora.com", "reddit.com",
-            "fishki.net", "yaplakal.com", "blog", "forum"
-        }
-
-        # Генерируем расширенные поисковые запросы
-        expanded_queries = self._expand_search_query(query)
-        all_results = []
-
-        for attempt in range(2):
-            try:
-                with DDGS(timeout=10) as ddgs:
-                    for q in expanded_queries:
-                        results = ddgs.text(q, max_results=5)
-                        for r in results:
-                            href = r.get('href', '')
-                            if not href:
-                                continue
-                            
-                            try:
-                                domain = href.split('/')[2].lower()
-                            except IndexError:
-                                continue
-
-                            if any(bad in domain for bad in BLACKLISTED_DOMAINS):
-                                continue
-
-                            weight = 3 if any(official in domain for official in OFFICIAL_DOMAINS) else \
-                                     2 if any(gov in domain for gov in [".gov.ru", ".gkh.ru", ".gosuslugi.ru", ".vsrf.ru"]) else 1
-
-                            snippet = {
-                                "body": r['body'],
-                                "href": href,
-                                "title": r.get('title', ''),
-                                "weight": weight
-                            }
-                            all_results.append(snippet)
-
-                    all_results = sorted(all_results, key=lambda x: x['weight'], reverse=True)
-                    seen_bodies = set()
-                    unique_results = []
-                    for r in all_results:
-                        body_hash = hash(r['body'][:100])
-                        if body_hash not in seen_bodies:
-                            seen_bodies.add(body_hash)
-                            unique_results.append(r)
-                            if len(unique_results) >= max_results:
-                                break
-
-                    if unique_results:
-                        formatted = []
-                        for r in unique_results:
-                            prefix = "[ОФИЦИАЛЬНЫЙ ИСТОЧНИК] " if r['weight'] >= 2 else ""
-                            formatted.append(f"{prefix}• {r['body']}\n  Источник: {r['href']}\n")
-                        return "\n".join(formatted).strip()
-                    else:
-                        return "По вашему запросу ничего не найдено в надёжных источниках."
-
-            except Exception as e:
-                if attempt == 0:
-                    time.sleep(2)
-                    continue
-                return f"Ошибка веб-поиска: {str(e)}"
-
-        return "Не удалось выполнить веб-поиск. Попробуйте позже."
+    # Агент: Общие собрания собственников.
+    # Системный промт для Saiga/LLaMA-3 8B:
+    # - Фокус: инициирование, уведомление, кворум, голосование, протокол, оспаривание решений
+    # - Жёсткая структура и ссылки на нормативные акты
+    PROMPT_TEMPLATE = (
+        "Ты — эксперт по проведению общих собраний собственников в многоквартирных домах. Дай точный, "
+        "структурированный и юридически обоснованный ответ, используя ТОЛЬКО контекст, веб-результаты и обновления.\n\n"
+        "**ЖЕСТКИЕ ПРАВИЛА:**\n"
+        "1. Если данных нет — отвечай: 'Недостаточно данных для точного ответа.'\n"
+        "2. Все утверждения подкрепляй ссылками на нормативные акты ([ЖК РФ, ст. 45], [ПП РФ №416, п. 5]).\n"
+        "3. Структура ответа: Краткий вывод → Нормативное обоснование → Пошаговая инструкция → Судебная практика.\n"
+        "4. Формулы пени только при наличии ключевых слов.\n"
+        "5. Приоритет источников: ЖК РФ > ПП РФ > разъяснения Минстроя/ГЖИ > судебная практика.\n\n"
+        "### Контекст:\n"
+        "{context_text}\n\n"
+        "### Веб-поиск:\n"
+        "{web_results}\n\n"
+        "### Дополнительные обновления:\n"
+        "{extra}\n\n"
+        "### Структура ответа:\n"
+        "- Краткий вывод\n"
+        "- Нормативное обоснование (статьи ЖК РФ, пункты ПП РФ)\n"
+        "- Пошаговая инструкция:\n"
+        "  * Кто может инициировать собрание? (ЖК РФ, ст. 45)\n"
+        "  * Уведомление собственников (сроки, форма, способы — ПП РФ №416, п. 5)\n"
+        "  * Расчет кворума и проведение голосования (ЖК РФ, ст. 46-47)\n"
+        "  * Оформление и публикация протокола (ПП РФ №416, п. 21)\n"
+        "  * Оспаривание решений (сроки, основания, порядок — ЖК РФ, ст. 46(5))\n"
+        "- Судебная практика\n"
+        "{penalty_block}\n"
+        "### Ключевые нормативные акты:\n"
+        "- ЖК РФ (ст. 44-48 — основы проведения ОСС)\n"
+        "- ПП РФ №416 «О порядке проведения общего собрания»\n"
+        "- Приказ Минстроя №74/пр (технические требования к электронному голосованию)\n"
+        "- ГПК РФ (порядок оспаривания решений в суде)\n\n"
+        "{role_instruction}"
+    )
+    PENALTY_BLOCK = (
+        "\n**Расчет пени (актуальная формула):**\n"
+        "- Пени = Сумма долга × Дни просрочки × (Ключевая ставка ЦБ РФ / 300 / 100)\n"
+        "- Нормативная база: [ЖК РФ, ст. 155.1]\n"
+        "- Ограничение: ≤ 9.5% годовых [ФЗ №44-ФЗ, ПП РФ №329]\n"
+        "- Начало: с 31-го дня после срока оплаты.\n"
+    )
 
-    def _expand_search_query(self, query: str) -> List[str]:
-        """Генерирует несколько вариантов поискового запроса для лучшего покрытия темы."""
-        queries = [query]
-        queries.append(f"{query} ЖК РФ ст 44-48")
-        queries.append(f"{query} ПП РФ 416")
-        queries.append(f"{query} электронное голосование ГИС ЖКХ")
-        queries.append(f"{query} оспаривание решения ОСС судебная практика")
-        queries.append(f"{query} протокол общего собрания форма")
-        # Добавляем синонимы
-        for term, data in self.term_map.items():
-            if term in query.lower() or any(syn in query.lower() for syn in data.get("synonyms", [])):
-                for synonym in data.get("synonyms", [])[:2]:
-                    new_q = query.replace(term, synonym) if term in query else query + " " + synonym
-                    queries.append(new_q)
-        return list(set(queries))
-
-    def _build_prompt(self, summary: str, context_text: str, role: str = "смешанная") -> str:
-        """
-        Агент: Общие собрания собственников.
-        Формирует системный промт для Saiga/LLaMA-3 8B:
-        - Фокус: инициирование, уведомление, кворум, голосование, протокол, оспаривание решений
-        - Жёсткая структура и ссылки на нормативные акты
-        """
-        extra = self.improve_prompt_from_feedback()
-        web_results = self._perform_web_search(summary)
-    
-        penalty_keywords = [
-            "пени", "пеня", "неустойка", "штраф за просрочку",
-            "ставка цб", "ключевая ставка", "расчет пени"
-        ]
-        should_calculate_penalty = any(kw in summary.lower() for kw in penalty_keywords)
-    
-        # --- SYSTEM PROMPT ---
-        system_prompt = (
-            "Ты — эксперт по проведению общих собраний собственников в многоквартирных домах. "
-            "Дай точный, структурированный и юридически обоснованный ответ, используя ТОЛЬКО контекст, веб-результаты и обновления.\n\n"
-            "**ЖЕСТКИЕ ПРАВИЛА:**\n"
-            "1. Если данных нет — отвечай: 'Недостаточно данных для точного ответа.'\n"
-            "2. Все утверждения подкрепляй ссылками на нормативные акты ([ЖК РФ, ст. 45], [ПП РФ №416, п. 5]).\n"
-            "3. Структура ответа: Краткий вывод → Нормативное обоснование → Пошаговая инструкция → Судебная практика.\n"
-            "4. Формулы пени только при наличии ключевых слов.\n"
-            "5. Приоритет источников: ЖК РФ > ПП РФ > разъяснения Минстроя/ГЖИ > судебная практика.\n\n"
-            f"### Контекст:\n{context_text}\n\n"
-            f"### Веб-поиск:\n{web_results}\n\n"
-            f"### Дополнительные обновления:\n{extra}\n\n"
-            "### Структура ответа:\n"
-            "- Краткий вывод\n"
-            "- Нормативное обоснование (статьи ЖК РФ, пункты ПП РФ)\n"
-            "- Пошаговая инструкция:\n"
-            "  * Кто может инициировать собрание? (ЖК РФ, ст. 45)\n"
-            "  * Уведомление собственников (сроки, форма, способы — ПП РФ №416, п. 5)\n"
-            "  * Расчет кворума и проведение голосования (ЖК РФ, ст. 46-47)\n"
-            "  * Оформление и публикация протокола (ПП РФ №416, п. 21)\n"
-            "  * Оспаривание решений (сроки, основания, порядок — ЖК РФ, ст. 46(5))\n"
-            "- Судебная практика\n"
-        )
-    
-        if should_calculate_penalty:
-            system_prompt += (
-                "\n**Расчет пени (актуальная формула):**\n"
-                "- Пени = Сумма долга × Дни просрочки × (Ключевая ставка ЦБ РФ / 300 / 100)\n"
-                "- Нормативная база: [ЖК РФ, ст. 155.1]\n"
-                "- Ограничение: ≤ 9.5% годовых [ФЗ №44-ФЗ, ПП РФ №329]\n"
-                "- Начало: с 31-го дня после срока оплаты.\n"
-            )
-    
-        system_prompt += (
-            "\n### Ключевые нормативные акты:\n"
-            "- ЖК РФ (ст. 44-48 — основы проведения ОСС)\n"
-            "- ПП РФ №416 «О порядке проведения общего собрания»\n"
-            "- Приказ Минстроя №74/пр (технические требования к электронному голосованию)\n"
-            "- ГПК РФ (порядок оспаривания решений в суде)\n\n"
-            f"{self.get_role_instruction(role)}"
-        )
-    
-        return (
-            "<|begin_of_text|><|start_header_id|>system<|end_header_id|>\n"
-            f"{system_prompt}<|eot_id|>"
-        )
         
 class CapitalRepairAgent(RAGAgent):
+    OFFICIAL_DOMAINS = RAGAgent.OFFICIAL_DOMAINS | {"reformagkh.ru", "kapremont.rf", "dom.gosuslugi.ru", "vsrf.ru"}
+    GOV_SUFFIXES = (".gov.ru", ".gkh.ru", ".kapremont.rf", ".vsrf.ru")
+    SEARCH_QUERY_TEMPLATES = (
+        "{q} ЖК РФ ст 166-180",
+        "{q} ПП РФ 416 капремонт",
+        "{q} региональная программа капитального ремонта",
+        "{q} судебная практика по капремонту",
+        "{q} спецсчет или региональный оператор",
+    )
+    PENALTY_KEYWORDS = (
+        "пени", "пеня", "неустойка", "штраф за просрочку",
+        "ставка цб", "ключевая ставка", "расчет пени",
+    )
+
     def __init__(self):
         # Расширенный и структурированный словарь с синонимами и контекстами
-        self.term_map = self._build_term_map()
-        keywords = self._flatten_term_map(self.term_map)
+        self.term_map, keywords = self._shared_term_map()
         
         super().__init__("Капитальный ремонт", keywords)
 
@@ -2470,189 +2159,72 @@ class CapitalRepairAgent(RAGAgent):
             },
         }
 
-    def _flatten_term_map(self, term_map: Dict) -> List[str]:
-        """Преобразует структурированный словарь в плоский список уникальных ключевых слов."""
-        keywords = set()
-        for term, data in term_map.items():
-            keywords.add(term.lower())  # оригинальный ключ
-            for synonym in data.get("synonyms", []):
-                keywords.add(synonym.lower())
-            # Добавляем ключи из контекстов
-            contexts = data.get("contexts", [])
-            if isinstance(contexts, dict):
-                for ctx_key in contexts.keys():
-                    keywords.add(ctx_key.lower())
-            elif isinstance(contexts, list):
-                for ctx in contexts:
-                    keywords.add(ctx.lower())
-        return list(keywords)
-
-    def _perform_web_search(self, query: str, max_results: int = 3) -> str:
-        """
-        Улучшенный веб-поиск: приоритет официальным источникам, фильтрация, ранжирование.
-        Выполняется ВНУТРИ _build_prompt, как в оригинальной архитектуре.
-        """
-        OFFICIAL_DOMAINS = {
-            "cbr.ru", "government.ru", "kremlin.ru", "rosstat.gov.ru", "minfin.gov.ru",
-            "fas.gov.ru", "gji.ru", "rospotrebnadzor.ru", "rosreestr.gov.ru",
-            "minstroyrf.ru", "fgis-tarif.ru", "consultant.ru", "garant.ru",
-            "pravo.gov.ru", "gkh.ru", "reformagkh.ru", "kapremont.rf", "dom.gosuslugi.ru", "vsrf.ru"
-        }
-
-        BLACKLISTED_DOMAINS = {
-            "otvet.mail.ru", "ask.fm", "irecommend.ru", "pikabu.ru",
-            "zen.yandex.ru", "thequestion.ru", "quora.com", "reddit.com",
-            "fishki.net", "yaplakal.com", "blog", "forum"
-        }
-
-        # Генерируем расширенные поисковые запросы
-        expanded_queries = self._expand_search_query(query)
-        all_results = []
-
-        for attempt in range(2):
-            try:
-                with DDGS(timeout=10) as ddgs:
-                    for q in expanded_queries:
-                        results = ddgs.text(q, max_results=5)
-                        for r in results:
-                            href = r.get('href', '')
-                            if not href:
-                                continue
-                            
-                            try:
-                                domain = href.split('/')[2].lower()
-                            except IndexError:
-                                continue
-
-                            if any(bad in domain for bad in BLACKLISTED_DOMAINS):
-                                continue
-
-                            weight = 3 if any(official in domain for official in OFFICIAL_DOMAINS) else \
-                                     2 if any(gov in domain for gov in [".gov.ru", ".gkh.ru", ".kapremont.rf", ".vsrf.ru"]) else 1
-
-                            snippet = {
-                                "body": r['body'],
-                                "href": href,
-                                "title": r.get('title', ''),
-                                "weight": weight
-                            }
-                            all_results.append(snippet)
-
-                    all_results = sorted(all_results, key=lambda x: x['weight'], reverse=True)
-                    seen_bodies = set()
-                    unique_results = []
-                    for r in all_results:
-                        body_hash = hash(r['body'][:100])
-                        if body_hash not in seen_bodies:
-                            seen_bodies.add(body_hash)
-                            unique_results.append(r)
-                            if len(unique_results) >= max_results:
-                                break
-
-                    if unique_results:
-                        formatted = []
-                        for r in unique_results:
-                            prefix = "[ОФИЦИАЛЬНЫЙ ИСТОЧНИК] " if r['weight'] >= 2 else ""
-                            formatted.append(f"{prefix}• {r['body']}\n  Источник: {r['href']}\n")
-                        return "\n".join(formatted).strip()
-                    else:
-                        return "По вашему запросу ничего не найдено в надёжных источниках."
-
-            except Exception as e:
-                if attempt == 0:
-                    time.sleep(2)
-                    continue
-                return f"Ошибка веб-поиска: {str(e)}"
-
-        return "Не удалось выполнить веб-поиск. Попробуйте позже."
+    # Агент: Капитальный ремонт МКД
+    # Системный промт для Saiga/LLaMA-3 8B:
+    # - Фокус: работы, фонд, подрядчик, приём, отчётность, региональные программы
+    # - Жёсткая структура и ссылки на нормативные акты
+    PROMPT_TEMPLATE = (
+        "Ты — эксперт по капитальному ремонту многоквартирных домов. Дай точный, "
+        "структурированный и юридически корректный ответ, используя ТОЛЬКО контекст, веб-результаты и обновления.\n\n"
+        "**ЖЕСТКИЕ ПРАВИЛА:**\n"
+        "1. Если данных нет — отвечай: 'Недостаточно данных для точного ответа.'\n"
+        "2. Все утверждения подкрепляй ссылками на нормативные акты ([ЖК РФ, ст. 166], [ПП РФ №416, п. 7]).\n"
+        "3. Структура ответа: Краткий вывод → Нормативное обоснование → Пошаговая инструкция → Судебная практика.\n"
+        "4. Формулы пени только при наличии ключевых слов.\n"
+        "5. Приоритет источников: ЖК РФ > ПП РФ > региональные акты > разъяснения Минстроя > судебная практика.\n\n"
+        "### Контекст:\n"
+        "{context_text}\n\n"
+        "### Веб-поиск:\n"
+        "{web_results}\n\n"
+        "### Дополнительные обновления:\n"
+        "{extra}\n\n"
+        "### Структура ответа:\n"
+        "- Краткий вывод\n"
+        "- Нормативное обоснование (статьи ЖК РФ, пункты ПП РФ, региональные акты)\n"
+        "- Пошаговая инструкция:\n"
+        "  * Что входит в капремонт? (ЖК РФ, ст. 166)\n"
+        "  * Как формируется фонд? (ЖК РФ, ст. 170)\n"
+        "  * Как выбрать подрядчика? (ОСС, ЖК РФ, ст. 175)\n"
+        "  * Как принять работы? (состав комиссии, акт — ЖК РФ, ст. 176)\n"
+        "  * Как получить отчёт? (сроки, форма, публикация — ЖК РФ, ст. 177)\n"
+        "  * Что делать при переносе сроков или вандализме? (жалоба, повторное голосование)\n"
+        "- Судебная практика\n"
+        "{penalty_block}\n"
+        "### Ключевые нормативные акты:\n"
+        "- ЖК РФ (ст. 166-180 — основы капремонта)\n"
+        "- ПП РФ №416 «О порядке проведения капитального ремонта»\n"
+        "- ФЗ №271-ФЗ «О внесении изменений в ЖК РФ (по капремонту)»\n"
+        "- Региональная программа капитального ремонта (если вопрос региональный)\n"
+        "- Приказы Минстроя по формам отчётов и актов\n\n"
+        "{role_instruction}"
+    )
+    PENALTY_BLOCK = (
+        "\n**Расчет пени (актуальная формула):**\n"
+        "- Пени = Сумма долга × Дни просрочки × (Ключевая ставка ЦБ РФ / 300 / 100)\n"
+        "- Нормативная база: [ЖК РФ, ст. 155.1]\n"
+        "- Ограничение: ≤ 9.5% годовых [ФЗ №44-ФЗ, ПП РФ №329]\n"
+        "- Начало: с 31-го дня после срока оплаты.\n"
+    )
 
-    def _expand_search_query(self, query: str) -> List[str]:
-        """Генерирует несколько вариантов поискового запроса для лучшего покрытия темы."""
-        queries = [query]
-        queries.append(f"{query} ЖК РФ ст 166-180")
-        queries.append(f"{query} ПП РФ 416 капремонт")
-        queries.append(f"{query} региональная программа капитального ремонта")
-        queries.append(f"{query} судебная практика по капремонту")
-        queries.append(f"{query} спецсчет или региональный оператор")
-        # Добавляем синонимы
-        for term, data in self.term_map.items():
-            if term in query.lower() or any(syn in query.lower() for syn in data.get("synonyms", [])):
-                for synonym in data.get("synonyms", [])[:2]:
-                    new_q = query.replace(term, synonym) if term in query else query + " " + synonym
-                    queries.append(new_q)
-        return list(set(queries))
-
-    def _build_prompt(self, summary: str, context_text: str, role: str = "смешанная") -> str:
-        """
-        Агент: Капитальный ремонт МКД
-        Формирует системный промт для Saiga/LLaMA-3 8B:
-        - Фокус: работы, фонд, подрядчик, приём, отчётность, региональные программы
-        - Жёсткая структура и ссылки на нормативные акты
-        """
-        extra = self.improve_prompt_from_feedback()
-        web_results = self._perform_web_search(summary)
-    
-        penalty_keywords = [
-            "пени", "пеня", "неустойка", "штраф за просрочку",
-            "ставка цб", "ключевая ставка", "расчет пени"
-        ]
-        should_calculate_penalty = any(kw in summary.lower() for kw in penalty_keywords)
-    
-        # --- SYSTEM PROMPT ---
-        system_prompt = (
-            "Ты — эксперт по капитальному ремонту многоквартирных домов. "
-            "Дай точный, структурированный и юридически корректный ответ, используя ТОЛЬКО контекст, веб-результаты и обновления.\n\n"
-            "**ЖЕСТКИЕ ПРАВИЛА:**\n"
-            "1. Если данных нет — отвечай: 'Недостаточно данных для точного ответа.'\n"
-            "2. Все утверждения подкрепляй ссылками на нормативные акты ([ЖК РФ, ст. 166], [ПП РФ №416, п. 7]).\n"
-            "3. Структура ответа: Краткий вывод → Нормативное обоснование → Пошаговая инструкция → Судебная практика.\n"
-            "4. Формулы пени только при наличии ключевых слов.\n"
-            "5. Приоритет источников: ЖК РФ > ПП РФ > региональные акты > разъяснения Минстроя > судебная практика.\n\n"
-            f"### Контекст:\n{context_text}\n\n"
-            f"### Веб-поиск:\n{web_results}\n\n"
-            f"### Дополнительные обновления:\n{extra}\n\n"
-            "### Структура ответа:\n"
-            "- Краткий вывод\n"
-            "- Нормативное обоснование (статьи ЖК РФ, пункты ПП РФ, региональные акты)\n"
-            "- Пошаговая инструкция:\n"
-            "  * Что входит в капремонт? (ЖК РФ, ст. 166)\n"
-            "  * Как формируется фонд? (ЖК РФ, ст. 170)\n"
-            "  * Как выбрать подрядчика? (ОСС, ЖК РФ, ст. 175)\n"
-            "  * Как принять работы? (состав комиссии, акт — ЖК РФ, ст. 176)\n"
-            "  * Как получить отчёт? (сроки, форма, публикация — ЖК РФ, ст. 177)\n"
-            "  * Что делать при переносе сроков или вандализме? (жалоба, повторное голосование)\n"
-            "- Судебная практика\n"
-        )
-    
-        if should_calculate_penalty:
-            system_prompt += (
-                "\n**Расчет пени (актуальная формула):**\n"
-                "- Пени = Сумма долга × Дни просрочки × (Ключевая ставка ЦБ РФ / 300 / 100)\n"
-                "- Нормативная база: [ЖК РФ, ст. 155.1]\n"
-                "- Ограничение: ≤ 9.5% годовых [ФЗ №44-ФЗ, ПП РФ №329]\n"
-                "- Начало: с 31-го дня после срока оплаты.\n"
-            )
-    
-        system_prompt += (
-            "\n### Ключевые нормативные акты:\n"
-            "- ЖК РФ (ст. 166-180 — основы капремонта)\n"
-            "- ПП РФ №416 «О порядке проведения капитального ремонта»\n"
-            "- ФЗ №271-ФЗ «О внесении изменений в ЖК РФ (по капремонту)»\n"
-            "- Региональная программа капитального ремонта (если вопрос региональный)\n"
-            "- Приказы Минстроя по формам отчётов и актов\n\n"
-            f"{self.get_role_instruction(role)}"
-        )
-    
-        return (
-            "<|begin_of_text|><|start_header_id|>system<|end_header_id|>\n"
-            f"{system_prompt}<|eot_id|>"
-        )
 
 class EmergencyAgent(RAGAgent):
+    OFFICIAL_DOMAINS = RAGAgent.OFFICIAL_DOMAINS | {"mchs.gov.ru", "vsrf.ru", "gjirf.ru"}
+    GOV_SUFFIXES = (".gov.ru", ".gkh.ru", ".mchs.gov.ru")
+    SEARCH_QUERY_TEMPLATES = (
+        "{q} ПП РФ 354 аварии",
+        "{q} ПП РФ 416 аварийная служба",
+        "{q} акт о заливе ЖКХ",
+        "{q} сроки устранения аварии отопление",
+        "{q} судебная практика по возмещению ущерба за залив",
+    )
+    PENALTY_KEYWORDS = (
+        "пени", "пеня", "неустойка", "штраф за просрочку",
+        "ставка цб", "ключевая ставка", "расчет пени",
+    )
+
     def __init__(self):
         # Расширенный и структурированный словарь с синонимами и контекстами
-        self.term_map = self._build_term_map()
-        keywords = self._flatten_term_map(self.term_map)
+        self.term_map, keywords = self._shared_term_map()
         
         super().__init__("Аварии и инциденты", keywords)
 
@@ -2741,188 +2313,71 @@ class EmergencyAgent(RAGAgent):
             },
         }
 
-    def _flatten_term_map(self, term_map: Dict) -> List[str]:
-        """Преобразует структурированный словарь в плоский список уникальных ключевых слов."""
-        keywords = set()
-        for term, data in term_map.items():
-            keywords.add(term.lower())  # оригинальный ключ
-            for synonym in data.get("synonyms", []):
-                keywords.add(synonym.lower())
-            # Добавляем ключи из контекстов
-            contexts = data.get("contexts", [])
-            if isinstance(contexts, dict):
-                for ctx_key in contexts.keys():
-                    keywords.add(ctx_key.lower())
-            elif isinstance(contexts, list):
-                for ctx in contexts:
-                    keywords.add(ctx.lower())
-        return list(keywords)
-
-    def _perform_web_search(self, query: str, max_results: int = 3) -> str:
-        """
-        Улучшенный веб-поиск: приоритет официальным источникам, фильтрация, ранжирование.
-        Выполняется ВНУТРИ _build_prompt, как в оригинальной архитектуре.
-        """
-        OFFICIAL_DOMAINS = {
-            "cbr.ru", "government.ru", "kremlin.ru", "rosstat.gov.ru", "minfin.gov.ru",
-            "fas.gov.ru", "gji.ru", "rospotrebnadzor.ru", "rosreestr.gov.ru",
-            "minstroyrf.ru", "fgis-tarif.ru", "consultant.ru", "garant.ru",
-            "pravo.gov.ru", "gkh.ru", "mchs.gov.ru", "rospotrebnadzor.ru", "vsrf.ru", "gjirf.ru"
-        }
-
-        BLACKLISTED_DOMAINS = {
-            "otvet.mail.ru", "ask.fm", "irecommend.ru", "pikabu.ru",
-            "zen.yandex.ru", "thequestion.ru", "quora.com", "reddit.com",
-            "fishki.net", "yaplakal.com", "blog", "forum"
-        }
-
-        # Генерируем расширенные поисковые запросы
-        expanded_queries = self._expand_search_query(query)
-        all_results = []
-
-        for attempt in range(2):
-            try:
-                with DDGS(timeout=10) as ddgs:
-                    for q in expanded_queries:
-                        results = ddgs.text(q, max_results=5)
-                        for r in results:
-                            href = r.get('href', '')
-                            if not href:
-                                continue
-                            
-                            try:
-                                domain = href.split('/')[2].lower()
-                            except IndexError:
-                                continue
-
-                            if any(bad in domain for bad in BLACKLISTED_DOMAINS):
-                                continue
-
-                            weight = 3 if any(official in domain for official in OFFICIAL_DOMAINS) else \
-                                     2 if any(gov in domain for gov in [".gov.ru", ".gkh.ru", ".mchs.gov.ru"]) else 1
-
-                            snippet = {
-                                "body": r['body'],
-                                "href": href,
-                                "title": r.get('title', ''),
-                                "weight": weight
-                            }
-                            all_results.append(snippet)
-
-                    all_results = sorted(all_results, key=lambda x: x['weight'], reverse=True)
-                    seen_bodies = set()
-                    unique_results = []
-                    for r in all_results:
-                        body_hash = hash(r['body'][:100])
-                        if body_hash not in seen_bodies:
-                            seen_bodies.add(body_hash)
-                            unique_results.append(r)
-                            if len(unique_results) >= max_results:
-                                break
-
-                    if unique_results:
-                        formatted = []
-                        for r in unique_results:
-                            prefix = "[ОФИЦИАЛЬНЫЙ ИСТОЧНИК] " if r['weight'] >= 2 else ""
-                            formatted.append(f"{prefix}• {r['body']}\n  Источник: {r['href']}\n")
-                        return "\n".join(formatted).strip()
-                    else:
-                        return "По вашему запросу ничего не найдено в надёжных источниках."
-
-            except Exception as e:
-                if attempt == 0:
-                    time.sleep(2)
-                    continue
-                return f"Ошибка веб-поиска: {str(e)}"
-
-        return "Не удалось выполнить веб-поиск. Попробуйте позже."
+    # Агент: Аварийные ситуации ЖКХ
+    # Системный промт для Saiga/LLaMA-3 8B:
+    # - Фокус: отключение воды/отопления, протечки, сроки реагирования, акты, перерасчёт, возмещение ущерба
+    # - Жёсткая структура и ссылки на нормативные акты
+    PROMPT_TEMPLATE = (
+        "Ты — эксперт по аварийным ситуациям в ЖКХ. Дай точный, структурированный и юридически корректный ответ, "
+        "используя ТОЛЬКО контекст, веб-результаты и обновления.\n\n"
+        "**ЖЕСТКИЕ ПРАВИЛА:**\n"
+        "1. Если данных нет — отвечай: 'Недостаточно данных для точного ответа.'\n"
+        "2. Подкрепляй все утверждения ссылками на нормативные акты ([ПП РФ №354, п. 98], [ЖК РФ, ст. 157]).\n"
+        "3. Структура ответа: Краткий вывод → Нормативное обоснование → Пошаговая инструкция → Судебная практика.\n"
+        "4. Формулы пени только при наличии ключевых слов.\n"
+        "5. Приоритет источников: ПП РФ > ЖК РФ > СанПиН > Правила техэксплуатации > судебная практика.\n\n"
+        "### Контекст:\n"
+        "{context_text}\n\n"
+        "### Веб-поиск:\n"
+        "{web_results}\n\n"
+        "### Дополнительные обновления:\n"
+        "{extra}\n\n"
+        "### Структура ответа:\n"
+        "- Краткий вывод (1-2 предложения: что делать немедленно)\n"
+        "- Нормативное обоснование (пункты ПП РФ, ЖК РФ, СанПиН)\n"
+        "- Пошаговая инструкция:\n"
+        "  * Куда звонить и как оформить заявку? (ПП РФ №416, п. 3)\n"
+        "  * Сроки устранения (отопление — 1 сутки, вода — 4 часа — ПП РФ №354, п. 98)\n"
+        "  * Как зафиксировать факт аварии (фото, акт, свидетели — ПП РФ №354, п. 99)\n"
+        "  * Как получить перерасчет или возместить ущерб (ЖК РФ, ст. 157, ГК РФ, ст. 1064)\n"
+        "- Судебная практика\n"
+        "{penalty_block}\n"
+        "### Ключевые нормативные акты:\n"
+        "- ПП РФ №354 (п. 98-99 — аварии, сроки, акты)\n"
+        "- ПП РФ №416 (обязанности аварийных служб)\n"
+        "- ЖК РФ (ст. 157 — перерасчет, ст. 161 — ответственность УК)\n"
+        "- СанПиН 1.2.3685-21 (параметры качества воды, воздуха, шума)\n"
+        "- Правила технической эксплуатации жилищного фонда (Минстрой РФ)\n"
+        "- ГК РФ (ст. 1064 — возмещение вреда)\n\n"
+        "{role_instruction}"
+    )
+    PENALTY_BLOCK = (
+        "\n**Расчет пени (актуальная формула):**\n"
+        "- Пени = Сумма долга × Дни просрочки × (Ключевая ставка ЦБ РФ / 300 / 100)\n"
+        "- Нормативная база: [ЖК РФ, ст. 155.1]\n"
+        "- Ограничение: ≤ 9.5% годовых [ФЗ №44-ФЗ, ПП РФ №329]\n"
+        "- Начало: с 31-го дня после срока оплаты.\n"
+    )
 
-    def _expand_search_query(self, query: str) -> List[str]:
-        """Генерирует несколько вариантов поискового запроса для лучшего покрытия темы."""
-        queries = [query]
-        queries.append(f"{query} ПП РФ 354 аварии")
-        queries.append(f"{query} ПП РФ 416 аварийная служба")
-        queries.append(f"{query} акт о заливе ЖКХ")
-        queries.append(f"{query} сроки устранения аварии отопление")
-        queries.append(f"{query} судебная практика по возмещению ущерба за залив")
-        # Добавляем синонимы
-        for term, data in self.term_map.items():
-            if term in query.lower() or any(syn in query.lower() for syn in data.get("synonyms", [])):
-                for synonym in data.get("synonyms", [])[:2]:
-                    new_q = query.replace(term, synonym) if term in query else query + " " + synonym
-                    queries.append(new_q)
-        return list(set(queries))
-
-    def _build_prompt(self, summary: str, context_text: str, role: str = "смешанная") -> str:
-        """
-        Агент: Аварийные ситуации ЖКХ
-        Формирует системный промт для Saiga/LLaMA-3 8B:
-        - Фокус: отключение воды/отопления, протечки, сроки реагирования, акты, перерасчёт, возмещение ущерба
-        - Жёсткая структура и ссылки на нормативные акты
-        """
-        extra = self.improve_prompt_from_feedback()
-        web_results = self._perform_web_search(summary)
-    
-        penalty_keywords = [
-            "пени", "пеня", "неустойка", "штраф за просрочку",
-            "ставка цб", "ключевая ставка", "расчет пени"
-        ]
-        should_calculate_penalty = any(kw in summary.lower() for kw in penalty_keywords)
-    
-        # --- SYSTEM PROMPT ---
-        system_prompt = (
-            "Ты — эксперт по аварийным ситуациям в ЖКХ. "
-            "Дай точный, структурированный и юридически корректный ответ, используя ТОЛЬКО контекст, веб-результаты и обновления.\n\n"
-            "**ЖЕСТКИЕ ПРАВИЛА:**\n"
-            "1. Если данных нет — отвечай: 'Недостаточно данных для точного ответа.'\n"
-            "2. Подкрепляй все утверждения ссылками на нормативные акты ([ПП РФ №354, п. 98], [ЖК РФ, ст. 157]).\n"
-            "3. Структура ответа: Краткий вывод → Нормативное обоснование → Пошаговая инструкция → Судебная практика.\n"
-            "4. Формулы пени только при наличии ключевых слов.\n"
-            "5. Приоритет источников: ПП РФ > ЖК РФ > СанПиН > Правила техэксплуатации > судебная практика.\n\n"
-            f"### Контекст:\n{context_text}\n\n"
-            f"### Веб-поиск:\n{web_results}\n\n"
-            f"### Дополнительные обновления:\n{extra}\n\n"
-            "### Структура ответа:\n"
-            "- Краткий вывод (1-2 предложения: что делать немедленно)\n"
-            "- Нормативное обоснование (пункты ПП РФ, ЖК РФ, СанПиН)\n"
-            "- Пошаговая инструкция:\n"
-            "  * Куда звонить и как оформить заявку? (ПП РФ №416, п. 3)\n"
-            "  * Сроки устранения (отопление — 1 сутки, вода — 4 часа — ПП РФ №354, п. 98)\n"
-            "  * Как зафиксировать факт аварии (фото, акт, свидетели — ПП РФ №354, п. 99)\n"
-            "  * Как получить перерасчет или возместить ущерб (ЖК РФ, ст. 157, ГК РФ, ст. 1064)\n"
-            "- Судебная практика\n"
-        )
-    
-        if should_calculate_penalty:
-            system_prompt += (
-                "\n**Расчет пени (актуальная формула):**\n"
-                "- Пени = Сумма долга × Дни просрочки × (Ключевая ставка ЦБ РФ / 300 / 100)\n"
-                "- Нормативная база: [ЖК РФ, ст. 155.1]\n"
-                "- Ограничение: ≤ 9.5% годовых [ФЗ №44-ФЗ, ПП РФ №329]\n"
-                "- Начало: с 31-го дня после срока оплаты.\n"
-            )
-    
-        system_prompt += (
-            "\n### Ключевые нормативные акты:\n"
-            "- ПП РФ №354 (п. 98-99 — аварии, сроки, акты)\n"
-            "- ПП РФ №416 (обязанности аварийных служб)\n"
-            "- ЖК РФ (ст. 157 — перерасчет, ст. 161 — ответственность УК)\n"
-            "- СанПиН 1.2.3685-21 (параметры качества воды, воздуха, шума)\n"
-            "- Правила технической эксплуатации жилищного фонда (Минстрой РФ)\n"
-            "- ГК РФ (ст. 1064 — возмещение вреда)\n\n"
-            f"{self.get_role_instruction(role)}"
-        )
-    
-        return (
-            "<|begin_of_text|><|start_header_id|>system<|end_header_id|>\n"
-            f"{system_prompt}<|eot_id|>"
-        )
 
 class ContractorAgent(RAGAgent):
+    OFFICIAL_DOMAINS = RAGAgent.OFFICIAL_DOMAINS | {"gjirf.ru", "vsrf.ru", "sro.ru"}
+    GOV_SUFFIXES = (".gov.ru", ".gkh.ru", ".vsrf.ru", ".sro.ru")
+    SEARCH_QUERY_TEMPLATES = (
+        "{q} ГК РФ глава 37 подряд",
+        "{q} ЖК РФ ст 162 договор управления",
+        "{q} ПП РФ 416 приемка работ",
+        "{q} судебная практика по некачественному ремонту подрядчиком",
+        "{q} гарантийный срок ремонт фасада",
+    )
+    PENALTY_KEYWORDS = (
+        "пени", "пеня", "неустойка", "штраф за просрочку",
+        "ставка цб", "ключевая ставка", "расчет пени",
+    )
+
     def __init__(self):
         # Расширенный и структурированный словарь с синонимами и контекстами
-        self.term_map = self._build_term_map()
-        keywords = self._flatten_term_map(self.term_map)
+        self.term_map, keywords = self._shared_term_map()
         
         super().__init__("Подрядчики и мастера", keywords)
 
@@ -3006,188 +2461,71 @@ class ContractorAgent(RAGAgent):
             },
         }
 
-    def _flatten_term_map(self, term_map: Dict) -> List[str]:
-        """Преобразует структурированный словарь в плоский список уникальных ключевых слов."""
-        keywords = set()
-        for term, data in term_map.items():
-            keywords.add(term.lower())  # оригинальный ключ
-            for synonym in data.get("synonyms", []):
-                keywords.add(synonym.lower())
-            # Добавляем ключи из контекстов
-            contexts = data.get("contexts", [])
-            if isinstance(contexts, dict):
-                for ctx_key in contexts.keys():
-                    keywords.add(ctx_key.lower())
-            elif isinstance(contexts, list):
-                for ctx in contexts:
-                    keywords.add(ctx.lower())
-        return list(keywords)
+    # Агент: Работа с подрядчиками и мастерами ЖКХ
+    # Системный промт для Saiga/LLaMA-3 8B:
+    # - Фокус: вызов, фиксация работ, претензии, акты, взыскание убытков
+    # - Жёсткая структура и ссылки на нормативные акты
+    PROMPT_TEMPLATE = (
+        "Ты — эксперт по работе с подрядчиками и мастерами в ЖКХ. Дай точный, "
+        "структурированный и юридически корректный ответ, используя ТОЛЬКО контекст, веб-результаты и обновления.\n\n"
+        "**ЖЕСТКИЕ ПРАВИЛА:**\n"
+        "1. Если данных нет — отвечай: 'Недостаточно данных для точного ответа.'\n"
+        "2. Подкрепляй все утверждения ссылками на нормативные акты ([ГК РФ, ст. 723], [ПП РФ №416, п. 7]).\n"
+        "3. Структура ответа: Краткий вывод → Нормативное обоснование → Пошаговая инструкция → Судебная практика.\n"
+        "4. Формулы пени только при наличии ключевых слов.\n"
+        "5. Приоритет источников: ГК РФ > ЖК РФ > ПП РФ > Правила техэксплуатации > судебная практика.\n\n"
+        "### Контекст:\n"
+        "{context_text}\n\n"
+        "### Веб-поиск:\n"
+        "{web_results}\n\n"
+        "### Дополнительные обновления:\n"
+        "{extra}\n\n"
+        "### Структура ответа:\n"
+        "- Краткий вывод (1-2 предложения: что делать немедленно или по закону)\n"
+        "- Нормативное обоснование (статьи ГК РФ, ЖК РФ, ПП РФ)\n"
+        "- Пошаговая инструкция:\n"
+        "  * Как оформить вызов или заявку? (ЖК РФ, ст. 161)\n"
+        "  * Как зафиксировать некачественную работу (фото, акт, свидетели — ГК РФ, ст. 753)\n"
+        "  * Как направить претензию подрядчику (сроки, форма — ГК РФ, ст. 723)\n"
+        "  * Как действовать при отказе подписать акт (односторонний акт — ПП РФ №416)\n"
+        "  * Как взыскать убытки или добиться переделки (суд, экспертиза — ГК РФ, ст. 723, 724)\n"
+        "- Судебная практика\n"
+        "{penalty_block}\n"
+        "### Ключевые нормативные акты:\n"
+        "- Гражданский кодекс РФ (Глава 37 — Подряд, ст. 702-729)\n"
+        "- Жилищный кодекс РФ (ст. 161 — обязанности УК, ст. 162 — договор управления)\n"
+        "- ПП РФ №416 (порядок приёмки работ)\n"
+        "- ПП РФ №354 (сроки устранения аварий)\n"
+        "- Правила технической эксплуатации жилищного фонда\n\n"
+        "{role_instruction}"
+    )
+    PENALTY_BLOCK = (
+        "\n**Расчет пени (актуальная формула):**\n"
+        "- Пени = Сумма долга × Дни просрочки × (Ключевая ставка ЦБ РФ / 300 / 100)\n"
+        "- Нормативная база: [ЖК РФ, ст. 155.1]\n"
+        "- Ограничение: ≤ 9.5% годовых [ФЗ №44-ФЗ, ПП РФ №329]\n"
+        "- Начало: с 31-го дня после срока оплаты.\n"
+    )
 
-    def _perform_web_search(self, query: str, max_results: int = 3) -> str:
-        """
-        Улучшенный веб-поиск: приоритет официальным источникам, фильтрация, ранжирование.
-        Выполняется ВНУТРИ _build_prompt, как в оригинальной архитектуре.
-        """
-        OFFICIAL_DOMAINS = {
-            "cbr.ru", "government.ru", "kremlin.ru", "rosstat.gov.ru", "minfin.gov.ru",
-            "fas.gov.ru", "gji.ru", "rospotrebnadzor.ru", "rosreestr.gov.ru",
-            "minstroyrf.ru", "fgis-tarif.ru", "consultant.ru", "garant.ru",
-            "pravo.gov.ru", "gkh.ru", "gjirf.ru", "vsrf.ru", "sro.ru"
-        }
-
-        BLACKLISTED_DOMAINS = {
-            "otvet.mail.ru", "ask.fm", "irecommend.ru", "pikabu.ru",
-            "zen.yandex.ru", "thequestion.ru", "quora.com", "reddit.com",
-            "fishki.net", "yaplakal.com", "blog", "forum"
-        }
-
-        # Генерируем расширенные поисковые запросы
-        expanded_queries = self._expand_search_query(query)
-        all_results = []
-
-        for attempt in range(2):
-            try:
-                with DDGS(timeout=10) as ddgs:
-                    for q in expanded_queries:
-                        results = ddgs.text(q, max_results=5)
-                        for r in results:
-                            href = r.get('href', '')
-                            if not href:
-                                continue
-                            
-                            try:
-                                domain = href.split('/')[2].lower()
-                            except IndexError:
-                                continue
-
-                            if any(bad in domain for bad in BLACKLISTED_DOMAINS):
-                                continue
-
-                            weight = 3 if any(official in domain for official in OFFICIAL_DOMAINS) else \
-                                     2 if any(gov in domain for gov in [".gov.ru", ".gkh.ru", ".vsrf.ru", ".sro.ru"]) else 1
-
-                            snippet = {
-                                "body": r['body'],
-                                "href": href,
-                                "title": r.get('title', ''),
-                                "weight": weight
-                            }
-                            all_results.append(snippet)
-
-                    all_results = sorted(all_results, key=lambda x: x['weight'], reverse=True)
-                    seen_bodies = set()
-                    unique_results = []
-                    for r in all_results:
-                        body_hash = hash(r['body'][:100])
-                        if body_hash not in seen_bodies:
-                            seen_bodies.add(body_hash)
-                            unique_results.append(r)
-                            if len(unique_results) >= max_results:
-                                break
-
-                    if unique_results:
-                        formatted = []
-                        for r in unique_results:
-                            prefix = "[ОФИЦИАЛЬНЫЙ ИСТОЧНИК] " if r['weight'] >= 2 else ""
-                            formatted.append(f"{prefix}• {r['body']}\n  Источник: {r['href']}\n")
-                        return "\n".join(formatted).strip()
-                    else:
-                        return "По вашему запросу ничего не найдено в надёжных источниках."
-
-            except Exception as e:
-                if attempt == 0:
-                    time.sleep(2)
-                    continue
-                return f"Ошибка веб-поиска: {str(e)}"
-
-        return "Не удалось выполнить веб-поиск. Попробуйте позже."
-
-    def _expand_search_query(self, query: str) -> List[str]:
-        """Генерирует несколько вариантов поискового запроса для лучшего покрытия темы."""
-        queries = [query]
-        queries.append(f"{query} ГК РФ глава 37 подряд")
-        queries.append(f"{query} ЖК РФ ст 162 договор управления")
-        queries.append(f"{query} ПП РФ 416 приемка работ")
-        queries.append(f"{query} судебная практика по некачественному ремонту подрядчиком")
-        queries.append(f"{query} гарантийный срок ремонт фасада")
-        # Добавляем синонимы
-        for term, data in self.term_map.items():
-            if term in query.lower() or any(syn in query.lower() for syn in data.get("synonyms", [])):
-                for synonym in data.get("synonyms", [])[:2]:
-                    new_q = query.replace(term, synonym) if term in query else query + " " + synonym
-                    queries.append(new_q)
-        return list(set(queries))
-
-    def _build_prompt(self, summary: str, context_text: str, role: str = "смешанная") -> str:
-        """
-        Агент: Работа с подрядчиками и мастерами ЖКХ
-        Формирует системный промт для Saiga/LLaMA-3 8B:
-        - Фокус: вызов, фиксация работ, претензии, акты, взыскание убытков
-        - Жёсткая структура и ссылки на нормативные акты
-        """
-        extra = self.improve_prompt_from_feedback()
-        web_results = self._perform_web_search(summary)
-    
-        penalty_keywords = [
-            "пени", "пеня", "неустойка", "штраф за просрочку",
-            "ставка цб", "ключевая ставка", "расчет пени"
-        ]
-        should_calculate_penalty = any(kw in summary.lower() for kw in penalty_keywords)
-    
-        # --- SYSTEM PROMPT ---
-        system_prompt = (
-            "Ты — эксперт по работе с подрядчиками и мастерами в ЖКХ. "
-            "Дай точный, структурированный и юридически корректный ответ, используя ТОЛЬКО контекст, веб-результаты и обновления.\n\n"
-            "**ЖЕСТКИЕ ПРАВИЛА:**\n"
-            "1. Если данных нет — отвечай: 'Недостаточно данных для точного ответа.'\n"
-            "2. Подкрепляй все утверждения ссылками на нормативные акты ([ГК РФ, ст. 723], [ПП РФ №416, п. 7]).\n"
-            "3. Структура ответа: Краткий вывод → Нормативное обоснование → Пошаговая инструкция → Судебная практика.\n"
-            "4. Формулы пени только при наличии ключевых слов.\n"
-            "5. Приоритет источников: ГК РФ > ЖК РФ > ПП РФ > Правила техэксплуатации > судебная практика.\n\n"
-            f"### Контекст:\n{context_text}\n\n"
-            f"### Веб-поиск:\n{web_results}\n\n"
-            f"### Дополнительные обновления:\n{extra}\n\n"
-            "### Структура ответа:\n"
-            "- Краткий вывод (1-2 предложения: что делать немедленно или по закону)\n"
-            "- Нормативное обоснование (статьи ГК РФ, ЖК РФ, ПП РФ)\n"
-            "- Пошаговая инструкция:\n"
-            "  * Как оформить вызов или заявку? (ЖК РФ, ст. 161)\n"
-            "  * Как зафиксировать некачественную работу (фото, акт, свидетели — ГК РФ, ст. 753)\n"
-            "  * Как направить претензию подрядчику (сроки, форма — ГК РФ, ст. 723)\n"
-            "  * Как действовать при отказе подписать акт (односторонний акт — ПП РФ №416)\n"
-            "  * Как взыскать убытки или добиться переделки (суд, экспертиза — ГК РФ, ст. 723, 724)\n"
-            "- Судебная практика\n"
-        )
-    
-        if should_calculate_penalty:
-            system_prompt += (
-                "\n**Расчет пени (актуальная формула):**\n"
-                "- Пени = Сумма долга × Дни просрочки × (Ключевая ставка ЦБ РФ / 300 / 100)\n"
-                "- Нормативная база: [ЖК РФ, ст. 155.1]\n"
-                "- Ограничение: ≤ 9.5% годовых [ФЗ №44-ФЗ, ПП РФ №329]\n"
-                "- Начало: с 31-го дня после срока оплаты.\n"
-            )
-    
-        system_prompt += (
-            "\n### Ключевые нормативные акты:\n"
-            "- Гражданский кодекс РФ (Глава 37 — Подряд, ст. 702-729)\n"
-            "- Жилищный кодекс РФ (ст. 161 — обязанности УК, ст. 162 — договор управления)\n"
-            "- ПП РФ №416 (порядок приёмки работ)\n"
-            "- ПП РФ №354 (сроки устранения аварий)\n"
-            "- Правила технической эксплуатации жилищного фонда\n\n"
-            f"{self.get_role_instruction(role)}"
-        )
-    
-        return (
-            "<|begin_of_text|><|start_header_id|>system<|end_header_id|>\n"
-            f"{system_prompt}<|eot_id|>"
-        )
 
 class HistoryAgent(RAGAgent):
+    OFFICIAL_DOMAINS = RAGAgent.OFFICIAL_DOMAINS | {"dom.gosuslugi.ru", "gjirf.ru", "roscomnadzor.ru"}
+    GOV_SUFFIXES = (".gov.ru", ".gkh.ru", ".gosuslugi.ru")
+    SEARCH_QUERY_TEMPLATES = (
+        "{q} ФЗ 209-ФЗ история заявок",
+        "{q} ПП РФ 731 раскрытие информации",
+        "{q} как получить историю заявок ГИС ЖКХ",
+        "{q} судебная практика по отказу в предоставлении истории заявок",
+        "{q} срок хранения заявок ЖКХ",
+    )
+    PENALTY_KEYWORDS = (
+        "пени", "пеня", "неустойка", "штраф за просрочку",
+        "ставка цб", "ключевая ставка", "расчет пени",
+    )
+
     def __init__(self):
         # Расширенный и структурированный словарь с синонимами и контекстами
-        self.term_map = self._build_term_map()
-        keywords = self._flatten_term_map(self.term_map)
+        self.term_map, keywords = self._shared_term_map()
         
         super().__init__("История заявок", keywords)
 
@@ -3266,186 +2604,65 @@ class HistoryAgent(RAGAgent):
             },
         }
 
-    def _flatten_term_map(self, term_map: Dict) -> List[str]:
-        """Преобразует структурированный словарь в плоский список уникальных ключевых слов."""
-        keywords = set()
-        for term, data in term_map.items():
-            keywords.add(term.lower())  # оригинальный ключ
-            for synonym in data.get("synonyms", []):
-                keywords.add(synonym.lower())
-            # Добавляем ключи из контекстов
-            contexts = data.get("contexts", [])
-            if isinstance(contexts, dict):
-                for ctx_key in contexts.keys():
-                    keywords.add(ctx_key.lower())
-            elif isinstance(contexts, list):
-                for ctx in contexts:
-                    keywords.add(ctx.lower())
-        return list(keywords)
-
-    def _perform_web_search(self, query: str, max_results: int = 3) -> str:
-        """
-        Улучшенный веб-поиск: приоритет официальным источникам, фильтрация, ранжирование.
-        Выполняется ВНУТРИ _build_prompt, как в оригинальной архитектуре.
-        """
-        OFFICIAL_DOMAINS = {
-            "cbr.ru", "government.ru", "kremlin.ru", "rosstat.gov.ru", "minfin.gov.ru",
-            "fas.gov.ru", "gji.ru", "rospotrebnadzor.ru", "rosreestr.gov.ru",
-            "minstroyrf.ru", "fgis-tarif.ru", "consultant.ru", "garant.ru",
-            "pravo.gov.ru", "gkh.ru", "dom.gosuslugi.ru", "gjirf.ru", "roscomnadzor.ru"
-        }
-
-        BLACKLISTED_DOMAINS = {
-            "otvet.mail.ru", "ask.fm", "irecommend.ru", "pikabu.ru",
-            "zen.yandex.ru", "thequestion.ru", "quora.com", "reddit.com",
-            "fishki.net", "yaplakal.com", "blog", "forum"
-        }
-
-        # Генерируем расширенные поисковые запросы
-        expanded_queries = self._expand_search_query(query)
-        all_results = []
-
-        for attempt in range(2):
-            try:
-                with DDGS(timeout=10) as ddgs:
-                    for q in expanded_queries:
-                        results = ddgs.text(q, max_results=5)
-                        for r in results:
-                            href = r.get('href', '')
-                            if not href:
-                                continue
-                            
-                            try:
-                                domain = href.split('/')[2].lower()
-                            except IndexError:
-                                continue
-
-                            if any(bad in domain for bad in BLACKLISTED_DOMAINS):
-                                continue
-
-                            weight = 3 if any(official in domain for official in OFFICIAL_DOMAINS) else \
-                                     2 if any(gov in domain for gov in [".gov.ru", ".gkh.ru", ".gosuslugi.ru"]) else 1
-
-                            snippet = {
-                                "body": r['body'],
-                                "href": href,
-                                "title": r.get('title', ''),
-                                "weight": weight
-                            }
-                            all_results.append(snippet)
-
-                    all_results = sorted(all_results, key=lambda x: x['weight'], reverse=True)
-                    seen_bodies = set()
-                    unique_results = []
-                    for r in all_results:
-                        body_hash = hash(r['body'][:100])
-                        if body_hash not in seen_bodies:
-                            seen_bodies.add(body_hash)
-                            unique_results.append(r)
-                            if len(unique_results) >= max_results:
-                                break
-
-                    if unique_results:
-                        formatted = []
-                        for r in unique_results:
-                            prefix = "[ОФИЦИАЛЬНЫЙ ИСТОЧНИК] " if r['weight'] >= 2 else ""
-                            formatted.append(f"{prefix}• {r['body']}\n  Источник: {r['href']}\n")
-                        return "\n".join(formatted).strip()
-                    else:
-                        return "По вашему запросу ничего не найдено в надёжных источниках."
-
-            except Exception as e:
-                if attempt == 0:
-                    time.sleep(2)
-                    continue
-                return f"Ошибка веб-поиска: {str(e)}"
-
-        return "Не удалось выполнить веб-поиск. Попробуйте позже."
+    # Агент: История заявок в ЖКХ
+    # Системный промт для Saiga/LLaMA-3 8B:
+    # - Фокус: доступ к истории заявок, ГИС ЖКХ, порядок запроса, раскрытие информации
+    # - Жёсткая структура и ссылки на нормативные акты
+    PROMPT_TEMPLATE = (
+        "Ты — эксперт по истории заявок и информационным системам ЖКХ. Дай точный, "
+        "структурированный и юридически корректный ответ, используя ТОЛЬКО контекст, веб-результаты и обновления.\n\n"
+        "**ЖЕСТКИЕ ПРАВИЛА:**\n"
+        "1. Если данных нет — отвечай: 'Недостаточно данных для точного ответа.'\n"
+        "2. Подкрепляй все утверждения ссылками на нормативные акты ([ФЗ №59-ФЗ, ст. 12], [ПП РФ №731, п. 3]).\n"
+        "3. Структура ответа: Краткий вывод → Нормативное обоснование → Пошаговая инструкция → Судебная практика.\n"
+        "4. Формулы пени только при наличии ключевых слов.\n"
+        "5. Приоритет источников: ФЗ > ПП РФ > внутренние регламенты УК > судебная практика.\n\n"
+        "### Контекст:\n"
+        "{context_text}\n\n"
+        "### Веб-поиск:\n"
+        "{web_results}\n\n"
+        "### Дополнительные обновления:\n"
+        "{extra}\n\n"
+        "### Структура ответа:\n"
+        "- Краткий вывод (1-2 предложения: что делать немедленно или по закону)\n"
+        "- Нормативное обоснование (ФЗ, ПП РФ, внутренние регламенты)\n"
+        "- Пошаговая инструкция:\n"
+        "  * Где хранится история заявок (ГИС ЖКХ, личный кабинет, внутренняя система УК — ПП РФ №731, п. 3)\n"
+        "  * Как получить доступ (авторизация, письменный запрос — ФЗ №59-ФЗ, ст. 12)\n"
+        "  * Какая информация доступна (дата, статус, исполнитель, описание — ПП РФ №731, Приложение 1)\n"
+        "  * Действия, если данные не предоставляют (жалоба в ГЖИ, прокуратуру, суд — ФЗ №59-ФЗ, ст. 12)\n"
+        "- Судебная практика\n"
+        "{penalty_block}\n"
+        "### Ключевые нормативные акты:\n"
+        "- ФЗ №209-ФЗ «О раскрытии информации в ЖКХ»\n"
+        "- ПП РФ №731 «О стандартизации раскрытия информации»\n"
+        "- ФЗ №59-ФЗ «О порядке рассмотрения обращений граждан»\n"
+        "- ФЗ №152-ФЗ «О персональных данных»\n\n"
+        "{role_instruction}"
+    )
+    PENALTY_BLOCK = (
+        "\n**Расчет пени (актуальная формула):**\n"
+        "- Пени = Сумма долга × Дни просрочки × (Ключевая ставка ЦБ РФ / 300 / 100)\n"
+        "- Нормативная база: [ЖК РФ, ст. 155.1]\n"
+        "- Ограничение: ≤ 9.5% годовых [ФЗ №44-ФЗ, ПП РФ №329]\n"
+        "- Начало: с 31-го дня после срока оплаты.\n"
+    )
 
-    def _expand_search_query(self, query: str) -> List[str]:
-        """Генерирует несколько вариантов поискового запроса для лучшего покрытия темы."""
-        queries = [query]
-        queries.append(f"{query} ФЗ 209-ФЗ история заявок")
-        queries.append(f"{query} ПП РФ 731 раскрытие информации")
-        queries.append(f"{query} как получить историю заявок ГИС ЖКХ")
-        queries.append(f"{query} судебная практика по отказу в предоставлении истории заявок")
-        queries.append(f"{query} срок хранения заявок ЖКХ")
-        # Добавляем синонимы
-        for term, data in self.term_map.items():
-            if term in query.lower() or any(syn in query.lower() for syn in data.get("synonyms", [])):
-                for synonym in data.get("synonyms", [])[:2]:
-                    new_q = query.replace(term, synonym) if term in query else query + " " + synonym
-                    queries.append(new_q)
-        return list(set(queries))
-
-    def _build_prompt(self, summary: str, context_text: str, role: str = "смешанная") -> str:
-        """
-        Агент: История заявок в ЖКХ
-        Формирует системный промт для Saiga/LLaMA-3 8B:
-        - Фокус: доступ к истории заявок, ГИС ЖКХ, порядок запроса, раскрытие информации
-        - Жёсткая структура и ссылки на нормативные акты
-        """
-        extra = self.improve_prompt_from_feedback()
-        web_results = self._perform_web_search(summary)
-    
-        penalty_keywords = [
-            "пени", "пеня", "неустойка", "штраф за просрочку",
-            "ставка цб", "ключевая ставка", "расчет пени"
-        ]
-        should_calculate_penalty = any(kw in summary.lower() for kw in penalty_keywords)
-    
-        # --- SYSTEM PROMPT ---
-        system_prompt = (
-            "Ты — эксперт по истории заявок и информационным системам ЖКХ. "
-            "Дай точный, структурированный и юридически корректный ответ, используя ТОЛЬКО контекст, веб-результаты и обновления.\n\n"
-            "**ЖЕСТКИЕ ПРАВИЛА:**\n"
-            "1. Если данных нет — отвечай: 'Недостаточно данных для точного ответа.'\n"
-            "2. Подкрепляй все утверждения ссылками на нормативные акты ([ФЗ №59-ФЗ, ст. 12], [ПП РФ №731, п. 3]).\n"
-            "3. Структура ответа: Краткий вывод → Нормативное обоснование → Пошаговая инструкция → Судебная практика.\n"
-            "4. Формулы пени только при наличии ключевых слов.\n"
-            "5. Приоритет источников: ФЗ > ПП РФ > внутренние регламенты УК > судебная практика.\n\n"
-            f"### Контекст:\n{context_text}\n\n"
-            f"### Веб-поиск:\n{web_results}\n\n"
-            f"### Дополнительные обновления:\n{extra}\n\n"
-            "### Структура ответа:\n"
-            "- Краткий вывод (1-2 предложения: что делать немедленно или по закону)\n"
-            "- Нормативное обоснование (ФЗ, ПП РФ, внутренние регламенты)\n"
-            "- Пошаговая инструкция:\n"
-            "  * Где хранится история заявок (ГИС ЖКХ, личный кабинет, внутренняя система УК — ПП РФ №731, п. 3)\n"
-            "  * Как получить доступ (авторизация, письменный запрос — ФЗ №59-ФЗ, ст. 12)\n"
-            "  * Какая информация доступна (дата, статус, исполнитель, описание — ПП РФ №731, Приложение 1)\n"
-            "  * Действия, если данные не предоставляют (жалоба в ГЖИ, прокуратуру, суд — ФЗ №59-ФЗ, ст. 12)\n"
-            "- Судебная практика\n"
-        )
-    
-        if should_calculate_penalty:
-            system_prompt += (
-                "\n**Расчет пени (актуальная формула):**\n"
-                "- Пени = Сумма долга × Дни просрочки × (Ключевая ставка ЦБ РФ / 300 / 100)\n"
-                "- Нормативная база: [ЖК РФ, ст. 155.1]\n"
-                "- Ограничение: ≤ 9.5% годовых [ФЗ №44-ФЗ, ПП РФ №329]\n"
-                "- Начало: с 31-го дня после срока оплаты.\n"
-            )
-    
-        system_prompt += (
-            "\n### Ключевые нормативные акты:\n"
-            "- ФЗ №209-ФЗ «О раскрытии информации в ЖКХ»\n"
-            "- ПП РФ №731 «О стандартизации раскрытия информации»\n"
-            "- ФЗ №59-ФЗ «О порядке рассмотрения обращений граждан»\n"
-            "- ФЗ №152-ФЗ «О персональных данных»\n\n"
-            f"{self.get_role_instruction(role)}"
-        )
-    
-        return (
-            "<|begin_of_text|><|start_header_id|>system<|end_header_id|>\n"
-            f"{system_prompt}<|eot_id|>"
-        )
 
 class FallbackAgent(RAGAgent):
+    OFFICIAL_DOMAINS = RAGAgent.OFFICIAL_DOMAINS | {"mchs.gov.ru", "proc.gov.ru", "rosconsumnadzor.ru"}
+    GOV_SUFFIXES = (".gov.ru", ".gkh.ru", ".mchs.gov.ru")
+    SEARCH_QUERY_TEMPLATES = (
+        "{q} ЖКХ структура",
+        "{q} обязанности УК",
+        "{q} функции ГЖИ",
+        "{q} что такое РСО",
+        "{q} основы жилищного законодательства",
+    )
+
     def __init__(self):
         # Расширенный и структурированный словарь с синонимами и контекстами
-        self.term_map = self._build_term_map()
-        keywords = self._flatten_term_map(self.term_map)
+        self.term_map, keywords = self._shared_term_map()
         
         super().__init__("Fallback", keywords)
 
@@ -3457,6 +2674,7 @@ class FallbackAgent(RAGAgent):
             "почему ты", "тест", "проверка", "hello", "привет", "здравствуй",
             "эй", "ой", "ага", "ок", "ладно", "понятно", "спасибо", "пожалуйста"
         ]
+        self._trigger_re = self._compile_phrases(self.trigger_phrases)
 
     def _build_term_map(self) -> Dict[str, Any]:
         """Строит расширенную семантическую карту терминов с синонимами, контекстами и нормативными ссылками."""
@@ -3533,131 +2751,20 @@ class FallbackAgent(RAGAgent):
             },
         }
 
-    def _flatten_term_map(self, term_map: Dict) -> List[str]:
-        """Преобразует структурированный словарь в плоский список уникальных ключевых слов."""
-        keywords = set()
-        for term, data in term_map.items():
-            keywords.add(term.lower())  # оригинальный ключ
-            for synonym in data.get("synonyms", []):
-                keywords.add(synonym.lower())
-            # Добавляем ключи из контекстов
-            contexts = data.get("contexts", [])
-            if isinstance(contexts, dict):
-                for ctx_key in contexts.keys():
-                    keywords.add(ctx_key.lower())
-            elif isinstance(contexts, list):
-                for ctx in contexts:
-                    keywords.add(ctx.lower())
-        return list(keywords)
-
-    def _perform_web_search(self, query: str, max_results: int = 3) -> str:
-        """
-        Улучшенный веб-поиск: приоритет официальным источникам, фильтрация, ранжирование.
-        Выполняется ВНУТРИ generate_fallback_response, как в оригинальной архитектуре.
-        """
-        OFFICIAL_DOMAINS = {
-            "cbr.ru", "government.ru", "kremlin.ru", "rosstat.gov.ru", "minfin.gov.ru",
-            "fas.gov.ru", "gji.ru", "rospotrebnadzor.ru", "rosreestr.gov.ru",
-            "minstroyrf.ru", "fgis-tarif.ru", "consultant.ru", "garant.ru",
-            "pravo.gov.ru", "gkh.ru", "mchs.gov.ru", "proc.gov.ru", "rosconsumnadzor.ru"
-        }
-
-        BLACKLISTED_DOMAINS = {
-            "otvet.mail.ru", "ask.fm", "irecommend.ru", "pikabu.ru",
-            "zen.yandex.ru", "thequestion.ru", "quora.com", "reddit.com",
-            "fishki.net", "yaplakal.com", "blog", "forum"
-        }
-
-        # Генерируем расширенные поисковые запросы
-        expanded_queries = self._expand_search_query(query)
-        all_results = []
-
-        for attempt in range(2):
-            try:
-                with DDGS(timeout=10) as ddgs:
-                    for q in expanded_queries:
-                        results = ddgs.text(q, max_results=5)
-                        for r in results:
-                            href = r.get('href', '')
-                            if not href:
-                                continue
-                            
-                            try:
-                                domain = href.split('/')[2].lower()
-                            except IndexError:
-                                continue
-
-                            if any(bad in domain for bad in BLACKLISTED_DOMAINS):
-                                continue
-
-                            weight = 3 if any(official in domain for official in OFFICIAL_DOMAINS) else \
-                                     2 if any(gov in domain for gov in [".gov.ru", ".gkh.ru", ".mchs.gov.ru"]) else 1
-
-                            snippet = {
-                                "body": r['body'],
-                                "href": href,
-                                "title": r.get('title', ''),
-                                "weight": weight
-                            }
-                            all_results.append(snippet)
-
-                    all_results = sorted(all_results, key=lambda x: x['weight'], reverse=True)
-                    seen_bodies = set()
-                    unique_results = []
-                    for r in all_results:
-                        body_hash = hash(r['body'][:100])
-                        if body_hash not in seen_bodies:
-                            seen_bodies.add(body_hash)
-                            unique_results.append(r)
-                            if len(unique_results) >= max_results:
-                                break
-
-                    if unique_results:
-                        formatted = []
-                        for r in unique_results:
-                            prefix = "[ОФИЦИАЛЬНЫЙ ИСТОЧНИК] " if r['weight'] >= 2 else ""
-                            formatted.append(f"{prefix}• {r['body']}\n  Источник: {r['href']}\n")
-                        return "\n".join(formatted).strip()
-                    else:
-                        return "По вашему запросу ничего не найдено в надёжных источниках."
-
-            except Exception as e:
-                if attempt == 0:
-                    time.sleep(2)
-                    continue
-                return f"Ошибка веб-поиска: {str(e)}"
-
-        return "Не удалось выполнить веб-поиск. Попробуйте позже."
-
-    def _expand_search_query(self, query: str) -> List[str]:
-        """Генерирует несколько вариантов поискового запроса для лучшего покрытия темы."""
-        queries = [query]
-        queries.append(f"{query} ЖКХ структура")
-        queries.append(f"{query} обязанности УК")
-        queries.append(f"{query} функции ГЖИ")
-        queries.append(f"{query} что такое РСО")
-        queries.append(f"{query} основы жилищного законодательства")
-        # Добавляем синонимы
-        for term, data in self.term_map.items():
-            if term in query.lower() or any(syn in query.lower() for syn in data.get("synonyms", [])):
-                for synonym in data.get("synonyms", [])[:2]:
-                    new_q = query.replace(term, synonym) if term in query else query + " " + synonym
-                    queries.append(new_q)
-        return list(set(queries))
-
     def matches(self, query: str) -> bool:
         q = query.lower()
         # 🆕 Основная логика: если запрос содержит любое ключевое слово ИЛИ триггер — ловим
-        if any(kw in q for kw in self.keywords):
+        if self._keyword_re is not None and self._keyword_re.search(q):
             return True
-        if any(phrase in q for phrase in self.trigger_phrases):
+        if self._trigger_re.search(q):
             return True
         # 🆕 Также ловим очень короткие сообщения (1-2 слова), если они не попали под другие агенты
         if len(q.split()) <= 2:
             return True
         return False
 
-    def _build_prompt(self, summary: str, context_text: str, role: str = "смешанная") -> str:
+    def _build_prompt(self, summary: str, context_text: str, role: str = "смешанная",
+                      top_chunk: Optional[str] = None) -> str:
         # Не используем стандартный промпт — ответ генерируется вручную или через LLM в generate_fallback_response
         return ""
 
@@ -3758,7 +2865,8 @@ class FallbackAgent(RAGAgent):
                     answer = answer.split(stop)[0].strip()
         
             # --- Проверка информативности ---
-            if len(answer.split()) < 5 or any(phrase in answer.lower() for phrase in ["не знаю", "не могу", "извините", "не понимаю"]):
+            answer_lower = answer.lower()
+            if len(answer.split()) < 5 or any(phrase in answer_lower for phrase in ["не знаю", "не могу", "извините", "не понимаю"]):
                 raise ValueError("Сгенерированный ответ слишком короткий или неинформативный")
         
             return answer
@@ -3772,10 +2880,23 @@ class FallbackAgent(RAGAgent):
             )
             
 class QualityControlAgent(RAGAgent):
+    OFFICIAL_DOMAINS = RAGAgent.OFFICIAL_DOMAINS | {"rosconsumnadzor.ru", "proc.gov.ru", "vsrf.ru"}
+    GOV_SUFFIXES = (".gov.ru", ".gkh.ru", ".rosconsumnadzor.ru")
+    SEARCH_QUERY_TEMPLATES = (
+        "{q} ПП РФ 354 раздел 6",
+        "{q} СанПиН 1.2.3685-21",
+        "{q} перерасчет за некачественную услугу формула",
+        "{q} судебная практика по качеству ЖКУ",
+        "{q} жалоба в Роспотребнадзор на УК",
+    )
+    PENALTY_KEYWORDS = (
+        "пени", "пеня", "неустойка", "штраф за просрочку",
+        "ставка цб", "ключевая ставка", "расчет пени",
+    )
+
     def __init__(self):
         # Расширенный и структурированный словарь с синонимами и контекстами
-        self.term_map = self._build_term_map()
-        keywords = self._flatten_term_map(self.term_map)
+        self.term_map, keywords = self._shared_term_map()
         
         super().__init__("Контроль качества услуг", keywords)
 
@@ -3859,188 +2980,72 @@ class QualityControlAgent(RAGAgent):
             },
         }
 
-    def _flatten_term_map(self, term_map: Dict) -> List[str]:
-        """Преобразует структурированный словарь в плоский список уникальных ключевых слов."""
-        keywords = set()
-        for term, data in term_map.items():
-            keywords.add(term.lower())  # оригинальный ключ
-            for synonym in data.get("synonyms", []):
-                keywords.add(synonym.lower())
-            # Добавляем ключи из контекстов
-            contexts = data.get("contexts", [])
-            if isinstance(contexts, dict):
-                for ctx_key in contexts.keys():
-                    keywords.add(ctx_key.lower())
-            elif isinstance(contexts, list):
-                for ctx in contexts:
-                    keywords.add(ctx.lower())
-        return list(keywords)
-
-    def _perform_web_search(self, query: str, max_results: int = 3) -> str:
-        """
-        Улучшенный веб-поиск: приоритет официальным источникам, фильтрация, ранжирование.
-        Выполняется ВНУТРИ _build_prompt, как в оригинальной архитектуре.
-        """
-        OFFICIAL_DOMAINS = {
-            "cbr.ru", "government.ru", "kremlin.ru", "rosstat.gov.ru", "minfin.gov.ru",
-            "fas.gov.ru", "gji.ru", "rospotrebnadzor.ru", "rosreestr.gov.ru",
-            "minstroyrf.ru", "fgis-tarif.ru", "consultant.ru", "garant.ru",
-            "pravo.gov.ru", "gkh.ru", "rosconsumnadzor.ru", "proc.gov.ru", "vsrf.ru"
-        }
-
-        BLACKLISTED_DOMAINS = {
-            "otvet.mail.ru", "ask.fm", "irecommend.ru", "pikabu.ru",
-            "zen.yandex.ru", "thequestion.ru", "quora.com", "reddit.com",
-            "fishki.net", "yaplakal.com", "blog", "forum"
-        }
-
-        # Генерируем расширенные поисковые запросы
-        expanded_queries = self._expand_search_query(query)
-        all_results = []
-
-        for attempt in range(2):
-            try:
-                with DDGS(timeout=10) as ddgs:
-                    for q in expanded_queries:
-                        results = ddgs.text(q, max_results=5)
-                        for r in results:
-                            href = r.get('href', '')
-                            if not href:
-                                continue
-                            
-                            try:
-                                domain = href.split('/')[2].lower()
-                            except IndexError:
-                                continue
-
-                            if any(bad in domain for bad in BLACKLISTED_DOMAINS):
-                                continue
-
-                            weight = 3 if any(official in domain for official in OFFICIAL_DOMAINS) else \
-                                     2 if any(gov in domain for gov in [".gov.ru", ".gkh.ru", ".rosconsumnadzor.ru"]) else 1
-
-                            snippet = {
-                                "body": r['body'],
-                                "href": href,
-                                "title": r.get('title', ''),
-                                "weight": weight
-                            }
-                            all_results.append(snippet)
-
-                    all_results = sorted(all_results, key=lambda x: x['weight'], reverse=True)
-                    seen_bodies = set()
-                    unique_results = []
-                    for r in all_results:
-                        body_hash = hash(r['body'][:100])
-                        if body_hash not in seen_bodies:
-                            seen_bodies.add(body_hash)
-                            unique_results.append(r)
-                            if len(unique_results) >= max_results:
-                                break
-
-                    if unique_results:
-                        formatted = []
-                        for r in unique_results:
-                            prefix = "[ОФИЦИАЛЬНЫЙ ИСТОЧНИК] " if r['weight'] >= 2 else ""
-                            formatted.append(f"{prefix}• {r['body']}\n  Источник: {r['href']}\n")
-                        return "\n".join(formatted).strip()
-                    else:
-                        return "По вашему запросу ничего не найдено в надёжных источниках."
-
-            except Exception as e:
-                if attempt == 0:
-                    time.sleep(2)
-                    continue
-                return f"Ошибка веб-поиска: {str(e)}"
-
-        return "Не удалось выполнить веб-поиск. Попробуйте позже."
+    # Агент: Контроль качества услуг ЖКХ
+    # Системный промт для Saiga/LLaMA-3 8B:
+    # - Фокус: контроль качества, замеры, параметры, акты, перерасчет, жалобы
+    # - Жёсткая структура и ссылки на нормативные акты
+    PROMPT_TEMPLATE = (
+        "Ты — эксперт по контролю качества коммунальных услуг в ЖКХ. Дай точный, "
+        "структурированный и юридически корректный ответ, используя ТОЛЬКО контекст, веб-результаты и обновления.\n\n"
+        "**ЖЕСТКИЕ ПРАВИЛА:**\n"
+        "1. Если данных нет — отвечай: 'Недостаточно данных для точного ответа.'\n"
+        "2. Подкрепляй все утверждения ссылками на нормативные акты ([ПП РФ №354, п. 58], [СанПиН 1.2.3685-21, п. "
+        "9.2]).\n"
+        "3. Структура ответа: Краткий вывод → Нормативное обоснование → Пошаговая инструкция → Судебная практика.\n"
+        "4. Формулы пени только при наличии ключевых слов.\n"
+        "5. Приоритет источников: СанПиН > ПП РФ > ЖК РФ > разъяснения контролирующих органов > судебная практика.\n\n"
+        "### Контекст:\n"
+        "{context_text}\n\n"
+        "### Веб-поиск:\n"
+        "{web_results}\n\n"
+        "### Дополнительные обновления:\n"
+        "{extra}\n\n"
+        "### Структура ответа:\n"
+        "- Краткий вывод (1-2 предложения: что делать немедленно или по закону)\n"
+        "- Нормативное обоснование (ПП РФ, СанПиН, ЖК РФ)\n"
+        "- Пошаговая инструкция:\n"
+        "  * Как зафиксировать нарушение (замер, фото, акт — ПП РФ №354, п. 58, 99)\n"
+        "  * Какие параметры считаются нарушением (температура, давление — СанПиН 1.2.3685-21, п. 9.2)\n"
+        "  * Как рассчитать перерасчёт (формула из Приложения 2 ПП РФ №354)\n"
+        "  * Куда подавать жалобу (УК → ГЖИ → Роспотребнадзор → прокуратура — ЖК РФ, ст. 20)\n"
+        "  * Возможные санкции для УК (штраф, предписание, расторжение договора)\n"
+        "- Судебная практика\n"
+        "{penalty_block}\n"
+        "### Ключевые нормативные акты:\n"
+        "- ПП РФ №354 (качество услуг, замеры, сроки, перерасчёт, акты)\n"
+        "- СанПиН 1.2.3685-21 (гигиенические требования к температуре, давлению, шуму)\n"
+        "- ЖК РФ (ст. 161 — обязанности УК, ст. 20 — контроль со стороны государства)\n"
+        "- ФЗ №59-ФЗ (сроки рассмотрения обращений — 30 дней)\n"
+        "- ПП РФ №491 (содержание общего имущества — санитарное состояние)\n\n"
+        "{role_instruction}"
+    )
+    PENALTY_BLOCK = (
+        "\n**Расчет пени (актуальная формула):**\n"
+        "- Пени = Сумма долга × Дни просрочки × (Ключевая ставка ЦБ РФ / 300 / 100)\n"
+        "- Нормативная база: [ЖК РФ, ст. 155.1]\n"
+        "- Ограничение: ≤ 9.5% годовых [ФЗ №44-ФЗ, ПП РФ №329]\n"
+        "- Начало начисления: с 31-го дня после срока оплаты.\n"
+    )
 
-    def _expand_search_query(self, query: str) -> List[str]:
-        """Генерирует несколько вариантов поискового запроса для лучшего покрытия темы."""
-        queries = [query]
-        queries.append(f"{query} ПП РФ 354 раздел 6")
-        queries.append(f"{query} СанПиН 1.2.3685-21")
-        queries.append(f"{query} перерасчет за некачественную услугу формула")
-        queries.append(f"{query} судебная практика по качеству ЖКУ")
-        queries.append(f"{query} жалоба в Роспотребнадзор на УК")
-        # Добавляем синонимы
-        for term, data in self.term_map.items():
-            if term in query.lower() or any(syn in query.lower() for syn in data.get("synonyms", [])):
-                for synonym in data.get("synonyms", [])[:2]:
-                    new_q = query.replace(term, synonym) if term in query else query + " " + synonym
-                    queries.append(new_q)
-        return list(set(queries))
-
-    def _build_prompt(self, summary: str, context_text: str, role: str = "смешанная") -> str:
-        """
-        Агент: Контроль качества услуг ЖКХ
-        Формирует системный промт для Saiga/LLaMA-3 8B:
-        - Фокус: контроль качества, замеры, параметры, акты, перерасчет, жалобы
-        - Жёсткая структура и ссылки на нормативные акты
-        """
-        extra = self.improve_prompt_from_feedback()
-        web_results = self._perform_web_search(summary)
-    
-        penalty_keywords = [
-            "пени", "пеня", "неустойка", "штраф за просрочку",
-            "ставка цб", "ключевая ставка", "расчет пени"
-        ]
-        should_calculate_penalty = any(kw in summary.lower() for kw in penalty_keywords)
-    
-        # --- SYSTEM PROMPT ---
-        system_prompt = (
-            "Ты — эксперт по контролю качества коммунальных услуг в ЖКХ. "
-            "Дай точный, структурированный и юридически корректный ответ, используя ТОЛЬКО контекст, веб-результаты и обновления.\n\n"
-            "**ЖЕСТКИЕ ПРАВИЛА:**\n"
-            "1. Если данных нет — отвечай: 'Недостаточно данных для точного ответа.'\n"
-            "2. Подкрепляй все утверждения ссылками на нормативные акты ([ПП РФ №354, п. 58], [СанПиН 1.2.3685-21, п. 9.2]).\n"
-            "3. Структура ответа: Краткий вывод → Нормативное обоснование → Пошаговая инструкция → Судебная практика.\n"
-            "4. Формулы пени только при наличии ключевых слов.\n"
-            "5. Приоритет источников: СанПиН > ПП РФ > ЖК РФ > разъяснения контролирующих органов > судебная практика.\n\n"
-            f"### Контекст:\n{context_text}\n\n"
-            f"### Веб-поиск:\n{web_results}\n\n"
-            f"### Дополнительные обновления:\n{extra}\n\n"
-            "### Структура ответа:\n"
-            "- Краткий вывод (1-2 предложения: что делать немедленно или по закону)\n"
-            "- Нормативное обоснование (ПП РФ, СанПиН, ЖК РФ)\n"
-            "- Пошаговая инструкция:\n"
-            "  * Как зафиксировать нарушение (замер, фото, акт — ПП РФ №354, п. 58, 99)\n"
-            "  * Какие параметры считаются нарушением (температура, давление — СанПиН 1.2.3685-21, п. 9.2)\n"
-            "  * Как рассчитать перерасчёт (формула из Приложения 2 ПП РФ №354)\n"
-            "  * Куда подавать жалобу (УК → ГЖИ → Роспотребнадзор → прокуратура — ЖК РФ, ст. 20)\n"
-            "  * Возможные санкции для УК (штраф, предписание, расторжение договора)\n"
-            "- Судебная практика\n"
-        )
-    
-        if should_calculate_penalty:
-            system_prompt += (
-                "\n**Расчет пени (актуальная формула):**\n"
-                "- Пени = Сумма долга × Дни просрочки × (Ключевая ставка ЦБ РФ / 300 / 100)\n"
-                "- Нормативная база: [ЖК РФ, ст. 155.1]\n"
-                "- Ограничение: ≤ 9.5% годовых [ФЗ №44-ФЗ, ПП РФ №329]\n"
-                "- Начало начисления: с 31-го дня после срока оплаты.\n"
-            )
-    
-        system_prompt += (
-            "\n### Ключевые нормативные акты:\n"
-            "- ПП РФ №354 (качество услуг, замеры, сроки, перерасчёт, акты)\n"
-            "- СанПиН 1.2.3685-21 (гигиенические требования к температуре, давлению, шуму)\n"
-            "- ЖК РФ (ст. 161 — обязанности УК, ст. 20 — контроль со стороны государства)\n"
-            "- ФЗ №59-ФЗ (сроки рассмотрения обращений — 30 дней)\n"
-            "- ПП РФ №491 (содержание общего имущества — санитарное состояние)\n\n"
-            f"{self.get_role_instruction(role)}"
-        )
-    
-        return (
-            "<|begin_of_text|><|start_header_id|>system<|end_header_id|>\n"
-            f"{system_prompt}<|eot_id|>"
-        )
         
 class PaymentDocumentsAgent(RAGAgent):
+    OFFICIAL_DOMAINS = RAGAgent.OFFICIAL_DOMAINS | {"dom.gosuslugi.ru", "nalog.gov.ru", "fns.ru"}
+    GOV_SUFFIXES = (".gov.ru", ".gkh.ru", ".nalog.gov.ru")
+    SEARCH_QUERY_TEMPLATES = (
+        "{q} ПП РФ 354 платёжные документы",
+        "{q} ФЗ 54-ФЗ кассовые чеки ЖКХ",
+        "{q} расшифровка строк в ЕПД",
+        "{q} где долг в квитанции ЖКХ",
+        "{q} судебная практика по ошибкам в квитанциях",
+    )
+    PENALTY_KEYWORDS = (
+        "пени", "пеня", "неустойка", "штраф за просрочку",
+        "ставка цб", "ключевая ставка", "расчет пени",
+    )
+
     def __init__(self):
         # Расширенный и структурированный словарь с синонимами и контекстами
-        self.term_map = self._build_term_map()
-        keywords = self._flatten_term_map(self.term_map)
+        self.term_map, keywords = self._shared_term_map()
         
         super().__init__("Платёжные документы", keywords)
 
@@ -4124,190 +3129,73 @@ class PaymentDocumentsAgent(RAGAgent):
             },
         }
 
-    def _flatten_term_map(self, term_map: Dict) -> List[str]:
-        """Преобразует структурированный словарь в плоский список уникальных ключевых слов."""
-        keywords = set()
-        for term, data in term_map.items():
-            keywords.add(term.lower())  # оригинальный ключ
-            for synonym in data.get("synonyms", []):
-                keywords.add(synonym.lower())
-            # Добавляем ключи из контекстов
-            contexts = data.get("contexts", [])
-            if isinstance(contexts, dict):
-                for ctx_key in contexts.keys():
-                    keywords.add(ctx_key.lower())
-            elif isinstance(contexts, list):
-                for ctx in contexts:
-                    keywords.add(ctx.lower())
-        return list(keywords)
-
-    def _perform_web_search(self, query: str, max_results: int = 3) -> str:
-        """
-        Улучшенный веб-поиск: приоритет официальным источникам, фильтрация, ранжирование.
-        Выполняется ВНУТРИ _build_prompt, как в оригинальной архитектуре.
-        """
-        OFFICIAL_DOMAINS = {
-            "cbr.ru", "government.ru", "kremlin.ru", "rosstat.gov.ru", "minfin.gov.ru",
-            "fas.gov.ru", "gji.ru", "rospotrebnadzor.ru", "rosreestr.gov.ru",
-            "minstroyrf.ru", "fgis-tarif.ru", "consultant.ru", "garant.ru",
-            "pravo.gov.ru", "gkh.ru", "dom.gosuslugi.ru", "nalog.gov.ru", "fns.ru"
-        }
-
-        BLACKLISTED_DOMAINS = {
-            "otvet.mail.ru", "ask.fm", "irecommend.ru", "pikabu.ru",
-            "zen.yandex.ru", "thequestion.ru", "quora.com", "reddit.com",
-            "fishki.net", "yaplakal.com", "blog", "forum"
-        }
-
-        # Генерируем расширенные поисковые запросы
-        expanded_queries = self._expand_search_query(query)
-        all_results = []
-
-        for attempt in range(2):
-            try:
-                with DDGS(timeout=10) as ddgs:
-                    for q in expanded_queries:
-                        results = ddgs.text(q, max_results=5)
-                        for r in results:
-                            href = r.get('href', '')
-                            if not href:
-                                continue
-                            
-                            try:
-                                domain = href.split('/')[2].lower()
-                            except IndexError:
-                                continue
-
-                            if any(bad in domain for bad in BLACKLISTED_DOMAINS):
-                                continue
-
-                            weight = 3 if any(official in domain for official in OFFICIAL_DOMAINS) else \
-                                     2 if any(gov in domain for gov in [".gov.ru", ".gkh.ru", ".nalog.gov.ru"]) else 1
-
-                            snippet = {
-                                "body": r['body'],
-                                "href": href,
-                                "title": r.get('title', ''),
-                                "weight": weight
-                            }
-                            all_results.append(snippet)
-
-                    all_results = sorted(all_results, key=lambda x: x['weight'], reverse=True)
-                    seen_bodies = set()
-                    unique_results = []
-                    for r in all_results:
-                        body_hash = hash(r['body'][:100])
-                        if body_hash not in seen_bodies:
-                            seen_bodies.add(body_hash)
-                            unique_results.append(r)
-                            if len(unique_results) >= max_results:
-                                break
-
-                    if unique_results:
-                        formatted = []
-                        for r in unique_results:
-                            prefix = "[ОФИЦИАЛЬНЫЙ ИСТОЧНИК] " if r['weight'] >= 2 else ""
-                            formatted.append(f"{prefix}• {r['body']}\n  Источник: {r['href']}\n")
-                        return "\n".join(formatted).strip()
-                    else:
-                        return "По вашему запросу ничего не найдено в надёжных источниках."
-
-            except Exception as e:
-                if attempt == 0:
-                    time.sleep(2)
-                    continue
-                return f"Ошибка веб-поиска: {str(e)}"
-
-        return "Не удалось выполнить веб-поиск. Попробуйте позже."
+    # Агент: Платёжные документы ЖКХ
+    # Системный промт для Saiga/LLaMA-3 8B:
+    # - Фокус: квитанции, реквизиты, ошибки, чеки, пени, сроки, формы
+    # - Жёсткая структура и ссылки на нормативные акты
+    PROMPT_TEMPLATE = (
+        "Ты — эксперт по платёжным документам в ЖКХ. Дай точный, структурированный и юридически корректный ответ, "
+        "используя ТОЛЬКО контекст, веб-результаты и обновления.\n\n"
+        "**ЖЕСТКИЕ ПРАВИЛА:**\n"
+        "1. Если данных нет — отвечай: 'Недостаточно данных для точного ответа.'\n"
+        "2. Подкрепляй все утверждения ссылками на нормативные акты ([ПП РФ №354, п. 94], [ФЗ №54-ФЗ, ст. 4.7]).\n"
+        "3. Структура ответа: Краткий вывод → Нормативное обоснование → Пошаговая инструкция → Судебная практика.\n"
+        "4. Формулы пени только при наличии ключевых слов.\n"
+        "5. Приоритет источников: ЖК РФ > ПП РФ > ФЗ №54-ФЗ > разъяснения Минстроя > судебная практика.\n\n"
+        "### Контекст:\n"
+        "{context_text}\n\n"
+        "### Веб-поиск:\n"
+        "{web_results}\n\n"
+        "### Дополнительные обновления:\n"
+        "{extra}\n\n"
+        "### Структура ответа:\n"
+        "- Краткий вывод (1-2 предложения: где искать строку, как исправить ошибку, куда обратиться)\n"
+        "- Нормативное обоснование (ЖК РФ, ПП РФ, ФЗ)\n"
+        "- Пошаговая инструкция:\n"
+        "  * Как выглядит правильная квитанция (обязательные реквизиты — ПП РФ №354, п. 94)\n"
+        "  * Где найти долг или пени (раздел «Задолженность» — ПП РФ №354, п. 94(5))\n"
+        "  * Как исправить ошибку (жалоба в УК в течение 30 дней — ПП РФ №354, п. 95)\n"
+        "  * Как получить чек при оплате (ФЗ №54-ФЗ, ст. 4.7)\n"
+        "  * Куда обратиться, если не пришла квитанция (личный кабинет, ГИС ЖКХ, офис УК — ПП РФ №354, п. 93)\n"
+        "{penalty_block}\n"
+        "### Судебная практика:\n"
+        "[**Определение ВС РФ №XXX-ЭСXX-XXXX от ДД.ММ.ГГГГ** — краткая позиция суда]\n"
+        "Если судебных решений нет: 'Судебная практика по данному вопросу в базе отсутствует'.\n\n"
+        "### Ключевые нормативные акты:\n"
+        "- ЖК РФ (ст. 155 — сроки и порядок оплаты)\n"
+        "- ПП РФ №354 (п. 93-95 — форма, сроки, порядок предоставления и оспаривания платёжных документов)\n"
+        "- ФЗ №54-ФЗ «О применении ККТ» (обязательность выдачи чеков при оплате)\n"
+        "- ПП РФ №491 (если вопрос касается содержания общего имущества)\n"
+        "- ФЗ №209-ФЗ (о раскрытии информации — способы получения документов)\n\n"
+        "{role_instruction}"
+    )
+    PENALTY_BLOCK = (
+        "\n**Расчет пени (актуальная формула):**\n"
+        "- Пени = Сумма долга × Дни просрочки × (Ключевая ставка ЦБ РФ / 300 / 100)\n"
+        "- Нормативная база: [ЖК РФ, ст. 155.1]\n"
+        "- Ограничение: ≤ 9.5% годовых [ФЗ №44-ФЗ, ПП РФ №329]\n"
+        "- Начало начисления: с 31-го дня после срока оплаты.\n"
+    )
 
-    def _expand_search_query(self, query: str) -> List[str]:
-        """Генерирует несколько вариантов поискового запроса для лучшего покрытия темы."""
-        queries = [query]
-        queries.append(f"{query} ПП РФ 354 платёжные документы")
-        queries.append(f"{query} ФЗ 54-ФЗ кассовые чеки ЖКХ")
-        queries.append(f"{query} расшифровка строк в ЕПД")
-        queries.append(f"{query} где долг в квитанции ЖКХ")
-        queries.append(f"{query} судебная практика по ошибкам в квитанциях")
-        # Добавляем синонимы
-        for term, data in self.term_map.items():
-            if term in query.lower() or any(syn in query.lower() for syn in data.get("synonyms", [])):
-                for synonym in data.get("synonyms", [])[:2]:
-                    new_q = query.replace(term, synonym) if term in query else query + " " + synonym
-                    queries.append(new_q)
-        return list(set(queries))
-
-    def _build_prompt(self, summary: str, context_text: str, role: str = "смешанная") -> str:
-        """
-        Агент: Платёжные документы ЖКХ
-        Формирует системный промт для Saiga/LLaMA-3 8B:
-        - Фокус: квитанции, реквизиты, ошибки, чеки, пени, сроки, формы
-        - Жёсткая структура и ссылки на нормативные акты
-        """
-        extra = self.improve_prompt_from_feedback()
-        web_results = self._perform_web_search(summary)
-    
-        penalty_keywords = [
-            "пени", "пеня", "неустойка", "штраф за просрочку",
-            "ставка цб", "ключевая ставка", "расчет пени"
-        ]
-        should_calculate_penalty = any(kw in summary.lower() for kw in penalty_keywords)
-    
-        # --- SYSTEM PROMPT ---
-        system_prompt = (
-            "Ты — эксперт по платёжным документам в ЖКХ. "
-            "Дай точный, структурированный и юридически корректный ответ, используя ТОЛЬКО контекст, веб-результаты и обновления.\n\n"
-            "**ЖЕСТКИЕ ПРАВИЛА:**\n"
-            "1. Если данных нет — отвечай: 'Недостаточно данных для точного ответа.'\n"
-            "2. Подкрепляй все утверждения ссылками на нормативные акты ([ПП РФ №354, п. 94], [ФЗ №54-ФЗ, ст. 4.7]).\n"
-            "3. Структура ответа: Краткий вывод → Нормативное обоснование → Пошаговая инструкция → Судебная практика.\n"
-            "4. Формулы пени только при наличии ключевых слов.\n"
-            "5. Приоритет источников: ЖК РФ > ПП РФ > ФЗ №54-ФЗ > разъяснения Минстроя > судебная практика.\n\n"
-            f"### Контекст:\n{context_text}\n\n"
-            f"### Веб-поиск:\n{web_results}\n\n"
-            f"### Дополнительные обновления:\n{extra}\n\n"
-            "### Структура ответа:\n"
-            "- Краткий вывод (1-2 предложения: где искать строку, как исправить ошибку, куда обратиться)\n"
-            "- Нормативное обоснование (ЖК РФ, ПП РФ, ФЗ)\n"
-            "- Пошаговая инструкция:\n"
-            "  * Как выглядит правильная квитанция (обязательные реквизиты — ПП РФ №354, п. 94)\n"
-            "  * Где найти долг или пени (раздел «Задолженность» — ПП РФ №354, п. 94(5))\n"
-            "  * Как исправить ошибку (жалоба в УК в течение 30 дней — ПП РФ №354, п. 95)\n"
-            "  * Как получить чек при оплате (ФЗ №54-ФЗ, ст. 4.7)\n"
-            "  * Куда обратиться, если не пришла квитанция (личный кабинет, ГИС ЖКХ, офис УК — ПП РФ №354, п. 93)\n"
-        )
-    
-        if should_calculate_penalty:
-            system_prompt += (
-                "\n**Расчет пени (актуальная формула):**\n"
-                "- Пени = Сумма долга × Дни просрочки × (Ключевая ставка ЦБ РФ / 300 / 100)\n"
-                "- Нормативная база: [ЖК РФ, ст. 155.1]\n"
-                "- Ограничение: ≤ 9.5% годовых [ФЗ №44-ФЗ, ПП РФ №329]\n"
-                "- Начало начисления: с 31-го дня после срока оплаты.\n"
-            )
-    
-        system_prompt += (
-            "\n### Судебная практика:\n"
-            "[**Определение ВС РФ №XXX-ЭСXX-XXXX от ДД.ММ.ГГГГ** — краткая позиция суда]\n"
-            "Если судебных решений нет: 'Судебная практика по данному вопросу в базе отсутствует'.\n\n"
-            "### Ключевые нормативные акты:\n"
-            "- ЖК РФ (ст. 155 — сроки и порядок оплаты)\n"
-            "- ПП РФ №354 (п. 93-95 — форма, сроки, порядок предоставления и оспаривания платёжных документов)\n"
-            "- ФЗ №54-ФЗ «О применении ККТ» (обязательность выдачи чеков при оплате)\n"
-            "- ПП РФ №491 (если вопрос касается содержания общего имущества)\n"
-            "- ФЗ №209-ФЗ (о раскрытии информации — способы получения документов)\n\n"
-            f"{self.get_role_instruction(role)}"
-        )
-    
-        return (
-            "<|begin_of_text|><|start_header_id|>system<|end_header_id|>\n"
-            f"{system_prompt}<|eot_id|>"
-        )
         
 class BillingAuditAgent(RAGAgent):
+    OFFICIAL_DOMAINS = RAGAgent.OFFICIAL_DOMAINS | {"fstrf.ru", "gjirf.ru", "vsrf.ru"}
+    GOV_SUFFIXES = (".gov.ru", ".gkh.ru", ".fstrf.ru", ".vsrf.ru")
+    SEARCH_QUERY_TEMPLATES = (
+        "{q} ПП РФ 354 аудит начислений",
+        "{q} ЖК РФ ст 158 проверка квитанции",
+        "{q} повышающий коэффициент 1.5 законно",
+        "{q} судебная практика по оспариванию начислений ЖКХ",
+        "{q} как проверить правильность начислений за ЖКХ",
+    )
+    PENALTY_KEYWORDS = (
+        "пени", "пеня", "неустойка", "штраф за просрочку",
+        "ставка цб", "ключевая ставка", "расчет пени",
+    )
+
     def __init__(self):
         # Расширенный и структурированный словарь с синонимами и контекстами
-        self.term_map = self._build_term_map()
-        keywords = self._flatten_term_map(self.term_map)
+        self.term_map, keywords = self._shared_term_map()
         
         super().__init__("Аудит начислений", keywords)
 
@@ -4391,190 +3279,74 @@ class BillingAuditAgent(RAGAgent):
             },
         }
 
-    def _flatten_term_map(self, term_map: Dict) -> List[str]:
-        """Преобразует структурированный словарь в плоский список уникальных ключевых слов."""
-        keywords = set()
-        for term, data in term_map.items():
-            keywords.add(term.lower())  # оригинальный ключ
-            for synonym in data.get("synonyms", []):
-                keywords.add(synonym.lower())
-            # Добавляем ключи из контекстов
-            contexts = data.get("contexts", [])
-            if isinstance(contexts, dict):
-                for ctx_key in contexts.keys():
-                    keywords.add(ctx_key.lower())
-            elif isinstance(contexts, list):
-                for ctx in contexts:
-                    keywords.add(ctx.lower())
-        return list(keywords)
-
-    def _perform_web_search(self, query: str, max_results: int = 3) -> str:
-        """
-        Улучшенный веб-поиск: приоритет официальным источникам, фильтрация, ранжирование.
-        Выполняется ВНУТРИ _build_prompt, как в оригинальной архитектуре.
-        """
-        OFFICIAL_DOMAINS = {
-            "cbr.ru", "government.ru", "kremlin.ru", "rosstat.gov.ru", "minfin.gov.ru",
-            "fas.gov.ru", "gji.ru", "rospotrebnadzor.ru", "rosreestr.gov.ru",
-            "minstroyrf.ru", "fgis-tarif.ru", "consultant.ru", "garant.ru",
-            "pravo.gov.ru", "gkh.ru", "fstrf.ru", "gjirf.ru", "vsrf.ru"
-        }
-
-        BLACKLISTED_DOMAINS = {
-            "otvet.mail.ru", "ask.fm", "irecommend.ru", "pikabu.ru",
-            "zen.yandex.ru", "thequestion.ru", "quora.com", "reddit.com",
-            "fishki.net", "yaplakal.com", "blog", "forum"
-        }
-
-        # Генерируем расширенные поисковые запросы
-        expanded_queries = self._expand_search_query(query)
-        all_results = []
-
-        for attempt in range(2):
-            try:
-                with DDGS(timeout=10) as ddgs:
-                    for q in expanded_queries:
-                        results = ddgs.text(q, max_results=5)
-                        for r in results:
-                            href = r.get('href', '')
-                            if not href:
-                                continue
-                            
-                            try:
-                                domain = href.split('/')[2].lower()
-                            except IndexError:
-                                continue
-
-                            if any(bad in domain for bad in BLACKLISTED_DOMAINS):
-                                continue
-
-                            weight = 3 if any(official in domain for official in OFFICIAL_DOMAINS) else \
-                                     2 if any(gov in domain for gov in [".gov.ru", ".gkh.ru", ".fstrf.ru", ".vsrf.ru"]) else 1
-
-                            snippet = {
-                                "body": r['body'],
-                                "href": href,
-                                "title": r.get('title', ''),
-                                "weight": weight
-                            }
-                            all_results.append(snippet)
-
-                    all_results = sorted(all_results, key=lambda x: x['weight'], reverse=True)
-                    seen_bodies = set()
-                    unique_results = []
-                    for r in all_results:
-                        body_hash = hash(r['body'][:100])
-                        if body_hash not in seen_bodies:
-                            seen_bodies.add(body_hash)
-                            unique_results.append(r)
-                            if len(unique_results) >= max_results:
-                                break
-
-                    if unique_results:
-                        formatted = []
-                        for r in unique_results:
-                            prefix = "[ОФИЦИАЛЬНЫЙ ИСТОЧНИК] " if r['weight'] >= 2 else ""
-                            formatted.append(f"{prefix}• {r['body']}\n  Источник: {r['href']}\n")
-                        return "\n".join(formatted).strip()
-                    else:
-                        return "По вашему запросу ничего не найдено в надёжных источниках."
-
-            except Exception as e:
-                if attempt == 0:
-                    time.sleep(2)
-                    continue
-                return f"Ошибка веб-поиска: {str(e)}"
-
-        return "Не удалось выполнить веб-поиск. Попробуйте позже."
+    # Агент: Аудит начислений ЖКХ
+    # Системный промт:
+    # - Фокус: аудит и проверка начислений, запросы, расчёты, оспаривание, документы, ГЖИ
+    # - Жёсткая структура и ссылки на нормативные акты
+    PROMPT_TEMPLATE = (
+        "Ты — эксперт по аудиту начислений в ЖКХ. Дай точный, структурированный и юридически корректный ответ, "
+        "используя ТОЛЬКО контекст, веб-результаты и обновления.\n\n"
+        "**ЖЕСТКИЕ ПРАВИЛА:**\n"
+        "1. Если данных нет — отвечай: 'Недостаточно данных для точного ответа.'\n"
+        "2. Подкрепляй все утверждения ссылками на нормативные акты ([ЖК РФ, ст. 158], [ПП РФ №354, п. 95]).\n"
+        "3. Структура ответа: "
+        "Краткий вывод → Нормативное обоснование → Пошаговая инструкция по аудиту → Судебная практика.\n"
+        "4. Формулы пени только при наличии ключевых слов.\n"
+        "5. Приоритет источников: ЖК РФ > ПП РФ > разъяснения Минстроя > судебная практика.\n\n"
+        "### Контекст:\n"
+        "{context_text}\n\n"
+        "### Веб-поиск:\n"
+        "{web_results}\n\n"
+        "### Дополнительные обновления:\n"
+        "{extra}\n\n"
+        "### Структура ответа:\n"
+        "- Краткий вывод (1-2 предложения: что делать, куда обратиться, законно ли начисление)\n"
+        "- Нормативное обоснование (ЖК РФ, ПП РФ, ссылки на разделы по расчёту, проверке, оспариванию)\n"
+        "- Пошаговая инструкция по аудиту:\n"
+        "  * Как запросить детализацию расчёта (письменный запрос в УК — ЖК РФ, ст. 158)\n"
+        "  * Как проверить правильность начислений (сравнение с тарифами, ИПУ, нормативами — ПП РФ №354, разделы 4,5)\n"
+        "  * Как оспорить начисление (претензия → жалоба в ГЖИ → суд — ЖК РФ, ст. 158)\n"
+        "  * Какие документы собрать (квитанции, акты, договоры — ПП РФ №354, п. 95)\n"
+        "  * Что делать при отказе УК (жалоба в ГЖИ с приложением документов — ПП РФ №493)\n"
+        "{penalty_block}\n"
+        "### Судебная практика:\n"
+        "[**Определение ВС РФ №XXX-ЭСXX-XXXX от ДД.ММ.ГГГГ** — краткая позиция суда]\n"
+        "Если судебных решений нет: 'Судебная практика по данному вопросу в базе отсутствует'.\n\n"
+        "### Ключевые нормативные акты:\n"
+        "- ЖК РФ (ст. 154-158 — порядок расчёта и оспаривания)\n"
+        "- ПП РФ №354 (разделы 4,5,9 — расчёт по нормативу, по ИПУ, порядок проверки)\n"
+        "- ПП РФ №491 (содержание общего имущества, при необходимости)\n"
+        "- ПП РФ №1149 (тарифное регулирование, ФГИС Тариф)\n"
+        "- ПП РФ №493 (проверки ГЖИ)\n\n"
+        "{role_instruction}"
+    )
+    PENALTY_BLOCK = (
+        "\n**Расчет пени (актуальная формула):**\n"
+        "- Пени = Сумма долга × Дни просрочки × (Ключевая ставка ЦБ РФ / 300 / 100)\n"
+        "- Нормативная база: [ЖК РФ, ст. 155.1]\n"
+        "- Ограничение: ≤ 9.5% годовых [ФЗ №44-ФЗ, ПП РФ №329]\n"
+        "- Начало начисления: с 31-го дня после срока оплаты.\n"
+    )
 
-    def _expand_search_query(self, query: str) -> List[str]:
-        """Генерирует несколько вариантов поискового запроса для лучшего покрытия темы."""
-        queries = [query]
-        queries.append(f"{query} ПП РФ 354 аудит начислений")
-        queries.append(f"{query} ЖК РФ ст 158 проверка квитанции")
-        queries.append(f"{query} повышающий коэффициент 1.5 законно")
-        queries.append(f"{query} судебная практика по оспариванию начислений ЖКХ")
-        queries.append(f"{query} как проверить правильность начислений за ЖКХ")
-        # Добавляем синонимы
-        for term, data in self.term_map.items():
-            if term in query.lower() or any(syn in query.lower() for syn in data.get("synonyms", [])):
-                for synonym in data.get("synonyms", [])[:2]:
-                    new_q = query.replace(term, synonym) if term in query else query + " " + synonym
-                    queries.append(new_q)
-        return list(set(queries))
-
-    def _build_prompt(self, summary: str, context_text: str, role: str = "смешанная") -> str:
-        """
-        Агент: Аудит начислений ЖКХ
-        Формирует системный промт:
-        - Фокус: аудит и проверка начислений, запросы, расчёты, оспаривание, документы, ГЖИ
-        - Жёсткая структура и ссылки на нормативные акты
-        """
-        extra = self.improve_prompt_from_feedback()
-        web_results = self._perform_web_search(summary)
-    
-        penalty_keywords = [
-            "пени", "пеня", "неустойка", "штраф за просрочку",
-            "ставка цб", "ключевая ставка", "расчет пени"
-        ]
-        should_calculate_penalty = any(kw in summary.lower() for kw in penalty_keywords)
-    
-        # --- SYSTEM PROMPT ---
-        system_prompt = (
-            "Ты — эксперт по аудиту начислений в ЖКХ. "
-            "Дай точный, структурированный и юридически корректный ответ, используя ТОЛЬКО контекст, веб-результаты и обновления.\n\n"
-            "**ЖЕСТКИЕ ПРАВИЛА:**\n"
-            "1. Если данных нет — отвечай: 'Недостаточно данных для точного ответа.'\n"
-            "2. Подкрепляй все утверждения ссылками на нормативные акты ([ЖК РФ, ст. 158], [ПП РФ №354, п. 95]).\n"
-            "3. Структура ответа: Краткий вывод → Нормативное обоснование → Пошаговая инструкция по аудиту → Судебная практика.\n"
-            "4. Формулы пени только при наличии ключевых слов.\n"
-            "5. Приоритет источников: ЖК РФ > ПП РФ > разъяснения Минстроя > судебная практика.\n\n"
-            f"### Контекст:\n{context_text}\n\n"
-            f"### Веб-поиск:\n{web_results}\n\n"
-            f"### Дополнительные обновления:\n{extra}\n\n"
-            "### Структура ответа:\n"
-            "- Краткий вывод (1-2 предложения: что делать, куда обратиться, законно ли начисление)\n"
-            "- Нормативное обоснование (ЖК РФ, ПП РФ, ссылки на разделы по расчёту, проверке, оспариванию)\n"
-            "- Пошаговая инструкция по аудиту:\n"
-            "  * Как запросить детализацию расчёта (письменный запрос в УК — ЖК РФ, ст. 158)\n"
-            "  * Как проверить правильность начислений (сравнение с тарифами, ИПУ, нормативами — ПП РФ №354, разделы 4,5)\n"
-            "  * Как оспорить начисление (претензия → жалоба в ГЖИ → суд — ЖК РФ, ст. 158)\n"
-            "  * Какие документы собрать (квитанции, акты, договоры — ПП РФ №354, п. 95)\n"
-            "  * Что делать при отказе УК (жалоба в ГЖИ с приложением документов — ПП РФ №493)\n"
-        )
-    
-        if should_calculate_penalty:
-            system_prompt += (
-                "\n**Расчет пени (актуальная формула):**\n"
-                "- Пени = Сумма долга × Дни просрочки × (Ключевая ставка ЦБ РФ / 300 / 100)\n"
-                "- Нормативная база: [ЖК РФ, ст. 155.1]\n"
-                "- Ограничение: ≤ 9.5% годовых [ФЗ №44-ФЗ, ПП РФ №329]\n"
-                "- Начало начисления: с 31-го дня после срока оплаты.\n"
-            )
-    
-        system_prompt += (
-            "\n### Судебная практика:\n"
-            "[**Определение ВС РФ №XXX-ЭСXX-XXXX от ДД.ММ.ГГГГ** — краткая позиция суда]\n"
-            "Если судебных решений нет: 'Судебная практика по данному вопросу в базе отсутствует'.\n\n"
-            "### Ключевые нормативные акты:\n"
-            "- ЖК РФ (ст. 154-158 — порядок расчёта и оспаривания)\n"
-            "- ПП РФ №354 (разделы 4,5,9 — расчёт по нормативу, по ИПУ, порядок проверки)\n"
-            "- ПП РФ №491 (содержание общего имущества, при необходимости)\n"
-            "- ПП РФ №1149 (тарифное регулирование, ФГИС Тариф)\n"
-            "- ПП РФ №493 (проверки ГЖИ)\n\n"
-            f"{self.get_role_instruction(role)}"
-        )
-    
-        return (
-            "<|begin_of_text|><|start_header_id|>system<|end_header_id|>\n"
-            f"{system_prompt}<|eot_id|>"
-        )
         
 class SubsidyAndBenefitsAgent(RAGAgent):
+    OFFICIAL_DOMAINS = RAGAgent.OFFICIAL_DOMAINS | {"gosuslugi.ru", "pfr.gov.ru", "socmin.ru", "vsrf.ru"}
+    GOV_SUFFIXES = (".gov.ru", ".gkh.ru", ".gosuslugi.ru", ".pfr.gov.ru")
+    SEARCH_QUERY_TEMPLATES = (
+        "{q} ПП РФ 761 субсидии ЖКХ",
+        "{q} ЖК РФ ст 159 льготы",
+        "{q} ФЗ 181-ФЗ льготы инвалидам",
+        "{q} судебная практика по отказу в субсидии",
+        "{q} как оформить субсидию через ГИС ЖКХ",
+    )
+    PENALTY_KEYWORDS = (
+        "пени", "пеня", "неустойка", "штраф за просрочку",
+        "ставка цб", "ключевая ставка", "расчет пени",
+    )
+
     def __init__(self):
         # Расширенный и структурированный словарь с синонимами и контекстами
-        self.term_map = self._build_term_map()
-        keywords = self._flatten_term_map(self.term_map)
+        self.term_map, keywords = self._shared_term_map()
         
         super().__init__("Льготы и субсидии", keywords)
 
@@ -4658,193 +3430,77 @@ class SubsidyAndBenefitsAgent(RAGAgent):
             },
         }
 
-    def _flatten_term_map(self, term_map: Dict) -> List[str]:
-        """Преобразует структурированный словарь в плоский список уникальных ключевых слов."""
-        keywords = set()
-        for term, data in term_map.items():
-            keywords.add(term.lower())  # оригинальный ключ
-            for synonym in data.get("synonyms", []):
-                keywords.add(synonym.lower())
-            # Добавляем ключи из контекстов
-            contexts = data.get("contexts", [])
-            if isinstance(contexts, dict):
-                for ctx_key in contexts.keys():
-                    keywords.add(ctx_key.lower())
-            elif isinstance(contexts, list):
-                for ctx in contexts:
-                    keywords.add(ctx.lower())
-        return list(keywords)
+    # Агент: Льготы и субсидии ЖКХ
+    # Системный промт:
+    # - Фокус: льготы, субсидии, компенсации — категории, документы, подача, сроки, обжалование
+    # - Жёсткая структура и ссылки на нормативные акты
+    PROMPT_TEMPLATE = (
+        "Ты — эксперт по льготам, субсидиям и компенсациям ЖКХ. Дай точный, "
+        "структурированный и юридически корректный ответ, используя ТОЛЬКО контекст, веб-результаты и обновления.\n\n"
+        "**ЖЕСТКИЕ ПРАВИЛА:**\n"
+        "1. Если данных нет — отвечай: 'Недостаточно данных для точного ответа.'\n"
+        "2. Подкрепляй все утверждения ссылками на нормативные акты ([ЖК РФ, ст. 159], [ПП РФ №761, п. 10], "
+        "[ФЗ №181-ФЗ, ст. 5]).\n"
+        "3. Структура ответа: Краткий вывод → Нормативное обоснование → Пошаговая инструкция → Судебная практика.\n"
+        "4. Формулы пени только при наличии ключевых слов.\n"
+        "5. Приоритет источников: ЖК РФ > ПП РФ > ФЗ > региональные акты > судебная практика.\n\n"
+        "### Контекст:\n"
+        "{context_text}\n\n"
+        "### Веб-поиск:\n"
+        "{web_results}\n\n"
+        "### Дополнительные обновления:\n"
+        "{extra}\n\n"
+        "### Структура ответа:\n"
+        "- Краткий вывод (1-2 предложения: имеет ли право, куда обращаться, что делать при отказе)\n"
+        "- Нормативное обоснование (ЖК РФ, ПП РФ, ФЗ, ссылки на разделы по льготам и субсидиям)\n"
+        "- Пошаговая инструкция:\n"
+        "  * Кто имеет право? (категории граждан — ЖК РФ, ст. 159, ФЗ №181-ФЗ)\n"
+        "  * Какие документы нужны? (справки о доходах, составе семьи, удостоверения — ПП РФ №761, п. 10)\n"
+        "  * Куда подавать? (МФЦ, ГИС ЖКХ, портал госуслуг, соцзащита — ПП РФ №761)\n"
+        "  * Сроки рассмотрения и выплаты (10 рабочих дней — ПП РФ №761, п. 15)\n"
+        "  * Что делать при отказе? (жалоба в вышестоящий орган, прокуратуру, суд — ФЗ №59-ФЗ, ст. 12)\n"
+        "{penalty_block}\n"
+        "### Судебная практика:\n"
+        "[**Определение ВС РФ №XXX-ЭСXX-XXXX от ДД.ММ.ГГГГ** — краткая позиция суда]\n"
+        "Если судебных решений нет: 'Судебная практика по данному вопросу в базе отсутствует'.\n\n"
+        "### Ключевые нормативные акты:\n"
+        "- ЖК РФ (ст. 159-160 — основания и порядок предоставления льгот)\n"
+        "- ПП РФ №761 «О предоставлении субсидий на оплату ЖКУ»\n"
+        "- ФЗ №181-ФЗ «О социальной защите инвалидов»\n"
+        "- ФЗ №5-ФЗ «О ветеранах»\n"
+        "- Указ Президента РФ №431 «О мерах по социальной поддержке многодетных семей»\n"
+        "- Региональные законы и постановления (если есть в контексте)\n\n"
+        "{role_instruction}"
+    )
+    PENALTY_BLOCK = (
+        "\n**Расчет пени (актуальная формула):**\n"
+        "- Пени = Сумма долга × Дни просрочки × (Ключевая ставка ЦБ РФ / 300 / 100)\n"
+        "- Нормативная база: [ЖК РФ, ст. 155.1]\n"
+        "- Ограничение: ≤ 9.5% годовых [ФЗ №44-ФЗ, ПП РФ №329]\n"
+        "- Начало начисления: с 31-го дня после срока оплаты.\n"
+    )
 
-    def _perform_web_search(self, query: str, max_results: int = 3) -> str:
-        """
-        Улучшенный веб-поиск: приоритет официальным источникам, фильтрация, ранжирование.
-        Выполняется ВНУТРИ _build_prompt, как в оригинальной архитектуре.
-        """
-        OFFICIAL_DOMAINS = {
-            "cbr.ru", "government.ru", "kremlin.ru", "rosstat.gov.ru", "minfin.gov.ru",
-            "fas.gov.ru", "gji.ru", "rospotrebnadzor.ru", "rosreestr.gov.ru",
-            "minstroyrf.ru", "fgis-tarif.ru", "consultant.ru", "garant.ru",
-            "pravo.gov.ru", "gkh.ru", "gosuslugi.ru", "pfr.gov.ru", "socmin.ru", "vsrf.ru"
-        }
+        
+class LegalClaimsAgent(RAGAgent):
+    OFFICIAL_DOMAINS = RAGAgent.OFFICIAL_DOMAINS | {"proc.gov.ru", "vsrf.ru", "sudrf.ru", "fssprus.ru"}
+    GOV_SUFFIXES = (".gov.ru", ".gkh.ru", ".vsrf.ru", ".sudrf.ru")
+    SEARCH_QUERY_TEMPLATES = (
+        "{q} ГПК РФ ст 131 исковое заявление",
+        "{q} ЖК РФ ст 162 претензия УК",
+        "{q} судебная практика по моральному вреду ЖКХ",
+        "{q} образец жалобы в прокуратуру на УК",
+        "{q} срок исковой давности жилищные споры",
+    )
+    PENALTY_KEYWORDS = (
+        "пени", "пеня", "неустойка", "штраф за просрочку",
+        "ставка цб", "ключевая ставка", "расчет пени",
+    )
 
-        BLACKLISTED_DOMAINS = {
-            "otvet.mail.ru", "ask.fm", "irecommend.ru", "pikabu.ru",
-            "zen.yandex.ru", "thequestion.ru", "quora.com", "reddit.com",
-            "fishki.net", "yaplakal.com", "blog", "forum"
-        }
-
-        # Генерируем расширенные поисковые запросы
-        expanded_queries = self._expand_search_query(query)
-        all_results = []
-
-        for attempt in range(2):
-            try:
-                with DDGS(timeout=10) as ddgs:
-                    for q in expanded_queries:
-                        results = ddgs.text(q, max_results=5)
-                        for r in results:
-                            href = r.get('href', '')
-                            if not href:
-                                continue
-                            
-                            try:
-                                domain = href.split('/')[2].lower()
-                            except IndexError:
-                                continue
-
-                            if any(bad in domain for bad in BLACKLISTED_DOMAINS):
-                                continue
-
-                            weight = 3 if any(official in domain for official in OFFICIAL_DOMAINS) else \
-                                     2 if any(gov in domain for gov in [".gov.ru", ".gkh.ru", ".gosuslugi.ru", ".pfr.gov.ru"]) else 1
-
-                            snippet = {
-                                "body": r['body'],
-                                "href": href,
-                                "title": r.get('title', ''),
-                                "weight": weight
-                            }
-                            all_results.append(snippet)
-
-                    all_results = sorted(all_results, key=lambda x: x['weight'], reverse=True)
-                    seen_bodies = set()
-                    unique_results = []
-                    for r in all_results:
-                        body_hash = hash(r['body'][:100])
-                        if body_hash not in seen_bodies:
-                            seen_bodies.add(body_hash)
-                            unique_results.append(r)
-                            if len(unique_results) >= max_results:
-                                break
-
-                    if unique_results:
-                        formatted = []
-                        for r in unique_results:
-                            prefix = "[ОФИЦИАЛЬНЫЙ ИСТОЧНИК] " if r['weight'] >= 2 else ""
-                            formatted.append(f"{prefix}• {r['body']}\n  Источник: {r['href']}\n")
-                        return "\n".join(formatted).strip()
-                    else:
-                        return "По вашему запросу ничего не найдено в надёжных источниках."
-
-            except Exception as e:
-                if attempt == 0:
-                    time.sleep(2)
-                    continue
-                return f"Ошибка веб-поиска: {str(e)}"
-
-        return "Не удалось выполнить веб-поиск. Попробуйте позже."
-
-    def _expand_search_query(self, query: str) -> List[str]:
-        """Генерирует несколько вариантов поискового запроса для лучшего покрытия темы."""
-        queries = [query]
-        queries.append(f"{query} ПП РФ 761 субсидии ЖКХ")
-        queries.append(f"{query} ЖК РФ ст 159 льготы")
-        queries.append(f"{query} ФЗ 181-ФЗ льготы инвалидам")
-        queries.append(f"{query} судебная практика по отказу в субсидии")
-        queries.append(f"{query} как оформить субсидию через ГИС ЖКХ")
-        # Добавляем синонимы
-        for term, data in self.term_map.items():
-            if term in query.lower() or any(syn in query.lower() for syn in data.get("synonyms", [])):
-                for synonym in data.get("synonyms", [])[:2]:
-                    new_q = query.replace(term, synonym) if term in query else query + " " + synonym
-                    queries.append(new_q)
-        return list(set(queries))
-
-    def _build_prompt(self, summary: str, context_text: str, role: str = "смешанная") -> str:
-        """
-        Агент: Льготы и субсидии ЖКХ
-        Формирует системный промт:
-        - Фокус: льготы, субсидии, компенсации — категории, документы, подача, сроки, обжалование
-        - Жёсткая структура и ссылки на нормативные акты
-        """
-        extra = self.improve_prompt_from_feedback()
-        web_results = self._perform_web_search(summary)
-    
-        penalty_keywords = [
-            "пени", "пеня", "неустойка", "штраф за просрочку",
-            "ставка цб", "ключевая ставка", "расчет пени"
-        ]
-        should_calculate_penalty = any(kw in summary.lower() for kw in penalty_keywords)
-    
-        # --- SYSTEM PROMPT ---
-        system_prompt = (
-            "Ты — эксперт по льготам, субсидиям и компенсациям ЖКХ. "
-            "Дай точный, структурированный и юридически корректный ответ, используя ТОЛЬКО контекст, веб-результаты и обновления.\n\n"
-            "**ЖЕСТКИЕ ПРАВИЛА:**\n"
-            "1. Если данных нет — отвечай: 'Недостаточно данных для точного ответа.'\n"
-            "2. Подкрепляй все утверждения ссылками на нормативные акты ([ЖК РФ, ст. 159], [ПП РФ №761, п. 10], [ФЗ №181-ФЗ, ст. 5]).\n"
-            "3. Структура ответа: Краткий вывод → Нормативное обоснование → Пошаговая инструкция → Судебная практика.\n"
-            "4. Формулы пени только при наличии ключевых слов.\n"
-            "5. Приоритет источников: ЖК РФ > ПП РФ > ФЗ > региональные акты > судебная практика.\n\n"
-            f"### Контекст:\n{context_text}\n\n"
-            f"### Веб-поиск:\n{web_results}\n\n"
-            f"### Дополнительные обновления:\n{extra}\n\n"
-            "### Структура ответа:\n"
-            "- Краткий вывод (1-2 предложения: имеет ли право, куда обращаться, что делать при отказе)\n"
-            "- Нормативное обоснование (ЖК РФ, ПП РФ, ФЗ, ссылки на разделы по льготам и субсидиям)\n"
-            "- Пошаговая инструкция:\n"
-            "  * Кто имеет право? (категории граждан — ЖК РФ, ст. 159, ФЗ №181-ФЗ)\n"
-            "  * Какие документы нужны? (справки о доходах, составе семьи, удостоверения — ПП РФ №761, п. 10)\n"
-            "  * Куда подавать? (МФЦ, ГИС ЖКХ, портал госуслуг, соцзащита — ПП РФ №761)\n"
-            "  * Сроки рассмотрения и выплаты (10 рабочих дней — ПП РФ №761, п. 15)\n"
-            "  * Что делать при отказе? (жалоба в вышестоящий орган, прокуратуру, суд — ФЗ №59-ФЗ, ст. 12)\n"
-        )
-    
-        if should_calculate_penalty:
-            system_prompt += (
-                "\n**Расчет пени (актуальная формула):**\n"
-                "- Пени = Сумма долга × Дни просрочки × (Ключевая ставка ЦБ РФ / 300 / 100)\n"
-                "- Нормативная база: [ЖК РФ, ст. 155.1]\n"
-                "- Ограничение: ≤ 9.5% годовых [ФЗ №44-ФЗ, ПП РФ №329]\n"
-                "- Начало начисления: с 31-го дня после срока оплаты.\n"
-            )
-    
-        system_prompt += (
-            "\n### Судебная практика:\n"
-            "[**Определение ВС РФ №XXX-ЭСXX-XXXX от ДД.ММ.ГГГГ** — краткая позиция суда]\n"
-            "Если судебных решений нет: 'Судебная практика по данному вопросу в базе отсутствует'.\n\n"
-            "### Ключевые нормативные акты:\n"
-            "- ЖК РФ (ст. 159-160 — основания и порядок предоставления льгот)\n"
-            "- ПП РФ №761 «О предоставлении субсидий на оплату ЖКУ»\n"
-            "- ФЗ №181-ФЗ «О социальной защите инвалидов»\n"
-            "- ФЗ №5-ФЗ «О ветеранах»\n"
-            "- Указ Президента РФ №431 «О мерах по социальной поддержке многодетных семей»\n"
-            "- Региональные законы и постановления (если есть в контексте)\n\n"
-            f"{self.get_role_instruction(role)}"
-        )
-    
-        return (
-            "<|begin_of_text|><|start_header_id|>system<|end_header_id|>\n"
-            f"{system_prompt}<|eot_id|>"
-        )
-        
-class LegalClaimsAgent(RAGAgent):
-    def __init__(self):
-        # Расширенный и структурированный словарь с синонимами и контекстами
-        self.term_map = self._build_term_map()
-        keywords = self._flatten_term_map(self.term_map)
-        
-        super().__init__("Юридические претензии", keywords)
+    def __init__(self):
+        # Расширенный и структурированный словарь с синонимами и контекстами
+        self.term_map, keywords = self._shared_term_map()
+        
+        super().__init__("Юридические претензии", keywords)
 
     def _build_term_map(self) -> Dict[str, Any]:
         """Строит расширенную семантическую карту терминов с синонимами, контекстами и нормативными ссылками."""
@@ -4926,191 +3582,75 @@ class LegalClaimsAgent(RAGAgent):
             },
         }
 
-    def _flatten_term_map(self, term_map: Dict) -> List[str]:
-        """Преобразует структурированный словарь в плоский список уникальных ключевых слов."""
-        keywords = set()
-        for term, data in term_map.items():
-            keywords.add(term.lower())  # оригинальный ключ
-            for synonym in data.get("synonyms", []):
-                keywords.add(synonym.lower())
-            # Добавляем ключи из контекстов
-            contexts = data.get("contexts", [])
-            if isinstance(contexts, dict):
-                for ctx_key in contexts.keys():
-                    keywords.add(ctx_key.lower())
-            elif isinstance(contexts, list):
-                for ctx in contexts:
-                    keywords.add(ctx.lower())
-        return list(keywords)
-
-    def _perform_web_search(self, query: str, max_results: int = 3) -> str:
-        """
-        Улучшенный веб-поиск: приоритет официальным источникам, фильтрация, ранжирование.
-        Выполняется ВНУТРИ _build_prompt, как в оригинальной архитектуре.
-        """
-        OFFICIAL_DOMAINS = {
-            "cbr.ru", "government.ru", "kremlin.ru", "rosstat.gov.ru", "minfin.gov.ru",
-            "fas.gov.ru", "gji.ru", "rospotrebnadzor.ru", "rosreestr.gov.ru",
-            "minstroyrf.ru", "fgis-tarif.ru", "consultant.ru", "garant.ru",
-            "pravo.gov.ru", "gkh.ru", "proc.gov.ru", "vsrf.ru", "sudrf.ru", "fssprus.ru"
-        }
-
-        BLACKLISTED_DOMAINS = {
-            "otvet.mail.ru", "ask.fm", "irecommend.ru", "pikabu.ru",
-            "zen.yandex.ru", "thequestion.ru", "quora.com", "reddit.com",
-            "fishki.net", "yaplakal.com", "blog", "forum"
-        }
-
-        # Генерируем расширенные поисковые запросы
-        expanded_queries = self._expand_search_query(query)
-        all_results = []
-
-        for attempt in range(2):
-            try:
-                with DDGS(timeout=10) as ddgs:
-                    for q in expanded_queries:
-                        results = ddgs.text(q, max_results=5)
-                        for r in results:
-                            href = r.get('href', '')
-                            if not href:
-                                continue
-                            
-                            try:
-                                domain = href.split('/')[2].lower()
-                            except IndexError:
-                                continue
-
-                            if any(bad in domain for bad in BLACKLISTED_DOMAINS):
-                                continue
-
-                            weight = 3 if any(official in domain for official in OFFICIAL_DOMAINS) else \
-                                     2 if any(gov in domain for gov in [".gov.ru", ".gkh.ru", ".vsrf.ru", ".sudrf.ru"]) else 1
-
-                            snippet = {
-                                "body": r['body'],
-                                "href": href,
-                                "title": r.get('title', ''),
-                                "weight": weight
-                            }
-                            all_results.append(snippet)
-
-                    all_results = sorted(all_results, key=lambda x: x['weight'], reverse=True)
-                    seen_bodies = set()
-                    unique_results = []
-                    for r in all_results:
-                        body_hash = hash(r['body'][:100])
-                        if body_hash not in seen_bodies:
-                            seen_bodies.add(body_hash)
-                            unique_results.append(r)
-                            if len(unique_results) >= max_results:
-                                break
-
-                    if unique_results:
-                        formatted = []
-                        for r in unique_results:
-                            prefix = "[ОФИЦИАЛЬНЫЙ ИСТОЧНИК] " if r['weight'] >= 2 else ""
-                            formatted.append(f"{prefix}• {r['body']}\n  Источник: {r['href']}\n")
-                        return "\n".join(formatted).strip()
-                    else:
-                        return "По вашему запросу ничего не найдено в надёжных источниках."
-
-            except Exception as e:
-                if attempt == 0:
-                    time.sleep(2)
-                    continue
-                return f"Ошибка веб-поиска: {str(e)}"
-
-        return "Не удалось выполнить веб-поиск. Попробуйте позже."
+    # Агент: Юридические претензии ЖКХ
+    # Системный промт:
+    # - Фокус: жилищные споры — претензии, доказательства, иск, подсудность, исковая давность, судебная практика
+    # - Жёсткая структура и ссылки на нормативные акты
+    PROMPT_TEMPLATE = (
+        "Ты — эксперт по жилищным спорам. Дай точный, структурированный и юридически корректный ответ, "
+        "используя ТОЛЬКО контекст, веб-результаты и обновления.\n\n"
+        "**ЖЕСТКИЕ ПРАВИЛА:**\n"
+        "1. Если данных нет — отвечай: 'Недостаточно данных для точного ответа.'\n"
+        "2. Структура ответа: Краткий вывод → Нормативное обоснование → Пошаговая инструкция → Судебная практика.\n"
+        "3. Подкрепляй каждое утверждение ссылками на нормативные акты ([ГК РФ, ст. 330], [ЖК РФ, ст. 162], [ГПК РФ, "
+        "ст. 131]).\n"
+        "4. Формулы пени только при наличии ключевых слов.\n"
+        "5. Приоритет источников: ГК РФ > ГПК РФ > ЖК РФ > ФЗ > ПП РФ > судебная практика.\n\n"
+        "### Контекст:\n"
+        "{context_text}\n\n"
+        "### Веб-поиск:\n"
+        "{web_results}\n\n"
+        "### Дополнительные обновления:\n"
+        "{extra}\n\n"
+        "### Структура ответа:\n"
+        "- Краткий вывод (1-2 предложения: что делать, куда подавать, сроки, шансы на успех)\n"
+        "- Нормативное обоснование (ГК РФ, ГПК РФ, ЖК РФ, ФЗ, ссылки на статьи)\n"
+        "- Пошаговая инструкция:\n"
+        "  * Досудебное урегулирование: составление претензии (ЖК РФ, ст. 162)\n"
+        "  * Сбор доказательств: акты, фото, переписка, свидетели (ГПК РФ, ст. 67)\n"
+        "  * Подача жалобы: ГЖИ, Роспотребнадзор, прокуратура (ФЗ №59-ФЗ, ст. 12)\n"
+        "  * Подача иска: подсудность, госпошлина, приложения (ГПК РФ, ст. 131)\n"
+        "  * Сроки: исковая давность — 3 года (ГК РФ, ст. 196), рассмотрение претензии — 30 дней (ЖК РФ, ст. 162)\n"
+        "{penalty_block}\n"
+        "### Судебная практика:\n"
+        "[**Определение ВС РФ №XXX-ЭСXX-XXXX от ДД.ММ.ГГГГ** — краткая позиция суда]\n"
+        "Если судебных решений нет: 'Судебная практика по данному вопросу в базе отсутствует'.\n\n"
+        "### Ключевые нормативные акты:\n"
+        "- Жилищный кодекс РФ (ст. 155, 158, 161, 162 — претензии, ответственность УК)\n"
+        "- Гражданский кодекс РФ (ст. 196 — исковая давность, ст. 330 — неустойка, ст. 151 — моральный вред)\n"
+        "- Гражданский процессуальный кодекс РФ (ст. 131 — исковое заявление, ст. 122 — судебный приказ)\n"
+        "- ФЗ №59-ФЗ «О порядке рассмотрения обращений граждан»\n"
+        "- ФЗ №2202-1 «О прокуратуре РФ»\n"
+        "- ПП РФ №354, №491 — по вопросам качества услуг и содержания имущества\n\n"
+        "{role_instruction}"
+    )
+    PENALTY_BLOCK = (
+        "\n**Расчет пени (актуальная формула):**\n"
+        "- Пени = Сумма долга × Дни просрочки × (Ключевая ставка ЦБ РФ / 300 / 100)\n"
+        "- Нормативная база: [ЖК РФ, ст. 155.1]\n"
+        "- Ограничение: ≤ 9.5% годовых [ФЗ №44-ФЗ, ПП РФ №329]\n"
+        "- Начало начисления: с 31-го дня после срока оплаты.\n"
+    )
 
-    def _expand_search_query(self, query: str) -> List[str]:
-        """Генерирует несколько вариантов поискового запроса для лучшего покрытия темы."""
-        queries = [query]
-        queries.append(f"{query} ГПК РФ ст 131 исковое заявление")
-        queries.append(f"{query} ЖК РФ ст 162 претензия УК")
-        queries.append(f"{query} судебная практика по моральному вреду ЖКХ")
-        queries.append(f"{query} образец жалобы в прокуратуру на УК")
-        queries.append(f"{query} срок исковой давности жилищные споры")
-        # Добавляем синонимы
-        for term, data in self.term_map.items():
-            if term in query.lower() or any(syn in query.lower() for syn in data.get("synonyms", [])):
-                for synonym in data.get("synonyms", [])[:2]:
-                    new_q = query.replace(term, synonym) if term in query else query + " " + synonym
-                    queries.append(new_q)
-        return list(set(queries))
-
-    def _build_prompt(self, summary: str, context_text: str, role: str = "смешанная") -> str:
-        """
-        Агент: Юридические претензии ЖКХ
-        Формирует системный промт:
-        - Фокус: жилищные споры — претензии, доказательства, иск, подсудность, исковая давность, судебная практика
-        - Жёсткая структура и ссылки на нормативные акты
-        """
-        extra = self.improve_prompt_from_feedback()
-        web_results = self._perform_web_search(summary)
-    
-        penalty_keywords = [
-            "пени", "пеня", "неустойка", "штраф за просрочку",
-            "ставка цб", "ключевая ставка", "расчет пени"
-        ]
-        should_calculate_penalty = any(kw in summary.lower() for kw in penalty_keywords)
-    
-        # --- SYSTEM PROMPT ---
-        system_prompt = (
-            "Ты — эксперт по жилищным спорам. Дай точный, структурированный и юридически корректный ответ, "
-            "используя ТОЛЬКО контекст, веб-результаты и обновления.\n\n"
-            "**ЖЕСТКИЕ ПРАВИЛА:**\n"
-            "1. Если данных нет — отвечай: 'Недостаточно данных для точного ответа.'\n"
-            "2. Структура ответа: Краткий вывод → Нормативное обоснование → Пошаговая инструкция → Судебная практика.\n"
-            "3. Подкрепляй каждое утверждение ссылками на нормативные акты ([ГК РФ, ст. 330], [ЖК РФ, ст. 162], [ГПК РФ, ст. 131]).\n"
-            "4. Формулы пени только при наличии ключевых слов.\n"
-            "5. Приоритет источников: ГК РФ > ГПК РФ > ЖК РФ > ФЗ > ПП РФ > судебная практика.\n\n"
-            f"### Контекст:\n{context_text}\n\n"
-            f"### Веб-поиск:\n{web_results}\n\n"
-            f"### Дополнительные обновления:\n{extra}\n\n"
-            "### Структура ответа:\n"
-            "- Краткий вывод (1-2 предложения: что делать, куда подавать, сроки, шансы на успех)\n"
-            "- Нормативное обоснование (ГК РФ, ГПК РФ, ЖК РФ, ФЗ, ссылки на статьи)\n"
-            "- Пошаговая инструкция:\n"
-            "  * Досудебное урегулирование: составление претензии (ЖК РФ, ст. 162)\n"
-            "  * Сбор доказательств: акты, фото, переписка, свидетели (ГПК РФ, ст. 67)\n"
-            "  * Подача жалобы: ГЖИ, Роспотребнадзор, прокуратура (ФЗ №59-ФЗ, ст. 12)\n"
-            "  * Подача иска: подсудность, госпошлина, приложения (ГПК РФ, ст. 131)\n"
-            "  * Сроки: исковая давность — 3 года (ГК РФ, ст. 196), рассмотрение претензии — 30 дней (ЖК РФ, ст. 162)\n"
-        )
-    
-        if should_calculate_penalty:
-            system_prompt += (
-                "\n**Расчет пени (актуальная формула):**\n"
-                "- Пени = Сумма долга × Дни просрочки × (Ключевая ставка ЦБ РФ / 300 / 100)\n"
-                "- Нормативная база: [ЖК РФ, ст. 155.1]\n"
-                "- Ограничение: ≤ 9.5% годовых [ФЗ №44-ФЗ, ПП РФ №329]\n"
-                "- Начало начисления: с 31-го дня после срока оплаты.\n"
-            )
-    
-        system_prompt += (
-            "\n### Судебная практика:\n"
-            "[**Определение ВС РФ №XXX-ЭСXX-XXXX от ДД.ММ.ГГГГ** — краткая позиция суда]\n"
-            "Если судебных решений нет: 'Судебная практика по данному вопросу в базе отсутствует'.\n\n"
-            "### Ключевые нормативные акты:\n"
-            "- Жилищный кодекс РФ (ст. 155, 158, 161, 162 — претензии, ответственность УК)\n"
-            "- Гражданский кодекс РФ (ст. 196 — исковая давность, ст. 330 — неустойка, ст. 151 — моральный вред)\n"
-            "- Гражданский процессуальный кодекс РФ (ст. 131 — исковое заявление, ст. 122 — судебный приказ)\n"
-            "- ФЗ №59-ФЗ «О порядке рассмотрения обращений граждан»\n"
-            "- ФЗ №2202-1 «О прокуратуре РФ»\n"
-            "- ПП РФ №354, №491 — по вопросам качества услуг и содержания имущества\n\n"
-            f"{self.get_role_instruction(role)}"
-        )
-    
-        return (
-            "<|begin_of_text|><|start_header_id|>system<|end_header_id|>\n"
-            f"{system_prompt}<|eot_id|>"
-        )
         
 class DebtManagementAgent(RAGAgent):
+    OFFICIAL_DOMAINS = RAGAgent.OFFICIAL_DOMAINS | {"fssprus.ru", "vsrf.ru", "bankrot.fedresurs.ru", "roscomnadzor.ru"}
+    GOV_SUFFIXES = (".gov.ru", ".gkh.ru", ".fssprus.ru", ".vsrf.ru")
+    SEARCH_QUERY_TEMPLATES = (
+        "{q} ЖКХ ФЗ 229-ФЗ",
+        "{q} судебная практика по запрету выезда за долги",
+        "{q} как списать долг за ЖКХ через банкротство",
+        "{q} образец заявления о рассрочке долга УК",
+        "{q} срок исковой давности по долгам ЖКХ",
+    )
+    PENALTY_KEYWORDS = (
+        "пени", "пеня", "неустойка", "штраф за просрочку",
+        "ставка цб", "ключевая ставка", "расчет пени",
+    )
+
     def __init__(self):
         # Расширенный и структурированный словарь с синонимами и контекстами
-        self.term_map = self._build_term_map()
-        keywords = self._flatten_term_map(self.term_map)
+        self.term_map, keywords = self._shared_term_map()
         
         super().__init__("Управление долгами", keywords)
 
@@ -5194,192 +3734,75 @@ class DebtManagementAgent(RAGAgent):
             },
         }
 
-    def _flatten_term_map(self, term_map: Dict) -> List[str]:
-        """Преобразует структурированный словарь в плоский список уникальных ключевых слов."""
-        keywords = set()
-        for term, data in term_map.items():
-            keywords.add(term.lower())  # оригинальный ключ
-            for synonym in data.get("synonyms", []):
-                keywords.add(synonym.lower())
-            # Добавляем ключи из контекстов
-            contexts = data.get("contexts", [])
-            if isinstance(contexts, dict):
-                for ctx_key in contexts.keys():
-                    keywords.add(ctx_key.lower())
-            elif isinstance(contexts, list):
-                for ctx in contexts:
-                    keywords.add(ctx.lower())
-        return list(keywords)
-
-    def _perform_web_search(self, query: str, max_results: int = 3) -> str:
-        """
-        Улучшенный веб-поиск: приоритет официальным источникам, фильтрация, ранжирование.
-        Выполняется ВНУТРИ _build_prompt, как в оригинальной архитектуре.
-        """
-        OFFICIAL_DOMAINS = {
-            "cbr.ru", "government.ru", "kremlin.ru", "rosstat.gov.ru", "minfin.gov.ru",
-            "fas.gov.ru", "gji.ru", "rospotrebnadzor.ru", "rosreestr.gov.ru",
-            "minstroyrf.ru", "fgis-tarif.ru", "consultant.ru", "garant.ru",
-            "pravo.gov.ru", "gkh.ru", "fssprus.ru", "vsrf.ru", "bankrot.fedresurs.ru", "roscomnadzor.ru"
-        }
-
-        BLACKLISTED_DOMAINS = {
-            "otvet.mail.ru", "ask.fm", "irecommend.ru", "pikabu.ru",
-            "zen.yandex.ru", "thequestion.ru", "quora.com", "reddit.com",
-            "fishki.net", "yaplakal.com", "blog", "forum"
-        }
-
-        # Генерируем расширенные поисковые запросы
-        expanded_queries = self._expand_search_query(query)
-        all_results = []
-
-        for attempt in range(2):
-            try:
-                with DDGS(timeout=10) as ddgs:
-                    for q in expanded_queries:
-                        results = ddgs.text(q, max_results=5)
-                        for r in results:
-                            href = r.get('href', '')
-                            if not href:
-                                continue
-                            
-                            try:
-                                domain = href.split('/')[2].lower()
-                            except IndexError:
-                                continue
-
-                            if any(bad in domain for bad in BLACKLISTED_DOMAINS):
-                                continue
-
-                            weight = 3 if any(official in domain for official in OFFICIAL_DOMAINS) else \
-                                     2 if any(gov in domain for gov in [".gov.ru", ".gkh.ru", ".fssprus.ru", ".vsrf.ru"]) else 1
-
-                            snippet = {
-                                "body": r['body'],
-                                "href": href,
-                                "title": r.get('title', ''),
-                                "weight": weight
-                            }
-                            all_results.append(snippet)
-
-                    all_results = sorted(all_results, key=lambda x: x['weight'], reverse=True)
-                    seen_bodies = set()
-                    unique_results = []
-                    for r in all_results:
-                        body_hash = hash(r['body'][:100])
-                        if body_hash not in seen_bodies:
-                            seen_bodies.add(body_hash)
-                            unique_results.append(r)
-                            if len(unique_results) >= max_results:
-                                break
-
-                    if unique_results:
-                        formatted = []
-                        for r in unique_results:
-                            prefix = "[ОФИЦИАЛЬНЫЙ ИСТОЧНИК] " if r['weight'] >= 2 else ""
-                            formatted.append(f"{prefix}• {r['body']}\n  Источник: {r['href']}\n")
-                        return "\n".join(formatted).strip()
-                    else:
-                        return "По вашему запросу ничего не найдено в надёжных источниках."
-
-            except Exception as e:
-                if attempt == 0:
-                    time.sleep(2)
-                    continue
-                return f"Ошибка веб-поиска: {str(e)}"
-
-        return "Не удалось выполнить веб-поиск. Попробуйте позже."
+    # Агент: Управление задолженностью ЖКХ
+    # Системный промт:
+    # - Фокус: задолженность, пени, рассрочка, взыскание, исполнительное производство, банкротство
+    # - Жёсткая структура и ссылки на нормативные акты
+    PROMPT_TEMPLATE = (
+        "Ты — эксперт по управлению задолженностью в ЖКХ. Дай точный, структурированный и юридически корректный ответ, "
+        "используя ТОЛЬКО контекст, веб-результаты и обновления.\n\n"
+        "**ЖЕСТКИЕ ПРАВИЛА:**\n"
+        "1. Если данных нет — отвечай: 'Недостаточно данных для точного ответа.'\n"
+        "2. Структура ответа: Краткий вывод → Нормативное обоснование → Пошаговая инструкция → Судебная практика.\n"
+        "3. Подкрепляй каждое утверждение ссылками на нормативные акты ([ЖК РФ, ст. 155.1], [ФЗ №229-ФЗ, ст. 69]).\n"
+        "4. Формулы пени только при наличии ключевых слов.\n"
+        "5. Приоритет источников: ЖК РФ > ФЗ > ПП РФ > судебная практика.\n\n"
+        "### Контекст:\n"
+        "{context_text}\n\n"
+        "### Веб-поиск:\n"
+        "{web_results}\n\n"
+        "### Дополнительные обновления:\n"
+        "{extra}\n\n"
+        "### Структура ответа:\n"
+        "- Краткий вывод (1-2 предложения: что делать, права, сроки)\n"
+        "- Нормативное обоснование (ЖК РФ, ФЗ, ПП РФ, ссылки на статьи)\n"
+        "- Пошаговая инструкция:\n"
+        "  * Рассрочка платежей (ЖК РФ, ст. 155.1)\n"
+        "  * Подача претензий и обращений в УК, ГЖИ (ФЗ №59-ФЗ, ст. 12)\n"
+        "  * Взыскание задолженности через суд (ГПК РФ, ст. 131)\n"
+        "  * Исполнительное производство (ФЗ №229-ФЗ, ст. 69)\n"
+        "  * Банкротство должника (ФЗ №127-ФЗ)\n"
+        "{penalty_block}\n"
+        "### Судебная практика:\n"
+        "[**Определение ВС РФ №XXX-ЭСXX-XXXX от ДД.ММ.ГГГГ** — краткая позиция суда]\n"
+        "Если судебных решений нет: 'Судебная практика по данному вопросу в базе отсутствует'.\n\n"
+        "### Ключевые нормативные акты:\n"
+        "- Жилищный кодекс РФ (ст. 155, 155.1, 158 — сроки оплаты, пени, взыскание)\n"
+        "- ФЗ №229-ФЗ «Об исполнительном производстве»\n"
+        "- ФЗ №230-ФЗ «О защите прав должников»\n"
+        "- ФЗ №127-ФЗ «О банкротстве»\n"
+        "- ГК РФ (ст. 196 — исковая давность)\n"
+        "- ПП РФ №354 (раздел 8 — порядок расчётов)\n\n"
+        "{role_instruction}"
+    )
+    PENALTY_BLOCK = (
+        "\n**Расчет пени (актуальная формула):**\n"
+        "- Пени = Сумма долга × Дни просрочки × (Ключевая ставка ЦБ РФ / 300 / 100)\n"
+        "- Нормативная база: [ЖК РФ, ст. 155.1]\n"
+        "- Ограничение: ≤ 9.5% годовых [ФЗ №44-ФЗ, ПП РФ №329]\n"
+        "- Пример: долг 10 000 руб., просрочка 30 дней → Пени = 95 руб.\n"
+        "- Начало начисления: с 31-го дня после срока оплаты.\n"
+    )
 
-    def _expand_search_query(self, query: str) -> List[str]:
-        """Генерирует несколько вариантов поискового запроса для лучшего покрытия темы."""
-        queries = [query]
-        queries.append(f"{query} ЖКХ ФЗ 229-ФЗ")
-        queries.append(f"{query} судебная практика по запрету выезда за долги")
-        queries.append(f"{query} как списать долг за ЖКХ через банкротство")
-        queries.append(f"{query} образец заявления о рассрочке долга УК")
-        queries.append(f"{query} срок исковой давности по долгам ЖКХ")
-        # Добавляем синонимы
-        for term, data in self.term_map.items():
-            if term in query.lower() or any(syn in query.lower() for syn in data.get("synonyms", [])):
-                for synonym in data.get("synonyms", [])[:2]:
-                    new_q = query.replace(term, synonym) if term in query else query + " " + synonym
-                    queries.append(new_q)
-        return list(set(queries))
-
-    def _build_prompt(self, summary: str, context_text: str, role: str = "смешанная") -> str:
-        """
-        Агент: Управление задолженностью ЖКХ
-        Формирует системный промт:
-        - Фокус: задолженность, пени, рассрочка, взыскание, исполнительное производство, банкротство
-        - Жёсткая структура и ссылки на нормативные акты
-        """
-        extra = self.improve_prompt_from_feedback()
-        web_results = self._perform_web_search(summary)
-    
-        penalty_keywords = [
-            "пени", "пеня", "неустойка", "штраф за просрочку",
-            "ставка цб", "ключевая ставка", "расчет пени"
-        ]
-        should_calculate_penalty = any(kw in summary.lower() for kw in penalty_keywords)
-    
-        # --- SYSTEM PROMPT ---
-        system_prompt = (
-            "Ты — эксперт по управлению задолженностью в ЖКХ. Дай точный, структурированный и юридически корректный ответ, "
-            "используя ТОЛЬКО контекст, веб-результаты и обновления.\n\n"
-            "**ЖЕСТКИЕ ПРАВИЛА:**\n"
-            "1. Если данных нет — отвечай: 'Недостаточно данных для точного ответа.'\n"
-            "2. Структура ответа: Краткий вывод → Нормативное обоснование → Пошаговая инструкция → Судебная практика.\n"
-            "3. Подкрепляй каждое утверждение ссылками на нормативные акты ([ЖК РФ, ст. 155.1], [ФЗ №229-ФЗ, ст. 69]).\n"
-            "4. Формулы пени только при наличии ключевых слов.\n"
-            "5. Приоритет источников: ЖК РФ > ФЗ > ПП РФ > судебная практика.\n\n"
-            f"### Контекст:\n{context_text}\n\n"
-            f"### Веб-поиск:\n{web_results}\n\n"
-            f"### Дополнительные обновления:\n{extra}\n\n"
-            "### Структура ответа:\n"
-            "- Краткий вывод (1-2 предложения: что делать, права, сроки)\n"
-            "- Нормативное обоснование (ЖК РФ, ФЗ, ПП РФ, ссылки на статьи)\n"
-            "- Пошаговая инструкция:\n"
-            "  * Рассрочка платежей (ЖК РФ, ст. 155.1)\n"
-            "  * Подача претензий и обращений в УК, ГЖИ (ФЗ №59-ФЗ, ст. 12)\n"
-            "  * Взыскание задолженности через суд (ГПК РФ, ст. 131)\n"
-            "  * Исполнительное производство (ФЗ №229-ФЗ, ст. 69)\n"
-            "  * Банкротство должника (ФЗ №127-ФЗ)\n"
-        )
-    
-        if should_calculate_penalty:
-            system_prompt += (
-                "\n**Расчет пени (актуальная формула):**\n"
-                "- Пени = Сумма долга × Дни просрочки × (Ключевая ставка ЦБ РФ / 300 / 100)\n"
-                "- Нормативная база: [ЖК РФ, ст. 155.1]\n"
-                "- Ограничение: ≤ 9.5% годовых [ФЗ №44-ФЗ, ПП РФ №329]\n"
-                "- Пример: долг 10 000 руб., просрочка 30 дней → Пени = 95 руб.\n"
-                "- Начало начисления: с 31-го дня после срока оплаты.\n"
-            )
-    
-        system_prompt += (
-            "\n### Судебная практика:\n"
-            "[**Определение ВС РФ №XXX-ЭСXX-XXXX от ДД.ММ.ГГГГ** — краткая позиция суда]\n"
-            "Если судебных решений нет: 'Судебная практика по данному вопросу в базе отсутствует'.\n\n"
-            "### Ключевые нормативные акты:\n"
-            "- Жилищный кодекс РФ (ст. 155, 155.1, 158 — сроки оплаты, пени, взыскание)\n"
-            "- ФЗ №229-ФЗ «Об исполнительном производстве»\n"
-            "- ФЗ №230-ФЗ «О защите прав должников»\n"
-            "- ФЗ №127-ФЗ «О банкротстве»\n"
-            "- ГК РФ (ст. 196 — исковая давность)\n"
-            "- ПП РФ №354 (раздел 8 — порядок расчётов)\n\n"
-            f"{self.get_role_instruction(role)}"
-        )
-    
-        return (
-            "<|begin_of_text|><|start_header_id|>system<|end_header_id|>\n"
-            f"{system_prompt}<|eot_id|>"
-        )
         
 class IoTIntegrationAgent(RAGAgent):
+    OFFICIAL_DOMAINS = RAGAgent.OFFICIAL_DOMAINS | {"digital.gov.ru", "roskomnadzor.ru", "fct.gov.ru"}
+    GOV_SUFFIXES = (".gov.ru", ".gkh.ru", ".roskomnadzor.ru", ".digital.gov.ru")
+    SEARCH_QUERY_TEMPLATES = (
+        "{q} ФЗ 152-ФЗ IoT ЖКХ",
+        "{q} ПП РФ 689 персональные данные",
+        "{q} умные счётчики интеграция API",
+        "{q} уведомления в Telegram датчики протечки",
+        "{q} MQTT Zigbee LoRaWAN сравнение",
+    )
+    PENALTY_KEYWORDS = (
+        "пени", "пеня", "неустойка", "штраф за просрочку",
+        "ставка цб", "ключевая ставка", "расчет пени",
+    )
+
     def __init__(self):
         # Расширенный и структурированный словарь с синонимами и контекстами
-        self.term_map = self._build_term_map()
-        keywords = self._flatten_term_map(self.term_map)
+        self.term_map, keywords = self._shared_term_map()
         
         super().__init__("Интеграция с IoT", keywords)
 
@@ -5463,186 +3886,75 @@ class IoTIntegrationAgent(RAGAgent):
             },
         }
 
-    def _flatten_term_map(self, term_map: Dict) -> List[str]:
-        """Преобразует структурированный словарь в плоский список уникальных ключевых слов."""
-        keywords = set()
-        for term, data in term_map.items():
-            keywords.add(term.lower())  # оригинальный ключ
-            for synonym in data.get("synonyms", []):
-                keywords.add(synonym.lower())
-            # Добавляем ключи из контекстов
-            contexts = data.get("contexts", [])
-            if isinstance(contexts, dict):
-                for ctx_key in contexts.keys():
-                    keywords.add(ctx_key.lower())
-            elif isinstance(contexts, list):
-                for ctx in contexts:
-                    keywords.add(ctx.lower())
-        return list(keywords)
-
-    def _perform_web_search(self, query: str, max_results: int = 3) -> str:
-        """
-        Улучшенный веб-поиск: приоритет официальным источникам, фильтрация, ранжирование.
-        Выполняется ВНУТРИ _build_prompt, как в оригинальной архитектуре.
-        """
-        OFFICIAL_DOMAINS = {
-            "cbr.ru", "government.ru", "kremlin.ru", "rosstat.gov.ru", "minfin.gov.ru",
-            "fas.gov.ru", "gji.ru", "rospotrebnadzor.ru", "rosreestr.gov.ru",
-            "minstroyrf.ru", "fgis-tarif.ru", "consultant.ru", "garant.ru",
-            "pravo.gov.ru", "gkh.ru", "digital.gov.ru", "roskomnadzor.ru", "fct.gov.ru"
-        }
-
-        BLACKLISTED_DOMAINS = {
-            "otvet.mail.ru", "ask.fm", "irecommend.ru", "pikabu.ru",
-            "zen.yandex.ru", "thequestion.ru", "quora.com", "reddit.com",
-            "fishki.net", "yaplakal.com", "blog", "forum"
-        }
-
-        # Генерируем расширенные поисковые запросы
-        expanded_queries = self._expand_search_query(query)
-        all_results = []
-
-        for attempt in range(2):
-            try:
-                with DDGS(timeout=10) as ddgs:
-                    for q in expanded_queries:
-                        results = ddgs.text(q, max_results=5)
-                        for r in results:
-                            href = r.get('href', '')
-                            if not href:
-                                continue
-                            
-                            try:
-                                domain = href.split('/')[2].lower()
-                            except IndexError:
-                                continue
-
-                            if any(bad in domain for bad in BLACKLISTED_DOMAINS):
-                                continue
-
-                            weight = 3 if any(official in domain for official in OFFICIAL_DOMAINS) else \
-                                     2 if any(gov in domain for gov in [".gov.ru", ".gkh.ru", ".roskomnadzor.ru", ".digital.gov.ru"]) else 1
-
-                            snippet = {
-                                "body": r['body'],
-                                "href": href,
-                                "title": r.get('title', ''),
-                                "weight": weight
-                            }
-                            all_results.append(snippet)
-
-                    all_results = sorted(all_results, key=lambda x: x['weight'], reverse=True)
-                    seen_bodies = set()
-                    unique_results = []
-                    for r in all_results:
-                        body_hash = hash(r['body'][:100])
-                        if body_hash not in seen_bodies:
-                            seen_bodies.add(body_hash)
-                            unique_results.append(r)
-                            if len(unique_results) >= max_results:
-                                break
-
-                    if unique_results:
-                        formatted = []
-                        for r in unique_results:
-                            prefix = "[ОФИЦИАЛЬНЫЙ ИСТОЧНИК] " if r['weight'] >= 2 else ""
-                            formatted.append(f"{prefix}• {r['body']}\n  Источник: {r['href']}\n")
-                        return "\n".join(formatted).strip()
-                    else:
-                        return "По вашему запросу ничего не найдено в надёжных источниках."
-
-            except Exception as e:
-                if attempt == 0:
-                    time.sleep(2)
-                    continue
-                return f"Ошибка веб-поиска: {str(e)}"
-
-        return "Не удалось выполнить веб-поиск. Попробуйте позже."
+    # Агент: Интеграция с IoT и цифровой мониторинг ЖКХ
+    # Системный промт:
+    # - Фокус: IoT, цифровой мониторинг, интеграции, уведомления, нормативы по данным
+    # - Жёсткая структура и ссылки на нормативные акты
+    PROMPT_TEMPLATE = (
+        "Ты — эксперт по внедрению IoT и цифрового мониторинга в ЖКХ. Дай точный, "
+        "структурированный и юридически корректный ответ, используя ТОЛЬКО контекст, веб-результаты и обновления.\n\n"
+        "**ЖЕСТКИЕ ПРАВИЛА:**\n"
+        "1. Если данных нет — отвечай: 'Недостаточно данных для точного ответа.'\n"
+        "2. Структура ответа: Краткий вывод → Техническое решение → Нормативные требования → Рекомендации.\n"
+        "3. Подкрепляй каждое утверждение ссылками на нормативные акты ([ФЗ №152-ФЗ, ст. 9], [ПП РФ №689, п. 4]).\n"
+        "4. Формулы пени только при наличии ключевых слов.\n"
+        "5. Приоритет источников: ФЗ > ПП РФ > технические стандарты.\n\n"
+        "### Контекст:\n"
+        "{context_text}\n\n"
+        "### Веб-поиск:\n"
+        "{web_results}\n\n"
+        "### Дополнительные обновления:\n"
+        "{extra}\n\n"
+        "### Структура ответа:\n"
+        "- Краткий вывод (1-2 предложения)\n"
+        "- Техническое решение / Возможности (устройства, интеграция, уведомления)\n"
+        "- Нормативные требования (обработка данных, согласие жильцов, меры безопасности)\n"
+        "- Рекомендации по внедрению (этапы, юридические риски, примеры кейсов)\n"
+        "{penalty_block}\n"
+        "### Ключевые нормативные акты:\n"
+        "- ФЗ №152-ФЗ «О персональных данных»\n"
+        "- ПП РФ №689 «Об утверждении требований к защите персональных данных»\n"
+        "- ФЗ №149-ФЗ «Об информации, ИТ и защите информации»\n"
+        "- ФЗ №261-ФЗ (умные счётчики)\n"
+        "- ПП РФ №354 (интеграция показаний счётчиков)\n\n"
+        "{role_instruction}"
+    )
+    PENALTY_BLOCK = (
+        "\n**Расчет пени (актуальная формула):**\n"
+        "- Пени = Сумма долга × Дни просрочки × (Ключевая ставка ЦБ РФ / 300 / 100)\n"
+        "- Нормативная база: [ЖК РФ, ст. 155.1]\n"
+        "- Ограничение: ≤ 9.5% годовых [ФЗ №44-ФЗ, ПП РФ №329]\n"
+        "- Пример: долг 10 000 руб., просрочка 30 дней → Пени = 95 руб.\n"
+        "- Начало начисления: с 31-го дня после срока оплаты.\n"
+    )
 
-    def _expand_search_query(self, query: str) -> List[str]:
-        """Генерирует несколько вариантов поискового запроса для лучшего покрытия темы."""
-        queries = [query]
-        queries.append(f"{query} ФЗ 152-ФЗ IoT ЖКХ")
-        queries.append(f"{query} ПП РФ 689 персональные данные")
-        queries.append(f"{query} умные счётчики интеграция API")
-        queries.append(f"{query} уведомления в Telegram датчики протечки")
-        queries.append(f"{query} MQTT Zigbee LoRaWAN сравнение")
-        # Добавляем синонимы
-        for term, data in self.term_map.items():
-            if term in query.lower() or any(syn in query.lower() for syn in data.get("synonyms", [])):
-                for synonym in data.get("synonyms", [])[:2]:
-                    new_q = query.replace(term, synonym) if term in query else query + " " + synonym
-                    queries.append(new_q)
-        return list(set(queries))
-
-    def _build_prompt(self, summary: str, context_text: str, role: str = "смешанная") -> str:
-        """
-        Агент: Интеграция с IoT и цифровой мониторинг ЖКХ
-        Формирует системный промт:
-        - Фокус: IoT, цифровой мониторинг, интеграции, уведомления, нормативы по данным
-        - Жёсткая структура и ссылки на нормативные акты
-        """
-        extra = self.improve_prompt_from_feedback()
-        web_results = self._perform_web_search(summary)
-    
-        penalty_keywords = [
-            "пени", "пеня", "неустойка", "штраф за просрочку",
-            "ставка цб", "ключевая ставка", "расчет пени"
-        ]
-        should_calculate_penalty = any(kw in summary.lower() for kw in penalty_keywords)
-    
-        # --- SYSTEM PROMPT ---
-        system_prompt = (
-            "Ты — эксперт по внедрению IoT и цифрового мониторинга в ЖКХ. "
-            "Дай точный, структурированный и юридически корректный ответ, "
-            "используя ТОЛЬКО контекст, веб-результаты и обновления.\n\n"
-            "**ЖЕСТКИЕ ПРАВИЛА:**\n"
-            "1. Если данных нет — отвечай: 'Недостаточно данных для точного ответа.'\n"
-            "2. Структура ответа: Краткий вывод → Техническое решение → Нормативные требования → Рекомендации.\n"
-            "3. Подкрепляй каждое утверждение ссылками на нормативные акты ([ФЗ №152-ФЗ, ст. 9], [ПП РФ №689, п. 4]).\n"
-            "4. Формулы пени только при наличии ключевых слов.\n"
-            "5. Приоритет источников: ФЗ > ПП РФ > технические стандарты.\n\n"
-            f"### Контекст:\n{context_text}\n\n"
-            f"### Веб-поиск:\n{web_results}\n\n"
-            f"### Дополнительные обновления:\n{extra}\n\n"
-            "### Структура ответа:\n"
-            "- Краткий вывод (1-2 предложения)\n"
-            "- Техническое решение / Возможности (устройства, интеграция, уведомления)\n"
-            "- Нормативные требования (обработка данных, согласие жильцов, меры безопасности)\n"
-            "- Рекомендации по внедрению (этапы, юридические риски, примеры кейсов)\n"
-        )
-    
-        if should_calculate_penalty:
-            system_prompt += (
-                "\n**Расчет пени (актуальная формула):**\n"
-                "- Пени = Сумма долга × Дни просрочки × (Ключевая ставка ЦБ РФ / 300 / 100)\n"
-                "- Нормативная база: [ЖК РФ, ст. 155.1]\n"
-                "- Ограничение: ≤ 9.5% годовых [ФЗ №44-ФЗ, ПП РФ №329]\n"
-                "- Пример: долг 10 000 руб., просрочка 30 дней → Пени = 95 руб.\n"
-                "- Начало начисления: с 31-го дня после срока оплаты.\n"
-            )
-    
-        system_prompt += (
-            "\n### Ключевые нормативные акты:\n"
-            "- ФЗ №152-ФЗ «О персональных данных»\n"
-            "- ПП РФ №689 «Об утверждении требований к защите персональных данных»\n"
-            "- ФЗ №149-ФЗ «Об информации, ИТ и защите информации»\n"
-            "- ФЗ №261-ФЗ (умные счётчики)\n"
-            "- ПП РФ №354 (интеграция показаний счётчиков)\n\n"
-            f"{self.get_role_instruction(role)}"
-        )
-    
-        return (
-            "<|begin_of_text|><|start_header_id|>system<|end_header_id|>\n"
-            f"{system_prompt}<|eot_id|>"
-        )
 
         
 class WasteManagementAgent(RAGAgent):
+    OFFICIAL_DOMAINS = RAGAgent.OFFICIAL_DOMAINS | {"rpn.gov.ru", "mnr.gov.ru", "rosconsumnadzor.ru", "vsrf.ru"}
+    GOV_SUFFIXES = (".gov.ru", ".gkh.ru", ".rpn.gov.ru", ".vsrf.ru")
+    SEARCH_QUERY_TEMPLATES = (
+        "{q} ФЗ 89-ФЗ ТКО",
+        "{q} ПП РФ 354 раздел 8",
+        "{q} судебная практика по перерасчету за ТКО",
+        "{q} класс опасности батареек лампочек",
+        "{q} куда сдать автошины покрышки",
+    )
+    # Упоминания опасных отходов и смешивания включают в промт соответствующие блоки
+    HAZARDOUS_KEYWORDS = (
+        "автошины", "покрышки", "резина", "батарейки", "лампочки",
+        "энергосберегающие лампы", "ртутьсодержащие", "градусник",
+        "термометр", "медицинские отходы", "ртуть", "кислота",
+        "краска", "лак", "масло", "строительный мусор", "техника", "мебель",
+    )
+    MIXING_KEYWORDS = (
+        "смешивание", "смешивать", "батарейки с мусором", "ртуть в контейнере",
+        "опасные с бытовыми", "нарушение сортировки", "вместе с тко",
+    )
+
     def __init__(self):
         # Расширенный и структурированный словарь с синонимами и контекстами
-        self.term_map = self._build_term_map()
-        keywords = self._flatten_term_map(self.term_map)
+        self.term_map, keywords = self._shared_term_map()
         
         super().__init__("Вывоз ТКО", keywords)
 
@@ -5726,213 +4038,83 @@ class WasteManagementAgent(RAGAgent):
             },
         }
 
-    def _flatten_term_map(self, term_map: Dict) -> List[str]:
-        """Преобразует структурированный словарь в плоский список уникальных ключевых слов."""
-        keywords = set()
-        for term, data in term_map.items():
-            keywords.add(term.lower())  # оригинальный ключ
-            for synonym in data.get("synonyms", []):
-                keywords.add(synonym.lower())
-            # Добавляем ключи из контекстов
-            contexts = data.get("contexts", [])
-            if isinstance(contexts, dict):
-                for ctx_key in contexts.keys():
-                    keywords.add(ctx_key.lower())
-            elif isinstance(contexts, list):
-                for ctx in contexts:
-                    keywords.add(ctx.lower())
-        return list(keywords)
-
-    def _perform_web_search(self, query: str, max_results: int = 3) -> str:
-        """
-        Улучшенный веб-поиск: приоритет официальным источникам, фильтрация, ранжирование.
-        Выполняется ВНУТРИ _build_prompt, как в оригинальной архитектуре.
-        """
-        OFFICIAL_DOMAINS = {
-            "cbr.ru", "government.ru", "kremlin.ru", "rosstat.gov.ru", "minfin.gov.ru",
-            "fas.gov.ru", "gji.ru", "rospotrebnadzor.ru", "rosreestr.gov.ru",
-            "minstroyrf.ru", "fgis-tarif.ru", "consultant.ru", "garant.ru",
-            "pravo.gov.ru", "gkh.ru", "rpn.gov.ru", "mnr.gov.ru", "rosconsumnadzor.ru", "vsrf.ru"
-        }
-
-        BLACKLISTED_DOMAINS = {
-            "otvet.mail.ru", "ask.fm", "irecommend.ru", "pikabu.ru",
-            "zen.yandex.ru", "thequestion.ru", "quora.com", "reddit.com",
-            "fishki.net", "yaplakal.com", "blog", "forum"
-        }
-
-        # Генерируем расширенные поисковые запросы
-        expanded_queries = self._expand_search_query(query)
-        all_results = []
-
-        for attempt in range(2):
-            try:
-                with DDGS(timeout=10) as ddgs:
-                    for q in expanded_queries:
-                        results = ddgs.text(q, max_results=5)
-                        for r in results:
-                            href = r.get('href', '')
-                            if not href:
-                                continue
-                            
-                            try:
-                                domain = href.split('/')[2].lower()
-                            except IndexError:
-                                continue
-
-                            if any(bad in domain for bad in BLACKLISTED_DOMAINS):
-                                continue
-
-                            weight = 3 if any(official in domain for official in OFFICIAL_DOMAINS) else \
-                                     2 if any(gov in domain for gov in [".gov.ru", ".gkh.ru", ".rpn.gov.ru", ".vsrf.ru"]) else 1
-
-                            snippet = {
-                                "body": r['body'],
-                                "href": href,
-                                "title": r.get('title', ''),
-                                "weight": weight
-                            }
-                            all_results.append(snippet)
-
-                    all_results = sorted(all_results, key=lambda x: x['weight'], reverse=True)
-                    seen_bodies = set()
-                    unique_results = []
-                    for r in all_results:
-                        body_hash = hash(r['body'][:100])
-                        if body_hash not in seen_bodies:
-                            seen_bodies.add(body_hash)
-                            unique_results.append(r)
-                            if len(unique_results) >= max_results:
-                                break
-
-                    if unique_results:
-                        formatted = []
-                        for r in unique_results:
-                            prefix = "[ОФИЦИАЛЬНЫЙ ИСТОЧНИК] " if r['weight'] >= 2 else ""
-                            formatted.append(f"{prefix}• {r['body']}\n  Источник: {r['href']}\n")
-                        return "\n".join(formatted).strip()
-                    else:
-                        return "По вашему запросу ничего не найдено в надёжных источниках."
-
-            except Exception as e:
-                if attempt == 0:
-                    time.sleep(2)
-                    continue
-                return f"Ошибка веб-поиска: {str(e)}"
+    # Агент: Вывоз ТКО
+    # Системный промт:
+    # - Фокус: классификация отходов, запрет смешивания, порядок утилизации, расчёт платы, нормативы
+    # - Жёсткая структура и ссылки на нормативные акты
+    PROMPT_TEMPLATE = (
+        "Ты — эксперт по обращению с твёрдыми коммунальными отходами (ТКО) в ЖКХ. Отвечай строго по нормативам, "
+        "без выдуманных данных, используя ТОЛЬКО предоставленный контекст и обновления.\n\n"
+        "**ЖЕСТКИЕ ПРАВИЛА:**\n"
+        "1. Если данных нет — отвечай: 'Недостаточно данных для точного ответа. Обратитесь в УК.'\n"
+        "2. Указывай ссылки на нормативные акты (ФЗ, ПП РФ, СанПиН, КоАП).\n"
+        "3. Структура: краткий вывод → нормативы → классификация отходов → запрет смешивания → порядок утилизации → перерасчёты → судебная практика.\n"
+        "4. Формулы пени включай только при упоминании пени или штрафов.\n"
+        "5. Приоритет региональных актов над федеральными.\n\n"
+        "### Контекст:\n"
+        "{context_text}\n\n"
+        "### Веб-поиск:\n"
+        "{web_results}\n\n"
+        "### Дополнительные обновления:\n"
+        "{extra}\n\n"
+        "{hazardous_block}"
+        "{mixing_block}"
+        "--- Основной ответ ---\n"
+        "Краткий вывод: [1-2 предложения — что делать, куда обращаться]\n"
+        "Нормативное обоснование: [ФЗ №89-ФЗ, ПП РФ, СанПиН]\n"
+        "Пошаговая инструкция: [расчёт платы, перерасчёт, ответственные лица, утилизация]\n"
+        "Судебная практика: [если есть, указать; иначе 'отсутствует']\n\n"
+        "### Ключевые нормативные акты:\n"
+        "- ФЗ №89-ФЗ «Об отходах производства и потребления»\n"
+        "- ПП РФ №354 (расчёт платы за ТКО)\n"
+        "- ПП РФ №491 (контейнерные площадки)\n"
+        "- СанПиН 1.2.3685-21\n"
+        "- КоАП РФ, ст. 8.2\n"
+        "{penalty_block}{role_instruction}"
+    )
+    PENALTY_BLOCK = (
+        "\n**Расчёт пени (если упомянут):**\n"
+        "- Пени = Сумма долга × Дни просрочки × (Ключевая ставка ЦБ РФ / 300 / 100)\n"
+        "- Основание: [ЖК РФ, ст.155.1], [ФЗ №44-ФЗ], [ПП РФ №329]\n"
+        "- Ограничение: ≤ 9.5% годовых\n"
+        "- Пример: 10 000 руб., просрочка 30 дней → 95 руб.\n"
+        "- Начало начисления: с 31-го дня после срока оплаты\n"
+    )
+    HAZARDOUS_BLOCK = (
+        "--- Классификация отходов ---\n"
+        "1. Класс опасности: [указать из контекста или 'не указан']\n"
+        "2. Относится ли к ТКО: [Да/Нет]\n"
+        "3. Разрешено захоронение: [Да/Нет, если нет — ФЗ №89-ФЗ, ст.12]\n"
+        "4. Ответственный за утилизацию: [Собственник/Гражданин]\n"
+        "5. Способ утилизации: [пункты приёма, спецтехника]\n\n"
+    )
+    MIXING_BLOCK = (
+        "--- Запрет смешивания ---\n"
+        "Смешивание отходов разных классов опасности строго запрещено ФЗ №89-ФЗ, ст. 13.1.\n"
+        "Нарушение влечет ответственность по ст. 8.2 КоАП РФ.\n\n"
+    )
 
-        return "Не удалось выполнить веб-поиск. Попробуйте позже."
+    def _prompt_blocks(self, q_lower: str) -> Dict[str, str]:
+        blocks = super()._prompt_blocks(q_lower)
+        blocks["hazardous_block"] = self.HAZARDOUS_BLOCK if any(kw in q_lower for kw in self.HAZARDOUS_KEYWORDS) else ""
+        blocks["mixing_block"] = self.MIXING_BLOCK if any(kw in q_lower for kw in self.MIXING_KEYWORDS) else ""
+        return blocks
 
-    def _expand_search_query(self, query: str) -> List[str]:
-        """Генерирует несколько вариантов поискового запроса для лучшего покрытия темы."""
-        queries = [query]
-        queries.append(f"{query} ФЗ 89-ФЗ ТКО")
-        queries.append(f"{query} ПП РФ 354 раздел 8")
-        queries.append(f"{query} судебная практика по перерасчету за ТКО")
-        queries.append(f"{query} класс опасности батареек лампочек")
-        queries.append(f"{query} куда сдать автошины покрышки")
-        # Добавляем синонимы
-        for term, data in self.term_map.items():
-            if term in query.lower() or any(syn in query.lower() for syn in data.get("synonyms", [])):
-                for synonym in data.get("synonyms", [])[:2]:
-                    new_q = query.replace(term, synonym) if term in query else query + " " + synonym
-                    queries.append(new_q)
-        return list(set(queries))
-
-    def _build_prompt(self, summary: str, context_text: str, role: str = "смешанная") -> str:
-        """
-        Агент: Вывоз ТКО
-        Формирует системный промт:
-        - Фокус: классификация отходов, запрет смешивания, порядок утилизации, расчёт платы, нормативы
-        - Жёсткая структура и ссылки на нормативные акты
-        """
-        extra = self.improve_prompt_from_feedback()
-        web_results = self._perform_web_search(summary)
-    
-        penalty_keywords = ["пени", "неустойка", "штраф за просрочку", "ставка цб", "9.5%", "ключевая ставка"]
-        q_lower = summary.lower()
-        should_calculate_penalty = any(kw in q_lower for kw in penalty_keywords)
-    
-        hazardous_keywords = [
-            "автошины", "покрышки", "резина", "батарейки", "лампочки",
-            "энергосберегающие лампы", "ртутьсодержащие", "градусник",
-            "термометр", "медицинские отходы", "ртуть", "кислота",
-            "краска", "лак", "масло", "строительный мусор", "техника", "мебель"
-        ]
-        mentions_hazardous = any(kw in q_lower for kw in hazardous_keywords)
-    
-        mixing_keywords = [
-            "смешивание", "смешивать", "батарейки с мусором", "ртуть в контейнере",
-            "опасные с бытовыми", "нарушение сортировки", "вместе с тко"
-        ]
-        mentions_mixing = any(kw in q_lower for kw in mixing_keywords)
-    
-        system_prompt = (
-            "Ты — эксперт по обращению с твёрдыми коммунальными отходами (ТКО) в ЖКХ. "
-            "Отвечай строго по нормативам, без выдуманных данных, используя ТОЛЬКО предоставленный контекст и обновления.\n\n"
-            "**ЖЕСТКИЕ ПРАВИЛА:**\n"
-            "1. Если данных нет — отвечай: 'Недостаточно данных для точного ответа. Обратитесь в УК.'\n"
-            "2. Указывай ссылки на нормативные акты (ФЗ, ПП РФ, СанПиН, КоАП).\n"
-            "3. Структура: краткий вывод → нормативы → классификация отходов → запрет смешивания → порядок утилизации → перерасчёты → судебная практика.\n"
-            "4. Формулы пени включай только при упоминании пени или штрафов.\n"
-            "5. Приоритет региональных актов над федеральными.\n\n"
-            f"### Контекст:\n{context_text}\n\n"
-            f"### Веб-поиск:\n{web_results}\n\n"
-            f"### Дополнительные обновления:\n{extra}\n\n"
-        )
-    
-        if mentions_hazardous:
-            system_prompt += (
-                "--- Классификация отходов ---\n"
-                "1. Класс опасности: [указать из контекста или 'не указан']\n"
-                "2. Относится ли к ТКО: [Да/Нет]\n"
-                "3. Разрешено захоронение: [Да/Нет, если нет — ФЗ №89-ФЗ, ст.12]\n"
-                "4. Ответственный за утилизацию: [Собственник/Гражданин]\n"
-                "5. Способ утилизации: [пункты приёма, спецтехника]\n\n"
-            )
-    
-        if mentions_mixing:
-            system_prompt += (
-                "--- Запрет смешивания ---\n"
-                "Смешивание отходов разных классов опасности строго запрещено ФЗ №89-ФЗ, ст. 13.1.\n"
-                "Нарушение влечет ответственность по ст. 8.2 КоАП РФ.\n\n"
-            )
-    
-        system_prompt += (
-            "--- Основной ответ ---\n"
-            "Краткий вывод: [1-2 предложения — что делать, куда обращаться]\n"
-            "Нормативное обоснование: [ФЗ №89-ФЗ, ПП РФ, СанПиН]\n"
-            "Пошаговая инструкция: [расчёт платы, перерасчёт, ответственные лица, утилизация]\n"
-            "Судебная практика: [если есть, указать; иначе 'отсутствует']\n\n"
-            "### Ключевые нормативные акты:\n"
-            "- ФЗ №89-ФЗ «Об отходах производства и потребления»\n"
-            "- ПП РФ №354 (расчёт платы за ТКО)\n"
-            "- ПП РФ №491 (контейнерные площадки)\n"
-            "- СанПиН 1.2.3685-21\n"
-            "- КоАП РФ, ст. 8.2\n"
-        )
-    
-        if should_calculate_penalty:
-            system_prompt += (
-                "\n**Расчёт пени (если упомянут):**\n"
-                "- Пени = Сумма долга × Дни просрочки × (Ключевая ставка ЦБ РФ / 300 / 100)\n"
-                "- Основание: [ЖК РФ, ст.155.1], [ФЗ №44-ФЗ], [ПП РФ №329]\n"
-                "- Ограничение: ≤ 9.5% годовых\n"
-                "- Пример: 10 000 руб., просрочка 30 дней → 95 руб.\n"
-                "- Начало начисления: с 31-го дня после срока оплаты\n"
-            )
-    
-        system_prompt += f"{self.get_role_instruction(role)}"
-    
-        return (
-            "<|begin_of_text|><|start_header_id|>system<|end_header_id|>\n"
-            f"{system_prompt}<|eot_id|>"
-        )
 
 class AccountManagementAgent(RAGAgent):
+    OFFICIAL_DOMAINS = RAGAgent.OFFICIAL_DOMAINS | {"gosuslugi.ru", "мфц.рф", "vsrf.ru"}
+    GOV_SUFFIXES = (".gov.ru", ".gkh.ru", ".rosreestr.gov.ru", ".gosuslugi.ru")
+    SEARCH_QUERY_TEMPLATES = (
+        "{q} ЖК РФ ст 154 лицевой счет",
+        "{q} ПП РФ 354 раздел 9",
+        "{q} как разделить лицевой счет судебная практика",
+        "{q} документы для переоформления лицевого счета",
+        "{q} доверенность на управление лицевым счетом ЖКХ",
+    )
+
     def __init__(self):
         # Расширенный и структурированный словарь с синонимами и контекстами
-        self.term_map = self._build_term_map()
-        keywords = self._flatten_term_map(self.term_map)
+        self.term_map, keywords = self._shared_term_map()
         
         super().__init__("Управление лицевыми счетами", keywords)
 
@@ -6016,189 +4198,66 @@ class AccountManagementAgent(RAGAgent):
             },
         }
 
-    def _flatten_term_map(self, term_map: Dict) -> List[str]:
-        """Преобразует структурированный словарь в плоский список уникальных ключевых слов."""
-        keywords = set()
-        for term, data in term_map.items():
-            keywords.add(term.lower())  # оригинальный ключ
-            for synonym in data.get("synonyms", []):
-                keywords.add(synonym.lower())
-            # Добавляем ключи из контекстов
-            contexts = data.get("contexts", [])
-            if isinstance(contexts, dict):
-                for ctx_key in contexts.keys():
-                    keywords.add(ctx_key.lower())
-            elif isinstance(contexts, list):
-                for ctx in contexts:
-                    keywords.add(ctx.lower())
-        return list(keywords)
-
-    def _perform_web_search(self, query: str, max_results: int = 3) -> str:
-        """
-        Улучшенный веб-поиск: приоритет официальным источникам, фильтрация, ранжирование.
-        Выполняется ВНУТРИ _build_prompt, как в оригинальной архитектуре.
-        """
-        OFFICIAL_DOMAINS = {
-            "cbr.ru", "government.ru", "kremlin.ru", "rosstat.gov.ru", "minfin.gov.ru",
-            "fas.gov.ru", "gji.ru", "rospotrebnadzor.ru", "rosreestr.gov.ru",
-            "minstroyrf.ru", "fgis-tarif.ru", "consultant.ru", "garant.ru",
-            "pravo.gov.ru", "gkh.ru", "rosreestr.gov.ru", "gosuslugi.ru", "мфц.рф", "vsrf.ru"
-        }
-
-        BLACKLISTED_DOMAINS = {
-            "otvet.mail.ru", "ask.fm", "irecommend.ru", "pikabu.ru",
-            "zen.yandex.ru", "thequestion.ru", "quora.com", "reddit.com",
-            "fishki.net", "yaplakal.com", "blog", "forum"
-        }
-
-        # Генерируем расширенные поисковые запросы
-        expanded_queries = self._expand_search_query(query)
-        all_results = []
-
-        for attempt in range(2):
-            try:
-                with DDGS(timeout=10) as ddgs:
-                    for q in expanded_queries:
-                        results = ddgs.text(q, max_results=5)
-                        for r in results:
-                            href = r.get('href', '')
-                            if not href:
-                                continue
-                            
-                            try:
-                                domain = href.split('/')[2].lower()
-                            except IndexError:
-                                continue
-
-                            if any(bad in domain for bad in BLACKLISTED_DOMAINS):
-                                continue
-
-                            weight = 3 if any(official in domain for official in OFFICIAL_DOMAINS) else \
-                                     2 if any(gov in domain for gov in [".gov.ru", ".gkh.ru", ".rosreestr.gov.ru", ".gosuslugi.ru"]) else 1
-
-                            snippet = {
-                                "body": r['body'],
-                                "href": href,
-                                "title": r.get('title', ''),
-                                "weight": weight
-                            }
-                            all_results.append(snippet)
-
-                    all_results = sorted(all_results, key=lambda x: x['weight'], reverse=True)
-                    seen_bodies = set()
-                    unique_results = []
-                    for r in all_results:
-                        body_hash = hash(r['body'][:100])
-                        if body_hash not in seen_bodies:
-                            seen_bodies.add(body_hash)
-                            unique_results.append(r)
-                            if len(unique_results) >= max_results:
-                                break
-
-                    if unique_results:
-                        formatted = []
-                        for r in unique_results:
-                            prefix = "[ОФИЦИАЛЬНЫЙ ИСТОЧНИК] " if r['weight'] >= 2 else ""
-                            formatted.append(f"{prefix}• {r['body']}\n  Источник: {r['href']}\n")
-                        return "\n".join(formatted).strip()
-                    else:
-                        return "По вашему запросу ничего не найдено в надёжных источниках."
-
-            except Exception as e:
-                if attempt == 0:
-                    time.sleep(2)
-                    continue
-                return f"Ошибка веб-поиска: {str(e)}"
-
-        return "Не удалось выполнить веб-поиск. Попробуйте позже."
+    # Агент: Управление лицевыми счетами ЖКХ
+    # Системный промт:
+    # - Фокус: открытие, закрытие, разделение, доверенности, смена собственника
+    # - Жёсткая структура с ссылками на нормативные акты
+    PROMPT_TEMPLATE = (
+        "Ты — эксперт по управлению лицевыми счетами в сфере ЖКХ. Отвечай строго по нормативам, без выдуманных данных, "
+        "используя только контекст и обновления.\n\n"
+        "**ЖЕСТКИЕ ПРАВИЛА:**\n"
+        "1. Если данных нет — отвечай: 'Недостаточно данных для точного ответа. Обратитесь в УК.'\n"
+        "2. Указывай ссылки на нормативные акты (ЖК РФ, ПП РФ, ФЗ).\n"
+        "3. Структура: краткий вывод → нормативы → пошаговая инструкция → доверенности → смена собственника → судебная практика.\n"
+        "4. Формулы пени включай только при упоминании пени.\n"
+        "5. Приоритет региональных актов над федеральными.\n\n"
+        "### Контекст:\n"
+        "{context_text}\n\n"
+        "### Веб-поиск:\n"
+        "{web_results}\n\n"
+        "### Дополнительные обновления:\n"
+        "{extra}\n\n"
+        "--- Основной ответ ---\n"
+        "Краткий вывод: [1-2 предложения — что делать, какие документы нужны, куда обращаться]\n"
+        "Нормативное обоснование: [ЖК РФ, ПП РФ, ФЗ]\n"
+        "Пошаговая инструкция:\n"
+        "- Открытие/закрытие/переоформление лицевого счета (документы, сроки — ЖК РФ, ст.154; ПП РФ №354, п.93)\n"
+        "- Разделение/объединение счёта (соглашение, техническая возможность, судебное решение — ПП РФ №354, п.94)\n"
+        "- Оформление доверенности (нотариальная форма, регистрация в УК — ГК РФ, ст.185)\n"
+        "- Изменение собственника или состава семьи (уведомление в 5 дней — ПП РФ №354, п.93(3))\n"
+        "- Получение выписки ЕГРН или техпаспорта (Росреестр, МФЦ — ФЗ №218-ФЗ)\n\n"
+        "Судебная практика: [если есть, указать; иначе 'отсутствует']\n"
+        "### Ключевые нормативные акты:\n"
+        "- Жилищный кодекс РФ (ст.153-155)\n"
+        "- ПП РФ №354 (п.93-94)\n"
+        "- ФЗ №218-ФЗ «О государственной регистрации недвижимости»\n"
+        "- ГК РФ, ст.185 (доверенность)\n"
+        "{penalty_block}{role_instruction}"
+    )
+    PENALTY_BLOCK = (
+        "\n**Расчёт пени (если упомянут):**\n"
+        "- Формула: Пени = Сумма долга × Дни просрочки × (Ключевая ставка ЦБ РФ / 300 / 100)\n"
+        "- Основание: [ЖК РФ, ст.155.1], [ФЗ №44-ФЗ], [ПП РФ №329]\n"
+        "- Ограничение: не более 9.5% годовых до 2027 года\n"
+        "- Пример: 10 000 руб., просрочка 30 дней → 95 руб.\n"
+        "- Начало начисления: с 31-го дня после окончания срока оплаты\n"
+    )
 
-    def _expand_search_query(self, query: str) -> List[str]:
-        """Генерирует несколько вариантов поискового запроса для лучшего покрытия темы."""
-        queries = [query]
-        queries.append(f"{query} ЖК РФ ст 154 лицевой счет")
-        queries.append(f"{query} ПП РФ 354 раздел 9")
-        queries.append(f"{query} как разделить лицевой счет судебная практика")
-        queries.append(f"{query} документы для переоформления лицевого счета")
-        queries.append(f"{query} доверенность на управление лицевым счетом ЖКХ")
-        # Добавляем синонимы
-        for term, data in self.term_map.items():
-            if term in query.lower() or any(syn in query.lower() for syn in data.get("synonyms", [])):
-                for synonym in data.get("synonyms", [])[:2]:
-                    new_q = query.replace(term, synonym) if term in query else query + " " + synonym
-                    queries.append(new_q)
-        return list(set(queries))
-
-    def _build_prompt(self, summary: str, context_text: str, role: str = "смешанная") -> str:
-        """
-        Агент: Управление лицевыми счетами ЖКХ
-        Формирует системный промт:
-        - Фокус: открытие, закрытие, разделение, доверенности, смена собственника
-        - Жёсткая структура с ссылками на нормативные акты
-        """
-        extra = self.improve_prompt_from_feedback()
-        web_results = self._perform_web_search(summary)
-    
-        # Проверка на необходимость расчета пени
-        penalty_keywords = ["пени", "неустойка", "штраф за просрочку", "ставка цб", "9.5%", "ключевая ставка"]
-        q_lower = summary.lower()
-        should_calculate_penalty = any(kw in q_lower for kw in penalty_keywords)
-    
-        # --- SYSTEM PROMPT ---
-        system_prompt = (
-            "Ты — эксперт по управлению лицевыми счетами в сфере ЖКХ. "
-            "Отвечай строго по нормативам, без выдуманных данных, используя только контекст и обновления.\n\n"
-            "**ЖЕСТКИЕ ПРАВИЛА:**\n"
-            "1. Если данных нет — отвечай: 'Недостаточно данных для точного ответа. Обратитесь в УК.'\n"
-            "2. Указывай ссылки на нормативные акты (ЖК РФ, ПП РФ, ФЗ).\n"
-            "3. Структура: краткий вывод → нормативы → пошаговая инструкция → доверенности → смена собственника → судебная практика.\n"
-            "4. Формулы пени включай только при упоминании пени.\n"
-            "5. Приоритет региональных актов над федеральными.\n\n"
-            f"### Контекст:\n{context_text}\n\n"
-            f"### Веб-поиск:\n{web_results}\n\n"
-            f"### Дополнительные обновления:\n{extra}\n\n"
-            "--- Основной ответ ---\n"
-            "Краткий вывод: [1-2 предложения — что делать, какие документы нужны, куда обращаться]\n"
-            "Нормативное обоснование: [ЖК РФ, ПП РФ, ФЗ]\n"
-            "Пошаговая инструкция:\n"
-            "- Открытие/закрытие/переоформление лицевого счета (документы, сроки — ЖК РФ, ст.154; ПП РФ №354, п.93)\n"
-            "- Разделение/объединение счёта (соглашение, техническая возможность, судебное решение — ПП РФ №354, п.94)\n"
-            "- Оформление доверенности (нотариальная форма, регистрация в УК — ГК РФ, ст.185)\n"
-            "- Изменение собственника или состава семьи (уведомление в 5 дней — ПП РФ №354, п.93(3))\n"
-            "- Получение выписки ЕГРН или техпаспорта (Росреестр, МФЦ — ФЗ №218-ФЗ)\n\n"
-            "Судебная практика: [если есть, указать; иначе 'отсутствует']\n"
-            "### Ключевые нормативные акты:\n"
-            "- Жилищный кодекс РФ (ст.153-155)\n"
-            "- ПП РФ №354 (п.93-94)\n"
-            "- ФЗ №218-ФЗ «О государственной регистрации недвижимости»\n"
-            "- ГК РФ, ст.185 (доверенность)\n"
-        )
-    
-        # --- Динамический блок: расчет пени ---
-        if should_calculate_penalty:
-            system_prompt += (
-                "\n**Расчёт пени (если упомянут):**\n"
-                "- Формула: Пени = Сумма долга × Дни просрочки × (Ключевая ставка ЦБ РФ / 300 / 100)\n"
-                "- Основание: [ЖК РФ, ст.155.1], [ФЗ №44-ФЗ], [ПП РФ №329]\n"
-                "- Ограничение: не более 9.5% годовых до 2027 года\n"
-                "- Пример: 10 000 руб., просрочка 30 дней → 95 руб.\n"
-                "- Начало начисления: с 31-го дня после окончания срока оплаты\n"
-            )
-    
-        system_prompt += f"{self.get_role_instruction(role)}"
-    
-        # --- Формат для Saiga/LLaMA-3 ---
-        prompt_formatted = (
-            "<|begin_of_text|><|start_header_id|>system<|end_header_id|>\n"
-            f"{system_prompt}<|eot_id|>"
-        )
-    
-        return prompt_formatted
         
 class ContractAndMeetingAgent(RAGAgent):
+    OFFICIAL_DOMAINS = RAGAgent.OFFICIAL_DOMAINS | {"dom.gosuslugi.ru", "gjirf.ru", "vsrf.ru"}
+    GOV_SUFFIXES = (".gov.ru", ".gkh.ru", ".gosuslugi.ru", ".vsrf.ru")
+    SEARCH_QUERY_TEMPLATES = (
+        "{q} ЖК РФ ст 161 договор управления",
+        "{q} ПП РФ 416 общее собрание",
+        "{q} судебная практика по расторжению договора с УК",
+        "{q} ответственность подрядчика за некачественный ремонт",
+        "{q} можно ли использовать доходы от рекламы на погашение долгов",
+    )
+
     def __init__(self):
         # Расширенный и структурированный словарь с синонимами и контекстами
-        self.term_map = self._build_term_map()
-        keywords = self._flatten_term_map(self.term_map)
+        self.term_map, keywords = self._shared_term_map()
         
         super().__init__("Договоры и решения ОСС", keywords)
 
@@ -6282,189 +4341,68 @@ class ContractAndMeetingAgent(RAGAgent):
             },
         }
 
-    def _flatten_term_map(self, term_map: Dict) -> List[str]:
-        """Преобразует структурированный словарь в плоский список уникальных ключевых слов."""
-        keywords = set()
-        for term, data in term_map.items():
-            keywords.add(term.lower())  # оригинальный ключ
-            for synonym in data.get("synonyms", []):
-                keywords.add(synonym.lower())
-            # Добавляем ключи из контекстов
-            contexts = data.get("contexts", [])
-            if isinstance(contexts, dict):
-                for ctx_key in contexts.keys():
-                    keywords.add(ctx_key.lower())
-            elif isinstance(contexts, list):
-                for ctx in contexts:
-                    keywords.add(ctx.lower())
-        return list(keywords)
-
-    def _perform_web_search(self, query: str, max_results: int = 3) -> str:
-        """
-        Улучшенный веб-поиск: приоритет официальным источникам, фильтрация, ранжирование.
-        Выполняется ВНУТРИ _build_prompt, как в оригинальной архитектуре.
-        """
-        OFFICIAL_DOMAINS = {
-            "cbr.ru", "government.ru", "kremlin.ru", "rosstat.gov.ru", "minfin.gov.ru",
-            "fas.gov.ru", "gji.ru", "rospotrebnadzor.ru", "rosreestr.gov.ru",
-            "minstroyrf.ru", "fgis-tarif.ru", "consultant.ru", "garant.ru",
-            "pravo.gov.ru", "gkh.ru", "dom.gosuslugi.ru", "gjirf.ru", "vsrf.ru"
-        }
-
-        BLACKLISTED_DOMAINS = {
-            "otvet.mail.ru", "ask.fm", "irecommend.ru", "pikabu.ru",
-            "zen.yandex.ru", "thequestion.ru", "quora.com", "reddit.com",
-            "fishki.net", "yaplakal.com", "blog", "forum"
-        }
-
-        # Генерируем расширенные поисковые запросы
-        expanded_queries = self._expand_search_query(query)
-        all_results = []
-
-        for attempt in range(2):
-            try:
-                with DDGS(timeout=10) as ddgs:
-                    for q in expanded_queries:
-                        results = ddgs.text(q, max_results=5)
-                        for r in results:
-                            href = r.get('href', '')
-                            if not href:
-                                continue
-                            
-                            try:
-                                domain = href.split('/')[2].lower()
-                            except IndexError:
-                                continue
-
-                            if any(bad in domain for bad in BLACKLISTED_DOMAINS):
-                                continue
-
-                            weight = 3 if any(official in domain for official in OFFICIAL_DOMAINS) else \
-                                     2 if any(gov in domain for gov in [".gov.ru", ".gkh.ru", ".gosuslugi.ru", ".vsrf.ru"]) else 1
-
-                            snippet = {
-                                "body": r['body'],
-                                "href": href,
-                                "title": r.get('title', ''),
-                                "weight": weight
-                            }
-                            all_results.append(snippet)
-
-                    all_results = sorted(all_results, key=lambda x: x['weight'], reverse=True)
-                    seen_bodies = set()
-                    unique_results = []
-                    for r in all_results:
-                        body_hash = hash(r['body'][:100])
-                        if body_hash not in seen_bodies:
-                            seen_bodies.add(body_hash)
-                            unique_results.append(r)
-                            if len(unique_results) >= max_results:
-                                break
-
-                    if unique_results:
-                        formatted = []
-                        for r in unique_results:
-                            prefix = "[ОФИЦИАЛЬНЫЙ ИСТОЧНИК] " if r['weight'] >= 2 else ""
-                            formatted.append(f"{prefix}• {r['body']}\n  Источник: {r['href']}\n")
-                        return "\n".join(formatted).strip()
-                    else:
-                        return "По вашему запросу ничего не найдено в надёжных источниках."
-
-            except Exception as e:
-                if attempt == 0:
-                    time.sleep(2)
-                    continue
-                return f"Ошибка веб-поиска: {str(e)}"
-
-        return "Не удалось выполнить веб-поиск. Попробуйте позже."
+    # Агент: Договоры управления и решения ОСС
+    # Системный промт:
+    # - Фокус: заключение и расторжение договоров, проведение ОСС, ответственность, реклама
+    # - Жёсткая структура с ссылками на нормативные акты
+    PROMPT_TEMPLATE = (
+        "Ты — эксперт по договорам управления и решениям общих собраний собственников в сфере ЖКХ. "
+        "Отвечай строго по нормативам, без выдуманных данных, используя только контекст и обновления.\n\n"
+        "**ЖЕСТКИЕ ПРАВИЛА:**\n"
+        "1. Если данных нет — отвечай: 'Недостаточно данных для точного ответа. Обратитесь в УК.'\n"
+        "2. Указывай ссылки на нормативные акты (ЖК РФ, ГК РФ, ПП РФ).\n"
+        "3. Структура: краткий вывод → нормативы → пошаговая инструкция → ответственность → судебная практика.\n"
+        "4. Формулы пени включай только при упоминании пени.\n"
+        "5. Приоритет региональных актов над федеральными.\n\n"
+        "### Контекст:\n"
+        "{context_text}\n\n"
+        "### Веб-поиск:\n"
+        "{web_results}\n\n"
+        "### Дополнительные обновления:\n"
+        "{extra}\n\n"
+        "--- Основной ответ ---\n"
+        "Краткий вывод: [1-2 предложения — законно ли действие, что делать, куда обращаться]\n"
+        "Нормативное обоснование: [ЖК РФ, ГК РФ, ПП РФ]\n"
+        "Пошаговая инструкция:\n"
+        "- Заключение/расторжение договора управления (решение ОСС, уведомление — ЖК РФ, ст.161-162)\n"
+        "- Проведение ОСС и оформление протокола (уведомление, кворум, подписание — ПП РФ №416)\n"
+        "- Размещение рекламы (только с решением ОСС — ЖК РФ, ст.36)\n"
+        "- Действия при некачественном ремонте (акт, претензия, экспертиза — ГК РФ, ст.723)\n"
+        "- Жалобы на нарушение решений ОСС (ГЖИ, прокуратура, суд — ЖК РФ, ст.20)\n\n"
+        "Судебная практика: [если есть, указать; иначе 'отсутствует']\n"
+        "### Ключевые нормативные акты:\n"
+        "- Жилищный кодекс РФ (Глава 6 — ОСС, ст.161-162 — договор управления)\n"
+        "- ПП РФ №416 «О порядке проведения общего собрания...»\n"
+        "- Гражданский кодекс РФ (ст.168 — недействительность сделок, ст.723 — ответственность подрядчика)\n"
+        "- Земельный кодекс РФ (ст.39.20 — аренда земельных участков под МКД)\n"
+        "{penalty_block}{role_instruction}"
+    )
+    PENALTY_BLOCK = (
+        "\n**Расчёт пени (если упомянут):**\n"
+        "- Формула: Пени = Сумма долга × Дни просрочки × (Ключевая ставка ЦБ РФ / 300 / 100)\n"
+        "- Основание: [ЖК РФ, ст.155.1], [ФЗ №44-ФЗ], [ПП РФ №329]\n"
+        "- Ограничение: не более 9.5% годовых до 2027 года\n"
+        "- Пример: 10 000 руб., просрочка 30 дней → 95 руб.\n"
+        "- Начало начисления: с 31-го дня после окончания срока оплаты\n"
+    )
 
-    def _expand_search_query(self, query: str) -> List[str]:
-        """Генерирует несколько вариантов поискового запроса для лучшего покрытия темы."""
-        queries = [query]
-        queries.append(f"{query} ЖК РФ ст 161 договор управления")
-        queries.append(f"{query} ПП РФ 416 общее собрание")
-        queries.append(f"{query} судебная практика по расторжению договора с УК")
-        queries.append(f"{query} ответственность подрядчика за некачественный ремонт")
-        queries.append(f"{query} можно ли использовать доходы от рекламы на погашение долгов")
-        # Добавляем синонимы
-        for term, data in self.term_map.items():
-            if term in query.lower() or any(syn in query.lower() for syn in data.get("synonyms", [])):
-                for synonym in data.get("synonyms", [])[:2]:
-                    new_q = query.replace(term, synonym) if term in query else query + " " + synonym
-                    queries.append(new_q)
-        return list(set(queries))
-
-    def _build_prompt(self, summary: str, context_text: str, role: str = "смешанная") -> str:
-        """
-        Агент: Договоры управления и решения ОСС
-        Формирует системный промт:
-        - Фокус: заключение и расторжение договоров, проведение ОСС, ответственность, реклама
-        - Жёсткая структура с ссылками на нормативные акты
-        """
-        extra = self.improve_prompt_from_feedback()
-        web_results = self._perform_web_search(summary)
-    
-        # Проверка на необходимость расчета пени
-        penalty_keywords = ["пени", "неустойка", "штраф за просрочку", "ставка цб", "9.5%", "ключевая ставка"]
-        q_lower = summary.lower()
-        should_calculate_penalty = any(kw in q_lower for kw in penalty_keywords)
-    
-        # --- SYSTEM PROMPT ---
-        system_prompt = (
-            "Ты — эксперт по договорам управления и решениям общих собраний собственников в сфере ЖКХ. "
-            "Отвечай строго по нормативам, без выдуманных данных, используя только контекст и обновления.\n\n"
-            "**ЖЕСТКИЕ ПРАВИЛА:**\n"
-            "1. Если данных нет — отвечай: 'Недостаточно данных для точного ответа. Обратитесь в УК.'\n"
-            "2. Указывай ссылки на нормативные акты (ЖК РФ, ГК РФ, ПП РФ).\n"
-            "3. Структура: краткий вывод → нормативы → пошаговая инструкция → ответственность → судебная практика.\n"
-            "4. Формулы пени включай только при упоминании пени.\n"
-            "5. Приоритет региональных актов над федеральными.\n\n"
-            f"### Контекст:\n{context_text}\n\n"
-            f"### Веб-поиск:\n{web_results}\n\n"
-            f"### Дополнительные обновления:\n{extra}\n\n"
-            "--- Основной ответ ---\n"
-            "Краткий вывод: [1-2 предложения — законно ли действие, что делать, куда обращаться]\n"
-            "Нормативное обоснование: [ЖК РФ, ГК РФ, ПП РФ]\n"
-            "Пошаговая инструкция:\n"
-            "- Заключение/расторжение договора управления (решение ОСС, уведомление — ЖК РФ, ст.161-162)\n"
-            "- Проведение ОСС и оформление протокола (уведомление, кворум, подписание — ПП РФ №416)\n"
-            "- Размещение рекламы (только с решением ОСС — ЖК РФ, ст.36)\n"
-            "- Действия при некачественном ремонте (акт, претензия, экспертиза — ГК РФ, ст.723)\n"
-            "- Жалобы на нарушение решений ОСС (ГЖИ, прокуратура, суд — ЖК РФ, ст.20)\n\n"
-            "Судебная практика: [если есть, указать; иначе 'отсутствует']\n"
-            "### Ключевые нормативные акты:\n"
-            "- Жилищный кодекс РФ (Глава 6 — ОСС, ст.161-162 — договор управления)\n"
-            "- ПП РФ №416 «О порядке проведения общего собрания...»\n"
-            "- Гражданский кодекс РФ (ст.168 — недействительность сделок, ст.723 — ответственность подрядчика)\n"
-            "- Земельный кодекс РФ (ст.39.20 — аренда земельных участков под МКД)\n"
-        )
-    
-        # --- Динамический блок: расчет пени ---
-        if should_calculate_penalty:
-            system_prompt += (
-                "\n**Расчёт пени (если упомянут):**\n"
-                "- Формула: Пени = Сумма долга × Дни просрочки × (Ключевая ставка ЦБ РФ / 300 / 100)\n"
-                "- Основание: [ЖК РФ, ст.155.1], [ФЗ №44-ФЗ], [ПП РФ №329]\n"
-                "- Ограничение: не более 9.5% годовых до 2027 года\n"
-                "- Пример: 10 000 руб., просрочка 30 дней → 95 руб.\n"
-                "- Начало начисления: с 31-го дня после окончания срока оплаты\n"
-            )
-    
-        system_prompt += f"{self.get_role_instruction(role)}"
-    
-        # --- Формат для Saiga/LLaMA-3 ---
-        prompt_formatted = (
-            "<|begin_of_text|><|start_header_id|>system<|end_header_id|>\n"
-            f"{system_prompt}<|eot_id|>"
-        )
-    
-        return prompt_formatted
         
 class RegionalMunicipalAgent(RAGAgent):
+    OFFICIAL_DOMAINS = RAGAgent.OFFICIAL_DOMAINS | {"regulation.gov.ru", "vsrf.ru", "fstrf.ru"}
+    GOV_SUFFIXES = (".gov.ru", ".gkh.ru", ".fgis-tarif.ru", ".vsrf.ru")
+    SEARCH_QUERY_TEMPLATES = (
+        "{q} судебная практика по оспариванию региональных актов",
+        "{q} как найти официальный текст постановления мэрии",
+    )
+    # Регионы, для которых к запросу добавляются региональные варианты
+    REGION_KEYWORDS = (
+        "москва", "московская область", "санкт-петербург", "спб", "екатеринбург", "казань",
+        "новосибирск", "нижний новгород", "самара", "ростов-на-дону", "челябинск", "омск",
+    )
+
     def __init__(self):
         # Расширенный и структурированный словарь с синонимами и контекстами
-        self.term_map = self._build_term_map()
-        keywords = self._flatten_term_map(self.term_map)
+        self.term_map, keywords = self._shared_term_map()
         
         super().__init__("Региональные и муниципальные акты", keywords)
 
@@ -6548,205 +4486,82 @@ class RegionalMunicipalAgent(RAGAgent):
             },
         }
 
-    def _flatten_term_map(self, term_map: Dict) -> List[str]:
-        """Преобразует структурированный словарь в плоский список уникальных ключевых слов."""
-        keywords = set()
-        for term, data in term_map.items():
-            keywords.add(term.lower())  # оригинальный ключ
-            for synonym in data.get("synonyms", []):
-                keywords.add(synonym.lower())
-            # Добавляем ключи из контекстов
-            contexts = data.get("contexts", [])
-            if isinstance(contexts, dict):
-                for ctx_key in contexts.keys():
-                    keywords.add(ctx_key.lower())
-            elif isinstance(contexts, list):
-                for ctx in contexts:
-                    keywords.add(ctx.lower())
-        return list(keywords)
-
-    def _perform_web_search(self, query: str, max_results: int = 3) -> str:
-        """
-        Улучшенный веб-поиск: приоритет официальным источникам, фильтрация, ранжирование.
-        Выполняется ВНУТРИ _build_prompt, как в оригинальной архитектуре.
-        """
-        OFFICIAL_DOMAINS = {
-            "cbr.ru", "government.ru", "kremlin.ru", "rosstat.gov.ru", "minfin.gov.ru",
-            "fas.gov.ru", "gji.ru", "rospotrebnadzor.ru", "rosreestr.gov.ru",
-            "minstroyrf.ru", "fgis-tarif.ru", "consultant.ru", "garant.ru",
-            "pravo.gov.ru", "gkh.ru", "regulation.gov.ru", "vsrf.ru", "fstrf.ru"
-        }
-
-        BLACKLISTED_DOMAINS = {
-            "otvet.mail.ru", "ask.fm", "irecommend.ru", "pikabu.ru",
-            "zen.yandex.ru", "thequestion.ru", "quora.com", "reddit.com",
-            "fishki.net", "yaplakal.com", "blog", "forum"
-        }
-
-        # Генерируем расширенные поисковые запросы
-        expanded_queries = self._expand_search_query(query)
-        all_results = []
-
-        for attempt in range(2):
-            try:
-                with DDGS(timeout=10) as ddgs:
-                    for q in expanded_queries:
-                        results = ddgs.text(q, max_results=5)
-                        for r in results:
-                            href = r.get('href', '')
-                            if not href:
-                                continue
-                            
-                            try:
-                                domain = href.split('/')[2].lower()
-                            except IndexError:
-                                continue
-
-                            if any(bad in domain for bad in BLACKLISTED_DOMAINS):
-                                continue
-
-                            weight = 3 if any(official in domain for official in OFFICIAL_DOMAINS) else \
-                                     2 if any(gov in domain for gov in [".gov.ru", ".gkh.ru", ".fgis-tarif.ru", ".vsrf.ru"]) else 1
-
-                            snippet = {
-                                "body": r['body'],
-                                "href": href,
-                                "title": r.get('title', ''),
-                                "weight": weight
-                            }
-                            all_results.append(snippet)
-
-                    all_results = sorted(all_results, key=lambda x: x['weight'], reverse=True)
-                    seen_bodies = set()
-                    unique_results = []
-                    for r in all_results:
-                        body_hash = hash(r['body'][:100])
-                        if body_hash not in seen_bodies:
-                            seen_bodies.add(body_hash)
-                            unique_results.append(r)
-                            if len(unique_results) >= max_results:
-                                break
-
-                    if unique_results:
-                        formatted = []
-                        for r in unique_results:
-                            prefix = "[ОФИЦИАЛЬНЫЙ ИСТОЧНИК] " if r['weight'] >= 2 else ""
-                            formatted.append(f"{prefix}• {r['body']}\n  Источник: {r['href']}\n")
-                        return "\n".join(formatted).strip()
-                    else:
-                        return "По вашему запросу ничего не найдено в надёжных источниках."
-
-            except Exception as e:
-                if attempt == 0:
-                    time.sleep(2)
-                    continue
-                return f"Ошибка веб-поиска: {str(e)}"
-
-        return "Не удалось выполнить веб-поиск. Попробуйте позже."
-
-    def _expand_search_query(self, query: str) -> List[str]:
-        """Генерирует несколько вариантов поискового запроса для лучшего покрытия темы."""
-        queries = [query]
+    def _template_queries(self, query: str) -> Iterator[str]:
+        """Дополняет шаблонные запросы региональными, если в запросе указан регион."""
         # Извлекаем название региона из запроса
-        region_keywords = [
-            "москва", "московская область", "санкт-петербург", "спб", "екатеринбург", "казань",
-            "новосибирск", "нижний новгород", "самара", "ростов-на-дону", "челябинск", "омск"
-        ]
-        detected_region = None
-        for region in region_keywords:
-            if region in query.lower():
-                detected_region = region
-                break
+        q_lower = query.lower()
+        detected_region = next((region for region in self.REGION_KEYWORDS if region in q_lower), None)
 
         if detected_region:
-            queries.append(f"{query} официальный сайт {detected_region}")
-            queries.append(f"{query} постановление правительства {detected_region}")
-            queries.append(f"{query} тарифы {detected_region} ФГИС Тариф")
+            yield f"{query} официальный сайт {detected_region}"
+            yield f"{query} постановление правительства {detected_region}"
+            yield f"{query} тарифы {detected_region} ФГИС Тариф"
         else:
-            queries.append(f"{query} региональный закон ЖКХ")
-            queries.append(f"{query} муниципальный акт ЖКХ")
-
-        queries.append(f"{query} судебная практика по оспариванию региональных актов")
-        queries.append(f"{query} как найти официальный текст постановления мэрии")
-        # Добавляем синонимы
-        for term, data in self.term_map.items():
-            if term in query.lower() or any(syn in query.lower() for syn in data.get("synonyms", [])):
-                for synonym in data.get("synonyms", [])[:2]:
-                    new_q = query.replace(term, synonym) if term in query else query + " " + synonym
-                    queries.append(new_q)
-        return list(set(queries))
-
-    def _build_prompt(self, summary: str, context_text: str, role: str = "смешанная") -> str:
-        """
-        Агент: Региональные и муниципальные акты ЖКХ
-        Формирует системный промт:
-        - Фокус: поиск, актуальность, обжалование региональных/муниципальных актов
-        - Жёсткая структура с ссылками на нормативные акты
-        """
-        extra = self.improve_prompt_from_feedback()
-        web_results = self._perform_web_search(summary)
-    
-        # Проверка на необходимость расчета пени
-        penalty_keywords = ["пени", "неустойка", "штраф за просрочку", "ставка цб", "9.5%", "ключевая ставка"]
-        q_lower = summary.lower()
-        should_calculate_penalty = any(kw in q_lower for kw in penalty_keywords)
-    
-        # --- SYSTEM PROMPT ---
-        system_prompt = (
-            "Ты — эксперт по региональным и муниципальным актам в сфере ЖКХ. "
-            "Отвечай строго по нормативам, без выдуманных данных, используя только контекст и обновления.\n\n"
-            "**ЖЕСТКИЕ ПРАВИЛА:**\n"
-            "1. Если информации нет — отвечай: 'Недостаточно данных для точного ответа. Обратитесь в вашу УК.'\n"
-            "2. Указывай ссылки на нормативные акты (региональные, муниципальные, федеральные).\n"
-            "3. Структура: краткий вывод → нормативы → пошаговая инструкция → судебная практика.\n"
-            "4. Формулы пени включай только при упоминании пени.\n"
-            "5. Приоритет региональных/муниципальных актов над федеральными, если вопрос региональный.\n\n"
-            f"### Контекст:\n{context_text}\n\n"
-            f"### Веб-поиск:\n{web_results}\n\n"
-            f"### Дополнительные обновления:\n{extra}\n\n"
-            "--- Основной ответ ---\n"
-            "Краткий вывод: [1-2 предложения — действует ли акт, где найти, законно ли начисление]\n"
-            "Нормативное обоснование: [точные названия, номера, даты региональных/муниципальных и федеральных актов]\n"
-            "Пошаговая инструкция:\n"
-            "- Где найти официальный текст акта (сайт региона, ФГИС Тариф, портал госуслуг)\n"
-            "- Как проверить актуальность (дата вступления, изменения, отменяющие акты)\n"
-            "- Как обжаловать акт (жалоба в вышестоящий орган, прокуратуру, суд — ФЗ №59-ФЗ, ГПК РФ, ст.254)\n"
-            "- Как применить акт на практике (расчёт тарифа, оформление льготы, участие в капремонте)\n\n"
-            "Судебная практика: [если есть, указать; иначе 'отсутствует']\n"
-            "### Ключевые нормативные акты:\n"
-            "- Жилищный кодекс РФ (ст.155, ст.158.1, гл.7 — местное самоуправление)\n"
-            "- ФЗ №131-ФЗ «Об общих принципах организации местного самоуправления»\n"
-            "- ФЗ №210-ФЗ «Об основах государственного регулирования тарифов»\n"
-            "- ПП РФ №354, №491 — федеральные правила, если региональные не установлены\n"
-            "- ПП РФ №1149 — о ФГИС Тариф\n"
-        )
-    
-        # --- Динамический блок: расчет пени ---
-        if should_calculate_penalty:
-            system_prompt += (
-                "\n**Расчёт пени (если упомянут):**\n"
-                "- Формула: Пени = Сумма долга × Дни просрочки × (Ключевая ставка ЦБ РФ / 300 / 100)\n"
-                "- Основание: [ЖК РФ, ст.155.1], [ФЗ №44-ФЗ], [ПП РФ №329]\n"
-                "- Ограничение: не более 9.5% годовых до 2027 года\n"
-                "- Пример: 10 000 руб., просрочка 30 дней → 95 руб.\n"
-                "- Начало начисления: с 31-го дня после окончания срока оплаты\n"
-            )
-    
-        system_prompt += f"{self.get_role_instruction(role)}"
-    
-        # --- Формат для QVikhr / LLaMA-3 ---
-        prompt_formatted = (
-            "<|begin_of_text|><|start_header_id|>system<|end_header_id|>\n"
-            f"{system_prompt}<|eot_id|>"
-        )
-    
-        return prompt_formatted
+            yield f"{query} региональный закон ЖКХ"
+            yield f"{query} муниципальный акт ЖКХ"
+
+        yield from super()._template_queries(query)
+
+    # Агент: Региональные и муниципальные акты ЖКХ
+    # Системный промт:
+    # - Фокус: поиск, актуальность, обжалование региональных/муниципальных актов
+    # - Жёсткая структура с ссылками на нормативные акты
+    PROMPT_TEMPLATE = (
+        "Ты — эксперт по региональным и муниципальным актам в сфере ЖКХ. Отвечай строго по нормативам, "
+        "без выдуманных данных, используя только контекст и обновления.\n\n"
+        "**ЖЕСТКИЕ ПРАВИЛА:**\n"
+        "1. Если информации нет — отвечай: 'Недостаточно данных для точного ответа. Обратитесь в вашу УК.'\n"
+        "2. Указывай ссылки на нормативные акты (региональные, муниципальные, федеральные).\n"
+        "3. Структура: краткий вывод → нормативы → пошаговая инструкция → судебная практика.\n"
+        "4. Формулы пени включай только при упоминании пени.\n"
+        "5. Приоритет региональных/муниципальных актов над федеральными, если вопрос региональный.\n\n"
+        "### Контекст:\n"
+        "{context_text}\n\n"
+        "### Веб-поиск:\n"
+        "{web_results}\n\n"
+        "### Дополнительные обновления:\n"
+        "{extra}\n\n"
+        "--- Основной ответ ---\n"
+        "Краткий вывод: [1-2 предложения — действует ли акт, где найти, законно ли начисление]\n"
+        "Нормативное обоснование: [точные названия, номера, даты региональных/муниципальных и федеральных актов]\n"
+        "Пошаговая инструкция:\n"
+        "- Где найти официальный текст акта (сайт региона, ФГИС Тариф, портал госуслуг)\n"
+        "- Как проверить актуальность (дата вступления, изменения, отменяющие акты)\n"
+        "- Как обжаловать акт (жалоба в вышестоящий орган, прокуратуру, суд — ФЗ №59-ФЗ, ГПК РФ, ст.254)\n"
+        "- Как применить акт на практике (расчёт тарифа, оформление льготы, участие в капремонте)\n\n"
+        "Судебная практика: [если есть, указать; иначе 'отсутствует']\n"
+        "### Ключевые нормативные акты:\n"
+        "- Жилищный кодекс РФ (ст.155, ст.158.1, гл.7 — местное самоуправление)\n"
+        "- ФЗ №131-ФЗ «Об общих принципах организации местного самоуправления»\n"
+        "- ФЗ №210-ФЗ «Об основах государственного регулирования тарифов»\n"
+        "- ПП РФ №354, №491 — федеральные правила, если региональные не установлены\n"
+        "- ПП РФ №1149 — о ФГИС Тариф\n"
+        "{penalty_block}{role_instruction}"
+    )
+    PENALTY_BLOCK = (
+        "\n**Расчёт пени (если упомянут):**\n"
+        "- Формула: Пени = Сумма долга × Дни просрочки × (Ключевая ставка ЦБ РФ / 300 / 100)\n"
+        "- Основание: [ЖК РФ, ст.155.1], [ФЗ №44-ФЗ], [ПП РФ №329]\n"
+        "- Ограничение: не более 9.5% годовых до 2027 года\n"
+        "- Пример: 10 000 руб., просрочка 30 дней → 95 руб.\n"
+        "- Начало начисления: с 31-го дня после окончания срока оплаты\n"
+    )
+
         
 class CourtPracticeAgent(RAGAgent):
+    OFFICIAL_DOMAINS = RAGAgent.OFFICIAL_DOMAINS | {"vsrf.ru", "sudrf.ru", "kad.arbitr.ru"}
+    GOV_SUFFIXES = (".gov.ru", ".gkh.ru", ".vsrf.ru", ".sudrf.ru")
+    SEARCH_QUERY_TEMPLATES = (
+        "{q} ВС РФ судебная практика ЖКХ",
+        "{q} постановление Пленума ВС РФ жилищные споры",
+        "{q} обзор практики Верховного Суда по ЖКХ",
+        "{q} разъяснения Минстроя по ПП РФ 354",
+        "{q} письма Ростехнадзора по поверке счётчиков",
+    )
+
     def __init__(self):
         # Расширенный и структурированный словарь с синонимами и контекстами
-        self.term_map = self._build_term_map()
-        keywords = self._flatten_term_map(self.term_map)
+        self.term_map, keywords = self._shared_term_map()
         
         super().__init__("Судебная практика и разъяснения", keywords)
 
@@ -6830,191 +4645,70 @@ class CourtPracticeAgent(RAGAgent):
             },
         }
 
-    def _flatten_term_map(self, term_map: Dict) -> List[str]:
-        """Преобразует структурированный словарь в плоский список уникальных ключевых слов."""
-        keywords = set()
-        for term, data in term_map.items():
-            keywords.add(term.lower())  # оригинальный ключ
-            for synonym in data.get("synonyms", []):
-                keywords.add(synonym.lower())
-            # Добавляем ключи из контекстов
-            contexts = data.get("contexts", [])
-            if isinstance(contexts, dict):
-                for ctx_key in contexts.keys():
-                    keywords.add(ctx_key.lower())
-            elif isinstance(contexts, list):
-                for ctx in contexts:
-                    keywords.add(ctx.lower())
-        return list(keywords)
-
-    def _perform_web_search(self, query: str, max_results: int = 3) -> str:
-        """
-        Улучшенный веб-поиск: приоритет официальным источникам, фильтрация, ранжирование.
-        Выполняется ВНУТРИ _build_prompt, как в оригинальной архитектуре.
-        """
-        OFFICIAL_DOMAINS = {
-            "cbr.ru", "government.ru", "kremlin.ru", "rosstat.gov.ru", "minfin.gov.ru",
-            "fas.gov.ru", "gji.ru", "rospotrebnadzor.ru", "rosreestr.gov.ru",
-            "minstroyrf.ru", "fgis-tarif.ru", "consultant.ru", "garant.ru",
-            "pravo.gov.ru", "gkh.ru", "vsrf.ru", "sudrf.ru", "kad.arbitr.ru", "rosreestr.gov.ru"
-        }
-
-        BLACKLISTED_DOMAINS = {
-            "otvet.mail.ru", "ask.fm", "irecommend.ru", "pikabu.ru",
-            "zen.yandex.ru", "thequestion.ru", "quora.com", "reddit.com",
-            "fishki.net", "yaplakal.com", "blog", "forum"
-        }
-
-        # Генерируем расширенные поисковые запросы
-        expanded_queries = self._expand_search_query(query)
-        all_results = []
-
-        for attempt in range(2):
-            try:
-                with DDGS(timeout=10) as ddgs:
-                    for q in expanded_queries:
-                        results = ddgs.text(q, max_results=5)
-                        for r in results:
-                            href = r.get('href', '')
-                            if not href:
-                                continue
-                            
-                            try:
-                                domain = href.split('/')[2].lower()
-                            except IndexError:
-                                continue
-
-                            if any(bad in domain for bad in BLACKLISTED_DOMAINS):
-                                continue
-
-                            weight = 3 if any(official in domain for official in OFFICIAL_DOMAINS) else \
-                                     2 if any(gov in domain for gov in [".gov.ru", ".gkh.ru", ".vsrf.ru", ".sudrf.ru"]) else 1
-
-                            snippet = {
-                                "body": r['body'],
-                                "href": href,
-                                "title": r.get('title', ''),
-                                "weight": weight
-                            }
-                            all_results.append(snippet)
-
-                    all_results = sorted(all_results, key=lambda x: x['weight'], reverse=True)
-                    seen_bodies = set()
-                    unique_results = []
-                    for r in all_results:
-                        body_hash = hash(r['body'][:100])
-                        if body_hash not in seen_bodies:
-                            seen_bodies.add(body_hash)
-                            unique_results.append(r)
-                            if len(unique_results) >= max_results:
-                                break
-
-                    if unique_results:
-                        formatted = []
-                        for r in unique_results:
-                            prefix = "[ОФИЦИАЛЬНЫЙ ИСТОЧНИК] " if r['weight'] >= 2 else ""
-                            formatted.append(f"{prefix}• {r['body']}\n  Источник: {r['href']}\n")
-                        return "\n".join(formatted).strip()
-                    else:
-                        return "По вашему запросу ничего не найдено в надёжных источниках."
-
-            except Exception as e:
-                if attempt == 0:
-                    time.sleep(2)
-                    continue
-                return f"Ошибка веб-поиска: {str(e)}"
-
-        return "Не удалось выполнить веб-поиск. Попробуйте позже."
+    # Агент: Судебная практика и разъяснения ЖКХ
+    # Системный промт:
+    # - Фокус: применение судебной практики и разъяснений
+    # - Жёсткая структура и ссылки на нормативные акты
+    PROMPT_TEMPLATE = (
+        "Ты — эксперт по судебной практике и разъяснениям в сфере ЖКХ. "
+        "Отвечай строго по нормативам и судебной практике, без выдуманных данных, "
+        "используя только предоставленный контекст и обновления.\n\n"
+        "**ЖЕСТКИЕ ПРАВИЛА:**\n"
+        "1. Если информации нет — отвечай: 'Недостаточно данных для точного ответа.'\n"
+        "2. Обязательно указывай ссылки на нормативные и судебные акты.\n"
+        "3. Структура: краткий вывод → нормативы → судебная практика → практические рекомендации.\n"
+        "4. Формулы пени включай только при упоминании пени.\n"
+        "5. Приоритет источников: "
+        "Постановления Пленума ВС РФ > Определения ВС РФ > Обзоры практики > Разъяснения Минстроя > Судебная практика нижестоящих судов.\n\n"
+        "### Контекст:\n"
+        "{context_text}\n\n"
+        "### Веб-поиск:\n"
+        "{web_results}\n\n"
+        "### Дополнительные обновления:\n"
+        "{extra}\n\n"
+        "--- Основной ответ ---\n"
+        "Краткий вывод: [позиция суда, шансы на успех, ключевые ссылки]\n"
+        "Нормативное обоснование: [ЖК РФ, ПП РФ, ФЗ — точные статьи и пункты]\n"
+        "Судебная практика:\n"
+        "- Определение ВС РФ №XXX-ЭСXX-XXXX — краткая суть и значение\n"
+        "- Постановление Пленума ВС РФ №X — ключевое разъяснение\n"
+        "- Обзор судебной практики — выводы, типичные ошибки\n"
+        "- Письмо Минстроя/Ростехнадзора №XXX — рекомендации и трактовка нормы\n\n"
+        "Практические рекомендации:\n"
+        "- Документы: акты, расчёты, переписка\n"
+        "- Формулировки в иске: с ссылкой на позицию ВС РФ\n"
+        "- Риски и контраргументы: позиция ответчика, практика аналогичных дел\n\n"
+        "Ключевые источники:\n"
+        "- Официальный сайт ВС РФ (https://www.vsrf.ru)\n"
+        "- Судебные акты: kad.arbitr.ru, sudrf.ru, ГАС «Правосудие»\n"
+        "- Разъяснения: Минстрой РФ, Ростехнадзор, ФАС, ГЖИ\n"
+        "- Нормативы: ЖК РФ, ПП РФ №354, №491\n"
+        "{penalty_block}{role_instruction}"
+    )
+    PENALTY_BLOCK = (
+        "\n**Расчёт пени (если упомянут):**\n"
+        "- Формула: Пени = Сумма долга × Дни просрочки × (Ключевая ставка ЦБ РФ / 300 / 100)\n"
+        "- Основание: [ЖК РФ, ст.155.1], [ФЗ №44-ФЗ], [ПП РФ №329]\n"
+        "- Ограничение: не более 9.5% годовых до 2027 года\n"
+        "- Пример: 10 000 руб., просрочка 30 дней → 95 руб.\n"
+        "- Начало начисления: с 31-го дня после окончания срока оплаты\n"
+    )
 
-    def _expand_search_query(self, query: str) -> List[str]:
-        """Генерирует несколько вариантов поискового запроса для лучшего покрытия темы."""
-        queries = [query]
-        queries.append(f"{query} ВС РФ судебная практика ЖКХ")
-        queries.append(f"{query} постановление Пленума ВС РФ жилищные споры")
-        queries.append(f"{query} обзор практики Верховного Суда по ЖКХ")
-        queries.append(f"{query} разъяснения Минстроя по ПП РФ 354")
-        queries.append(f"{query} письма Ростехнадзора по поверке счётчиков")
-        # Добавляем синонимы
-        for term, data in self.term_map.items():
-            if term in query.lower() or any(syn in query.lower() for syn in data.get("synonyms", [])):
-                for synonym in data.get("synonyms", [])[:2]:
-                    new_q = query.replace(term, synonym) if term in query else query + " " + synonym
-                    queries.append(new_q)
-        return list(set(queries))
-
-    def _build_prompt(self, summary: str, context_text: str, role: str = "смешанная") -> str:
-        """
-        Агент: Судебная практика и разъяснения ЖКХ
-        Формирует системный промт:
-        - Фокус: применение судебной практики и разъяснений
-        - Жёсткая структура и ссылки на нормативные акты
-        """
-        extra = self.improve_prompt_from_feedback()
-        web_results = self._perform_web_search(summary)
-    
-        # Проверка на необходимость расчета пени
-        penalty_keywords = ["пени", "неустойка", "штраф за просрочку", "ставка цб", "9.5%", "ключевая ставка"]
-        q_lower = summary.lower()
-        should_calculate_penalty = any(kw in q_lower for kw in penalty_keywords)
-    
-        # --- SYSTEM PROMPT ---
-        system_prompt = (
-            "Ты — эксперт по судебной практике и разъяснениям в сфере ЖКХ. "
-            "Отвечай строго по нормативам и судебной практике, без выдуманных данных, используя только предоставленный контекст и обновления.\n\n"
-            "**ЖЕСТКИЕ ПРАВИЛА:**\n"
-            "1. Если информации нет — отвечай: 'Недостаточно данных для точного ответа.'\n"
-            "2. Обязательно указывай ссылки на нормативные и судебные акты.\n"
-            "3. Структура: краткий вывод → нормативы → судебная практика → практические рекомендации.\n"
-            "4. Формулы пени включай только при упоминании пени.\n"
-            "5. Приоритет источников: Постановления Пленума ВС РФ > Определения ВС РФ > Обзоры практики > Разъяснения Минстроя > Судебная практика нижестоящих судов.\n\n"
-            f"### Контекст:\n{context_text}\n\n"
-            f"### Веб-поиск:\n{web_results}\n\n"
-            f"### Дополнительные обновления:\n{extra}\n\n"
-            "--- Основной ответ ---\n"
-            "Краткий вывод: [позиция суда, шансы на успех, ключевые ссылки]\n"
-            "Нормативное обоснование: [ЖК РФ, ПП РФ, ФЗ — точные статьи и пункты]\n"
-            "Судебная практика:\n"
-            "- Определение ВС РФ №XXX-ЭСXX-XXXX — краткая суть и значение\n"
-            "- Постановление Пленума ВС РФ №X — ключевое разъяснение\n"
-            "- Обзор судебной практики — выводы, типичные ошибки\n"
-            "- Письмо Минстроя/Ростехнадзора №XXX — рекомендации и трактовка нормы\n\n"
-            "Практические рекомендации:\n"
-            "- Документы: акты, расчёты, переписка\n"
-            "- Формулировки в иске: с ссылкой на позицию ВС РФ\n"
-            "- Риски и контраргументы: позиция ответчика, практика аналогичных дел\n\n"
-            "Ключевые источники:\n"
-            "- Официальный сайт ВС РФ (https://www.vsrf.ru)\n"
-            "- Судебные акты: kad.arbitr.ru, sudrf.ru, ГАС «Правосудие»\n"
-            "- Разъяснения: Минстрой РФ, Ростехнадзор, ФАС, ГЖИ\n"
-            "- Нормативы: ЖК РФ, ПП РФ №354, №491\n"
-        )
-    
-        # --- Динамический блок: расчет пени ---
-        if should_calculate_penalty:
-            system_prompt += (
-                "\n**Расчёт пени (если упомянут):**\n"
-                "- Формула: Пени = Сумма долга × Дни просрочки × (Ключевая ставка ЦБ РФ / 300 / 100)\n"
-                "- Основание: [ЖК РФ, ст.155.1], [ФЗ №44-ФЗ], [ПП РФ №329]\n"
-                "- Ограничение: не более 9.5% годовых до 2027 года\n"
-                "- Пример: 10 000 руб., просрочка 30 дней → 95 руб.\n"
-                "- Начало начисления: с 31-го дня после окончания срока оплаты\n"
-            )
-    
-        system_prompt += f"{self.get_role_instruction(role)}"
-    
-        # --- Формат для QVikhr / LLaMA-3 ---
-        prompt_formatted = (
-            "<|begin_of_text|><|start_header_id|>system<|end_header_id|>\n"
-            f"{system_prompt}<|eot_id|>"
-        )
-    
-        return prompt_formatted
         
 class LicensingControlAgent(RAGAgent):
+    OFFICIAL_DOMAINS = RAGAgent.OFFICIAL_DOMAINS | {"reformagkh.ru", "gjirf.ru", "vsrf.ru", "kad.arbitr.ru"}
+    GOV_SUFFIXES = (".gov.ru", ".gkh.ru", ".gjirf.ru", ".vsrf.ru")
+    SEARCH_QUERY_TEMPLATES = (
+        "{q} ФЗ 99-ФЗ лицензия УК",
+        "{q} ЖК РФ ст 193 лицензирование",
+        "{q} судебная практика по отзыву лицензии УК",
+        "{q} как проверить лицензию УК на сайте ГЖИ",
+        "{q} образец жалобы в ГЖИ на УК",
+    )
+
     def __init__(self):
         # Расширенный и структурированный словарь с синонимами и контекстами
-        self.term_map = self._build_term_map()
-        keywords = self._flatten_term_map(self.term_map)
+        self.term_map, keywords = self._shared_term_map()
         
         super().__init__("Лицензирование и контроль за УК", keywords)
 
@@ -7098,188 +4792,65 @@ class LicensingControlAgent(RAGAgent):
             },
         }
 
-    def _flatten_term_map(self, term_map: Dict) -> List[str]:
-        """Преобразует структурированный словарь в плоский список уникальных ключевых слов."""
-        keywords = set()
-        for term, data in term_map.items():
-            keywords.add(term.lower())  # оригинальный ключ
-            for synonym in data.get("synonyms", []):
-                keywords.add(synonym.lower())
-            # Добавляем ключи из контекстов
-            contexts = data.get("contexts", [])
-            if isinstance(contexts, dict):
-                for ctx_key in contexts.keys():
-                    keywords.add(ctx_key.lower())
-            elif isinstance(contexts, list):
-                for ctx in contexts:
-                    keywords.add(ctx.lower())
-        return list(keywords)
-
-    def _perform_web_search(self, query: str, max_results: int = 3) -> str:
-        """
-        Улучшенный веб-поиск: приоритет официальным источникам, фильтрация, ранжирование.
-        Выполняется ВНУТРИ _build_prompt, как в оригинальной архитектуре.
-        """
-        OFFICIAL_DOMAINS = {
-            "cbr.ru", "government.ru", "kremlin.ru", "rosstat.gov.ru", "minfin.gov.ru",
-            "fas.gov.ru", "gji.ru", "rospotrebnadzor.ru", "rosreestr.gov.ru",
-            "minstroyrf.ru", "fgis-tarif.ru", "consultant.ru", "garant.ru",
-            "pravo.gov.ru", "gkh.ru", "reformagkh.ru", "gjirf.ru", "vsrf.ru", "kad.arbitr.ru"
-        }
-
-        BLACKLISTED_DOMAINS = {
-            "otvet.mail.ru", "ask.fm", "irecommend.ru", "pikabu.ru",
-            "zen.yandex.ru", "thequestion.ru", "quora.com", "reddit.com",
-            "fishki.net", "yaplakal.com", "blog", "forum"
-        }
-
-        # Генерируем расширенные поисковые запросы
-        expanded_queries = self._expand_search_query(query)
-        all_results = []
-
-        for attempt in range(2):
-            try:
-                with DDGS(timeout=10) as ddgs:
-                    for q in expanded_queries:
-                        results = ddgs.text(q, max_results=5)
-                        for r in results:
-                            href = r.get('href', '')
-                            if not href:
-                                continue
-                            
-                            try:
-                                domain = href.split('/')[2].lower()
-                            except IndexError:
-                                continue
-
-                            if any(bad in domain for bad in BLACKLISTED_DOMAINS):
-                                continue
-
-                            weight = 3 if any(official in domain for official in OFFICIAL_DOMAINS) else \
-                                     2 if any(gov in domain for gov in [".gov.ru", ".gkh.ru", ".gjirf.ru", ".vsrf.ru"]) else 1
-
-                            snippet = {
-                                "body": r['body'],
-                                "href": href,
-                                "title": r.get('title', ''),
-                                "weight": weight
-                            }
-                            all_results.append(snippet)
-
-                    all_results = sorted(all_results, key=lambda x: x['weight'], reverse=True)
-                    seen_bodies = set()
-                    unique_results = []
-                    for r in all_results:
-                        body_hash = hash(r['body'][:100])
-                        if body_hash not in seen_bodies:
-                            seen_bodies.add(body_hash)
-                            unique_results.append(r)
-                            if len(unique_results) >= max_results:
-                                break
-
-                    if unique_results:
-                        formatted = []
-                        for r in unique_results:
-                            prefix = "[ОФИЦИАЛЬНЫЙ ИСТОЧНИК] " if r['weight'] >= 2 else ""
-                            formatted.append(f"{prefix}• {r['body']}\n  Источник: {r['href']}\n")
-                        return "\n".join(formatted).strip()
-                    else:
-                        return "По вашему запросу ничего не найдено в надёжных источниках."
-
-            except Exception as e:
-                if attempt == 0:
-                    time.sleep(2)
-                    continue
-                return f"Ошибка веб-поиска: {str(e)}"
-
-        return "Не удалось выполнить веб-поиск. Попробуйте позже."
+    # Агент: Лицензирование и контроль за УК
+    # Системный промт:
+    # - Фокус: лицензирование, проверка, контроль и ответственность УК
+    # - Жёсткая структура и ссылки на нормативные акты
+    PROMPT_TEMPLATE = (
+        "Ты — эксперт по лицензированию и контролю управляющих компаний в сфере ЖКХ. Отвечай строго по нормативам, "
+        "без выдуманных данных, используя только предоставленный контекст и обновления.\n\n"
+        "**ЖЕСТКИЕ ПРАВИЛА:**\n"
+        "1. Если информации нет — отвечай: 'Недостаточно данных для точного ответа.'\n"
+        "2. Обязательно указывай ссылки на нормативные акты и судебные решения.\n"
+        "3. Структура: краткий вывод → нормативы → пошаговая инструкция → судебная практика.\n"
+        "4. Формулы пени включай только при упоминании пени.\n"
+        "5. Приоритет источников: ЖК РФ > ФЗ №99-ФЗ > ФЗ №294-ФЗ > ПП РФ > судебная практика.\n\n"
+        "### Контекст:\n"
+        "{context_text}\n\n"
+        "### Веб-поиск:\n"
+        "{web_results}\n\n"
+        "### Дополнительные обновления:\n"
+        "{extra}\n\n"
+        "--- Основной ответ ---\n"
+        "Краткий вывод: [законно ли действие УК, куда обращаться, основные меры]\n"
+        "Нормативное обоснование: [ЖК РФ, ФЗ №99-ФЗ, ФЗ №294-ФЗ, ПП РФ — точные статьи и пункты]\n"
+        "Пошаговая инструкция:\n"
+        "- Проверка лицензии УК (официальный реестр ГЖИ — ФЗ №99-ФЗ, ст.18)\n"
+        "- Жалоба в ГЖИ (письменно, через ГИС ЖКХ — ФЗ №59-ФЗ, ст.12)\n"
+        "- Последствия нарушений (предписание, штраф, приостановление, отзыв лицензии — ФЗ №99-ФЗ, ст.20)\n"
+        "- Обжалование действий ГЖИ (вышестоящий орган или суд — ФЗ №294-ФЗ, ст.22)\n"
+        "- Требования к УК (квалификация, отчётность, отсутствие судимости — ЖК РФ, ст.193)\n\n"
+        "Судебная практика:\n"
+        "- Определение ВС РФ №XXX-ЭСXX-XXXX — краткая позиция суда\n"
+        "Если судебных решений нет: 'Судебная практика по данному вопросу в базе отсутствует'.\n\n"
+        "Ключевые источники:\n"
+        "- ЖК РФ, ФЗ №99-ФЗ, ФЗ №294-ФЗ, ПП РФ №493, ПП РФ №731\n"
+        "{penalty_block}{role_instruction}"
+    )
+    PENALTY_BLOCK = (
+        "\n**Расчёт пени (если упомянут):**\n"
+        "- Формула: Пени = Сумма долга × Дни просрочки × (Ключевая ставка ЦБ РФ / 300 / 100)\n"
+        "- Основание: [ЖК РФ, ст.155.1], [ФЗ №44-ФЗ], [ПП РФ №329]\n"
+        "- Ограничение: не более 9.5% годовых до 2027 года\n"
+        "- Пример: 10 000 руб., просрочка 30 дней → 95 руб.\n"
+        "- Начало начисления: с 31-го дня после окончания срока оплаты\n"
+    )
 
-    def _expand_search_query(self, query: str) -> List[str]:
-        """Генерирует несколько вариантов поискового запроса для лучшего покрытия темы."""
-        queries = [query]
-        queries.append(f"{query} ФЗ 99-ФЗ лицензия УК")
-        queries.append(f"{query} ЖК РФ ст 193 лицензирование")
-        queries.append(f"{query} судебная практика по отзыву лицензии УК")
-        queries.append(f"{query} как проверить лицензию УК на сайте ГЖИ")
-        queries.append(f"{query} образец жалобы в ГЖИ на УК")
-        # Добавляем синонимы
-        for term, data in self.term_map.items():
-            if term in query.lower() or any(syn in query.lower() for syn in data.get("synonyms", [])):
-                for synonym in data.get("synonyms", [])[:2]:
-                    new_q = query.replace(term, synonym) if term in query else query + " " + synonym
-                    queries.append(new_q)
-        return list(set(queries))
-
-    def _build_prompt(self, summary: str, context_text: str, role: str = "смешанная") -> str:
-        """
-        Агент: Лицензирование и контроль за УК
-        Формирует системный промт:
-        - Фокус: лицензирование, проверка, контроль и ответственность УК
-        - Жёсткая структура и ссылки на нормативные акты
-        """
-        extra = self.improve_prompt_from_feedback()
-        web_results = self._perform_web_search(summary)
-    
-        # Проверка на необходимость расчета пени
-        penalty_keywords = ["пени", "неустойка", "штраф за просрочку", "ставка цб", "9.5%", "ключевая ставка"]
-        q_lower = summary.lower()
-        should_calculate_penalty = any(kw in q_lower for kw in penalty_keywords)
-    
-        # --- SYSTEM PROMPT ---
-        system_prompt = (
-            "Ты — эксперт по лицензированию и контролю управляющих компаний в сфере ЖКХ. "
-            "Отвечай строго по нормативам, без выдуманных данных, используя только предоставленный контекст и обновления.\n\n"
-            "**ЖЕСТКИЕ ПРАВИЛА:**\n"
-            "1. Если информации нет — отвечай: 'Недостаточно данных для точного ответа.'\n"
-            "2. Обязательно указывай ссылки на нормативные акты и судебные решения.\n"
-            "3. Структура: краткий вывод → нормативы → пошаговая инструкция → судебная практика.\n"
-            "4. Формулы пени включай только при упоминании пени.\n"
-            "5. Приоритет источников: ЖК РФ > ФЗ №99-ФЗ > ФЗ №294-ФЗ > ПП РФ > судебная практика.\n\n"
-            f"### Контекст:\n{context_text}\n\n"
-            f"### Веб-поиск:\n{web_results}\n\n"
-            f"### Дополнительные обновления:\n{extra}\n\n"
-            "--- Основной ответ ---\n"
-            "Краткий вывод: [законно ли действие УК, куда обращаться, основные меры]\n"
-            "Нормативное обоснование: [ЖК РФ, ФЗ №99-ФЗ, ФЗ №294-ФЗ, ПП РФ — точные статьи и пункты]\n"
-            "Пошаговая инструкция:\n"
-            "- Проверка лицензии УК (официальный реестр ГЖИ — ФЗ №99-ФЗ, ст.18)\n"
-            "- Жалоба в ГЖИ (письменно, через ГИС ЖКХ — ФЗ №59-ФЗ, ст.12)\n"
-            "- Последствия нарушений (предписание, штраф, приостановление, отзыв лицензии — ФЗ №99-ФЗ, ст.20)\n"
-            "- Обжалование действий ГЖИ (вышестоящий орган или суд — ФЗ №294-ФЗ, ст.22)\n"
-            "- Требования к УК (квалификация, отчётность, отсутствие судимости — ЖК РФ, ст.193)\n\n"
-            "Судебная практика:\n"
-            "- Определение ВС РФ №XXX-ЭСXX-XXXX — краткая позиция суда\n"
-            "Если судебных решений нет: 'Судебная практика по данному вопросу в базе отсутствует'.\n\n"
-            "Ключевые источники:\n"
-            "- ЖК РФ, ФЗ №99-ФЗ, ФЗ №294-ФЗ, ПП РФ №493, ПП РФ №731\n"
-        )
-    
-        # --- Динамический блок: расчет пени ---
-        if should_calculate_penalty:
-            system_prompt += (
-                "\n**Расчёт пени (если упомянут):**\n"
-                "- Формула: Пени = Сумма долга × Дни просрочки × (Ключевая ставка ЦБ РФ / 300 / 100)\n"
-                "- Основание: [ЖК РФ, ст.155.1], [ФЗ №44-ФЗ], [ПП РФ №329]\n"
-                "- Ограничение: не более 9.5% годовых до 2027 года\n"
-                "- Пример: 10 000 руб., просрочка 30 дней → 95 руб.\n"
-                "- Начало начисления: с 31-го дня после окончания срока оплаты\n"
-            )
-    
-        system_prompt += f"{self.get_role_instruction(role)}"
-    
-        # --- Формат для QVikhr / LLaMA-3 ---
-        prompt_formatted = (
-            "<|begin_of_text|><|start_header_id|>system<|end_header_id|>\n"
-            f"{system_prompt}<|eot_id|>"
-        )
-    
-        return prompt_formatted
         
 class RSOInteractionAgent(RAGAgent):
+    OFFICIAL_DOMAINS = RAGAgent.OFFICIAL_DOMAINS | {"roscomnadzor.ru", "mchs.gov.ru", "vsrf.ru"}
+    GOV_SUFFIXES = (".gov.ru", ".gkh.ru", ".mchs.gov.ru", ".vsrf.ru")
+    SEARCH_QUERY_TEMPLATES = (
+        "{q} ЖК РФ ст 157 РСО",
+        "{q} ПП РФ 354 раздел 10",
+        "{q} судебная практика по прямым договорам с РСО",
+        "{q} акт сверки с ресурсоснабжающей организацией образец",
+        "{q} граница балансовой принадлежности РСО УК",
+    )
+
     def __init__(self):
         # Расширенный и структурированный словарь с синонимами и контекстами
-        self.term_map = self._build_term_map()
-        keywords = self._flatten_term_map(self.term_map)
+        self.term_map, keywords = self._shared_term_map()
         
         super().__init__("Взаимодействие с РСО", keywords)
 
@@ -7363,191 +4934,68 @@ class RSOInteractionAgent(RAGAgent):
             },
         }
 
-    def _flatten_term_map(self, term_map: Dict) -> List[str]:
-        """Преобразует структурированный словарь в плоский список уникальных ключевых слов."""
-        keywords = set()
-        for term, data in term_map.items():
-            keywords.add(term.lower())  # оригинальный ключ
-            for synonym in data.get("synonyms", []):
-                keywords.add(synonym.lower())
-            # Добавляем ключи из контекстов
-            contexts = data.get("contexts", [])
-            if isinstance(contexts, dict):
-                for ctx_key in contexts.keys():
-                    keywords.add(ctx_key.lower())
-            elif isinstance(contexts, list):
-                for ctx in contexts:
-                    keywords.add(ctx.lower())
-        return list(keywords)
-
-    def _perform_web_search(self, query: str, max_results: int = 3) -> str:
-        """
-        Улучшенный веб-поиск: приоритет официальным источникам, фильтрация, ранжирование.
-        Выполняется ВНУТРИ _build_prompt, как в оригинальной архитектуре.
-        """
-        OFFICIAL_DOMAINS = {
-            "cbr.ru", "government.ru", "kremlin.ru", "rosstat.gov.ru", "minfin.gov.ru",
-            "fas.gov.ru", "gji.ru", "rospotrebnadzor.ru", "rosreestr.gov.ru",
-            "minstroyrf.ru", "fgis-tarif.ru", "consultant.ru", "garant.ru",
-            "pravo.gov.ru", "gkh.ru", "roscomnadzor.ru", "mchs.gov.ru", "vsrf.ru"
-        }
-
-        BLACKLISTED_DOMAINS = {
-            "otvet.mail.ru", "ask.fm", "irecommend.ru", "pikabu.ru",
-            "zen.yandex.ru", "thequestion.ru", "quora.com", "reddit.com",
-            "fishki.net", "yaplakal.com", "blog", "forum"
-        }
-
-        # Генерируем расширенные поисковые запросы
-        expanded_queries = self._expand_search_query(query)
-        all_results = []
-
-        for attempt in range(2):
-            try:
-                with DDGS(timeout=10) as ddgs:
-                    for q in expanded_queries:
-                        results = ddgs.text(q, max_results=5)
-                        for r in results:
-                            href = r.get('href', '')
-                            if not href:
-                                continue
-                            
-                            try:
-                                domain = href.split('/')[2].lower()
-                            except IndexError:
-                                continue
-
-                            if any(bad in domain for bad in BLACKLISTED_DOMAINS):
-                                continue
-
-                            weight = 3 if any(official in domain for official in OFFICIAL_DOMAINS) else \
-                                     2 if any(gov in domain for gov in [".gov.ru", ".gkh.ru", ".mchs.gov.ru", ".vsrf.ru"]) else 1
-
-                            snippet = {
-                                "body": r['body'],
-                                "href": href,
-                                "title": r.get('title', ''),
-                                "weight": weight
-                            }
-                            all_results.append(snippet)
-
-                    all_results = sorted(all_results, key=lambda x: x['weight'], reverse=True)
-                    seen_bodies = set()
-                    unique_results = []
-                    for r in all_results:
-                        body_hash = hash(r['body'][:100])
-                        if body_hash not in seen_bodies:
-                            seen_bodies.add(body_hash)
-                            unique_results.append(r)
-                            if len(unique_results) >= max_results:
-                                break
-
-                    if unique_results:
-                        formatted = []
-                        for r in unique_results:
-                            prefix = "[ОФИЦИАЛЬНЫЙ ИСТОЧНИК] " if r['weight'] >= 2 else ""
-                            formatted.append(f"{prefix}• {r['body']}\n  Источник: {r['href']}\n")
-                        return "\n".join(formatted).strip()
-                    else:
-                        return "По вашему запросу ничего не найдено в надёжных источниках."
-
-            except Exception as e:
-                if attempt == 0:
-                    time.sleep(2)
-                    continue
-                return f"Ошибка веб-поиска: {str(e)}"
+    # Агент: Взаимодействие с РСО
+    # Системный промт:
+    # - Фокус: договоры, передача показаний, акты сверки, границы балансовой принадлежности
+    # - Жёсткая структура и ссылки на нормативные акты
+    PROMPT_TEMPLATE = (
+        "Ты — эксперт по взаимодействию управляющих компаний и ТСЖ с ресурсоснабжающими организациями (РСО) в сфере ЖКХ. Отвечай строго по нормативам, без выдуманных данных, используя только контекст, веб-результаты и обновления.\n\n"
+        "**ЖЕСТКИЕ ПРАВИЛА:**\n"
+        "1. Если информации нет — отвечай: 'Недостаточно данных для точного ответа.'\n"
+        "2. Обязательно указывай ссылки на нормативные акты.\n"
+        "3. Структура: краткий вывод → нормативы → пошаговая инструкция → судебная практика.\n"
+        "4. Формулы пени включай только при упоминании пени.\n"
+        "5. Приоритет источников: ЖК РФ > ПП РФ > разъяснения Минстроя > судебная практика.\n\n"
+        "### Контекст:\n"
+        "{context_text}\n\n"
+        "### Веб-поиск:\n"
+        "{web_results}\n\n"
+        "### Дополнительные обновления:\n"
+        "{extra}\n\n"
+        "--- Основной ответ ---\n"
+        "Краткий вывод: [кто отвечает, что делать, куда обращаться]\n"
+        "Нормативное обоснование: [ЖК РФ, ПП РФ — точные статьи и пункты]\n"
+        "Пошаговая инструкция:\n"
+        "- Заключение прямого договора с РСО (ОСС — ЖК РФ, ст.157.1)\n"
+        "- Передача показаний счетчиков (сроки, способы — ПП РФ №354, п.31)\n"
+        "- Составление акта сверки (сроки, участники, реквизиты — ПП РФ №354, п.101)\n"
+        "- Границы балансовой принадлежности (договор, схема — ПП РФ №491, п.3)\n"
+        "- Оспаривание начислений РСО (жалоба, акт, суд — ЖК РФ, ст.157)\n\n"
+        "Судебная практика:\n"
+        "- Определение ВС РФ №XXX-ЭСXX-XXXX — краткая позиция суда\n"
+        "Если судебных решений нет: 'Судебная практика по данному вопросу в базе отсутствует'.\n\n"
+        "Ключевые нормативные акты:\n"
+        "- ЖК РФ (ст.154 — состав платы, ст.156 — обязанности РСО, ст.157 — расчёты с РСО)\n"
+        "- ПП РФ №354 (раздел 10 — взаимодействие с РСО, п.31 — передача показаний, п.101 — акты сверки)\n"
+        "- ПП РФ №491 (п.3 — границы балансовой принадлежности)\n"
+        "- СанПиН 1.2.3685-21 (параметры качества услуг)\n"
+        "- ФЗ №261-ФЗ (обязанность установки ИПУ)\n"
+        "{penalty_block}{role_instruction}"
+    )
+    PENALTY_BLOCK = (
+        "\n**Расчёт пени (если упомянут):**\n"
+        "- Формула: Пени = Сумма долга × Дни просрочки × (Ключевая ставка ЦБ РФ / 300 / 100)\n"
+        "- Основание: [ЖК РФ, ст.155.1], [ФЗ №44-ФЗ], [ПП РФ №329]\n"
+        "- Ограничение: не более 9.5% годовых до 2027 года\n"
+        "- Пример: 10 000 руб., просрочка 30 дней → 95 руб.\n"
+        "- Начало начисления: с 31-го дня после окончания срока оплаты\n"
+    )
 
-        return "Не удалось выполнить веб-поиск. Попробуйте позже."
-
-    def _expand_search_query(self, query: str) -> List[str]:
-        """Генерирует несколько вариантов поискового запроса для лучшего покрытия темы."""
-        queries = [query]
-        queries.append(f"{query} ЖК РФ ст 157 РСО")
-        queries.append(f"{query} ПП РФ 354 раздел 10")
-        queries.append(f"{query} судебная практика по прямым договорам с РСО")
-        queries.append(f"{query} акт сверки с ресурсоснабжающей организацией образец")
-        queries.append(f"{query} граница балансовой принадлежности РСО УК")
-        # Добавляем синонимы
-        for term, data in self.term_map.items():
-            if term in query.lower() or any(syn in query.lower() for syn in data.get("synonyms", [])):
-                for synonym in data.get("synonyms", [])[:2]:
-                    new_q = query.replace(term, synonym) if term in query else query + " " + synonym
-                    queries.append(new_q)
-        return list(set(queries))
-
-    def _build_prompt(self, summary: str, context_text: str, role: str = "смешанная") -> str:
-        """
-        Агент: Взаимодействие с РСО
-        Формирует системный промт:
-        - Фокус: договоры, передача показаний, акты сверки, границы балансовой принадлежности
-        - Жёсткая структура и ссылки на нормативные акты
-        """
-        extra = self.improve_prompt_from_feedback()
-        web_results = self._perform_web_search(summary)
-    
-        # Проверка на запрос о пени
-        penalty_keywords = ["пени", "неустойка", "штраф за просрочку", "ставка цб", "9.5%", "ключевая ставка"]
-        should_calculate_penalty = any(kw in summary.lower() for kw in penalty_keywords)
-    
-        # --- SYSTEM PROMPT ---
-        system_prompt = (
-            "Ты — эксперт по взаимодействию управляющих компаний и ТСЖ с ресурсоснабжающими организациями (РСО) в сфере ЖКХ. "
-            "Отвечай строго по нормативам, без выдуманных данных, используя только контекст, веб-результаты и обновления.\n\n"
-            "**ЖЕСТКИЕ ПРАВИЛА:**\n"
-            "1. Если информации нет — отвечай: 'Недостаточно данных для точного ответа.'\n"
-            "2. Обязательно указывай ссылки на нормативные акты.\n"
-            "3. Структура: краткий вывод → нормативы → пошаговая инструкция → судебная практика.\n"
-            "4. Формулы пени включай только при упоминании пени.\n"
-            "5. Приоритет источников: ЖК РФ > ПП РФ > разъяснения Минстроя > судебная практика.\n\n"
-            f"### Контекст:\n{context_text}\n\n"
-            f"### Веб-поиск:\n{web_results}\n\n"
-            f"### Дополнительные обновления:\n{extra}\n\n"
-            "--- Основной ответ ---\n"
-            "Краткий вывод: [кто отвечает, что делать, куда обращаться]\n"
-            "Нормативное обоснование: [ЖК РФ, ПП РФ — точные статьи и пункты]\n"
-            "Пошаговая инструкция:\n"
-            "- Заключение прямого договора с РСО (ОСС — ЖК РФ, ст.157.1)\n"
-            "- Передача показаний счетчиков (сроки, способы — ПП РФ №354, п.31)\n"
-            "- Составление акта сверки (сроки, участники, реквизиты — ПП РФ №354, п.101)\n"
-            "- Границы балансовой принадлежности (договор, схема — ПП РФ №491, п.3)\n"
-            "- Оспаривание начислений РСО (жалоба, акт, суд — ЖК РФ, ст.157)\n\n"
-            "Судебная практика:\n"
-            "- Определение ВС РФ №XXX-ЭСXX-XXXX — краткая позиция суда\n"
-            "Если судебных решений нет: 'Судебная практика по данному вопросу в базе отсутствует'.\n\n"
-            "Ключевые нормативные акты:\n"
-            "- ЖК РФ (ст.154 — состав платы, ст.156 — обязанности РСО, ст.157 — расчёты с РСО)\n"
-            "- ПП РФ №354 (раздел 10 — взаимодействие с РСО, п.31 — передача показаний, п.101 — акты сверки)\n"
-            "- ПП РФ №491 (п.3 — границы балансовой принадлежности)\n"
-            "- СанПиН 1.2.3685-21 (параметры качества услуг)\n"
-            "- ФЗ №261-ФЗ (обязанность установки ИПУ)\n"
-        )
-    
-        # --- Динамический блок: расчет пени ---
-        if should_calculate_penalty:
-            system_prompt += (
-                "\n**Расчёт пени (если упомянут):**\n"
-                "- Формула: Пени = Сумма долга × Дни просрочки × (Ключевая ставка ЦБ РФ / 300 / 100)\n"
-                "- Основание: [ЖК РФ, ст.155.1], [ФЗ №44-ФЗ], [ПП РФ №329]\n"
-                "- Ограничение: не более 9.5% годовых до 2027 года\n"
-                "- Пример: 10 000 руб., просрочка 30 дней → 95 руб.\n"
-                "- Начало начисления: с 31-го дня после окончания срока оплаты\n"
-            )
-    
-        system_prompt += f"{self.get_role_instruction(role)}"
-    
-        # --- Формат для QVikhr / LLaMA-3 ---
-        prompt_formatted = (
-            "<|begin_of_text|><|start_header_id|>system<|end_header_id|>\n"
-            f"{system_prompt}<|eot_id|>"
-        )
-    
-        return prompt_formatted
 
 class SafetySecurityAgent(RAGAgent):
+    OFFICIAL_DOMAINS = RAGAgent.OFFICIAL_DOMAINS | {"mchs.gov.ru", "fssb.ru", "vsrf.ru", "roscomnadzor.ru"}
+    GOV_SUFFIXES = (".gov.ru", ".gkh.ru", ".mchs.gov.ru", ".fssb.ru", ".vsrf.ru")
+    SEARCH_QUERY_TEMPLATES = (
+        "{q} ПП РФ 1479 пожарная безопасность",
+        "{q} Постановление Правительства РФ 730 антитеррор",
+        "{q} судебная практика по штрафам МЧС",
+        "{q} требования к пожарному щиту в МКД",
+        "{q} антитеррористический паспорт объекта ЖКХ",
+    )
+
     def __init__(self):
         # Расширенный и структурированный словарь с синонимами и контекстами
-        self.term_map = self._build_term_map()
-        keywords = self._flatten_term_map(self.term_map)
+        self.term_map, keywords = self._shared_term_map()
         
         super().__init__("Безопасность и антитеррористическая защищенность", keywords)
 
@@ -7631,193 +5079,71 @@ class SafetySecurityAgent(RAGAgent):
             },
         }
 
-    def _flatten_term_map(self, term_map: Dict) -> List[str]:
-        """Преобразует структурированный словарь в плоский список уникальных ключевых слов."""
-        keywords = set()
-        for term, data in term_map.items():
-            keywords.add(term.lower())  # оригинальный ключ
-            for synonym in data.get("synonyms", []):
-                keywords.add(synonym.lower())
-            # Добавляем ключи из контекстов
-            contexts = data.get("contexts", [])
-            if isinstance(contexts, dict):
-                for ctx_key in contexts.keys():
-                    keywords.add(ctx_key.lower())
-            elif isinstance(contexts, list):
-                for ctx in contexts:
-                    keywords.add(ctx.lower())
-        return list(keywords)
-
-    def _perform_web_search(self, query: str, max_results: int = 3) -> str:
-        """
-        Улучшенный веб-поиск: приоритет официальным источникам, фильтрация, ранжирование.
-        Выполняется ВНУТРИ _build_prompt, как в оригинальной архитектуре.
-        """
-        OFFICIAL_DOMAINS = {
-            "cbr.ru", "government.ru", "kremlin.ru", "rosstat.gov.ru", "minfin.gov.ru",
-            "fas.gov.ru", "gji.ru", "rospotrebnadzor.ru", "rosreestr.gov.ru",
-            "minstroyrf.ru", "fgis-tarif.ru", "consultant.ru", "garant.ru",
-            "pravo.gov.ru", "gkh.ru", "mchs.gov.ru", "fssb.ru", "vsrf.ru", "roscomnadzor.ru"
-        }
-
-        BLACKLISTED_DOMAINS = {
-            "otvet.mail.ru", "ask.fm", "irecommend.ru", "pikabu.ru",
-            "zen.yandex.ru", "thequestion.ru", "quora.com", "reddit.com",
-            "fishki.net", "yaplakal.com", "blog", "forum"
-        }
-
-        # Генерируем расширенные поисковые запросы
-        expanded_queries = self._expand_search_query(query)
-        all_results = []
-
-        for attempt in range(2):
-            try:
-                with DDGS(timeout=10) as ddgs:
-                    for q in expanded_queries:
-                        results = ddgs.text(q, max_results=5)
-                        for r in results:
-                            href = r.get('href', '')
-                            if not href:
-                                continue
-                            
-                            try:
-                                domain = href.split('/')[2].lower()
-                            except IndexError:
-                                continue
-
-                            if any(bad in domain for bad in BLACKLISTED_DOMAINS):
-                                continue
-
-                            weight = 3 if any(official in domain for official in OFFICIAL_DOMAINS) else \
-                                     2 if any(gov in domain for gov in [".gov.ru", ".gkh.ru", ".mchs.gov.ru", ".fssb.ru", ".vsrf.ru"]) else 1
-
-                            snippet = {
-                                "body": r['body'],
-                                "href": href,
-                                "title": r.get('title', ''),
-                                "weight": weight
-                            }
-                            all_results.append(snippet)
-
-                    all_results = sorted(all_results, key=lambda x: x['weight'], reverse=True)
-                    seen_bodies = set()
-                    unique_results = []
-                    for r in all_results:
-                        body_hash = hash(r['body'][:100])
-                        if body_hash not in seen_bodies:
-                            seen_bodies.add(body_hash)
-                            unique_results.append(r)
-                            if len(unique_results) >= max_results:
-                                break
-
-                    if unique_results:
-                        formatted = []
-                        for r in unique_results:
-                            prefix = "[ОФИЦИАЛЬНЫЙ ИСТОЧНИК] " if r['weight'] >= 2 else ""
-                            formatted.append(f"{prefix}• {r['body']}\n  Источник: {r['href']}\n")
-                        return "\n".join(formatted).strip()
-                    else:
-                        return "По вашему запросу ничего не найдено в надёжных источниках."
-
-            except Exception as e:
-                if attempt == 0:
-                    time.sleep(2)
-                    continue
-                return f"Ошибка веб-поиска: {str(e)}"
-
-        return "Не удалось выполнить веб-поиск. Попробуйте позже."
+    # Агент: Безопасность и антитеррористическая защищённость
+    # Системный промт:
+    # - Фокус: пожарная безопасность, антитеррористическая защищённость
+    # - Жёсткая структура, ссылки на нормативы и судебную практику
+    PROMPT_TEMPLATE = (
+        "Ты — экспертный ИИ-ассистент по пожарной безопасности и антитеррористической защищённости в сфере ЖКХ. "
+        "Отвечай строго по нормативам, без выдуманных данных, используя только контекст, веб-результаты и обновления.\n\n"
+        "**ЖЕСТКИЕ ПРАВИЛА:**\n"
+        "1. Если информации нет — отвечай: 'Недостаточно данных для точного ответа.'\n"
+        "2. Обязательно указывай ссылки на нормативные акты.\n"
+        "3. Структура: краткий вывод → нормативы → пошаговая инструкция → судебная практика.\n"
+        "4. Формулы пени включай только при упоминании пени.\n"
+        "5. Приоритет: ФЗ > Постановления Правительства РФ > ПП РФ > Правила противопожарного режима > судебная практика.\n\n"
+        "### Контекст:\n"
+        "{context_text}\n\n"
+        "### Веб-поиск:\n"
+        "{web_results}\n\n"
+        "### Дополнительные обновления:\n"
+        "{extra}\n\n"
+        "--- Основной ответ ---\n"
+        "Краткий вывод: [что делать, кто отвечает, законно ли требование]\n"
+        "Нормативное обоснование: [ФЗ, постановления, ПП РФ — точные номера и пункты]\n"
+        "Пошаговая инструкция:\n"
+        "- Обязанности УК (обеспечение исправности систем — ЖК РФ, ст.161.1; ПП РФ №1479)\n"
+        "- Обязанности собственников (не загромождать эвакуационные пути — ЖК РФ, ст.36)\n"
+        "- Подготовка к проверке МЧС (паспорт объекта, журналы инструктажей, исправность оборудования — ПП РФ №1479)\n"
+        "- Действия при пожаре (вызов 101, эвакуация, использование огнетушителя — ПП РФ №1479, п.7)\n"
+        "- Оформление антитеррористического паспорта (заказ в специализированной организации — Постановление №730)\n\n"
+        "Судебная практика:\n"
+        "- Определение ВС РФ №XXX-ЭСXX-XXXX — краткая позиция суда\n"
+        "Если судебных решений нет: 'Судебная практика по данному вопросу в базе отсутствует'.\n\n"
+        "Ключевые нормативные акты:\n"
+        "- ЖК РФ (ст.36 — обязанности собственников, ст.161.1 — обязанности УК)\n"
+        "- ФЗ №69-ФЗ «О пожарной безопасности»\n"
+        "- ФЗ №35-ФЗ «О противодействии терроризму»\n"
+        "- Постановление Правительства РФ №730 «О противодействии терроризму...»\n"
+        "- ПП РФ №1479 «Правила противопожарного режима в РФ»\n"
+        "- ФЗ №123-ФЗ «Технический регламент о требованиях пожарной безопасности»\n"
+        "- Приказы МЧС и ФСБ по вопросам инструктажа и паспортизации\n"
+        "{penalty_block}{role_instruction}"
+    )
+    PENALTY_BLOCK = (
+        "\n**Расчёт пени (если упомянут):**\n"
+        "- Формула: Пени = Сумма долга × Дни просрочки × (Ключевая ставка ЦБ РФ / 300 / 100)\n"
+        "- Основание: [ЖК РФ, ст.155.1], [ФЗ №44-ФЗ], [ПП РФ №329]\n"
+        "- Ограничение: не более 9.5% годовых до 2027 года\n"
+        "- Пример: 10 000 руб., просрочка 30 дней → 95 руб.\n"
+        "- Начало начисления: с 31-го дня после окончания срока оплаты\n"
+    )
 
-    def _expand_search_query(self, query: str) -> List[str]:
-        """Генерирует несколько вариантов поискового запроса для лучшего покрытия темы."""
-        queries = [query]
-        queries.append(f"{query} ПП РФ 1479 пожарная безопасность")
-        queries.append(f"{query} Постановление Правительства РФ 730 антитеррор")
-        queries.append(f"{query} судебная практика по штрафам МЧС")
-        queries.append(f"{query} требования к пожарному щиту в МКД")
-        queries.append(f"{query} антитеррористический паспорт объекта ЖКХ")
-        # Добавляем синонимы
-        for term, data in self.term_map.items():
-            if term in query.lower() or any(syn in query.lower() for syn in data.get("synonyms", [])):
-                for synonym in data.get("synonyms", [])[:2]:
-                    new_q = query.replace(term, synonym) if term in query else query + " " + synonym
-                    queries.append(new_q)
-        return list(set(queries))
-
-    def _build_prompt(self, summary: str, context_text: str, role: str = "смешанная") -> str:
-        """
-        Агент: Безопасность и антитеррористическая защищённость
-        Формирует системный промт:
-        - Фокус: пожарная безопасность, антитеррористическая защищённость
-        - Жёсткая структура, ссылки на нормативы и судебную практику
-        """
-        extra = self.improve_prompt_from_feedback()
-        web_results = self._perform_web_search(summary)
-    
-        # Проверка на запрос о пени
-        penalty_keywords = ["пени", "неустойка", "штраф за просрочку", "ставка цб", "9.5%", "ключевая ставка"]
-        should_calculate_penalty = any(kw in summary.lower() for kw in penalty_keywords)
-    
-        # --- SYSTEM PROMPT ---
-        system_prompt = (
-            "Ты — экспертный ИИ-ассистент по пожарной безопасности и антитеррористической защищённости в сфере ЖКХ. "
-            "Отвечай строго по нормативам, без выдуманных данных, используя только контекст, веб-результаты и обновления.\n\n"
-            "**ЖЕСТКИЕ ПРАВИЛА:**\n"
-            "1. Если информации нет — отвечай: 'Недостаточно данных для точного ответа.'\n"
-            "2. Обязательно указывай ссылки на нормативные акты.\n"
-            "3. Структура: краткий вывод → нормативы → пошаговая инструкция → судебная практика.\n"
-            "4. Формулы пени включай только при упоминании пени.\n"
-            "5. Приоритет: ФЗ > Постановления Правительства РФ > ПП РФ > Правила противопожарного режима > судебная практика.\n\n"
-            f"### Контекст:\n{context_text}\n\n"
-            f"### Веб-поиск:\n{web_results}\n\n"
-            f"### Дополнительные обновления:\n{extra}\n\n"
-            "--- Основной ответ ---\n"
-            "Краткий вывод: [что делать, кто отвечает, законно ли требование]\n"
-            "Нормативное обоснование: [ФЗ, постановления, ПП РФ — точные номера и пункты]\n"
-            "Пошаговая инструкция:\n"
-            "- Обязанности УК (обеспечение исправности систем — ЖК РФ, ст.161.1; ПП РФ №1479)\n"
-            "- Обязанности собственников (не загромождать эвакуационные пути — ЖК РФ, ст.36)\n"
-            "- Подготовка к проверке МЧС (паспорт объекта, журналы инструктажей, исправность оборудования — ПП РФ №1479)\n"
-            "- Действия при пожаре (вызов 101, эвакуация, использование огнетушителя — ПП РФ №1479, п.7)\n"
-            "- Оформление антитеррористического паспорта (заказ в специализированной организации — Постановление №730)\n\n"
-            "Судебная практика:\n"
-            "- Определение ВС РФ №XXX-ЭСXX-XXXX — краткая позиция суда\n"
-            "Если судебных решений нет: 'Судебная практика по данному вопросу в базе отсутствует'.\n\n"
-            "Ключевые нормативные акты:\n"
-            "- ЖК РФ (ст.36 — обязанности собственников, ст.161.1 — обязанности УК)\n"
-            "- ФЗ №69-ФЗ «О пожарной безопасности»\n"
-            "- ФЗ №35-ФЗ «О противодействии терроризму»\n"
-            "- Постановление Правительства РФ №730 «О противодействии терроризму...»\n"
-            "- ПП РФ №1479 «Правила противопожарного режима в РФ»\n"
-            "- ФЗ №123-ФЗ «Технический регламент о требованиях пожарной безопасности»\n"
-            "- Приказы МЧС и ФСБ по вопросам инструктажа и паспортизации\n"
-        )
-    
-        # --- Динамический блок: расчет пени ---
-        if should_calculate_penalty:
-            system_prompt += (
-                "\n**Расчёт пени (если упомянут):**\n"
-                "- Формула: Пени = Сумма долга × Дни просрочки × (Ключевая ставка ЦБ РФ / 300 / 100)\n"
-                "- Основание: [ЖК РФ, ст.155.1], [ФЗ №44-ФЗ], [ПП РФ №329]\n"
-                "- Ограничение: не более 9.5% годовых до 2027 года\n"
-                "- Пример: 10 000 руб., просрочка 30 дней → 95 руб.\n"
-                "- Начало начисления: с 31-го дня после окончания срока оплаты\n"
-            )
-    
-        system_prompt += f"{self.get_role_instruction(role)}"
-    
-        # --- Формат для QVikhr / LLaMA-3 ---
-        prompt_formatted = (
-            "<|begin_of_text|><|start_header_id|>system<|end_header_id|>\n"
-            f"{system_prompt}<|eot_id|>"
-        )
-    
-        return prompt_formatted
 
 class EnergyEfficiencyAgent(RAGAgent):
+    OFFICIAL_DOMAINS = RAGAgent.OFFICIAL_DOMAINS | {"roscomnadzor.ru", "mce.gov.ru", "vsrf.ru"}
+    GOV_SUFFIXES = (".gov.ru", ".gkh.ru", ".mce.gov.ru", ".vsrf.ru")
+    SEARCH_QUERY_TEMPLATES = (
+        "{q} ФЗ 261-ФЗ энергосбережение",
+        "{q} ПП РФ 1289 энергосервис",
+        "{q} судебная практика по энергосервисным контрактам",
+        "{q} требования к установке ИПУ ОДПУ",
+        "{q} тепловизионное обследование МКД нормы",
+    )
+
     def __init__(self):
         # Расширенный и структурированный словарь с синонимами и контекстами
-        self.term_map = self._build_term_map()
-        keywords = self._flatten_term_map(self.term_map)
+        self.term_map, keywords = self._shared_term_map()
         
         super().__init__("Энергосбережение и энергоэффективность", keywords)
 
@@ -7901,191 +5227,70 @@ class EnergyEfficiencyAgent(RAGAgent):
             },
         }
 
-    def _flatten_term_map(self, term_map: Dict) -> List[str]:
-        """Преобразует структурированный словарь в плоский список уникальных ключевых слов."""
-        keywords = set()
-        for term, data in term_map.items():
-            keywords.add(term.lower())  # оригинальный ключ
-            for synonym in data.get("synonyms", []):
-                keywords.add(synonym.lower())
-            # Добавляем ключи из контекстов
-            contexts = data.get("contexts", [])
-            if isinstance(contexts, dict):
-                for ctx_key in contexts.keys():
-                    keywords.add(ctx_key.lower())
-            elif isinstance(contexts, list):
-                for ctx in contexts:
-                    keywords.add(ctx.lower())
-        return list(keywords)
-
-    def _perform_web_search(self, query: str, max_results: int = 3) -> str:
-        """
-        Улучшенный веб-поиск: приоритет официальным источникам, фильтрация, ранжирование.
-        Выполняется ВНУТРИ _build_prompt, как в оригинальной архитектуре.
-        """
-        OFFICIAL_DOMAINS = {
-            "cbr.ru", "government.ru", "kremlin.ru", "rosstat.gov.ru", "minfin.gov.ru",
-            "fas.gov.ru", "gji.ru", "rospotrebnadzor.ru", "rosreestr.gov.ru",
-            "minstroyrf.ru", "fgis-tarif.ru", "consultant.ru", "garant.ru",
-            "pravo.gov.ru", "gkh.ru", "roscomnadzor.ru", "mce.gov.ru", "vsrf.ru"
-        }
-
-        BLACKLISTED_DOMAINS = {
-            "otvet.mail.ru", "ask.fm", "irecommend.ru", "pikabu.ru",
-            "zen.yandex.ru", "thequestion.ru", "quora.com", "reddit.com",
-            "fishki.net", "yaplakal.com", "blog", "forum"
-        }
-
-        # Генерируем расширенные поисковые запросы
-        expanded_queries = self._expand_search_query(query)
-        all_results = []
-
-        for attempt in range(2):
-            try:
-                with DDGS(timeout=10) as ddgs:
-                    for q in expanded_queries:
-                        results = ddgs.text(q, max_results=5)
-                        for r in results:
-                            href = r.get('href', '')
-                            if not href:
-                                continue
-                            
-                            try:
-                                domain = href.split('/')[2].lower()
-                            except IndexError:
-                                continue
-
-                            if any(bad in domain for bad in BLACKLISTED_DOMAINS):
-                                continue
-
-                            weight = 3 if any(official in domain for official in OFFICIAL_DOMAINS) else \
-                                     2 if any(gov in domain for gov in [".gov.ru", ".gkh.ru", ".mce.gov.ru", ".vsrf.ru"]) else 1
-
-                            snippet = {
-                                "body": r['body'],
-                                "href": href,
-                                "title": r.get('title', ''),
-                                "weight": weight
-                            }
-                            all_results.append(snippet)
-
-                    all_results = sorted(all_results, key=lambda x: x['weight'], reverse=True)
-                    seen_bodies = set()
-                    unique_results = []
-                    for r in all_results:
-                        body_hash = hash(r['body'][:100])
-                        if body_hash not in seen_bodies:
-                            seen_bodies.add(body_hash)
-                            unique_results.append(r)
-                            if len(unique_results) >= max_results:
-                                break
-
-                    if unique_results:
-                        formatted = []
-                        for r in unique_results:
-                            prefix = "[ОФИЦИАЛЬНЫЙ ИСТОЧНИК] " if r['weight'] >= 2 else ""
-                            formatted.append(f"{prefix}• {r['body']}\n  Источник: {r['href']}\n")
-                        return "\n".join(formatted).strip()
-                    else:
-                        return "По вашему запросу ничего не найдено в надёжных источниках."
-
-            except Exception as e:
-                if attempt == 0:
-                    time.sleep(2)
-                    continue
-                return f"Ошибка веб-поиска: {str(e)}"
-
-        return "Не удалось выполнить веб-поиск. Попробуйте позже."
+    # Агент: Энергосбережение и энергоэффективность
+    # Системный промт:
+    # - Фокус: энергосбережение, энергоэффективность, ИПУ, энергосервис, господдержка
+    # - Жёсткая структура, ссылки на нормативы и судебную практику
+    PROMPT_TEMPLATE = (
+        "Ты — экспертный ИИ-ассистент по энергосбережению и энергоэффективности в сфере ЖКХ. "
+        "Отвечай строго по нормативам, без выдуманных данных, используя только контекст, веб-результаты и обновления.\n\n"
+        "**ЖЕСТКИЕ ПРАВИЛА:**\n"
+        "1. Если информации нет — отвечай: 'Недостаточно данных для точного ответа.'\n"
+        "2. Обязательно указывай ссылки на нормативные акты.\n"
+        "3. Структура: краткий вывод → нормативы → пошаговая инструкция → судебная практика.\n"
+        "4. Формулы пени включай только при упоминании пени.\n"
+        "5. Приоритет: ФЗ №261-ФЗ > ПП РФ > Приказы Минстроя > судебная практика.\n\n"
+        "### Контекст:\n"
+        "{context_text}\n\n"
+        "### Веб-поиск:\n"
+        "{web_results}\n\n"
+        "### Дополнительные обновления:\n"
+        "{extra}\n\n"
+        "--- Основной ответ ---\n"
+        "Краткий вывод: [что делать, кто отвечает, законно ли требование]\n"
+        "Нормативное обоснование: [ФЗ, постановления, приказы — точные номера и пункты]\n"
+        "Пошаговая инструкция:\n"
+        "- Проведение энергетического обследования (сроки, аккредитованная организация — ФЗ №261-ФЗ, ст.16; "
+        "Приказ Минстроя №889/пр)\n"
+        "- Установка и поверка ИПУ/ОДПУ (сроки, передача показаний — ФЗ №261-ФЗ, ст.13)\n"
+        "- Заключение энергосервисного контракта (расчёт экономии, срок контракта — ПП РФ №1289)\n"
+        "- Реализация мер энергоэффективности (утепление, модернизация систем — ФЗ №261-ФЗ, ст.25)\n"
+        "- Получение господдержки (документы, программы — ПП РФ №1289)\n\n"
+        "Судебная практика:\n"
+        "- Определение ВС РФ №XXX-ЭСXX-XXXX — краткая позиция суда\n"
+        "Если судебных решений нет: 'Судебная практика по данному вопросу в базе отсутствует'.\n\n"
+        "Ключевые нормативные акты:\n"
+        "- ФЗ №261-ФЗ «Об энергосбережении и о повышении энергетической эффективности»\n"
+        "- ПП РФ №1289 «О требованиях к энергосервисным контрактам...»\n"
+        "- ПП РФ №1818 «Об утверждении Правил установления требований энергетической эффективности...»\n"
+        "- Приказ Минстроя №889/пр «Об утверждении Правил проведения энергетического обследования...»\n"
+        "- ПП РФ №354 (в части установки и поверки приборов учёта)\n"
+        "{penalty_block}{role_instruction}"
+    )
+    PENALTY_BLOCK = (
+        "\n**Расчёт пени (если упомянут):**\n"
+        "- Формула: Пени = Сумма долга × Дни просрочки × (Ключевая ставка ЦБ РФ / 300 / 100)\n"
+        "- Основание: [ЖК РФ, ст.155.1], [ФЗ №44-ФЗ], [ПП РФ №329]\n"
+        "- Ограничение: не более 9.5% годовых до 2027 года\n"
+        "- Пример: 10 000 руб., просрочка 30 дней → 95 руб.\n"
+        "- Начало начисления: с 31-го дня после окончания срока оплаты\n"
+    )
 
-    def _expand_search_query(self, query: str) -> List[str]:
-        """Генерирует несколько вариантов поискового запроса для лучшего покрытия темы."""
-        queries = [query]
-        queries.append(f"{query} ФЗ 261-ФЗ энергосбережение")
-        queries.append(f"{query} ПП РФ 1289 энергосервис")
-        queries.append(f"{query} судебная практика по энергосервисным контрактам")
-        queries.append(f"{query} требования к установке ИПУ ОДПУ")
-        queries.append(f"{query} тепловизионное обследование МКД нормы")
-        # Добавляем синонимы
-        for term, data in self.term_map.items():
-            if term in query.lower() or any(syn in query.lower() for syn in data.get("synonyms", [])):
-                for synonym in data.get("synonyms", [])[:2]:
-                    new_q = query.replace(term, synonym) if term in query else query + " " + synonym
-                    queries.append(new_q)
-        return list(set(queries))
-
-    def _build_prompt(self, summary: str, context_text: str, role: str = "смешанная") -> str:
-        """
-        Агент: Энергосбережение и энергоэффективность
-        Формирует системный промт:
-        - Фокус: энергосбережение, энергоэффективность, ИПУ, энергосервис, господдержка
-        - Жёсткая структура, ссылки на нормативы и судебную практику
-        """
-        extra = self.improve_prompt_from_feedback()
-        web_results = self._perform_web_search(summary)
-    
-        # Проверка на запрос о пени
-        penalty_keywords = ["пени", "неустойка", "штраф за просрочку", "ставка цб", "9.5%", "ключевая ставка"]
-        should_calculate_penalty = any(kw in summary.lower() for kw in penalty_keywords)
-    
-        # --- SYSTEM PROMPT ---
-        system_prompt = (
-            "Ты — экспертный ИИ-ассистент по энергосбережению и энергоэффективности в сфере ЖКХ. "
-            "Отвечай строго по нормативам, без выдуманных данных, используя только контекст, веб-результаты и обновления.\n\n"
-            "**ЖЕСТКИЕ ПРАВИЛА:**\n"
-            "1. Если информации нет — отвечай: 'Недостаточно данных для точного ответа.'\n"
-            "2. Обязательно указывай ссылки на нормативные акты.\n"
-            "3. Структура: краткий вывод → нормативы → пошаговая инструкция → судебная практика.\n"
-            "4. Формулы пени включай только при упоминании пени.\n"
-            "5. Приоритет: ФЗ №261-ФЗ > ПП РФ > Приказы Минстроя > судебная практика.\n\n"
-            f"### Контекст:\n{context_text}\n\n"
-            f"### Веб-поиск:\n{web_results}\n\n"
-            f"### Дополнительные обновления:\n{extra}\n\n"
-            "--- Основной ответ ---\n"
-            "Краткий вывод: [что делать, кто отвечает, законно ли требование]\n"
-            "Нормативное обоснование: [ФЗ, постановления, приказы — точные номера и пункты]\n"
-            "Пошаговая инструкция:\n"
-            "- Проведение энергетического обследования (сроки, аккредитованная организация — ФЗ №261-ФЗ, ст.16; Приказ Минстроя №889/пр)\n"
-            "- Установка и поверка ИПУ/ОДПУ (сроки, передача показаний — ФЗ №261-ФЗ, ст.13)\n"
-            "- Заключение энергосервисного контракта (расчёт экономии, срок контракта — ПП РФ №1289)\n"
-            "- Реализация мер энергоэффективности (утепление, модернизация систем — ФЗ №261-ФЗ, ст.25)\n"
-            "- Получение господдержки (документы, программы — ПП РФ №1289)\n\n"
-            "Судебная практика:\n"
-            "- Определение ВС РФ №XXX-ЭСXX-XXXX — краткая позиция суда\n"
-            "Если судебных решений нет: 'Судебная практика по данному вопросу в базе отсутствует'.\n\n"
-            "Ключевые нормативные акты:\n"
-            "- ФЗ №261-ФЗ «Об энергосбережении и о повышении энергетической эффективности»\n"
-            "- ПП РФ №1289 «О требованиях к энергосервисным контрактам...»\n"
-            "- ПП РФ №1818 «Об утверждении Правил установления требований энергетической эффективности...»\n"
-            "- Приказ Минстроя №889/пр «Об утверждении Правил проведения энергетического обследования...»\n"
-            "- ПП РФ №354 (в части установки и поверки приборов учёта)\n"
-        )
-    
-        # --- Динамический блок: расчет пени ---
-        if should_calculate_penalty:
-            system_prompt += (
-                "\n**Расчёт пени (если упомянут):**\n"
-                "- Формула: Пени = Сумма долга × Дни просрочки × (Ключевая ставка ЦБ РФ / 300 / 100)\n"
-                "- Основание: [ЖК РФ, ст.155.1], [ФЗ №44-ФЗ], [ПП РФ №329]\n"
-                "- Ограничение: не более 9.5% годовых до 2027 года\n"
-                "- Пример: 10 000 руб., просрочка 30 дней → 95 руб.\n"
-                "- Начало начисления: с 31-го дня после окончания срока оплаты\n"
-            )
-    
-        system_prompt += f"{self.get_role_instruction(role)}"
-    
-        # --- Формат для QVikhr / LLaMA-3 ---
-        prompt_formatted = (
-            "<|begin_of_text|><|start_header_id|>system<|end_header_id|>\n"
-            f"{system_prompt}<|eot_id|>"
-        )
-    
-        return prompt_formatted
         
 class ReceiptProcessingAgent(RAGAgent):
+    OFFICIAL_DOMAINS = RAGAgent.OFFICIAL_DOMAINS | {"nalog.gov.ru", "ofd.ru", "fns.ru", "vsrf.ru"}
+    GOV_SUFFIXES = (".gov.ru", ".nalog.gov.ru", ".fns.ru", ".vsrf.ru")
+    SEARCH_QUERY_TEMPLATES = (
+        "{q} ФЗ 54-ФЗ чеки",
+        "{q} Приказ ФНС ММВ-7-20/229@ теги чека",
+        "{q} судебная практика по ошибкам в фискальных чеках",
+        "{q} как расшифровать QR-код чека",
+        "{q} интеграция чеков с 1С бухгалтерией",
+    )
+
     def __init__(self):
         # Расширенный и структурированный словарь с синонимами и контекстами
-        self.term_map = self._build_term_map()
-        keywords = self._flatten_term_map(self.term_map)
+        self.term_map, keywords = self._shared_term_map()
         
         super().__init__("Обработка чеков и платежных документов", keywords)
 
@@ -8169,191 +5374,69 @@ class ReceiptProcessingAgent(RAGAgent):
             },
         }
 
-    def _flatten_term_map(self, term_map: Dict) -> List[str]:
-        """Преобразует структурированный словарь в плоский список уникальных ключевых слов."""
-        keywords = set()
-        for term, data in term_map.items():
-            keywords.add(term.lower())  # оригинальный ключ
-            for synonym in data.get("synonyms", []):
-                keywords.add(synonym.lower())
-            # Добавляем ключи из контекстов
-            contexts = data.get("contexts", [])
-            if isinstance(contexts, dict):
-                for ctx_key in contexts.keys():
-                    keywords.add(ctx_key.lower())
-            elif isinstance(contexts, list):
-                for ctx in contexts:
-                    keywords.add(ctx.lower())
-        return list(keywords)
-
-    def _perform_web_search(self, query: str, max_results: int = 3) -> str:
-        """
-        Улучшенный веб-поиск: приоритет официальным источникам, фильтрация, ранжирование.
-        Выполняется ВНУТРИ _build_prompt, как в оригинальной архитектуре.
-        """
-        OFFICIAL_DOMAINS = {
-            "cbr.ru", "government.ru", "kremlin.ru", "rosstat.gov.ru", "minfin.gov.ru",
-            "fas.gov.ru", "gji.ru", "rospotrebnadzor.ru", "rosreestr.gov.ru",
-            "minstroyrf.ru", "fgis-tarif.ru", "consultant.ru", "garant.ru",
-            "pravo.gov.ru", "gkh.ru", "nalog.gov.ru", "ofd.ru", "fns.ru", "vsrf.ru"
-        }
-
-        BLACKLISTED_DOMAINS = {
-            "otvet.mail.ru", "ask.fm", "irecommend.ru", "pikabu.ru",
-            "zen.yandex.ru", "thequestion.ru", "quora.com", "reddit.com",
-            "fishki.net", "yaplakal.com", "blog", "forum"
-        }
-
-        # Генерируем расширенные поисковые запросы
-        expanded_queries = self._expand_search_query(query)
-        all_results = []
-
-        for attempt in range(2):
-            try:
-                with DDGS(timeout=10) as ddgs:
-                    for q in expanded_queries:
-                        results = ddgs.text(q, max_results=5)
-                        for r in results:
-                            href = r.get('href', '')
-                            if not href:
-                                continue
-                            
-                            try:
-                                domain = href.split('/')[2].lower()
-                            except IndexError:
-                                continue
-
-                            if any(bad in domain for bad in BLACKLISTED_DOMAINS):
-                                continue
-
-                            weight = 3 if any(official in domain for official in OFFICIAL_DOMAINS) else \
-                                     2 if any(gov in domain for gov in [".gov.ru", ".nalog.gov.ru", ".fns.ru", ".vsrf.ru"]) else 1
-
-                            snippet = {
-                                "body": r['body'],
-                                "href": href,
-                                "title": r.get('title', ''),
-                                "weight": weight
-                            }
-                            all_results.append(snippet)
-
-                    all_results = sorted(all_results, key=lambda x: x['weight'], reverse=True)
-                    seen_bodies = set()
-                    unique_results = []
-                    for r in all_results:
-                        body_hash = hash(r['body'][:100])
-                        if body_hash not in seen_bodies:
-                            seen_bodies.add(body_hash)
-                            unique_results.append(r)
-                            if len(unique_results) >= max_results:
-                                break
-
-                    if unique_results:
-                        formatted = []
-                        for r in unique_results:
-                            prefix = "[ОФИЦИАЛЬНЫЙ ИСТОЧНИК] " if r['weight'] >= 2 else ""
-                            formatted.append(f"{prefix}• {r['body']}\n  Источник: {r['href']}\n")
-                        return "\n".join(formatted).strip()
-                    else:
-                        return "По вашему запросу ничего не найдено в надёжных источниках."
-
-            except Exception as e:
-                if attempt == 0:
-                    time.sleep(2)
-                    continue
-                return f"Ошибка веб-поиска: {str(e)}"
-
-        return "Не удалось выполнить веб-поиск. Попробуйте позже."
+    # Агент: Обработка чеков и платежных документов
+    # Системный промт:
+    # - Фокус: фискальные чеки, QR-коды, теги ФФД, исправление ошибок, интеграция, ФЗ №54-ФЗ
+    # - Жёсткая структура, ссылки на нормативы и судебную практику
+    PROMPT_TEMPLATE = (
+        "Ты — экспертный ИИ-ассистент по обработке фискальных чеков и платежных документов в сфере ЖКХ. "
+        "Отвечай строго по нормативам, без выдуманных данных, используя только контекст, веб-результаты и обновления.\n\n"
+        "**ЖЕСТКИЕ ПРАВИЛА:**\n"
+        "1. Если информации нет — отвечай: 'Недостаточно данных для точного ответа.'\n"
+        "2. Обязательно указывай ссылки на нормативные акты.\n"
+        "3. Структура: краткий вывод → нормативы → пошаговая инструкция → судебная практика.\n"
+        "4. Формулы пени включай только при упоминании пени.\n"
+        "5. Приоритет: ФЗ №54-ФЗ > Приказы ФНС > ПП РФ > судебная практика.\n\n"
+        "### Контекст:\n"
+        "{context_text}\n\n"
+        "### Веб-поиск:\n"
+        "{web_results}\n\n"
+        "### Дополнительные обновления:\n"
+        "{extra}\n\n"
+        "--- Основной ответ ---\n"
+        "Краткий вывод: [что делать, как исправить, куда обратиться]\n"
+        "Нормативное обоснование: [ФЗ, приказы, ПП — точные номера и пункты]\n"
+        "Пошаговая инструкция / Техническое решение:\n"
+        "- Расшифровка QR-кода и тегов чека (структура, обязательные поля — Приказ ФНС №ММВ-7-20/229@)\n"
+        "- Исправление ошибок в чеке (аннулирование, повторная печать — ФЗ №54-ФЗ, ст.4.7)\n"
+        "- Интеграция чеков с бухгалтерией (форматы XML/JSON, API ОФД — Приказ ФНС №ЕД-7-20/662@)\n"
+        "- Обязательные данные в чеке (ИНН, признак расчёта, ФПД — ФЗ №54-ФЗ, ст.4.7)\n"
+        "- Действия при ошибках передачи в ОФД (проверка сети, перезагрузка ККТ, обращение в техподдержку)\n\n"
+        "Судебная практика:\n"
+        "- Определение ВС РФ №XXX-ЭСXX-XXXX — краткая позиция суда\n"
+        "Если судебных решений нет: 'Судебная практика по данному вопросу в базе отсутствует'.\n\n"
+        "Ключевые нормативные акты:\n"
+        "- ФЗ №54-ФЗ «О применении контрольно-кассовой техники»\n"
+        "- Приказ ФНС №ММВ-7-20/229@ «О формате фискальных документов»\n"
+        "- Приказ ФНС №ЕД-7-20/662@ «Об утверждении порядка регистрации ККТ»\n"
+        "- ПП РФ №354 (в части платежных документов ЖКХ)\n"
+        "- ФФД 1.2 (формат фискальных данных)\n"
+        "{penalty_block}{role_instruction}"
+    )
+    PENALTY_BLOCK = (
+        "\n**Расчёт пени (если упомянут):**\n"
+        "- Формула: Пени = Сумма долга × Дни просрочки × (Ключевая ставка ЦБ РФ / 300 / 100)\n"
+        "- Основание: [ЖК РФ, ст.155.1], [ФЗ №44-ФЗ], [ПП РФ №329]\n"
+        "- Ограничение: не более 9.5% годовых до 2027 года\n"
+        "- Пример: 10 000 руб., просрочка 30 дней → 95 руб.\n"
+        "- Начало начисления: с 31-го дня после окончания срока оплаты\n"
+    )
 
-    def _expand_search_query(self, query: str) -> List[str]:
-        """Генерирует несколько вариантов поискового запроса для лучшего покрытия темы."""
-        queries = [query]
-        queries.append(f"{query} ФЗ 54-ФЗ чеки")
-        queries.append(f"{query} Приказ ФНС ММВ-7-20/229@ теги чека")
-        queries.append(f"{query} судебная практика по ошибкам в фискальных чеках")
-        queries.append(f"{query} как расшифровать QR-код чека")
-        queries.append(f"{query} интеграция чеков с 1С бухгалтерией")
-        # Добавляем синонимы
-        for term, data in self.term_map.items():
-            if term in query.lower() or any(syn in query.lower() for syn in data.get("synonyms", [])):
-                for synonym in data.get("synonyms", [])[:2]:
-                    new_q = query.replace(term, synonym) if term in query else query + " " + synonym
-                    queries.append(new_q)
-        return list(set(queries))
-
-    def _build_prompt(self, summary: str, context_text: str, role: str = "смешанная") -> str:
-        """
-        Агент: Обработка чеков и платежных документов
-        Формирует системный промт:
-        - Фокус: фискальные чеки, QR-коды, теги ФФД, исправление ошибок, интеграция, ФЗ №54-ФЗ
-        - Жёсткая структура, ссылки на нормативы и судебную практику
-        """
-        extra = self.improve_prompt_from_feedback()
-        web_results = self._perform_web_search(summary)
-    
-        # Проверка на запрос о пени
-        penalty_keywords = ["пени", "неустойка", "штраф за просрочку", "ставка цб", "9.5%", "ключевая ставка"]
-        should_calculate_penalty = any(kw in summary.lower() for kw in penalty_keywords)
-    
-        # --- SYSTEM PROMPT ---
-        system_prompt = (
-            "Ты — экспертный ИИ-ассистент по обработке фискальных чеков и платежных документов в сфере ЖКХ. "
-            "Отвечай строго по нормативам, без выдуманных данных, используя только контекст, веб-результаты и обновления.\n\n"
-            "**ЖЕСТКИЕ ПРАВИЛА:**\n"
-            "1. Если информации нет — отвечай: 'Недостаточно данных для точного ответа.'\n"
-            "2. Обязательно указывай ссылки на нормативные акты.\n"
-            "3. Структура: краткий вывод → нормативы → пошаговая инструкция → судебная практика.\n"
-            "4. Формулы пени включай только при упоминании пени.\n"
-            "5. Приоритет: ФЗ №54-ФЗ > Приказы ФНС > ПП РФ > судебная практика.\n\n"
-            f"### Контекст:\n{context_text}\n\n"
-            f"### Веб-поиск:\n{web_results}\n\n"
-            f"### Дополнительные обновления:\n{extra}\n\n"
-            "--- Основной ответ ---\n"
-            "Краткий вывод: [что делать, как исправить, куда обратиться]\n"
-            "Нормативное обоснование: [ФЗ, приказы, ПП — точные номера и пункты]\n"
-            "Пошаговая инструкция / Техническое решение:\n"
-            "- Расшифровка QR-кода и тегов чека (структура, обязательные поля — Приказ ФНС №ММВ-7-20/229@)\n"
-            "- Исправление ошибок в чеке (аннулирование, повторная печать — ФЗ №54-ФЗ, ст.4.7)\n"
-            "- Интеграция чеков с бухгалтерией (форматы XML/JSON, API ОФД — Приказ ФНС №ЕД-7-20/662@)\n"
-            "- Обязательные данные в чеке (ИНН, признак расчёта, ФПД — ФЗ №54-ФЗ, ст.4.7)\n"
-            "- Действия при ошибках передачи в ОФД (проверка сети, перезагрузка ККТ, обращение в техподдержку)\n\n"
-            "Судебная практика:\n"
-            "- Определение ВС РФ №XXX-ЭСXX-XXXX — краткая позиция суда\n"
-            "Если судебных решений нет: 'Судебная практика по данному вопросу в базе отсутствует'.\n\n"
-            "Ключевые нормативные акты:\n"
-            "- ФЗ №54-ФЗ «О применении контрольно-кассовой техники»\n"
-            "- Приказ ФНС №ММВ-7-20/229@ «О формате фискальных документов»\n"
-            "- Приказ ФНС №ЕД-7-20/662@ «Об утверждении порядка регистрации ККТ»\n"
-            "- ПП РФ №354 (в части платежных документов ЖКХ)\n"
-            "- ФФД 1.2 (формат фискальных данных)\n"
-        )
-    
-        # --- Динамический блок: расчет пени ---
-        if should_calculate_penalty:
-            system_prompt += (
-                "\n**Расчёт пени (если упомянут):**\n"
-                "- Формула: Пени = Сумма долга × Дни просрочки × (Ключевая ставка ЦБ РФ / 300 / 100)\n"
-                "- Основание: [ЖК РФ, ст.155.1], [ФЗ №44-ФЗ], [ПП РФ №329]\n"
-                "- Ограничение: не более 9.5% годовых до 2027 года\n"
-                "- Пример: 10 000 руб., просрочка 30 дней → 95 руб.\n"
-                "- Начало начисления: с 31-го дня после окончания срока оплаты\n"
-            )
-    
-        system_prompt += f"{self.get_role_instruction(role)}"
-    
-        # --- Формат для QVikhr / LLaMA-3 ---
-        prompt_formatted = (
-            "<|begin_of_text|><|start_header_id|>system<|end_header_id|>\n"
-            f"{system_prompt}<|eot_id|>"
-        )
-    
-        return prompt_formatted
         
 class PassportRegistrationAgent(RAGAgent):
+    OFFICIAL_DOMAINS = RAGAgent.OFFICIAL_DOMAINS | {"мвд.рф", "госуслуги.рф", "мфц.рф", "vsrf.ru"}
+    GOV_SUFFIXES = (".gov.ru", ".мвд.рф", ".госуслуги.рф", ".мфц.рф", ".vsrf.ru")
+    SEARCH_QUERY_TEMPLATES = (
+        "{q} ПП РФ 713 регистрация",
+        "{q} ФЗ 5242-1 прописка",
+        "{q} судебная практика по фиктивной регистрации",
+        "{q} документы для прописки через Госуслуги",
+        "{q} обязанности УК при регистрации граждан",
+    )
+
     def __init__(self):
         # Расширенный и структурированный словарь с синонимами и контекстами
-        self.term_map = self._build_term_map()
-        keywords = self._flatten_term_map(self.term_map)
+        self.term_map, keywords = self._shared_term_map()
         
         super().__init__("Паспортный учет и регистрация", keywords)
 
@@ -8437,192 +5520,70 @@ class PassportRegistrationAgent(RAGAgent):
             },
         }
 
-    def _flatten_term_map(self, term_map: Dict) -> List[str]:
-        """Преобразует структурированный словарь в плоский список уникальных ключевых слов."""
-        keywords = set()
-        for term, data in term_map.items():
-            keywords.add(term.lower())  # оригинальный ключ
-            for synonym in data.get("synonyms", []):
-                keywords.add(synonym.lower())
-            # Добавляем ключи из контекстов
-            contexts = data.get("contexts", [])
-            if isinstance(contexts, dict):
-                for ctx_key in contexts.keys():
-                    keywords.add(ctx_key.lower())
-            elif isinstance(contexts, list):
-                for ctx in contexts:
-                    keywords.add(ctx.lower())
-        return list(keywords)
-
-    def _perform_web_search(self, query: str, max_results: int = 3) -> str:
-        """
-        Улучшенный веб-поиск: приоритет официальным источникам, фильтрация, ранжирование.
-        Выполняется ВНУТРИ _build_prompt, как в оригинальной архитектуре.
-        """
-        OFFICIAL_DOMAINS = {
-            "cbr.ru", "government.ru", "kremlin.ru", "rosstat.gov.ru", "minfin.gov.ru",
-            "fas.gov.ru", "gji.ru", "rospotrebnadzor.ru", "rosreestr.gov.ru",
-            "minstroyrf.ru", "fgis-tarif.ru", "consultant.ru", "garant.ru",
-            "pravo.gov.ru", "gkh.ru", "мвд.рф", "госуслуги.рф", "мфц.рф", "vsrf.ru"
-        }
-
-        BLACKLISTED_DOMAINS = {
-            "otvet.mail.ru", "ask.fm", "irecommend.ru", "pikabu.ru",
-            "zen.yandex.ru", "thequestion.ru", "quora.com", "reddit.com",
-            "fishki.net", "yaplakal.com", "blog", "forum"
-        }
-
-        # Генерируем расширенные поисковые запросы
-        expanded_queries = self._expand_search_query(query)
-        all_results = []
-
-        for attempt in range(2):
-            try:
-                with DDGS(timeout=10) as ddgs:
-                    for q in expanded_queries:
-                        results = ddgs.text(q, max_results=5)
-                        for r in results:
-                            href = r.get('href', '')
-                            if not href:
-                                continue
-                            
-                            try:
-                                domain = href.split('/')[2].lower()
-                            except IndexError:
-                                continue
-
-                            if any(bad in domain for bad in BLACKLISTED_DOMAINS):
-                                continue
-
-                            weight = 3 if any(official in domain for official in OFFICIAL_DOMAINS) else \
-                                     2 if any(gov in domain for gov in [".gov.ru", ".мвд.рф", ".госуслуги.рф", ".мфц.рф", ".vsrf.ru"]) else 1
-
-                            snippet = {
-                                "body": r['body'],
-                                "href": href,
-                                "title": r.get('title', ''),
-                                "weight": weight
-                            }
-                            all_results.append(snippet)
-
-                    all_results = sorted(all_results, key=lambda x: x['weight'], reverse=True)
-                    seen_bodies = set()
-                    unique_results = []
-                    for r in all_results:
-                        body_hash = hash(r['body'][:100])
-                        if body_hash not in seen_bodies:
-                            seen_bodies.add(body_hash)
-                            unique_results.append(r)
-                            if len(unique_results) >= max_results:
-                                break
-
-                    if unique_results:
-                        formatted = []
-                        for r in unique_results:
-                            prefix = "[ОФИЦИАЛЬНЫЙ ИСТОЧНИК] " if r['weight'] >= 2 else ""
-                            formatted.append(f"{prefix}• {r['body']}\n  Источник: {r['href']}\n")
-                        return "\n".join(formatted).strip()
-                    else:
-                        return "По вашему запросу ничего не найдено в надёжных источниках."
-
-            except Exception as e:
-                if attempt == 0:
-                    time.sleep(2)
-                    continue
-                return f"Ошибка веб-поиска: {str(e)}"
+    # Агент: Паспортный учет и регистрация
+    # Системный промт:
+    # - Фокус: оформление и снятие граждан с регистрационного учета, обязанности собственников и УК
+    # - Жёсткая структура, ссылки на нормативы и судебную практику
+    PROMPT_TEMPLATE = (
+        "Ты — экспертный ИИ-ассистент по паспортному учёту и регистрации граждан в сфере ЖКХ. "
+        "Отвечай строго по нормативам, без выдуманных данных, используя только контекст, веб-результаты и обновления.\n\n"
+        "**ЖЕСТКИЕ ПРАВИЛА:**\n"
+        "1. Если информации нет — отвечай: 'Недостаточно данных для точного ответа.'\n"
+        "2. Обязательно указывай ссылки на нормативные акты.\n"
+        "3. Структура: краткий вывод → нормативы → пошаговая инструкция → судебная практика.\n"
+        "4. Формулы пени включай только при упоминании пени.\n"
+        "5. Приоритет: ФЗ > ПП РФ > ЖК РФ > Приказы МВД > судебная практика.\n\n"
+        "### Контекст:\n"
+        "{context_text}\n\n"
+        "### Веб-поиск:\n"
+        "{web_results}\n\n"
+        "### Дополнительные обновления:\n"
+        "{extra}\n\n"
+        "--- Основной ответ ---\n"
+        "Краткий вывод: [что делать, куда идти, какие документы нужны]\n"
+        "Нормативное обоснование: [ФЗ, ПП РФ, ЖК РФ — точные номера и пункты]\n"
+        "Пошаговая инструкция:\n"
+        "- Оформление постоянной/временной регистрации (документы, сроки, способы подачи — ПП РФ №713, п.9, 20)\n"
+        "- Выписка из квартиры (добровольно, автоматически, через суд — ПП РФ №713, п.28)\n"
+        "- Обязанности собственника (согласие, уведомление — ЖК РФ, ст.31; ПП РФ №713, п.32)\n"
+        "- Обязанности УК (уведомление ОВМ в 3-дневный срок — ЖК РФ, ст.31(3))\n"
+        "- Получение справки о регистрации (МФЦ, Госуслуги, паспортный стол — ПП РФ №713, п.36)\n\n"
+        "Судебная практика:\n"
+        "- Определение ВС РФ №XXX-ЭСXX-XXXX — краткая позиция суда\n"
+        "Если судебных решений нет: 'Судебная практика по данному вопросу в базе отсутствует'.\n\n"
+        "Ключевые нормативные акты:\n"
+        "- ФЗ №5242-1 «О праве граждан РФ на свободу передвижения…»\n"
+        "- ПП РФ №713 «О регистрации и снятии граждан с регистрационного учета…»\n"
+        "- ЖК РФ, ст.31 — права и обязанности собственников и нанимателей\n"
+        "- ФЗ «О воинской обязанности и военной службе» (для военнообязанных)\n"
+        "- УК РФ, ст.322.2 — фиктивная регистрация\n"
+        "- Приказ МВД №984 «Об утверждении Административного регламента…»\n"
+        "{penalty_block}{role_instruction}"
+    )
+    PENALTY_BLOCK = (
+        "\n**Расчёт пени (если упомянут):**\n"
+        "- Формула: Пени = Сумма долга × Дни просрочки × (Ключевая ставка ЦБ РФ / 300 / 100)\n"
+        "- Основание: [ЖК РФ, ст.155.1], [ФЗ №44-ФЗ], [ПП РФ №329]\n"
+        "- Ограничение: не более 9.5% годовых до 2027 года\n"
+        "- Пример: 10 000 руб., просрочка 30 дней → 95 руб.\n"
+        "- Начало начисления: с 31-го дня после окончания срока оплаты\n"
+    )
 
-        return "Не удалось выполнить веб-поиск. Попробуйте позже."
-
-    def _expand_search_query(self, query: str) -> List[str]:
-        """Генерирует несколько вариантов поискового запроса для лучшего покрытия темы."""
-        queries = [query]
-        queries.append(f"{query} ПП РФ 713 регистрация")
-        queries.append(f"{query} ФЗ 5242-1 прописка")
-        queries.append(f"{query} судебная практика по фиктивной регистрации")
-        queries.append(f"{query} документы для прописки через Госуслуги")
-        queries.append(f"{query} обязанности УК при регистрации граждан")
-        # Добавляем синонимы
-        for term, data in self.term_map.items():
-            if term in query.lower() or any(syn in query.lower() for syn in data.get("synonyms", [])):
-                for synonym in data.get("synonyms", [])[:2]:
-                    new_q = query.replace(term, synonym) if term in query else query + " " + synonym
-                    queries.append(new_q)
-        return list(set(queries))
-
-    def _build_prompt(self, summary: str, context_text: str, role: str = "смешанная") -> str:
-        """
-        Агент: Паспортный учет и регистрация
-        Формирует системный промт:
-        - Фокус: оформление и снятие граждан с регистрационного учета, обязанности собственников и УК
-        - Жёсткая структура, ссылки на нормативы и судебную практику
-        """
-        extra = self.improve_prompt_from_feedback()
-        web_results = self._perform_web_search(summary)
-    
-        # Проверка на запрос о пени
-        penalty_keywords = ["пени", "неустойка", "штраф за просрочку", "ставка цб", "9.5%", "ключевая ставка"]
-        should_calculate_penalty = any(kw in summary.lower() for kw in penalty_keywords)
-    
-        # --- SYSTEM PROMPT ---
-        system_prompt = (
-            "Ты — экспертный ИИ-ассистент по паспортному учёту и регистрации граждан в сфере ЖКХ. "
-            "Отвечай строго по нормативам, без выдуманных данных, используя только контекст, веб-результаты и обновления.\n\n"
-            "**ЖЕСТКИЕ ПРАВИЛА:**\n"
-            "1. Если информации нет — отвечай: 'Недостаточно данных для точного ответа.'\n"
-            "2. Обязательно указывай ссылки на нормативные акты.\n"
-            "3. Структура: краткий вывод → нормативы → пошаговая инструкция → судебная практика.\n"
-            "4. Формулы пени включай только при упоминании пени.\n"
-            "5. Приоритет: ФЗ > ПП РФ > ЖК РФ > Приказы МВД > судебная практика.\n\n"
-            f"### Контекст:\n{context_text}\n\n"
-            f"### Веб-поиск:\n{web_results}\n\n"
-            f"### Дополнительные обновления:\n{extra}\n\n"
-            "--- Основной ответ ---\n"
-            "Краткий вывод: [что делать, куда идти, какие документы нужны]\n"
-            "Нормативное обоснование: [ФЗ, ПП РФ, ЖК РФ — точные номера и пункты]\n"
-            "Пошаговая инструкция:\n"
-            "- Оформление постоянной/временной регистрации (документы, сроки, способы подачи — ПП РФ №713, п.9, 20)\n"
-            "- Выписка из квартиры (добровольно, автоматически, через суд — ПП РФ №713, п.28)\n"
-            "- Обязанности собственника (согласие, уведомление — ЖК РФ, ст.31; ПП РФ №713, п.32)\n"
-            "- Обязанности УК (уведомление ОВМ в 3-дневный срок — ЖК РФ, ст.31(3))\n"
-            "- Получение справки о регистрации (МФЦ, Госуслуги, паспортный стол — ПП РФ №713, п.36)\n\n"
-            "Судебная практика:\n"
-            "- Определение ВС РФ №XXX-ЭСXX-XXXX — краткая позиция суда\n"
-            "Если судебных решений нет: 'Судебная практика по данному вопросу в базе отсутствует'.\n\n"
-            "Ключевые нормативные акты:\n"
-            "- ФЗ №5242-1 «О праве граждан РФ на свободу передвижения…»\n"
-            "- ПП РФ №713 «О регистрации и снятии граждан с регистрационного учета…»\n"
-            "- ЖК РФ, ст.31 — права и обязанности собственников и нанимателей\n"
-            "- ФЗ «О воинской обязанности и военной службе» (для военнообязанных)\n"
-            "- УК РФ, ст.322.2 — фиктивная регистрация\n"
-            "- Приказ МВД №984 «Об утверждении Административного регламента…»\n"
-        )
-    
-        # --- Динамический блок: расчет пени ---
-        if should_calculate_penalty:
-            system_prompt += (
-                "\n**Расчёт пени (если упомянут):**\n"
-                "- Формула: Пени = Сумма долга × Дни просрочки × (Ключевая ставка ЦБ РФ / 300 / 100)\n"
-                "- Основание: [ЖК РФ, ст.155.1], [ФЗ №44-ФЗ], [ПП РФ №329]\n"
-                "- Ограничение: не более 9.5% годовых до 2027 года\n"
-                "- Пример: 10 000 руб., просрочка 30 дней → 95 руб.\n"
-                "- Начало начисления: с 31-го дня после окончания срока оплаты\n"
-            )
-    
-        system_prompt += f"{self.get_role_instruction(role)}"
-    
-        # --- Формат для QVikhr / LLaMA-3 ---
-        prompt_formatted = (
-            "<|begin_of_text|><|start_header_id|>system<|end_header_id|>\n"
-            f"{system_prompt}<|eot_id|>"
-        )
-    
-        return prompt_formatted
 
 class RecalculationAgent(RAGAgent):
+    OFFICIAL_DOMAINS = RAGAgent.OFFICIAL_DOMAINS | {"roscomnadzor.ru", "vsrf.ru", "gjirf.ru"}
+    GOV_SUFFIXES = (".gov.ru", ".gkh.ru", ".vsrf.ru", ".gjirf.ru")
+    SEARCH_QUERY_TEMPLATES = (
+        "{q} ПП РФ 354 перерасчет",
+        "{q} ПП РФ 354 п 86 временная отсутствие",
+        "{q} судебная практика по перерасчету за отопление",
+        "{q} формула перерасчета при временном отсутствии",
+        "{q} документы для перерасчета за командировку",
+    )
+
     def __init__(self):
         # Расширенный и структурированный словарь с синонимами и контекстами
-        self.term_map = self._build_term_map()
-        keywords = self._flatten_term_map(self.term_map)
+        self.term_map, keywords = self._shared_term_map()
         
         super().__init__("Перерасчеты ЖКУ", keywords)
 
@@ -8706,190 +5667,68 @@ class RecalculationAgent(RAGAgent):
             },
         }
 
-    def _flatten_term_map(self, term_map: Dict) -> List[str]:
-        """Преобразует структурированный словарь в плоский список уникальных ключевых слов."""
-        keywords = set()
-        for term, data in term_map.items():
-            keywords.add(term.lower())  # оригинальный ключ
-            for synonym in data.get("synonyms", []):
-                keywords.add(synonym.lower())
-            # Добавляем ключи из контекстов
-            contexts = data.get("contexts", [])
-            if isinstance(contexts, dict):
-                for ctx_key in contexts.keys():
-                    keywords.add(ctx_key.lower())
-            elif isinstance(contexts, list):
-                for ctx in contexts:
-                    keywords.add(ctx.lower())
-        return list(keywords)
-
-    def _perform_web_search(self, query: str, max_results: int = 3) -> str:
-        """
-        Улучшенный веб-поиск: приоритет официальным источникам, фильтрация, ранжирование.
-        Выполняется ВНУТРИ _build_prompt, как в оригинальной архитектуре.
-        """
-        OFFICIAL_DOMAINS = {
-            "cbr.ru", "government.ru", "kremlin.ru", "rosstat.gov.ru", "minfin.gov.ru",
-            "fas.gov.ru", "gji.ru", "rospotrebnadzor.ru", "rosreestr.gov.ru",
-            "minstroyrf.ru", "fgis-tarif.ru", "consultant.ru", "garant.ru",
-            "pravo.gov.ru", "gkh.ru", "roscomnadzor.ru", "vsrf.ru", "gjirf.ru"
-        }
-
-        BLACKLISTED_DOMAINS = {
-            "otvet.mail.ru", "ask.fm", "irecommend.ru", "pikabu.ru",
-            "zen.yandex.ru", "thequestion.ru", "quora.com", "reddit.com",
-            "fishki.net", "yaplakal.com", "blog", "forum"
-        }
-
-        # Генерируем расширенные поисковые запросы
-        expanded_queries = self._expand_search_query(query)
-        all_results = []
-
-        for attempt in range(2):
-            try:
-                with DDGS(timeout=10) as ddgs:
-                    for q in expanded_queries:
-                        results = ddgs.text(q, max_results=5)
-                        for r in results:
-                            href = r.get('href', '')
-                            if not href:
-                                continue
-                            
-                            try:
-                                domain = href.split('/')[2].lower()
-                            except IndexError:
-                                continue
-
-                            if any(bad in domain for bad in BLACKLISTED_DOMAINS):
-                                continue
-
-                            weight = 3 if any(official in domain for official in OFFICIAL_DOMAINS) else \
-                                     2 if any(gov in domain for gov in [".gov.ru", ".gkh.ru", ".vsrf.ru", ".gjirf.ru"]) else 1
-
-                            snippet = {
-                                "body": r['body'],
-                                "href": href,
-                                "title": r.get('title', ''),
-                                "weight": weight
-                            }
-                            all_results.append(snippet)
-
-                    all_results = sorted(all_results, key=lambda x: x['weight'], reverse=True)
-                    seen_bodies = set()
-                    unique_results = []
-                    for r in all_results:
-                        body_hash = hash(r['body'][:100])
-                        if body_hash not in seen_bodies:
-                            seen_bodies.add(body_hash)
-                            unique_results.append(r)
-                            if len(unique_results) >= max_results:
-                                break
-
-                    if unique_results:
-                        formatted = []
-                        for r in unique_results:
-                            prefix = "[ОФИЦИАЛЬНЫЙ ИСТОЧНИК] " if r['weight'] >= 2 else ""
-                            formatted.append(f"{prefix}• {r['body']}\n  Источник: {r['href']}\n")
-                        return "\n".join(formatted).strip()
-                    else:
-                        return "По вашему запросу ничего не найдено в надёжных источниках."
-
-            except Exception as e:
-                if attempt == 0:
-                    time.sleep(2)
-                    continue
-                return f"Ошибка веб-поиска: {str(e)}"
-
-        return "Не удалось выполнить веб-поиск. Попробуйте позже."
+    # Агент: Перерасчёты ЖКУ
+    # Системный промт:
+    # - Фокус: условия, формулы, сроки, документы по перерасчётам коммунальных услуг
+    # - Жёсткая структура, ссылки на нормативы и судебную практику
+    PROMPT_TEMPLATE = (
+        "Ты — экспертный ИИ-ассистент по перерасчётам коммунальных услуг (ЖКУ). Отвечай строго по нормативам, "
+        "без выдуманных данных, используя только контекст, веб-результаты и обновления.\n\n"
+        "**ЖЕСТКИЕ ПРАВИЛА:**\n"
+        "1. Если информации нет — отвечай: 'Недостаточно данных для точного ответа.'\n"
+        "2. Обязательно указывай ссылки на нормативные акты.\n"
+        "3. Структура: краткий вывод → нормативы → пошаговая инструкция → судебная практика.\n"
+        "4. Формулы пени включай только при упоминании пени.\n"
+        "5. Приоритет: ПП РФ №354 > ЖК РФ > ПП РФ №491 > судебная практика.\n\n"
+        "### Контекст:\n"
+        "{context_text}\n\n"
+        "### Веб-поиск:\n"
+        "{web_results}\n\n"
+        "### Дополнительные обновления:\n"
+        "{extra}\n\n"
+        "--- Основной ответ ---\n"
+        "Краткий вывод: [положен ли перерасчёт, что делать, какие документы нужны]\n"
+        "Нормативное обоснование: [пункты ПП РФ №354, статьи ЖК РФ]\n"
+        "Пошаговая инструкция:\n"
+        "- Положен ли перерасчёт? (условия — ПП РФ №354, п.86, 90)\n"
+        "- Как подать заявление? (сроки, форма, документы — ПП РФ №354, п.91)\n"
+        "- Как рассчитывается сумма? (формула из Приложения 2 — ПП РФ №354)\n"
+        "- Исключения? (отопление, ОДН — ПП РФ №354, п.86(2))\n"
+        "- Сроки рассмотрения: 5 дней на проверку, 30 дней на возврат — ПП РФ №354, п.91(5)\n\n"
+        "Судебная практика:\n"
+        "- Определение ВС РФ №XXX-ЭСXX-XXXX — краткая позиция суда\n"
+        "Если судебных решений нет: 'Судебная практика по данному вопросу в базе отсутствует'.\n\n"
+        "Ключевые нормативные акты:\n"
+        "- ПП РФ №354 «О предоставлении коммунальных услуг…» (п.86, 90, 91; Приложение 2)\n"
+        "- ЖК РФ, ст.157 — перерасчёт и возврат\n"
+        "- ПП РФ №491 — содержание общего имущества\n"
+        "- СанПиН 1.2.3685-21 — параметры качества услуг\n"
+        "{penalty_block}{role_instruction}"
+    )
+    PENALTY_BLOCK = (
+        "\n**Расчёт пени (если упомянут):**\n"
+        "- Формула: Пени = Сумма долга × Дни просрочки × (Ключевая ставка ЦБ РФ / 300 / 100)\n"
+        "- Основание: [ЖК РФ, ст.155.1], [ФЗ №44-ФЗ], [ПП РФ №329]\n"
+        "- Ограничение: не более 9.5% годовых до 2027 года\n"
+        "- Пример: 10 000 руб., просрочка 30 дней → 95 руб.\n"
+        "- Начало начисления: с 31-го дня после окончания срока оплаты\n"
+    )
 
-    def _expand_search_query(self, query: str) -> List[str]:
-        """Генерирует несколько вариантов поискового запроса для лучшего покрытия темы."""
-        queries = [query]
-        queries.append(f"{query} ПП РФ 354 перерасчет")
-        queries.append(f"{query} ПП РФ 354 п 86 временная отсутствие")
-        queries.append(f"{query} судебная практика по перерасчету за отопление")
-        queries.append(f"{query} формула перерасчета при временном отсутствии")
-        queries.append(f"{query} документы для перерасчета за командировку")
-        # Добавляем синонимы
-        for term, data in self.term_map.items():
-            if term in query.lower() or any(syn in query.lower() for syn in data.get("synonyms", [])):
-                for synonym in data.get("synonyms", [])[:2]:
-                    new_q = query.replace(term, synonym) if term in query else query + " " + synonym
-                    queries.append(new_q)
-        return list(set(queries))
-
-    def _build_prompt(self, summary: str, context_text: str, role: str = "смешанная") -> str:
-        """
-        Агент: Перерасчёты ЖКУ
-        Формирует системный промт:
-        - Фокус: условия, формулы, сроки, документы по перерасчётам коммунальных услуг
-        - Жёсткая структура, ссылки на нормативы и судебную практику
-        """
-        extra = self.improve_prompt_from_feedback()
-        web_results = self._perform_web_search(summary)
-    
-        # Проверка на запрос о пени
-        penalty_keywords = ["пени", "неустойка", "штраф за просрочку", "ставка цб", "9.5%", "ключевая ставка"]
-        should_calculate_penalty = any(kw in summary.lower() for kw in penalty_keywords)
-    
-        # --- SYSTEM PROMPT ---
-        system_prompt = (
-            "Ты — экспертный ИИ-ассистент по перерасчётам коммунальных услуг (ЖКУ). "
-            "Отвечай строго по нормативам, без выдуманных данных, используя только контекст, веб-результаты и обновления.\n\n"
-            "**ЖЕСТКИЕ ПРАВИЛА:**\n"
-            "1. Если информации нет — отвечай: 'Недостаточно данных для точного ответа.'\n"
-            "2. Обязательно указывай ссылки на нормативные акты.\n"
-            "3. Структура: краткий вывод → нормативы → пошаговая инструкция → судебная практика.\n"
-            "4. Формулы пени включай только при упоминании пени.\n"
-            "5. Приоритет: ПП РФ №354 > ЖК РФ > ПП РФ №491 > судебная практика.\n\n"
-            f"### Контекст:\n{context_text}\n\n"
-            f"### Веб-поиск:\n{web_results}\n\n"
-            f"### Дополнительные обновления:\n{extra}\n\n"
-            "--- Основной ответ ---\n"
-            "Краткий вывод: [положен ли перерасчёт, что делать, какие документы нужны]\n"
-            "Нормативное обоснование: [пункты ПП РФ №354, статьи ЖК РФ]\n"
-            "Пошаговая инструкция:\n"
-            "- Положен ли перерасчёт? (условия — ПП РФ №354, п.86, 90)\n"
-            "- Как подать заявление? (сроки, форма, документы — ПП РФ №354, п.91)\n"
-            "- Как рассчитывается сумма? (формула из Приложения 2 — ПП РФ №354)\n"
-            "- Исключения? (отопление, ОДН — ПП РФ №354, п.86(2))\n"
-            "- Сроки рассмотрения: 5 дней на проверку, 30 дней на возврат — ПП РФ №354, п.91(5)\n\n"
-            "Судебная практика:\n"
-            "- Определение ВС РФ №XXX-ЭСXX-XXXX — краткая позиция суда\n"
-            "Если судебных решений нет: 'Судебная практика по данному вопросу в базе отсутствует'.\n\n"
-            "Ключевые нормативные акты:\n"
-            "- ПП РФ №354 «О предоставлении коммунальных услуг…» (п.86, 90, 91; Приложение 2)\n"
-            "- ЖК РФ, ст.157 — перерасчёт и возврат\n"
-            "- ПП РФ №491 — содержание общего имущества\n"
-            "- СанПиН 1.2.3685-21 — параметры качества услуг\n"
-        )
-    
-        # --- Динамический блок: расчет пени ---
-        if should_calculate_penalty:
-            system_prompt += (
-                "\n**Расчёт пени (если упомянут):**\n"
-                "- Формула: Пени = Сумма долга × Дни просрочки × (Ключевая ставка ЦБ РФ / 300 / 100)\n"
-                "- Основание: [ЖК РФ, ст.155.1], [ФЗ №44-ФЗ], [ПП РФ №329]\n"
-                "- Ограничение: не более 9.5% годовых до 2027 года\n"
-                "- Пример: 10 000 руб., просрочка 30 дней → 95 руб.\n"
-                "- Начало начисления: с 31-го дня после окончания срока оплаты\n"
-            )
-    
-        system_prompt += f"{self.get_role_instruction(role)}"
-    
-        # --- Формат для QVikhr / LLaMA-3 ---
-        prompt_formatted = (
-            "<|begin_of_text|><|start_header_id|>system<|end_header_id|>\n"
-            f"{system_prompt}<|eot_id|>"
-        )
-    
-        return prompt_formatted
 
 class CommonPropertyAgent(RAGAgent):
+    OFFICIAL_DOMAINS = RAGAgent.OFFICIAL_DOMAINS | {"roscomnadzor.ru", "vsrf.ru", "gjirf.ru"}
+    GOV_SUFFIXES = (".gov.ru", ".gkh.ru", ".vsrf.ru", ".gjirf.ru")
+    SEARCH_QUERY_TEMPLATES = (
+        "{q} ПП РФ 491 общее имущество",
+        "{q} ПП РФ 354 расчет одн",
+        "{q} судебная практика по снижению платы за содержание ои",
+        "{q} состав общего имущества МКД ЖК РФ ст 36",
+        "{q} ежегодный перерасчет за ои ПП РФ 491 п 32",
+    )
+
     def __init__(self):
         # Расширенный и структурированный словарь с синонимами и контекстами
-        self.term_map = self._build_term_map()
-        keywords = self._flatten_term_map(self.term_map)
+        self.term_map, keywords = self._shared_term_map()
         
         super().__init__("Управление Общим Имуществом", keywords)
 
@@ -8964,199 +5803,77 @@ class CommonPropertyAgent(RAGAgent):
             "жалоба на содержание ои": {
                 "synonyms": ["акт о нарушении", "претензия ук", "обращение в гжи", "проверка ук", "фото как доказательство", "электронная жалоба"],
                 "norm_refs": ["ЖК РФ, ст. 161", "ФЗ №59-ФЗ, ст. 12"],
-                "contexts": ["срок ответа (30 дней)", "обязательность рассмотрения", "предписание", "внеплановая проверка", "обжалование"]
-            },
-            "судебная практика по ои": {
-                "synonyms": ["оспаривание платы за ои", "взыскание убытков за некачественное содержание", "позиция вс рф по одн", "судебные споры с ук"],
-                "norm_refs": ["ГПК РФ, ст. 131", "КАС РФ, ст. 218"],
-                "contexts": ["основания для снижения платы", "доказательства нарушений", "расчёт убытков", "моральный вред", "госпошлина"]
-            },
-        }
-
-    def _flatten_term_map(self, term_map: Dict) -> List[str]:
-        """Преобразует структурированный словарь в плоский список уникальных ключевых слов."""
-        keywords = set()
-        for term, data in term_map.items():
-            keywords.add(term.lower())  # оригинальный ключ
-            for synonym in data.get("synonyms", []):
-                keywords.add(synonym.lower())
-            # Добавляем ключи из контекстов
-            contexts = data.get("contexts", [])
-            if isinstance(contexts, dict):
-                for ctx_key in contexts.keys():
-                    keywords.add(ctx_key.lower())
-            elif isinstance(contexts, list):
-                for ctx in contexts:
-                    keywords.add(ctx.lower())
-        return list(keywords)
-
-    def _perform_web_search(self, query: str, max_results: int = 3) -> str:
-        """
-        Улучшенный веб-поиск: приоритет официальным источникам, фильтрация, ранжирование.
-        Выполняется ВНУТРИ _build_prompt, как в оригинальной архитектуре.
-        """
-        OFFICIAL_DOMAINS = {
-            "cbr.ru", "government.ru", "kremlin.ru", "rosstat.gov.ru", "minfin.gov.ru",
-            "fas.gov.ru", "gji.ru", "rospotrebnadzor.ru", "rosreestr.gov.ru",
-            "minstroyrf.ru", "fgis-tarif.ru", "consultant.ru", "garant.ru",
-            "pravo.gov.ru", "gkh.ru", "roscomnadzor.ru", "vsrf.ru", "gjirf.ru"
-        }
-
-        BLACKLISTED_DOMAINS = {
-            "otvet.mail.ru", "ask.fm", "irecommend.ru", "pikabu.ru",
-            "zen.yandex.ru", "thequestion.ru", "quora.com", "reddit.com",
-            "fishki.net", "yaplakal.com", "blog", "forum"
-        }
-
-        # Генерируем расширенные поисковые запросы
-        expanded_queries = self._expand_search_query(query)
-        all_results = []
-
-        for attempt in range(2):
-            try:
-                with DDGS(timeout=10) as ddgs:
-                    for q in expanded_queries:
-                        results = ddgs.text(q, max_results=5)
-                        for r in results:
-                            href = r.get('href', '')
-                            if not href:
-                                continue
-                            
-                            try:
-                                domain = href.split('/')[2].lower()
-                            except IndexError:
-                                continue
-
-                            if any(bad in domain for bad in BLACKLISTED_DOMAINS):
-                                continue
-
-                            weight = 3 if any(official in domain for official in OFFICIAL_DOMAINS) else \
-                                     2 if any(gov in domain for gov in [".gov.ru", ".gkh.ru", ".vsrf.ru", ".gjirf.ru"]) else 1
-
-                            snippet = {
-                                "body": r['body'],
-                                "href": href,
-                                "title": r.get('title', ''),
-                                "weight": weight
-                            }
-                            all_results.append(snippet)
-
-                    all_results = sorted(all_results, key=lambda x: x['weight'], reverse=True)
-                    seen_bodies = set()
-                    unique_results = []
-                    for r in all_results:
-                        body_hash = hash(r['body'][:100])
-                        if body_hash not in seen_bodies:
-                            seen_bodies.add(body_hash)
-                            unique_results.append(r)
-                            if len(unique_results) >= max_results:
-                                break
-
-                    if unique_results:
-                        formatted = []
-                        for r in unique_results:
-                            prefix = "[ОФИЦИАЛЬНЫЙ ИСТОЧНИК] " if r['weight'] >= 2 else ""
-                            formatted.append(f"{prefix}• {r['body']}\n  Источник: {r['href']}\n")
-                        return "\n".join(formatted).strip()
-                    else:
-                        return "По вашему запросу ничего не найдено в надёжных источниках."
-
-            except Exception as e:
-                if attempt == 0:
-                    time.sleep(2)
-                    continue
-                return f"Ошибка веб-поиска: {str(e)}"
-
-        return "Не удалось выполнить веб-поиск. Попробуйте позже."
-
-    def _expand_search_query(self, query: str) -> List[str]:
-        """Генерирует несколько вариантов поискового запроса для лучшего покрытия темы."""
-        queries = [query]
-        queries.append(f"{query} ПП РФ 491 общее имущество")
-        queries.append(f"{query} ПП РФ 354 расчет одн")
-        queries.append(f"{query} судебная практика по снижению платы за содержание ои")
-        queries.append(f"{query} состав общего имущества МКД ЖК РФ ст 36")
-        queries.append(f"{query} ежегодный перерасчет за ои ПП РФ 491 п 32")
-        # Добавляем синонимы
-        for term, data in self.term_map.items():
-            if term in query.lower() or any(syn in query.lower() for syn in data.get("synonyms", [])):
-                for synonym in data.get("synonyms", [])[:2]:
-                    new_q = query.replace(term, synonym) if term in query else query + " " + synonym
-                    queries.append(new_q)
-        return list(set(queries))
-
-    def _build_prompt(self, summary: str, context_text: str, role: str = "смешанная") -> str:
-        """
-        Агент: Управление общим имуществом
-        Формирует промт:
-        - Фокус: состав, плата, ОДН, перерасчёт, снижение платы
-        - Строгая структура, ссылки на нормативы, судебная практика
-        """
-        extra = self.improve_prompt_from_feedback()
-        web_results = self._perform_web_search(summary)
-    
-        # Проверка на запрос о пени
-        penalty_keywords = ["пени", "неустойка", "штраф за просрочку", "ставка цб", "9.5%", "ключевая ставка"]
-        should_calculate_penalty = any(kw in summary.lower() for kw in penalty_keywords)
-    
-        # --- SYSTEM PROMPT ---
-        system_prompt = (
-            "Ты — экспертный ИИ-ассистент по управлению общим имуществом в многоквартирных домах (МКД). "
-            "Отвечай строго по нормативам, без выдуманных данных, используя только контекст, веб-результаты и обновления.\n\n"
-            "**ЖЕСТКИЕ ПРАВИЛА:**\n"
-            "1. Если информации нет — отвечай: 'Недостаточно данных для точного ответа.'\n"
-            "2. Обязательно указывай ссылки на нормативные акты.\n"
-            "3. Структура: краткий вывод → нормативы → пошаговая инструкция → судебная практика.\n"
-            "4. Формулы пени включай только при упоминании пени.\n"
-            "5. Приоритет: ЖК РФ > ПП РФ №491 > ПП РФ №354 > судебная практика.\n\n"
-            f"### Контекст:\n{context_text}\n\n"
-            f"### Веб-поиск:\n{web_results}\n\n"
-            f"### Дополнительные обновления:\n{extra}\n\n"
-            "--- Основной ответ ---\n"
-            "Краткий вывод: [что входит в ОИ, положен ли перерасчёт, как снизить плату]\n"
-            "Нормативное обоснование: [статьи ЖК РФ, пункты ПП РФ]\n"
-            "Пошаговая инструкция:\n"
-            "- Состав общего имущества (крыши, стены, лифты, подвалы — ЖК РФ, ст.36; ПП РФ №491, Приложение 1)\n"
-            "- Расчёт платы за содержание ОИ (тариф, утверждённый ОСС — ЖК РФ, ст.156)\n"
-            "- Расчёт ОДН (по нормативу или ОДПУ — ПП РФ №354, раздел 9)\n"
-            "- Снижение платы за некачественные услуги (акт, заявление — ПП РФ №354, п.106)\n"
-            "- Ежегодный перерасчёт (до 1 апреля, по факту — ПП РФ №491, п.32)\n\n"
-            "Судебная практика:\n"
-            "- Определение ВС РФ №XXX-ЭСXX-XXXX — краткая позиция суда\n"
-            "Если судебных решений нет: 'Судебная практика по данному вопросу в базе отсутствует'.\n\n"
-            "Ключевые нормативные акты:\n"
-            "- ЖК РФ (ст.36, ст.154-158 — состав ОИ, плата, перерасчёт, ответственность)\n"
-            "- ПП РФ №491 «Об утверждении Правил содержания ОИ…»\n"
-            "- ПП РФ №354 (раздел 9 — ОДН, п.106 — снижение платы)\n"
-            "- СанПиН 1.2.3685-21 (санитарные нормы содержания территорий)\n"
-        )
-    
-        # --- Блок расчёта пени ---
-        if should_calculate_penalty:
-            system_prompt += (
-                "\n**Расчёт пени (если упомянут):**\n"
-                "- Формула: Пени = Сумма долга × Дни просрочки × (Ключевая ставка ЦБ РФ / 300 / 100)\n"
-                "- Основание: [ЖК РФ, ст.155.1], [ФЗ №44-ФЗ], [ПП РФ №329]\n"
-                "- Ограничение: не более 9.5% годовых до 2027 года\n"
-                "- Пример: 10 000 руб., просрочка 30 дней → 95 руб.\n"
-                "- Начало начисления: с 31-го дня после окончания срока оплаты\n"
-            )
-    
-        system_prompt += f"{self.get_role_instruction(role)}"
-    
-        # --- Формат для QVikhr / LLaMA ---
-        prompt_formatted = (
-            "<|begin_of_text|><|start_header_id|>system<|end_header_id|>\n"
-            f"{system_prompt}<|eot_id|>"
-        )
-    
-        return prompt_formatted
+                "contexts": ["срок ответа (30 дней)", "обязательность рассмотрения", "предписание", "внеплановая проверка", "обжалование"]
+            },
+            "судебная практика по ои": {
+                "synonyms": ["оспаривание платы за ои", "взыскание убытков за некачественное содержание", "позиция вс рф по одн", "судебные споры с ук"],
+                "norm_refs": ["ГПК РФ, ст. 131", "КАС РФ, ст. 218"],
+                "contexts": ["основания для снижения платы", "доказательства нарушений", "расчёт убытков", "моральный вред", "госпошлина"]
+            },
+        }
+
+    # Агент: Управление общим имуществом
+    # Формирует промт:
+    # - Фокус: состав, плата, ОДН, перерасчёт, снижение платы
+    # - Строгая структура, ссылки на нормативы, судебная практика
+    PROMPT_TEMPLATE = (
+        "Ты — экспертный ИИ-ассистент по управлению общим имуществом в многоквартирных домах (МКД). "
+        "Отвечай строго по нормативам, без выдуманных данных, используя только контекст, веб-результаты и обновления.\n\n"
+        "**ЖЕСТКИЕ ПРАВИЛА:**\n"
+        "1. Если информации нет — отвечай: 'Недостаточно данных для точного ответа.'\n"
+        "2. Обязательно указывай ссылки на нормативные акты.\n"
+        "3. Структура: краткий вывод → нормативы → пошаговая инструкция → судебная практика.\n"
+        "4. Формулы пени включай только при упоминании пени.\n"
+        "5. Приоритет: ЖК РФ > ПП РФ №491 > ПП РФ №354 > судебная практика.\n\n"
+        "### Контекст:\n"
+        "{context_text}\n\n"
+        "### Веб-поиск:\n"
+        "{web_results}\n\n"
+        "### Дополнительные обновления:\n"
+        "{extra}\n\n"
+        "--- Основной ответ ---\n"
+        "Краткий вывод: [что входит в ОИ, положен ли перерасчёт, как снизить плату]\n"
+        "Нормативное обоснование: [статьи ЖК РФ, пункты ПП РФ]\n"
+        "Пошаговая инструкция:\n"
+        "- Состав общего имущества (крыши, стены, лифты, подвалы — ЖК РФ, ст.36; ПП РФ №491, Приложение 1)\n"
+        "- Расчёт платы за содержание ОИ (тариф, утверждённый ОСС — ЖК РФ, ст.156)\n"
+        "- Расчёт ОДН (по нормативу или ОДПУ — ПП РФ №354, раздел 9)\n"
+        "- Снижение платы за некачественные услуги (акт, заявление — ПП РФ №354, п.106)\n"
+        "- Ежегодный перерасчёт (до 1 апреля, по факту — ПП РФ №491, п.32)\n\n"
+        "Судебная практика:\n"
+        "- Определение ВС РФ №XXX-ЭСXX-XXXX — краткая позиция суда\n"
+        "Если судебных решений нет: 'Судебная практика по данному вопросу в базе отсутствует'.\n\n"
+        "Ключевые нормативные акты:\n"
+        "- ЖК РФ (ст.36, ст.154-158 — состав ОИ, плата, перерасчёт, ответственность)\n"
+        "- ПП РФ №491 «Об утверждении Правил содержания ОИ…»\n"
+        "- ПП РФ №354 (раздел 9 — ОДН, п.106 — снижение платы)\n"
+        "- СанПиН 1.2.3685-21 (санитарные нормы содержания территорий)\n"
+        "{penalty_block}{role_instruction}"
+    )
+    PENALTY_BLOCK = (
+        "\n**Расчёт пени (если упомянут):**\n"
+        "- Формула: Пени = Сумма долга × Дни просрочки × (Ключевая ставка ЦБ РФ / 300 / 100)\n"
+        "- Основание: [ЖК РФ, ст.155.1], [ФЗ №44-ФЗ], [ПП РФ №329]\n"
+        "- Ограничение: не более 9.5% годовых до 2027 года\n"
+        "- Пример: 10 000 руб., просрочка 30 дней → 95 руб.\n"
+        "- Начало начисления: с 31-го дня после окончания срока оплаты\n"
+    )
+
 
 class DisputeResolutionAgent(RAGAgent):
+    OFFICIAL_DOMAINS = RAGAgent.OFFICIAL_DOMAINS | {"proc.gov.ru", "vsrf.ru", "sudrf.ru", "kad.arbitr.ru"}
+    GOV_SUFFIXES = (".gov.ru", ".gkh.ru", ".vsrf.ru", ".sudrf.ru")
+    SEARCH_QUERY_TEMPLATES = (
+        "{q} ЖК РФ ст 162 претензия УК",
+        "{q} ПП РФ 354 перерасчет отказ",
+        "{q} судебная практика по спорам с УК",
+        "{q} образец претензии в УК по ЖКХ",
+        "{q} жалоба в ГЖИ на отказ в перерасчёте",
+    )
+
     def __init__(self):
         # Расширенный и структурированный словарь с синонимами и контекстами
-        self.term_map = self._build_term_map()
-        keywords = self._flatten_term_map(self.term_map)
+        self.term_map, keywords = self._shared_term_map()
         
         super().__init__("Разрешение Споров с УК/РСО", keywords)
 
@@ -9240,192 +5957,70 @@ class DisputeResolutionAgent(RAGAgent):
             },
         }
 
-    def _flatten_term_map(self, term_map: Dict) -> List[str]:
-        """Преобразует структурированный словарь в плоский список уникальных ключевых слов."""
-        keywords = set()
-        for term, data in term_map.items():
-            keywords.add(term.lower())  # оригинальный ключ
-            for synonym in data.get("synonyms", []):
-                keywords.add(synonym.lower())
-            # Добавляем ключи из контекстов
-            contexts = data.get("contexts", [])
-            if isinstance(contexts, dict):
-                for ctx_key in contexts.keys():
-                    keywords.add(ctx_key.lower())
-            elif isinstance(contexts, list):
-                for ctx in contexts:
-                    keywords.add(ctx.lower())
-        return list(keywords)
-
-    def _perform_web_search(self, query: str, max_results: int = 3) -> str:
-        """
-        Улучшенный веб-поиск: приоритет официальным источникам, фильтрация, ранжирование.
-        Выполняется ВНУТРИ _build_prompt, как в оригинальной архитектуре.
-        """
-        OFFICIAL_DOMAINS = {
-            "cbr.ru", "government.ru", "kremlin.ru", "rosstat.gov.ru", "minfin.gov.ru",
-            "fas.gov.ru", "gji.ru", "rospotrebnadzor.ru", "rosreestr.gov.ru",
-            "minstroyrf.ru", "fgis-tarif.ru", "consultant.ru", "garant.ru",
-            "pravo.gov.ru", "gkh.ru", "proc.gov.ru", "vsrf.ru", "sudrf.ru", "kad.arbitr.ru"
-        }
-
-        BLACKLISTED_DOMAINS = {
-            "otvet.mail.ru", "ask.fm", "irecommend.ru", "pikabu.ru",
-            "zen.yandex.ru", "thequestion.ru", "quora.com", "reddit.com",
-            "fishki.net", "yaplakal.com", "blog", "forum"
-        }
-
-        # Генерируем расширенные поисковые запросы
-        expanded_queries = self._expand_search_query(query)
-        all_results = []
-
-        for attempt in range(2):
-            try:
-                with DDGS(timeout=10) as ddgs:
-                    for q in expanded_queries:
-                        results = ddgs.text(q, max_results=5)
-                        for r in results:
-                            href = r.get('href', '')
-                            if not href:
-                                continue
-                            
-                            try:
-                                domain = href.split('/')[2].lower()
-                            except IndexError:
-                                continue
-
-                            if any(bad in domain for bad in BLACKLISTED_DOMAINS):
-                                continue
-
-                            weight = 3 if any(official in domain for official in OFFICIAL_DOMAINS) else \
-                                     2 if any(gov in domain for gov in [".gov.ru", ".gkh.ru", ".vsrf.ru", ".sudrf.ru"]) else 1
-
-                            snippet = {
-                                "body": r['body'],
-                                "href": href,
-                                "title": r.get('title', ''),
-                                "weight": weight
-                            }
-                            all_results.append(snippet)
-
-                    all_results = sorted(all_results, key=lambda x: x['weight'], reverse=True)
-                    seen_bodies = set()
-                    unique_results = []
-                    for r in all_results:
-                        body_hash = hash(r['body'][:100])
-                        if body_hash not in seen_bodies:
-                            seen_bodies.add(body_hash)
-                            unique_results.append(r)
-                            if len(unique_results) >= max_results:
-                                break
-
-                    if unique_results:
-                        formatted = []
-                        for r in unique_results:
-                            prefix = "[ОФИЦИАЛЬНЫЙ ИСТОЧНИК] " if r['weight'] >= 2 else ""
-                            formatted.append(f"{prefix}• {r['body']}\n  Источник: {r['href']}\n")
-                        return "\n".join(formatted).strip()
-                    else:
-                        return "По вашему запросу ничего не найдено в надёжных источниках."
-
-            except Exception as e:
-                if attempt == 0:
-                    time.sleep(2)
-                    continue
-                return f"Ошибка веб-поиска: {str(e)}"
-
-        return "Не удалось выполнить веб-поиск. Попробуйте позже."
+    # Агент: Разрешение споров с УК/РСО
+    # Формирует промт:
+    # - Фокус: досудебное урегулирование, претензии, доказательства, иск, подсудность, сроки исковой давности
+    # - Строгая структура, ссылки на нормативы, судебная практика
+    PROMPT_TEMPLATE = (
+        "Ты — экспертный ИИ-ассистент по жилищным спорам.\n"
+        "Отвечай строго по нормативам, без выдуманных данных, используя только контекст, веб-результаты и обновления.\n\n"
+        "**ЖЕСТКИЕ ПРАВИЛА:**\n"
+        "1. Если информации нет — отвечай: 'Недостаточно данных для точного ответа.'\n"
+        "2. Обязательно указывай ссылки на нормативные акты.\n"
+        "3. Структура: краткий вывод → нормативы → пошаговая инструкция → судебная практика.\n"
+        "4. Формулы пени включай только при упоминании пени.\n"
+        "5. Приоритет: ЖК РФ > ГК РФ > ПП РФ > ФЗ > судебная практика.\n\n"
+        "### Контекст:\n"
+        "{context_text}\n\n"
+        "### Веб-поиск:\n"
+        "{web_results}\n\n"
+        "### Дополнительные обновления:\n"
+        "{extra}\n\n"
+        "--- Основной ответ ---\n"
+        "Краткий вывод: [что делать, куда обращаться, шансы на успех]\n"
+        "Нормативное обоснование: [статьи ЖК РФ, ГК РФ, ПП РФ, ФЗ]\n"
+        "Пошаговая инструкция:\n"
+        "- Досудебное урегулирование: как составить и направить претензию (ЖК РФ, ст.162)\n"
+        "- Сбор доказательств: акты, фото, переписка, свидетели (ГПК РФ, ст.67)\n"
+        "- Подача жалобы: ГЖИ, Роспотребнадзор, прокуратура (ФЗ №59-ФЗ, ст.12)\n"
+        "- Подача иска: подсудность, госпошлина, приложения (ГПК РФ, ст.131)\n"
+        "- Сроки: исковой давности — 3 года (ГК РФ, ст.196), рассмотрение претензии — 30 дней (ЖК РФ, ст.162)\n\n"
+        "Судебная практика:\n"
+        "- Определение ВС РФ №XXX-ЭСXX-XXXX — краткая позиция суда\n"
+        "Если судебных решений нет: 'Судебная практика по данному вопросу в базе отсутствует'.\n\n"
+        "Ключевые нормативные акты:\n"
+        "- ЖК РФ (ст.155-162 — обязательства, претензии, ответственность УК)\n"
+        "- Гражданский кодекс РФ (ст.196 — исковая давность, ст.309 — исполнение обязательств)\n"
+        "- ПП РФ №354 (порядок расчётов и качества услуг)\n"
+        "- ПП РФ №491 (содержание общего имущества)\n"
+        "- ФЗ №59-ФЗ «О порядке рассмотрения обращений граждан»\n"
+        "- ФЗ №294-ФЗ «О защите прав при госконтроле»\n"
+        "{penalty_block}{role_instruction}"
+    )
+    PENALTY_BLOCK = (
+        "\n**Расчёт пени (если упомянут):**\n"
+        "- Формула: Пени = Сумма долга × Дни просрочки × (Ключевая ставка ЦБ РФ / 300 / 100)\n"
+        "- Основание: [ЖК РФ, ст.155.1], [ФЗ №44-ФЗ], [ПП РФ №329]\n"
+        "- Ограничение: не более 9.5% годовых до 2027 года\n"
+        "- Пример: 10 000 руб., просрочка 30 дней → 95 руб.\n"
+        "- Начало начисления: с 31-го дня после окончания срока оплаты\n"
+    )
 
-    def _expand_search_query(self, query: str) -> List[str]:
-        """Генерирует несколько вариантов поискового запроса для лучшего покрытия темы."""
-        queries = [query]
-        queries.append(f"{query} ЖК РФ ст 162 претензия УК")
-        queries.append(f"{query} ПП РФ 354 перерасчет отказ")
-        queries.append(f"{query} судебная практика по спорам с УК")
-        queries.append(f"{query} образец претензии в УК по ЖКХ")
-        queries.append(f"{query} жалоба в ГЖИ на отказ в перерасчёте")
-        # Добавляем синонимы
-        for term, data in self.term_map.items():
-            if term in query.lower() or any(syn in query.lower() for syn in data.get("synonyms", [])):
-                for synonym in data.get("synonyms", [])[:2]:
-                    new_q = query.replace(term, synonym) if term in query else query + " " + synonym
-                    queries.append(new_q)
-        return list(set(queries))
-
-    def _build_prompt(self, summary: str, context_text: str, role: str = "смешанная") -> str:
-        """
-        Агент: Разрешение споров с УК/РСО
-        Формирует промт:
-        - Фокус: досудебное урегулирование, претензии, доказательства, иск, подсудность, сроки исковой давности
-        - Строгая структура, ссылки на нормативы, судебная практика
-        """
-        extra = self.improve_prompt_from_feedback()
-        web_results = self._perform_web_search(summary)
-    
-        # Проверка на запрос о пени
-        penalty_keywords = ["пени", "неустойка", "штраф за просрочку", "ставка цб", "9.5%", "ключевая ставка"]
-        should_calculate_penalty = any(kw in summary.lower() for kw in penalty_keywords)
-    
-        # --- SYSTEM PROMPT ---
-        system_prompt = (
-            "Ты — экспертный ИИ-ассистент по жилищным спорам.\n"
-            "Отвечай строго по нормативам, без выдуманных данных, используя только контекст, веб-результаты и обновления.\n\n"
-            "**ЖЕСТКИЕ ПРАВИЛА:**\n"
-            "1. Если информации нет — отвечай: 'Недостаточно данных для точного ответа.'\n"
-            "2. Обязательно указывай ссылки на нормативные акты.\n"
-            "3. Структура: краткий вывод → нормативы → пошаговая инструкция → судебная практика.\n"
-            "4. Формулы пени включай только при упоминании пени.\n"
-            "5. Приоритет: ЖК РФ > ГК РФ > ПП РФ > ФЗ > судебная практика.\n\n"
-            f"### Контекст:\n{context_text}\n\n"
-            f"### Веб-поиск:\n{web_results}\n\n"
-            f"### Дополнительные обновления:\n{extra}\n\n"
-            "--- Основной ответ ---\n"
-            "Краткий вывод: [что делать, куда обращаться, шансы на успех]\n"
-            "Нормативное обоснование: [статьи ЖК РФ, ГК РФ, ПП РФ, ФЗ]\n"
-            "Пошаговая инструкция:\n"
-            "- Досудебное урегулирование: как составить и направить претензию (ЖК РФ, ст.162)\n"
-            "- Сбор доказательств: акты, фото, переписка, свидетели (ГПК РФ, ст.67)\n"
-            "- Подача жалобы: ГЖИ, Роспотребнадзор, прокуратура (ФЗ №59-ФЗ, ст.12)\n"
-            "- Подача иска: подсудность, госпошлина, приложения (ГПК РФ, ст.131)\n"
-            "- Сроки: исковой давности — 3 года (ГК РФ, ст.196), рассмотрение претензии — 30 дней (ЖК РФ, ст.162)\n\n"
-            "Судебная практика:\n"
-            "- Определение ВС РФ №XXX-ЭСXX-XXXX — краткая позиция суда\n"
-            "Если судебных решений нет: 'Судебная практика по данному вопросу в базе отсутствует'.\n\n"
-            "Ключевые нормативные акты:\n"
-            "- ЖК РФ (ст.155-162 — обязательства, претензии, ответственность УК)\n"
-            "- Гражданский кодекс РФ (ст.196 — исковая давность, ст.309 — исполнение обязательств)\n"
-            "- ПП РФ №354 (порядок расчётов и качества услуг)\n"
-            "- ПП РФ №491 (содержание общего имущества)\n"
-            "- ФЗ №59-ФЗ «О порядке рассмотрения обращений граждан»\n"
-            "- ФЗ №294-ФЗ «О защите прав при госконтроле»\n"
-        )
-    
-        # --- Блок расчёта пени ---
-        if should_calculate_penalty:
-            system_prompt += (
-                "\n**Расчёт пени (если упомянут):**\n"
-                "- Формула: Пени = Сумма долга × Дни просрочки × (Ключевая ставка ЦБ РФ / 300 / 100)\n"
-                "- Основание: [ЖК РФ, ст.155.1], [ФЗ №44-ФЗ], [ПП РФ №329]\n"
-                "- Ограничение: не более 9.5% годовых до 2027 года\n"
-                "- Пример: 10 000 руб., просрочка 30 дней → 95 руб.\n"
-                "- Начало начисления: с 31-го дня после окончания срока оплаты\n"
-            )
-    
-        system_prompt += f"{self.get_role_instruction(role)}"
-    
-        # --- Формат для QVikhr / LLaMA ---
-        prompt_formatted = (
-            "<|begin_of_text|><|start_header_id|>system<|end_header_id|>\n"
-            f"{system_prompt}<|eot_id|>"
-        )
-    
-        return prompt_formatted
 
 class ProceduralAgent(RAGAgent):
+    OFFICIAL_DOMAINS = RAGAgent.OFFICIAL_DOMAINS | {"roscomnadzor.ru", "vsrf.ru", "gjirf.ru", "fns.ru"}
+    GOV_SUFFIXES = (".gov.ru", ".gkh.ru", ".vsrf.ru", ".gjirf.ru")
+    SEARCH_QUERY_TEMPLATES = (
+        "{q} ПП РФ 354 образец акта",
+        "{q} ЖК РФ ст 162 образец претензии",
+        "{q} судебная практика по оформлению актов ЖКХ",
+        "{q} как составить заявление на перерасчет образец",
+        "{q} форма уведомления о проведении ОСС",
+    )
+
     def __init__(self):
         # Расширенный и структурированный словарь с синонимами и контекстами
-        self.term_map = self._build_term_map()
-        keywords = self._flatten_term_map(self.term_map)
+        self.term_map, keywords = self._shared_term_map()
         
         super().__init__("Процедурный Агент", keywords)
 
@@ -9509,191 +6104,69 @@ class ProceduralAgent(RAGAgent):
             },
         }
 
-    def _flatten_term_map(self, term_map: Dict) -> List[str]:
-        """Преобразует структурированный словарь в плоский список уникальных ключевых слов."""
-        keywords = set()
-        for term, data in term_map.items():
-            keywords.add(term.lower())  # оригинальный ключ
-            for synonym in data.get("synonyms", []):
-                keywords.add(synonym.lower())
-            # Добавляем ключи из контекстов
-            contexts = data.get("contexts", [])
-            if isinstance(contexts, dict):
-                for ctx_key in contexts.keys():
-                    keywords.add(ctx_key.lower())
-            elif isinstance(contexts, list):
-                for ctx in contexts:
-                    keywords.add(ctx.lower())
-        return list(keywords)
-
-    def _perform_web_search(self, query: str, max_results: int = 3) -> str:
-        """
-        Улучшенный веб-поиск: приоритет официальным источникам, фильтрация, ранжирование.
-        Выполняется ВНУТРИ _build_prompt, как в оригинальной архитектуре.
-        """
-        OFFICIAL_DOMAINS = {
-            "cbr.ru", "government.ru", "kremlin.ru", "rosstat.gov.ru", "minfin.gov.ru",
-            "fas.gov.ru", "gji.ru", "rospotrebnadzor.ru", "rosreestr.gov.ru",
-            "minstroyrf.ru", "fgis-tarif.ru", "consultant.ru", "garant.ru",
-            "pravo.gov.ru", "gkh.ru", "roscomnadzor.ru", "vsrf.ru", "gjirf.ru", "fns.ru"
-        }
-
-        BLACKLISTED_DOMAINS = {
-            "otvet.mail.ru", "ask.fm", "irecommend.ru", "pikabu.ru",
-            "zen.yandex.ru", "thequestion.ru", "quora.com", "reddit.com",
-            "fishki.net", "yaplakal.com", "blog", "forum"
-        }
-
-        # Генерируем расширенные поисковые запросы
-        expanded_queries = self._expand_search_query(query)
-        all_results = []
-
-        for attempt in range(2):
-            try:
-                with DDGS(timeout=10) as ddgs:
-                    for q in expanded_queries:
-                        results = ddgs.text(q, max_results=5)
-                        for r in results:
-                            href = r.get('href', '')
-                            if not href:
-                                continue
-                            
-                            try:
-                                domain = href.split('/')[2].lower()
-                            except IndexError:
-                                continue
-
-                            if any(bad in domain for bad in BLACKLISTED_DOMAINS):
-                                continue
-
-                            weight = 3 if any(official in domain for official in OFFICIAL_DOMAINS) else \
-                                     2 if any(gov in domain for gov in [".gov.ru", ".gkh.ru", ".vsrf.ru", ".gjirf.ru"]) else 1
-
-                            snippet = {
-                                "body": r['body'],
-                                "href": href,
-                                "title": r.get('title', ''),
-                                "weight": weight
-                            }
-                            all_results.append(snippet)
-
-                    all_results = sorted(all_results, key=lambda x: x['weight'], reverse=True)
-                    seen_bodies = set()
-                    unique_results = []
-                    for r in all_results:
-                        body_hash = hash(r['body'][:100])
-                        if body_hash not in seen_bodies:
-                            seen_bodies.add(body_hash)
-                            unique_results.append(r)
-                            if len(unique_results) >= max_results:
-                                break
-
-                    if unique_results:
-                        formatted = []
-                        for r in unique_results:
-                            prefix = "[ОФИЦИАЛЬНЫЙ ИСТОЧНИК] " if r['weight'] >= 2 else ""
-                            formatted.append(f"{prefix}• {r['body']}\n  Источник: {r['href']}\n")
-                        return "\n".join(formatted).strip()
-                    else:
-                        return "По вашему запросу ничего не найдено в надёжных источниках."
-
-            except Exception as e:
-                if attempt == 0:
-                    time.sleep(2)
-                    continue
-                return f"Ошибка веб-поиска: {str(e)}"
-
-        return "Не удалось выполнить веб-поиск. Попробуйте позже."
+    # Агент: Процедурный агент
+    # Формирует промт:
+    # - Фокус: оформление процедурных документов в ЖКХ — акты, заявки, претензии, формы, сроки
+    # - Строгая структура, ссылки на нормативы, судебная практика
+    PROMPT_TEMPLATE = (
+        "Ты — экспертный ИИ-ассистент по оформлению процедурных документов в сфере ЖКХ.\n"
+        "Отвечай строго по нормативам, без выдуманных данных, используя только контекст, веб-результаты и обновления.\n\n"
+        "**ЖЕСТКИЕ ПРАВИЛА:**\n"
+        "1. Если информации нет — отвечай: 'Недостаточно данных для точного ответа.'\n"
+        "2. Обязательно указывай ссылки на нормативные акты.\n"
+        "3. Структура: краткий вывод → нормативы → пошаговая инструкция → судебная практика.\n"
+        "4. Формулы пени включай только при упоминании пени.\n"
+        "5. Приоритет: ЖК РФ > ПП РФ > ФЗ > судебная практика.\n\n"
+        "### Контекст:\n"
+        "{context_text}\n\n"
+        "### Веб-поиск:\n"
+        "{web_results}\n\n"
+        "### Дополнительные обновления:\n"
+        "{extra}\n\n"
+        "--- Основной ответ ---\n"
+        "Краткий вывод: [какой документ нужен, где взять образец, как подать]\n"
+        "Нормативное обоснование: [статьи ЖК РФ, ПП РФ, ФЗ]\n"
+        "Пошаговая инструкция:\n"
+        "- Какие сведения должны быть в документе? (реквизиты, описание, требования — ПП РФ №354, Приложения)\n"
+        "- Как правильно оформить? (подпись, печать, приложения — ЖК РФ, ст.162)\n"
+        "- Куда и как подать? (лично, почтой, через ГИС ЖКХ — ФЗ №59-ФЗ, ст.12)\n"
+        "- Сроки рассмотрения? (10 дней на информацию, 30 дней на претензии — ФЗ №59-ФЗ, ст.12)\n"
+        "- Что делать при отказе или отсутствии ответа? (жалоба в ГЖИ, суд — ЖК РФ, ст.20)\n\n"
+        "Судебная практика:\n"
+        "- Определение ВС РФ №XXX-ЭСXX-XXXX — краткая позиция суда\n"
+        "Если судебных решений нет: 'Судебная практика по данному вопросу в базе отсутствует'.\n\n"
+        "Ключевые нормативные акты:\n"
+        "- ЖК РФ (ст.45 — уведомления, ст.162 — претензии)\n"
+        "- ПП РФ №354 (п.98-99 — акты, заявки; Приложения — формы документов)\n"
+        "- ПП РФ №491 (п.10 — акты по общему имуществу)\n"
+        "- ФЗ №59-ФЗ «О порядке рассмотрения обращений граждан»\n"
+        "- ФЗ №294-ФЗ «О защите прав при госконтроле»\n"
+        "{penalty_block}{role_instruction}"
+    )
+    PENALTY_BLOCK = (
+        "\n**Расчёт пени (если упомянут):**\n"
+        "- Формула: Пени = Сумма долга × Дни просрочки × (Ключевая ставка ЦБ РФ / 300 / 100)\n"
+        "- Основание: [ЖК РФ, ст.155.1], [ФЗ №44-ФЗ], [ПП РФ №329]\n"
+        "- Ограничение: не более 9.5% годовых до 2027 года\n"
+        "- Пример: 10 000 руб., просрочка 30 дней → 95 руб.\n"
+        "- Начало начисления: с 31-го дня после окончания срока оплаты\n"
+    )
 
-    def _expand_search_query(self, query: str) -> List[str]:
-        """Генерирует несколько вариантов поискового запроса для лучшего покрытия темы."""
-        queries = [query]
-        queries.append(f"{query} ПП РФ 354 образец акта")
-        queries.append(f"{query} ЖК РФ ст 162 образец претензии")
-        queries.append(f"{query} судебная практика по оформлению актов ЖКХ")
-        queries.append(f"{query} как составить заявление на перерасчет образец")
-        queries.append(f"{query} форма уведомления о проведении ОСС")
-        # Добавляем синонимы
-        for term, data in self.term_map.items():
-            if term in query.lower() or any(syn in query.lower() for syn in data.get("synonyms", [])):
-                for synonym in data.get("synonyms", [])[:2]:
-                    new_q = query.replace(term, synonym) if term in query else query + " " + synonym
-                    queries.append(new_q)
-        return list(set(queries))
-
-    def _build_prompt(self, summary: str, context_text: str, role: str = "смешанная") -> str:
-        """
-        Агент: Процедурный агент
-        Формирует промт:
-        - Фокус: оформление процедурных документов в ЖКХ — акты, заявки, претензии, формы, сроки
-        - Строгая структура, ссылки на нормативы, судебная практика
-        """
-        extra = self.improve_prompt_from_feedback()
-        web_results = self._perform_web_search(summary)
-    
-        # Проверка на запрос о пени
-        penalty_keywords = ["пени", "неустойка", "штраф за просрочку", "ставка цб", "9.5%", "ключевая ставка"]
-        should_calculate_penalty = any(kw in summary.lower() for kw in penalty_keywords)
-    
-        # --- SYSTEM PROMPT ---
-        system_prompt = (
-            "Ты — экспертный ИИ-ассистент по оформлению процедурных документов в сфере ЖКХ.\n"
-            "Отвечай строго по нормативам, без выдуманных данных, используя только контекст, веб-результаты и обновления.\n\n"
-            "**ЖЕСТКИЕ ПРАВИЛА:**\n"
-            "1. Если информации нет — отвечай: 'Недостаточно данных для точного ответа.'\n"
-            "2. Обязательно указывай ссылки на нормативные акты.\n"
-            "3. Структура: краткий вывод → нормативы → пошаговая инструкция → судебная практика.\n"
-            "4. Формулы пени включай только при упоминании пени.\n"
-            "5. Приоритет: ЖК РФ > ПП РФ > ФЗ > судебная практика.\n\n"
-            f"### Контекст:\n{context_text}\n\n"
-            f"### Веб-поиск:\n{web_results}\n\n"
-            f"### Дополнительные обновления:\n{extra}\n\n"
-            "--- Основной ответ ---\n"
-            "Краткий вывод: [какой документ нужен, где взять образец, как подать]\n"
-            "Нормативное обоснование: [статьи ЖК РФ, ПП РФ, ФЗ]\n"
-            "Пошаговая инструкция:\n"
-            "- Какие сведения должны быть в документе? (реквизиты, описание, требования — ПП РФ №354, Приложения)\n"
-            "- Как правильно оформить? (подпись, печать, приложения — ЖК РФ, ст.162)\n"
-            "- Куда и как подать? (лично, почтой, через ГИС ЖКХ — ФЗ №59-ФЗ, ст.12)\n"
-            "- Сроки рассмотрения? (10 дней на информацию, 30 дней на претензии — ФЗ №59-ФЗ, ст.12)\n"
-            "- Что делать при отказе или отсутствии ответа? (жалоба в ГЖИ, суд — ЖК РФ, ст.20)\n\n"
-            "Судебная практика:\n"
-            "- Определение ВС РФ №XXX-ЭСXX-XXXX — краткая позиция суда\n"
-            "Если судебных решений нет: 'Судебная практика по данному вопросу в базе отсутствует'.\n\n"
-            "Ключевые нормативные акты:\n"
-            "- ЖК РФ (ст.45 — уведомления, ст.162 — претензии)\n"
-            "- ПП РФ №354 (п.98-99 — акты, заявки; Приложения — формы документов)\n"
-            "- ПП РФ №491 (п.10 — акты по общему имуществу)\n"
-            "- ФЗ №59-ФЗ «О порядке рассмотрения обращений граждан»\n"
-            "- ФЗ №294-ФЗ «О защите прав при госконтроле»\n"
-        )
-    
-        # --- Блок расчёта пени ---
-        if should_calculate_penalty:
-            system_prompt += (
-                "\n**Расчёт пени (если упомянут):**\n"
-                "- Формула: Пени = Сумма долга × Дни просрочки × (Ключевая ставка ЦБ РФ / 300 / 100)\n"
-                "- Основание: [ЖК РФ, ст.155.1], [ФЗ №44-ФЗ], [ПП РФ №329]\n"
-                "- Ограничение: не более 9.5% годовых до 2027 года\n"
-                "- Пример: 10 000 руб., просрочка 30 дней → 95 руб.\n"
-                "- Начало начисления: с 31-го дня после окончания срока оплаты\n"
-            )
-    
-        system_prompt += f"{self.get_role_instruction(role)}"
-    
-        # --- Формат для QVikhr / LLaMA ---
-        prompt_formatted = (
-            "<|begin_of_text|><|start_header_id|>system<|end_header_id|>\n"
-            f"{system_prompt}<|eot_id|>"
-        )
-    
-        return prompt_formatted
 
 class NPBAgent(RAGAgent):
+    OFFICIAL_DOMAINS = RAGAgent.OFFICIAL_DOMAINS | {"roscomnadzor.ru", "vsrf.ru", "gjirf.ru"}
+    GOV_SUFFIXES = (".gov.ru", ".gkh.ru", ".pravo.gov.ru", ".vsrf.ru")
+    SEARCH_QUERY_TEMPLATES = (
+        "{q} официальный текст",
+        "{q} последняя редакция 2025",
+        "{q} pravo.gov.ru",
+        "{q} консультантплюс гарант",
+        "{q} вступил в силу когда",
+    )
+
     def __init__(self):
         # Расширенный и структурированный словарь с синонимами и контекстами
-        self.term_map = self._build_term_map()
-        keywords = self._flatten_term_map(self.term_map)
+        self.term_map, keywords = self._shared_term_map()
         
         super().__init__("Нормативно-Правовая База", keywords)
 
@@ -9777,197 +6250,75 @@ class NPBAgent(RAGAgent):
             },
         }
 
-    def _flatten_term_map(self, term_map: Dict) -> List[str]:
-        """Преобразует структурированный словарь в плоский список уникальных ключевых слов."""
-        keywords = set()
-        for term, data in term_map.items():
-            keywords.add(term.lower())  # оригинальный ключ
-            for synonym in data.get("synonyms", []):
-                keywords.add(synonym.lower())
-            # Добавляем ключи из контекстов
-            contexts = data.get("contexts", [])
-            if isinstance(contexts, dict):
-                for ctx_key in contexts.keys():
-                    keywords.add(ctx_key.lower())
-            elif isinstance(contexts, list):
-                for ctx in contexts:
-                    keywords.add(ctx.lower())
-        return list(keywords)
-
-    def _perform_web_search(self, query: str, max_results: int = 3) -> str:
-        """
-        Улучшенный веб-поиск: приоритет официальным источникам, фильтрация, ранжирование.
-        Выполняется ВНУТРИ _build_prompt, как в оригинальной архитектуре.
-        """
-        OFFICIAL_DOMAINS = {
-            "cbr.ru", "government.ru", "kremlin.ru", "rosstat.gov.ru", "minfin.gov.ru",
-            "fas.gov.ru", "gji.ru", "rospotrebnadzor.ru", "rosreestr.gov.ru",
-            "minstroyrf.ru", "fgis-tarif.ru", "consultant.ru", "garant.ru",
-            "pravo.gov.ru", "gkh.ru", "roscomnadzor.ru", "vsrf.ru", "gjirf.ru"
-        }
-
-        BLACKLISTED_DOMAINS = {
-            "otvet.mail.ru", "ask.fm", "irecommend.ru", "pikabu.ru",
-            "zen.yandex.ru", "thequestion.ru", "quora.com", "reddit.com",
-            "fishki.net", "yaplakal.com", "blog", "forum"
-        }
-
-        # Генерируем расширенные поисковые запросы
-        expanded_queries = self._expand_search_query(query)
-        all_results = []
-
-        for attempt in range(2):
-            try:
-                with DDGS(timeout=10) as ddgs:
-                    for q in expanded_queries:
-                        results = ddgs.text(q, max_results=5)
-                        for r in results:
-                            href = r.get('href', '')
-                            if not href:
-                                continue
-                            
-                            try:
-                                domain = href.split('/')[2].lower()
-                            except IndexError:
-                                continue
-
-                            if any(bad in domain for bad in BLACKLISTED_DOMAINS):
-                                continue
-
-                            weight = 3 if any(official in domain for official in OFFICIAL_DOMAINS) else \
-                                     2 if any(gov in domain for gov in [".gov.ru", ".gkh.ru", ".pravo.gov.ru", ".vsrf.ru"]) else 1
-
-                            snippet = {
-                                "body": r['body'],
-                                "href": href,
-                                "title": r.get('title', ''),
-                                "weight": weight
-                            }
-                            all_results.append(snippet)
-
-                    all_results = sorted(all_results, key=lambda x: x['weight'], reverse=True)
-                    seen_bodies = set()
-                    unique_results = []
-                    for r in all_results:
-                        body_hash = hash(r['body'][:100])
-                        if body_hash not in seen_bodies:
-                            seen_bodies.add(body_hash)
-                            unique_results.append(r)
-                            if len(unique_results) >= max_results:
-                                break
-
-                    if unique_results:
-                        formatted = []
-                        for r in unique_results:
-                            prefix = "[ОФИЦИАЛЬНЫЙ ИСТОЧНИК] " if r['weight'] >= 2 else ""
-                            formatted.append(f"{prefix}• {r['body']}\n  Источник: {r['href']}\n")
-                        return "\n".join(formatted).strip()
-                    else:
-                        return "По вашему запросу ничего не найдено в надёжных источниках."
-
-            except Exception as e:
-                if attempt == 0:
-                    time.sleep(2)
-                    continue
-                return f"Ошибка веб-поиска: {str(e)}"
-
-        return "Не удалось выполнить веб-поиск. Попробуйте позже."
+    # Агент: Нормативно-Правовая База
+    # Формирует промт:
+    # - Фокус: поиск и актуализация нормативно-правовых актов ЖКХ
+    # - Строгая структура, ссылки на официальные источники, взаимосвязи, судебная практика
+    PROMPT_TEMPLATE = (
+        "Ты — экспертный ИИ-ассистент по нормативно-правовой базе в ЖКХ.\n"
+        "Отвечай строго по официальным источникам и предоставленному контексту.\n\n"
+        "**ЖЕСТКИЕ ПРАВИЛА:**\n"
+        "1. Если информации нет — отвечай: 'Недостаточно данных для точного ответа.'\n"
+        "2. Обязательно указывай ссылки на нормативные акты.\n"
+        "3. Структура: краткий вывод → ключевые положения → актуальность → практическое применение → взаимосвязи → судебная практика.\n"
+        "4. Формулы пени включай только при упоминании пени.\n"
+        "5. Приоритет: официальные источники (pravo.gov.ru, consultant.ru, garant.ru) > судебная практика.\n\n"
+        "### Контекст:\n"
+        "{context_text}\n\n"
+        "### Веб-поиск:\n"
+        "{web_results}\n\n"
+        "### Дополнительные обновления:\n"
+        "{extra}\n\n"
+        "--- Основной ответ ---\n"
+        "Краткий вывод: [где найти текст, последняя редакция, основные положения]\n"
+        "Полный текст / Ключевые положения: [статьи, пункты, ссылки на официальные источники]\n"
+        "Актуальность и вступление в силу:\n"
+        "- Дата последней редакции: [Указать]\n"
+        "- Дата вступления в силу: [Указать]\n"
+        "- Проверка актуальности: [pravo.gov.ru, consultant.ru, garant.ru]\n"
+        "Практическое применение:\n"
+        "- Как применяется (примеры, типовые ситуации)\n"
+        "- Какие документы регулирует (квитанции, акты, договоры)\n"
+        "- Контролирующие органы (ГЖИ, Роспотребнадзор, ФАС)\n"
+        "Взаимосвязи с другими актами:\n"
+        "- Дополняющие или изменяющие акты\n"
+        "- Акты, утрачивающие силу\n"
+        "- Подзаконные акты, принятые на основе данного документа\n"
+        "Судебная практика:\n"
+        "- Определение ВС РФ №XXX-ЭСXX-XXXX — краткая позиция суда\n"
+        "Если судебных решений нет: 'Судебная практика по данному вопросу в базе отсутствует'.\n"
+        "Ключевые нормативные акты:\n"
+        "- ЖК РФ (ст.154-162 — плата, перерасчёты, ответственность)\n"
+        "- ПП РФ №354 (акты, формы, порядок расчётов)\n"
+        "- ПП РФ №491 (содержание общего имущества)\n"
+        "- СанПиН 1.2.3685-21 (санитарные нормы)\n"
+        "- ФЗ №59-ФЗ, ФЗ №294-ФЗ (порядок обращений, госконтроль)\n"
+        "{penalty_block}{role_instruction}"
+    )
+    PENALTY_BLOCK = (
+        "\n**Расчёт пени (если упомянут):**\n"
+        "- Формула: Пени = Сумма долга × Дни просрочки × (Ключевая ставка ЦБ РФ / 300 / 100)\n"
+        "- Основание: [ЖК РФ, ст.155.1], [ФЗ №44-ФЗ], [ПП РФ №329]\n"
+        "- Ограничение: не более 9.5% годовых до 2027 года\n"
+        "- Пример: 10 000 руб., просрочка 30 дней → 95 руб.\n"
+        "- Начало начисления: с 31-го дня после окончания срока оплаты\n"
+    )
 
-    def _expand_search_query(self, query: str) -> List[str]:
-        """Генерирует несколько вариантов поискового запроса для лучшего покрытия темы."""
-        queries = [query]
-        queries.append(f"{query} официальный текст")
-        queries.append(f"{query} последняя редакция 2025")
-        queries.append(f"{query} pravo.gov.ru")
-        queries.append(f"{query} консультантплюс гарант")
-        queries.append(f"{query} вступил в силу когда")
-        # Добавляем синонимы
-        for term, data in self.term_map.items():
-            if term in query.lower() or any(syn in query.lower() for syn in data.get("synonyms", [])):
-                for synonym in data.get("synonyms", [])[:2]:
-                    new_q = query.replace(term, synonym) if term in query else query + " " + synonym
-                    queries.append(new_q)
-        return list(set(queries))
-
-    def _build_prompt(self, summary: str, context_text: str, role: str = "смешанная") -> str:
-        """
-        Агент: Нормативно-Правовая База
-        Формирует промт:
-        - Фокус: поиск и актуализация нормативно-правовых актов ЖКХ
-        - Строгая структура, ссылки на официальные источники, взаимосвязи, судебная практика
-        """
-        extra = self.improve_prompt_from_feedback()
-        web_results = self._perform_web_search(summary)
-    
-        # Проверка на запрос о пени
-        penalty_keywords = ["пени", "неустойка", "штраф за просрочку", "ставка цб", "9.5%", "ключевая ставка"]
-        should_calculate_penalty = any(kw in summary.lower() for kw in penalty_keywords)
-    
-        # --- SYSTEM PROMPT ---
-        system_prompt = (
-            "Ты — экспертный ИИ-ассистент по нормативно-правовой базе в ЖКХ.\n"
-            "Отвечай строго по официальным источникам и предоставленному контексту.\n\n"
-            "**ЖЕСТКИЕ ПРАВИЛА:**\n"
-            "1. Если информации нет — отвечай: 'Недостаточно данных для точного ответа.'\n"
-            "2. Обязательно указывай ссылки на нормативные акты.\n"
-            "3. Структура: краткий вывод → ключевые положения → актуальность → практическое применение → взаимосвязи → судебная практика.\n"
-            "4. Формулы пени включай только при упоминании пени.\n"
-            "5. Приоритет: официальные источники (pravo.gov.ru, consultant.ru, garant.ru) > судебная практика.\n\n"
-            f"### Контекст:\n{context_text}\n\n"
-            f"### Веб-поиск:\n{web_results}\n\n"
-            f"### Дополнительные обновления:\n{extra}\n\n"
-            "--- Основной ответ ---\n"
-            "Краткий вывод: [где найти текст, последняя редакция, основные положения]\n"
-            "Полный текст / Ключевые положения: [статьи, пункты, ссылки на официальные источники]\n"
-            "Актуальность и вступление в силу:\n"
-            "- Дата последней редакции: [Указать]\n"
-            "- Дата вступления в силу: [Указать]\n"
-            "- Проверка актуальности: [pravo.gov.ru, consultant.ru, garant.ru]\n"
-            "Практическое применение:\n"
-            "- Как применяется (примеры, типовые ситуации)\n"
-            "- Какие документы регулирует (квитанции, акты, договоры)\n"
-            "- Контролирующие органы (ГЖИ, Роспотребнадзор, ФАС)\n"
-            "Взаимосвязи с другими актами:\n"
-            "- Дополняющие или изменяющие акты\n"
-            "- Акты, утрачивающие силу\n"
-            "- Подзаконные акты, принятые на основе данного документа\n"
-            "Судебная практика:\n"
-            "- Определение ВС РФ №XXX-ЭСXX-XXXX — краткая позиция суда\n"
-            "Если судебных решений нет: 'Судебная практика по данному вопросу в базе отсутствует'.\n"
-            "Ключевые нормативные акты:\n"
-            "- ЖК РФ (ст.154-162 — плата, перерасчёты, ответственность)\n"
-            "- ПП РФ №354 (акты, формы, порядок расчётов)\n"
-            "- ПП РФ №491 (содержание общего имущества)\n"
-            "- СанПиН 1.2.3685-21 (санитарные нормы)\n"
-            "- ФЗ №59-ФЗ, ФЗ №294-ФЗ (порядок обращений, госконтроль)\n"
-        )
-    
-        # --- Блок расчёта пени ---
-        if should_calculate_penalty:
-            system_prompt += (
-                "\n**Расчёт пени (если упомянут):**\n"
-                "- Формула: Пени = Сумма долга × Дни просрочки × (Ключевая ставка ЦБ РФ / 300 / 100)\n"
-                "- Основание: [ЖК РФ, ст.155.1], [ФЗ №44-ФЗ], [ПП РФ №329]\n"
-                "- Ограничение: не более 9.5% годовых до 2027 года\n"
-                "- Пример: 10 000 руб., просрочка 30 дней → 95 руб.\n"
-                "- Начало начисления: с 31-го дня после окончания срока оплаты\n"
-            )
-    
-        system_prompt += f"{self.get_role_instruction(role)}"
-    
-        # --- Формат для QVikhr / LLaMA ---
-        prompt_formatted = (
-            "<|begin_of_text|><|start_header_id|>system<|end_header_id|>\n"
-            f"{system_prompt}<|eot_id|>"
-        )
-    
-        return prompt_formatted
 
 class IPUODPUAgent(RAGAgent):
+    OFFICIAL_DOMAINS = RAGAgent.OFFICIAL_DOMAINS | {"roscomnadzor.ru", "rostec.ru", "vsrf.ru"}
+    GOV_SUFFIXES = (".gov.ru", ".gkh.ru", ".pravo.gov.ru", ".vsrf.ru")
+    SEARCH_QUERY_TEMPLATES = (
+        "{q} ФЗ 261-ФЗ приборы учета",
+        "{q} ПП РФ 354 п 81 поверка счетчиков",
+        "{q} судебная практика по отказу в опломбировке счетчика",
+        "{q} межповерочный интервал для счетчиков воды",
+        "{q} техническая невозможность установки ИПУ образец акта",
+    )
+
     def __init__(self):
         # Расширенный и структурированный словарь с синонимами и контекстами
-        self.term_map = self._build_term_map()
-        keywords = self._flatten_term_map(self.term_map)
+        self.term_map, keywords = self._shared_term_map()
         
         super().__init__("Приборы Учета (ИПУ/ОДПУ)", keywords)
 
@@ -10051,187 +6402,74 @@ class IPUODPUAgent(RAGAgent):
             },
         }
 
-    def _flatten_term_map(self, term_map: Dict) -> List[str]:
-        """Преобразует структурированный словарь в плоский список уникальных ключевых слов."""
-        keywords = set()
-        for term, data in term_map.items():
-            keywords.add(term.lower())  # оригинальный ключ
-            for synonym in data.get("synonyms", []):
-                keywords.add(synonym.lower())
-            # Добавляем ключи из контекстов
-            contexts = data.get("contexts", [])
-            if isinstance(contexts, dict):
-                for ctx_key in contexts.keys():
-                    keywords.add(ctx_key.lower())
-            elif isinstance(contexts, list):
-                for ctx in contexts:
-                    keywords.add(ctx.lower())
-        return list(keywords)
-
-    def _perform_web_search(self, query: str, max_results: int = 3) -> str:
-        """
-        Улучшенный веб-поиск: приоритет официальным источникам, фильтрация, ранжирование.
-        Выполняется ВНУТРИ _build_prompt, как в оригинальной архитектуре.
-        """
-        OFFICIAL_DOMAINS = {
-            "cbr.ru", "government.ru", "kremlin.ru", "rosstat.gov.ru", "minfin.gov.ru",
-            "fas.gov.ru", "gji.ru", "rospotrebnadzor.ru", "rosreestr.gov.ru",
-            "minstroyrf.ru", "fgis-tarif.ru", "consultant.ru", "garant.ru",
-            "pravo.gov.ru", "gkh.ru", "roscomnadzor.ru", "rostec.ru", "vsrf.ru"
-        }
-
-        BLACKLISTED_DOMAINS = {
-            "otvet.mail.ru", "ask.fm", "irecommend.ru", "pikabu.ru",
-            "zen.yandex.ru", "thequestion.ru", "quora.com", "reddit.com",
-            "fishki.net", "yaplakal.com", "blog", "forum"
-        }
-
-        # Генерируем расширенные поисковые запросы
-        expanded_queries = self._expand_search_query(query)
-        all_results = []
-
-        for attempt in range(2):
-            try:
-                with DDGS(timeout=10) as ddgs:
-                    for q in expanded_queries:
-                        results = ddgs.text(q, max_results=5)
-                        for r in results:
-                            href = r.get('href', '')
-                            if not href:
-                                continue
-                            
-                            try:
-                                domain = href.split('/')[2].lower()
-                            except IndexError:
-                                continue
-
-                            if any(bad in domain for bad in BLACKLISTED_DOMAINS):
-                                continue
-
-                            weight = 3 if any(official in domain for official in OFFICIAL_DOMAINS) else \
-                                     2 if any(gov in domain for gov in [".gov.ru", ".gkh.ru", ".pravo.gov.ru", ".vsrf.ru"]) else 1
-
-                            snippet = {
-                                "body": r['body'],
-                                "href": href,
-                                "title": r.get('title', ''),
-                                "weight": weight
-                            }
-                            all_results.append(snippet)
-
-                    all_results = sorted(all_results, key=lambda x: x['weight'], reverse=True)
-                    seen_bodies = set()
-                    unique_results = []
-                    for r in all_results:
-                        body_hash = hash(r['body'][:100])
-                        if body_hash not in seen_bodies:
-                            seen_bodies.add(body_hash)
-                            unique_results.append(r)
-                            if len(unique_results) >= max_results:
-                                break
-
-                    if unique_results:
-                        formatted = []
-                        for r in unique_results:
-                            prefix = "[ОФИЦИАЛЬНЫЙ ИСТОЧНИК] " if r['weight'] >= 2 else ""
-                            formatted.append(f"{prefix}• {r['body']}\n  Источник: {r['href']}\n")
-                        return "\n".join(formatted).strip()
-                    else:
-                        return "По вашему запросу ничего не найдено в надёжных источниках."
-
-            except Exception as e:
-                if attempt == 0:
-                    time.sleep(2)
-                    continue
-                return f"Ошибка веб-поиска: {str(e)}"
-
-        return "Не удалось выполнить веб-поиск. Попробуйте позже."
+    # Агент: Приборы учёта (ИПУ/ОДПУ)
+    # Формирует промт:
+    # - Фокус: установка, поверка, передача показаний, техническая невозможность
+    # - Строгая структура, ссылки на нормативные акты, судебная практика
+    # Промт передаётся модели как есть, без служебных токенов Saiga/LLaMA-3
+    WRAP_SYSTEM_PROMPT = False
+    PROMPT_TEMPLATE = (
+        "Ты — экспертный ИИ-ассистент по приборам учёта (ИПУ/ОДПУ) в ЖКХ.\n"
+        "Отвечай строго по официальным источникам и предоставленному контексту.\n\n"
+        "**ЖЕСТКИЕ ПРАВИЛА:**\n"
+        "1. НИКАКИХ ГАЛЛЮЦИНАЦИЙ: если информации нет — ответь: 'Недостаточно данных для точного ответа.'\n"
+        "2. ОБЯЗАТЕЛЬНО указывай ссылки на нормативные акты.\n"
+        "3. СТРУКТУРА: краткий вывод → нормативное обоснование → пошаговая инструкция → судебная практика.\n"
+        "4. ФОРМУЛЫ ТОЛЬКО ПРИ ЗАПРОСЕ о пени.\n"
+        "5. Приоритет: ФЗ №261-ФЗ > ПП РФ №354 > ФЗ №102-ФЗ > судебная практика.\n\n"
+        "### Контекст:\n"
+        "{context_text}\n\n"
+        "### Веб-поиск:\n"
+        "{web_results}\n\n"
+        "### Дополнительные обновления:\n"
+        "{extra}\n\n"
+        "--- Основной ответ ---\n"
+        "Краткий вывод: [что делать, кто отвечает, законность требований]\n"
+        "Нормативное обоснование: [статьи ФЗ №261-ФЗ, ПП РФ №354, ФЗ №102-ФЗ]\n"
+        "Пошаговая инструкция:\n"
+        "- Обязаны ли устанавливать ИПУ/ОДПУ? (ФЗ №261-ФЗ, ст.13)\n"
+        "- Порядок установки, замены, опломбировки (ПП РФ №354, п.31)\n"
+        "- Порядок поверки, межповерочные интервалы (ПП РФ №354, п.81; ФЗ №102-ФЗ)\n"
+        "- Передача показаний (ПП РФ №354, п.31(1))\n"
+        "- Действия при отказе или технической невозможности (ПП РФ №354, п.85)\n"
+        "Судебная практика:\n"
+        "- Определение ВС РФ №XXX-ЭСXX-XXXX — краткая позиция суда\n"
+        "Если судебных решений нет: 'Судебная практика по данному вопросу в базе отсутствует'.\n"
+        "Ключевые нормативные акты:\n"
+        "- ФЗ №261-ФЗ (ст.13 — установка ИПУ)\n"
+        "- ПП РФ №354 (п.31, 81, 85 — установка, поверка, техническая невозможность)\n"
+        "- ФЗ №102-ФЗ (поверка, межповерочные интервалы)\n"
+        "- ПП РФ №491 (если ОДПУ касается общего имущества)\n"
+        "{penalty_block}{role_instruction}"
+    )
+    PENALTY_BLOCK = (
+        "\n**Расчёт пени (если упомянут):**\n"
+        "- Формула: Пени = Сумма долга × Дни просрочки × (Ключевая ставка ЦБ РФ / 300 / 100)\n"
+        "- Основание: [ЖК РФ, ст.155.1], [ФЗ №44-ФЗ], [ПП РФ №329]\n"
+        "- Ограничение: не более 9.5% годовых до 2027 года\n"
+        "- Пример: 10 000 руб., просрочка 30 дней → 95 руб.\n"
+        "- Начало начисления: с 31-го дня после окончания срока оплаты\n"
+    )
 
-    def _expand_search_query(self, query: str) -> List[str]:
-        """Генерирует несколько вариантов поискового запроса для лучшего покрытия темы."""
-        queries = [query]
-        queries.append(f"{query} ФЗ 261-ФЗ приборы учета")
-        queries.append(f"{query} ПП РФ 354 п 81 поверка счетчиков")
-        queries.append(f"{query} судебная практика по отказу в опломбировке счетчика")
-        queries.append(f"{query} межповерочный интервал для счетчиков воды")
-        queries.append(f"{query} техническая невозможность установки ИПУ образец акта")
-        # Добавляем синонимы
-        for term, data in self.term_map.items():
-            if term in query.lower() or any(syn in query.lower() for syn in data.get("synonyms", [])):
-                for synonym in data.get("synonyms", [])[:2]:
-                    new_q = query.replace(term, synonym) if term in query else query + " " + synonym
-                    queries.append(new_q)
-        return list(set(queries))
-
-    def _build_prompt(self, summary: str, context_text: str, role: str = "смешанная") -> str:
-        """
-        Агент: Приборы учёта (ИПУ/ОДПУ)
-        Формирует промт:
-        - Фокус: установка, поверка, передача показаний, техническая невозможность
-        - Строгая структура, ссылки на нормативные акты, судебная практика
-        """
-        extra = self.improve_prompt_from_feedback()
-        web_results = self._perform_web_search(summary)
-    
-        # Проверка на запрос о пени
-        penalty_keywords = ["пени", "неустойка", "штраф за просрочку", "ставка цб", "9.5%", "ключевая ставка"]
-        should_calculate_penalty = any(kw in summary.lower() for kw in penalty_keywords)
-    
-        # --- SYSTEM PROMPT ---
-        system_prompt = (
-            "Ты — экспертный ИИ-ассистент по приборам учёта (ИПУ/ОДПУ) в ЖКХ.\n"
-            "Отвечай строго по официальным источникам и предоставленному контексту.\n\n"
-            "**ЖЕСТКИЕ ПРАВИЛА:**\n"
-            "1. НИКАКИХ ГАЛЛЮЦИНАЦИЙ: если информации нет — ответь: 'Недостаточно данных для точного ответа.'\n"
-            "2. ОБЯЗАТЕЛЬНО указывай ссылки на нормативные акты.\n"
-            "3. СТРУКТУРА: краткий вывод → нормативное обоснование → пошаговая инструкция → судебная практика.\n"
-            "4. ФОРМУЛЫ ТОЛЬКО ПРИ ЗАПРОСЕ о пени.\n"
-            "5. Приоритет: ФЗ №261-ФЗ > ПП РФ №354 > ФЗ №102-ФЗ > судебная практика.\n\n"
-            f"### Контекст:\n{context_text}\n\n"
-            f"### Веб-поиск:\n{web_results}\n\n"
-            f"### Дополнительные обновления:\n{extra}\n\n"
-            "--- Основной ответ ---\n"
-            "Краткий вывод: [что делать, кто отвечает, законность требований]\n"
-            "Нормативное обоснование: [статьи ФЗ №261-ФЗ, ПП РФ №354, ФЗ №102-ФЗ]\n"
-            "Пошаговая инструкция:\n"
-            "- Обязаны ли устанавливать ИПУ/ОДПУ? (ФЗ №261-ФЗ, ст.13)\n"
-            "- Порядок установки, замены, опломбировки (ПП РФ №354, п.31)\n"
-            "- Порядок поверки, межповерочные интервалы (ПП РФ №354, п.81; ФЗ №102-ФЗ)\n"
-            "- Передача показаний (ПП РФ №354, п.31(1))\n"
-            "- Действия при отказе или технической невозможности (ПП РФ №354, п.85)\n"
-            "Судебная практика:\n"
-            "- Определение ВС РФ №XXX-ЭСXX-XXXX — краткая позиция суда\n"
-            "Если судебных решений нет: 'Судебная практика по данному вопросу в базе отсутствует'.\n"
-            "Ключевые нормативные акты:\n"
-            "- ФЗ №261-ФЗ (ст.13 — установка ИПУ)\n"
-            "- ПП РФ №354 (п.31, 81, 85 — установка, поверка, техническая невозможность)\n"
-            "- ФЗ №102-ФЗ (поверка, межповерочные интервалы)\n"
-            "- ПП РФ №491 (если ОДПУ касается общего имущества)\n"
-        )
-    
-        # --- Блок расчёта пени ---
-        if should_calculate_penalty:
-            system_prompt += (
-                "\n**Расчёт пени (если упомянут):**\n"
-                "- Формула: Пени = Сумма долга × Дни просрочки × (Ключевая ставка ЦБ РФ / 300 / 100)\n"
-                "- Основание: [ЖК РФ, ст.155.1], [ФЗ №44-ФЗ], [ПП РФ №329]\n"
-                "- Ограничение: не более 9.5% годовых до 2027 года\n"
-                "- Пример: 10 000 руб., просрочка 30 дней → 95 руб.\n"
-                "- Начало начисления: с 31-го дня после окончания срока оплаты\n"
-            )
-    
-        system_prompt += f"{self.get_role_instruction(role)}"
-    
-        # --- Формат для LLaMA / QVikhr ---
-        prompt_formatted = f"{system_prompt}"
-    
-        return prompt_formatted
 
 class GISGKHAgent(RAGAgent):
+    OFFICIAL_DOMAINS = frozenset({
+        "gosuslugi.ru", "dom.gosuslugi.ru", "minstroyrf.ru", "minцифры.рф", "government.ru",
+        "gji.ru", "rosreestr.gov.ru", "fgis-tarif.ru", "consultant.ru", "garant.ru",
+        "pravo.gov.ru", "gkh.ru", "roscomnadzor.ru", "vsrf.ru", "fias.nalog.ru"
+    })
+    GOV_SUFFIXES = (".gov.ru", ".gkh.ru", ".pravo.gov.ru")
+    SEARCH_QUERY_TEMPLATES = (
+        "{q} ГИС ЖКХ официальный портал",
+        "{q} госуслуги инструкция как сделать",
+        "{q} ФЗ 210-ФЗ электронные услуги",
+        "{q} ПП РФ 1131 ГИС ЖКХ порядок",
+        "{q} судебная практика по жалобам через госуслуги",
+    )
+
     def __init__(self):
         # Строим семантическую карту терминов
-        self.term_map = self._build_term_map()
-        keywords = self._flatten_term_map(self.term_map)
+        self.term_map, keywords = self._shared_term_map()
         
         super().__init__("Госуслуги и ГИС ЖКХ", keywords)
 
@@ -10315,188 +6553,76 @@ class GISGKHAgent(RAGAgent):
             },
         }
 
-    def _flatten_term_map(self, term_map: Dict) -> List[str]:
-        """Преобразует структурированный словарь в плоский список уникальных ключевых слов."""
-        keywords = set()
-        for term, data in term_map.items():
-            keywords.add(term.lower())  # оригинальный ключ
-            for synonym in data.get("synonyms", []):
-                keywords.add(synonym.lower())
-            # Добавляем ключи из контекстов
-            contexts = data.get("contexts", [])
-            if isinstance(contexts, dict):
-                for ctx_key in contexts.keys():
-                    keywords.add(ctx_key.lower())
-            elif isinstance(contexts, list):
-                for ctx in contexts:
-                    keywords.add(ctx.lower())
-        return list(keywords)
-
-    def _perform_web_search(self, query: str, max_results: int = 3) -> str:
-        """
-        Улучшенный веб-поиск: приоритет официальным источникам, фильтрация, ранжирование.
-        Выполняется ВНУТРИ _build_prompt, как в оригинальной архитектуре.
-        """
-        OFFICIAL_DOMAINS = {
-            "gosuslugi.ru", "dom.gosuslugi.ru", "minstroyrf.ru", "minцифры.рф", "government.ru",
-            "gji.ru", "rosreestr.gov.ru", "fgis-tarif.ru", "consultant.ru", "garant.ru",
-            "pravo.gov.ru", "gkh.ru", "roscomnadzor.ru", "vsrf.ru", "fias.nalog.ru"
-        }
-
-        BLACKLISTED_DOMAINS = {
-            "otvet.mail.ru", "ask.fm", "irecommend.ru", "pikabu.ru",
-            "zen.yandex.ru", "thequestion.ru", "quora.com", "reddit.com",
-            "fishki.net", "yaplakal.com", "blog", "forum"
-        }
-
-        # Генерируем расширенные поисковые запросы
-        expanded_queries = self._expand_search_query(query)
-        all_results = []
-
-        for attempt in range(2):
-            try:
-                with DDGS(timeout=10) as ddgs:
-                    for q in expanded_queries:
-                        results = ddgs.text(q, max_results=5)
-                        for r in results:
-                            href = r.get('href', '')
-                            if not href:
-                                continue
-                            
-                            try:
-                                domain = href.split('/')[2].lower()
-                            except IndexError:
-                                continue
-
-                            if any(bad in domain for bad in BLACKLISTED_DOMAINS):
-                                continue
-
-                            weight = 3 if any(official in domain for official in OFFICIAL_DOMAINS) else \
-                                     2 if any(gov in domain for gov in [".gov.ru", ".gkh.ru", ".pravo.gov.ru"]) else 1
-
-                            snippet = {
-                                "body": r['body'],
-                                "href": href,
-                                "title": r.get('title', ''),
-                                "weight": weight
-                            }
-                            all_results.append(snippet)
-
-                    all_results = sorted(all_results, key=lambda x: x['weight'], reverse=True)
-                    seen_bodies = set()
-                    unique_results = []
-                    for r in all_results:
-                        body_hash = hash(r['body'][:100])
-                        if body_hash not in seen_bodies:
-                            seen_bodies.add(body_hash)
-                            unique_results.append(r)
-                            if len(unique_results) >= max_results:
-                                break
-
-                    if unique_results:
-                        formatted = []
-                        for r in unique_results:
-                            prefix = "[ОФИЦИАЛЬНЫЙ ИСТОЧНИК] " if r['weight'] >= 2 else ""
-                            formatted.append(f"{prefix}• {r['body']}\n  Источник: {r['href']}\n")
-                        return "\n".join(formatted).strip()
-                    else:
-                        return "По вашему запросу ничего не найдено в надёжных источниках."
-
-            except Exception as e:
-                if attempt == 0:
-                    time.sleep(2)
-                    continue
-                return f"Ошибка веб-поиска: {str(e)}"
-
-        return "Не удалось выполнить веб-поиск. Попробуйте позже."
+    # Агент: Госуслуги и ГИС ЖКХ
+    # Формирует промт:
+    # - Фокус: цифровые сервисы ЖКХ — портал Госуслуг, ГИС ЖКХ, регистрация, документы, ошибки
+    # - Строгая структура, ссылки на нормативные акты, судебная практика
+    # Промт передаётся модели как есть, без служебных токенов Saiga/LLaMA-3
+    WRAP_SYSTEM_PROMPT = False
+    PROMPT_TEMPLATE = (
+        "Ты — экспертный ИИ-ассистент по цифровым сервисам ЖКХ: портал Госуслуг и ГИС ЖКХ.\n"
+        "Отвечай строго по официальным источникам и предоставленному контексту.\n\n"
+        "**ЖЕСТКИЕ ПРАВИЛА:**\n"
+        "1. НИКАКИХ ГАЛЛЮЦИНАЦИЙ: если информации нет — ответь: 'Недостаточно данных для точного ответа.'\n"
+        "2. ОБЯЗАТЕЛЬНО указывай ссылки на нормативные акты.\n"
+        "3. СТРУКТУРА: краткий вывод → нормативное обоснование → пошаговая инструкция → судебная практика.\n"
+        "4. ФОРМУЛЫ ТОЛЬКО ПРИ ЗАПРОСЕ о пени.\n"
+        "5. Приоритет: ФЗ №210-ФЗ > ПП РФ №1131 > ФЗ №63-ФЗ > ПП РФ №354 > судебная практика.\n\n"
+        "### Контекст:\n"
+        "{context_text}\n\n"
+        "### Веб-поиск:\n"
+        "{web_results}\n\n"
+        "### Дополнительные обновления:\n"
+        "{extra}\n\n"
+        "--- Основной ответ ---\n"
+        "Краткий вывод: [что делать, где найти, законно ли требование, время выполнения]\n"
+        "Нормативное обоснование: [ФЗ №210-ФЗ, ПП РФ №1131, ФЗ №63-ФЗ, ПП РФ №354]\n"
+        "Пошаговая инструкция:\n"
+        "- Регистрация на портале Госуслуг / ГИС ЖКХ (ФЗ №210-ФЗ, ст.6)\n"
+        "- Поиск нужного сервиса и раздела\n"
+        "- Подготовка документов и данных (паспорт, СНИЛС, лицевой счёт, ЭЦП)\n"
+        "- Пошаговое использование интерфейса\n"
+        "- Действия при ошибках или отказах (техподдержка, жалоба, ГЖИ)\n"
+        "Судебная практика:\n"
+        "- Определение ВС РФ №XXX-ЭСXX-XXXX — краткая позиция суда\n"
+        "Если судебных решений нет: 'Судебная практика по данному вопросу в базе отсутствует'.\n"
+        "Ключевые нормативные акты:\n"
+        "- ФЗ №210-ФЗ «Об организации предоставления государственных и муниципальных услуг»\n"
+        "- ПП РФ №1131 «Об утверждении Правил функционирования ГИС ЖКХ»\n"
+        "- ФЗ №63-ФЗ «Об электронной подписи»\n"
+        "- ПП РФ №354 (если вопрос касается ЖКУ)\n"
+        "- ФЗ №59-ФЗ «О порядке рассмотрения обращений граждан»\n"
+        "{penalty_block}{role_instruction}"
+    )
+    PENALTY_BLOCK = (
+        "\n**Расчёт пени (если упомянут):**\n"
+        "- Формула: Пени = Сумма долга × Дни просрочки × (Ключевая ставка ЦБ РФ / 300 / 100)\n"
+        "- Основание: [ЖК РФ, ст.155.1], [ФЗ №44-ФЗ], [ПП РФ №329]\n"
+        "- Ограничение: не более 9.5% годовых до 2027 года\n"
+        "- Пример: 10 000 руб., просрочка 30 дней → 95 руб.\n"
+        "- Начало начисления: с 31-го дня после окончания срока оплаты\n"
+    )
 
-    def _expand_search_query(self, query: str) -> List[str]:
-        """Генерирует несколько вариантов поискового запроса для лучшего покрытия темы."""
-        queries = [query]
-        queries.append(f"{query} ГИС ЖКХ официальный портал")
-        queries.append(f"{query} госуслуги инструкция как сделать")
-        queries.append(f"{query} ФЗ 210-ФЗ электронные услуги")
-        queries.append(f"{query} ПП РФ 1131 ГИС ЖКХ порядок")
-        queries.append(f"{query} судебная практика по жалобам через госуслуги")
-        
-        # Добавляем синонимы
-        for term, data in self.term_map.items():
-            if term in query.lower() or any(syn in query.lower() for syn in data.get("synonyms", [])):
-                for synonym in data.get("synonyms", [])[:2]:
-                    new_q = query.replace(term, synonym) if term in query else query + " " + synonym
-                    queries.append(new_q)
-        return list(set(queries))
-
-    def _build_prompt(self, summary: str, context_text: str, role: str = "смешанная") -> str:
-        """
-        Агент: Госуслуги и ГИС ЖКХ
-        Формирует промт:
-        - Фокус: цифровые сервисы ЖКХ — портал Госуслуг, ГИС ЖКХ, регистрация, документы, ошибки
-        - Строгая структура, ссылки на нормативные акты, судебная практика
-        """
-        extra = self.improve_prompt_from_feedback()
-        web_results = self._perform_web_search(summary)
-    
-        # Проверка на запрос о пени
-        penalty_keywords = ["пени", "неустойка", "штраф за просрочку", "ставка цб", "9.5%", "ключевая ставка"]
-        should_calculate_penalty = any(kw in summary.lower() for kw in penalty_keywords)
-    
-        # --- SYSTEM PROMPT ---
-        system_prompt = (
-            "Ты — экспертный ИИ-ассистент по цифровым сервисам ЖКХ: портал Госуслуг и ГИС ЖКХ.\n"
-            "Отвечай строго по официальным источникам и предоставленному контексту.\n\n"
-            "**ЖЕСТКИЕ ПРАВИЛА:**\n"
-            "1. НИКАКИХ ГАЛЛЮЦИНАЦИЙ: если информации нет — ответь: 'Недостаточно данных для точного ответа.'\n"
-            "2. ОБЯЗАТЕЛЬНО указывай ссылки на нормативные акты.\n"
-            "3. СТРУКТУРА: краткий вывод → нормативное обоснование → пошаговая инструкция → судебная практика.\n"
-            "4. ФОРМУЛЫ ТОЛЬКО ПРИ ЗАПРОСЕ о пени.\n"
-            "5. Приоритет: ФЗ №210-ФЗ > ПП РФ №1131 > ФЗ №63-ФЗ > ПП РФ №354 > судебная практика.\n\n"
-            f"### Контекст:\n{context_text}\n\n"
-            f"### Веб-поиск:\n{web_results}\n\n"
-            f"### Дополнительные обновления:\n{extra}\n\n"
-            "--- Основной ответ ---\n"
-            "Краткий вывод: [что делать, где найти, законно ли требование, время выполнения]\n"
-            "Нормативное обоснование: [ФЗ №210-ФЗ, ПП РФ №1131, ФЗ №63-ФЗ, ПП РФ №354]\n"
-            "Пошаговая инструкция:\n"
-            "- Регистрация на портале Госуслуг / ГИС ЖКХ (ФЗ №210-ФЗ, ст.6)\n"
-            "- Поиск нужного сервиса и раздела\n"
-            "- Подготовка документов и данных (паспорт, СНИЛС, лицевой счёт, ЭЦП)\n"
-            "- Пошаговое использование интерфейса\n"
-            "- Действия при ошибках или отказах (техподдержка, жалоба, ГЖИ)\n"
-            "Судебная практика:\n"
-            "- Определение ВС РФ №XXX-ЭСXX-XXXX — краткая позиция суда\n"
-            "Если судебных решений нет: 'Судебная практика по данному вопросу в базе отсутствует'.\n"
-            "Ключевые нормативные акты:\n"
-            "- ФЗ №210-ФЗ «Об организации предоставления государственных и муниципальных услуг»\n"
-            "- ПП РФ №1131 «Об утверждении Правил функционирования ГИС ЖКХ»\n"
-            "- ФЗ №63-ФЗ «Об электронной подписи»\n"
-            "- ПП РФ №354 (если вопрос касается ЖКУ)\n"
-            "- ФЗ №59-ФЗ «О порядке рассмотрения обращений граждан»\n"
-        )
-    
-        # --- Блок расчёта пени ---
-        if should_calculate_penalty:
-            system_prompt += (
-                "\n**Расчёт пени (если упомянут):**\n"
-                "- Формула: Пени = Сумма долга × Дни просрочки × (Ключевая ставка ЦБ РФ / 300 / 100)\n"
-                "- Основание: [ЖК РФ, ст.155.1], [ФЗ №44-ФЗ], [ПП РФ №329]\n"
-                "- Ограничение: не более 9.5% годовых до 2027 года\n"
-                "- Пример: 10 000 руб., просрочка 30 дней → 95 руб.\n"
-                "- Начало начисления: с 31-го дня после окончания срока оплаты\n"
-            )
-    
-        system_prompt += f"{self.get_role_instruction(role)}"
-    
-        # --- Формат для LLaMA / QVikhr ---
-        prompt_formatted = f"{system_prompt}"
-    
-        return prompt_formatted
 
 class OwnerMeetingAgent(RAGAgent):
+    OFFICIAL_DOMAINS = frozenset({
+        "consultant.ru", "garant.ru", "pravo.gov.ru", "gji.ru", "minstroyrf.ru",
+        "vsrf.ru", "sudrf.ru", "правосудие.рф", "rosreestr.gov.ru", "gkh.ru",
+        "government.ru", "kremlin.ru", "fgis-tarif.ru"
+    })
+    GOV_SUFFIXES = (".gov.ru", ".gkh.ru", ".sudrf.ru", ".vsrf.ru")
+    SEARCH_QUERY_TEMPLATES = (
+        "{q} ЖК РФ ст 44-48 общее собрание собственников",
+        "{q} ПП РФ 416 порядок проведения осс",
+        "{q} судебная практика оспаривание решения осс",
+        "{q} кворум осс 50% или 2/3 ЖК РФ",
+        "{q} протокол общего собрания образец ПП РФ 416",
+        "{q} совет дома полномочия ЖК РФ ст 161.1",
+    )
+
     def __init__(self):
         # Строим семантическую карту терминов
-        self.term_map = self._build_term_map()
-        keywords = self._flatten_term_map(self.term_map)
+        self.term_map, keywords = self._shared_term_map()
         
         super().__init__("Собственники и Собрания", keywords)
 
@@ -10580,183 +6706,55 @@ class OwnerMeetingAgent(RAGAgent):
             },
         }
 
-    def _flatten_term_map(self, term_map: Dict) -> List[str]:
-        """Преобразует структурированный словарь в плоский список уникальных ключевых слов."""
-        keywords = set()
-        for term, data in term_map.items():
-            keywords.add(term.lower())  # оригинальный ключ
-            for synonym in data.get("synonyms", []):
-                keywords.add(synonym.lower())
-            # Добавляем ключи из контекстов
-            contexts = data.get("contexts", [])
-            if isinstance(contexts, dict):
-                for ctx_key in contexts.keys():
-                    keywords.add(ctx_key.lower())
-            elif isinstance(contexts, list):
-                for ctx in contexts:
-                    keywords.add(ctx.lower())
-        return list(keywords)
-
-    def _perform_web_search(self, query: str, max_results: int = 3) -> str:
-        """
-        Улучшенный веб-поиск: приоритет официальным источникам, фильтрация, ранжирование.
-        Выполняется ВНУТРИ _build_prompt, как в оригинальной архитектуре.
-        """
-        OFFICIAL_DOMAINS = {
-            "consultant.ru", "garant.ru", "pravo.gov.ru", "gji.ru", "minstroyrf.ru",
-            "vsrf.ru", "sudrf.ru", "правосудие.рф", "rosreestr.gov.ru", "gkh.ru",
-            "government.ru", "kremlin.ru", "fgis-tarif.ru"
-        }
-
-        BLACKLISTED_DOMAINS = {
-            "otvet.mail.ru", "ask.fm", "irecommend.ru", "pikabu.ru",
-            "zen.yandex.ru", "thequestion.ru", "quora.com", "reddit.com",
-            "fishki.net", "yaplakal.com", "blog", "forum"
-        }
-
-        # Генерируем расширенные поисковые запросы
-        expanded_queries = self._expand_search_query(query)
-        all_results = []
-
-        for attempt in range(2):
-            try:
-                with DDGS(timeout=10) as ddgs:
-                    for q in expanded_queries:
-                        results = ddgs.text(q, max_results=5)
-                        for r in results:
-                            href = r.get('href', '')
-                            if not href:
-                                continue
-                            
-                            try:
-                                domain = href.split('/')[2].lower()
-                            except IndexError:
-                                continue
-
-                            if any(bad in domain for bad in BLACKLISTED_DOMAINS):
-                                continue
-
-                            weight = 3 if any(official in domain for official in OFFICIAL_DOMAINS) else \
-                                     2 if any(gov in domain for gov in [".gov.ru", ".gkh.ru", ".sudrf.ru", ".vsrf.ru"]) else 1
-
-                            snippet = {
-                                "body": r['body'],
-                                "href": href,
-                                "title": r.get('title', ''),
-                                "weight": weight
-                            }
-                            all_results.append(snippet)
-
-                    all_results = sorted(all_results, key=lambda x: x['weight'], reverse=True)
-                    seen_bodies = set()
-                    unique_results = []
-                    for r in all_results:
-                        body_hash = hash(r['body'][:100])
-                        if body_hash not in seen_bodies:
-                            seen_bodies.add(body_hash)
-                            unique_results.append(r)
-                            if len(unique_results) >= max_results:
-                                break
-
-                    if unique_results:
-                        formatted = []
-                        for r in unique_results:
-                            prefix = "[ОФИЦИАЛЬНЫЙ ИСТОЧНИК] " if r['weight'] >= 2 else ""
-                            formatted.append(f"{prefix}• {r['body']}\n  Источник: {r['href']}\n")
-                        return "\n".join(formatted).strip()
-                    else:
-                        return "По вашему запросу ничего не найдено в надёжных источниках."
-
-            except Exception as e:
-                if attempt == 0:
-                    time.sleep(2)
-                    continue
-                return f"Ошибка веб-поиска: {str(e)}"
-
-        return "Не удалось выполнить веб-поиск. Попробуйте позже."
-
-    def _expand_search_query(self, query: str) -> List[str]:
-        """Генерирует несколько вариантов поискового запроса для лучшего покрытия темы."""
-        queries = [query]
-        queries.append(f"{query} ЖК РФ ст 44-48 общее собрание собственников")
-        queries.append(f"{query} ПП РФ 416 порядок проведения осс")
-        queries.append(f"{query} судебная практика оспаривание решения осс")
-        queries.append(f"{query} кворум осс 50% или 2/3 ЖК РФ")
-        queries.append(f"{query} протокол общего собрания образец ПП РФ 416")
-        queries.append(f"{query} совет дома полномочия ЖК РФ ст 161.1")
-        
-        # Добавляем синонимы
-        for term, data in self.term_map.items():
-            if term in query.lower() or any(syn in query.lower() for syn in data.get("synonyms", [])):
-                for synonym in data.get("synonyms", [])[:2]:
-                    new_q = query.replace(term, synonym) if term in query else query + " " + synonym
-                    queries.append(new_q)
-        return list(set(queries))
-
-    def _build_prompt(self, summary: str, context_text: str, role: str = "смешанная") -> str:
-        """
-        Агент: Собственники и Собрания
-        Формирует промт:
-        - Фокус: права собственников, ОСС — инициаторы, повестка, кворум, протокол, оспаривание
-        - Строгая структура, ссылки на нормативные акты, судебная практика
-        """
-        extra = self.improve_prompt_from_feedback()
-        web_results = self._perform_web_search(summary)
-    
-        # Проверка на запрос о пени
-        penalty_keywords = ["пени", "неустойка", "штраф за просрочку", "ставка цб", "9.5%", "ключевая ставка"]
-        should_calculate_penalty = any(kw in summary.lower() for kw in penalty_keywords)
-    
-        # --- SYSTEM PROMPT ---
-        system_prompt = (
-            "Ты — экспертный ИИ-ассистент по правам собственников и организации общих собраний в МКД.\n"
-            "Отвечай строго по официальным источникам и предоставленному контексту.\n\n"
-            "**ЖЕСТКИЕ ПРАВИЛА:**\n"
-            "1. НИКАКИХ ГАЛЛЮЦИНАЦИЙ: если информации нет — ответь: 'Недостаточно данных для точного ответа.'\n"
-            "2. ОБЯЗАТЕЛЬНО указывай ссылки на нормативные акты.\n"
-            "3. СТРУКТУРА: краткий вывод → нормативное обоснование → пошаговая инструкция → судебная практика.\n"
-            "4. ФОРМУЛЫ ТОЛЬКО ПРИ ЗАПРОСЕ о пени.\n"
-            "5. Приоритет: ЖК РФ > ПП РФ №416 > судебная практика > ПП РФ №1131.\n\n"
-            f"### Контекст:\n{context_text}\n\n"
-            f"### Веб-поиск:\n{web_results}\n\n"
-            f"### Дополнительные обновления:\n{extra}\n\n"
-            "--- Основной ответ ---\n"
-            "Краткий вывод: [что делать, кто отвечает, законно ли требование]\n"
-            "Нормативное обоснование: [ЖК РФ, ст.44-48, 161.1; ПП РФ №416; ПП РФ №1131]\n"
-            "Пошаговая инструкция:\n"
-            "- Кто может быть инициатором собрания? (ЖК РФ, ст.45)\n"
-            "- Составление повестки и уведомление собственников (ПП РФ №416, п.5-6)\n"
-            "- Расчёт кворума и проведение голосования (ЖК РФ, ст.46-47)\n"
-            "- Оформление и публикация протокола (ПП РФ №416, п.15; ПП РФ №1131, п.19)\n"
-            "- Оспаривание решения собрания (ЖК РФ, ст.46(6); срок 6 месяцев)\n"
-            "- Полномочия совета дома и председателя (ЖК РФ, ст.161.1)\n"
-            "Судебная практика:\n"
-            "- Определение ВС РФ №XXX-ЭСXX-XXXX — краткая позиция суда\n"
-            "Если судебных решений нет: 'Судебная практика по данному вопросу в базе отсутствует'.\n"
-            "Ключевые нормативные акты:\n"
-            "- ЖК РФ (Глава 6, ст.44-48; ст.161.1)\n"
-            "- ПП РФ №416 «Об утверждении Правил проведения общих собраний…»\n"
-            "- ПП РФ №1131 (ГИС ЖКХ и электронное голосование)\n"
-            "- ГПК РФ / КАС РФ (оспаривание решений)\n"
-        )
-    
-        # --- Блок расчёта пени ---
-        if should_calculate_penalty:
-            system_prompt += (
-                "\n**Расчёт пени (если упомянут):**\n"
-                "- Формула: Пени = Сумма долга × Дни просрочки × (Ключевая ставка ЦБ РФ / 300 / 100)\n"
-                "- Основание: [ЖК РФ, ст.155.1], [ФЗ №44-ФЗ], [ПП РФ №329]\n"
-                "- Ограничение: не более 9.5% годовых до 2027 года\n"
-                "- Пример: 10 000 руб., просрочка 30 дней → 95 руб.\n"
-                "- Начало начисления: с 31-го дня после окончания срока оплаты\n"
-            )
-    
-        system_prompt += f"{self.get_role_instruction(role)}"
-    
-        # --- Формат для LLaMA / QVikhr ---
-        prompt_formatted = f"{system_prompt}"
-    
-        return prompt_formatted
+    # Агент: Собственники и Собрания
+    # Формирует промт:
+    # - Фокус: права собственников, ОСС — инициаторы, повестка, кворум, протокол, оспаривание
+    # - Строгая структура, ссылки на нормативные акты, судебная практика
+    # Промт передаётся модели как есть, без служебных токенов Saiga/LLaMA-3
+    WRAP_SYSTEM_PROMPT = False
+    PROMPT_TEMPLATE = (
+        "Ты — экспертный ИИ-ассистент по правам собственников и организации общих собраний в МКД.\n"
+        "Отвечай строго по официальным источникам и предоставленному контексту.\n\n"
+        "**ЖЕСТКИЕ ПРАВИЛА:**\n"
+        "1. НИКАКИХ ГАЛЛЮЦИНАЦИЙ: если информации нет — ответь: 'Недостаточно данных для точного ответа.'\n"
+        "2. ОБЯЗАТЕЛЬНО указывай ссылки на нормативные акты.\n"
+        "3. СТРУКТУРА: краткий вывод → нормативное обоснование → пошаговая инструкция → судебная практика.\n"
+        "4. ФОРМУЛЫ ТОЛЬКО ПРИ ЗАПРОСЕ о пени.\n"
+        "5. Приоритет: ЖК РФ > ПП РФ №416 > судебная практика > ПП РФ №1131.\n\n"
+        "### Контекст:\n"
+        "{context_text}\n\n"
+        "### Веб-поиск:\n"
+        "{web_results}\n\n"
+        "### Дополнительные обновления:\n"
+        "{extra}\n\n"
+        "--- Основной ответ ---\n"
+        "Краткий вывод: [что делать, кто отвечает, законно ли требование]\n"
+        "Нормативное обоснование: [ЖК РФ, ст.44-48, 161.1; ПП РФ №416; ПП РФ №1131]\n"
+        "Пошаговая инструкция:\n"
+        "- Кто может быть инициатором собрания? (ЖК РФ, ст.45)\n"
+        "- Составление повестки и уведомление собственников (ПП РФ №416, п.5-6)\n"
+        "- Расчёт кворума и проведение голосования (ЖК РФ, ст.46-47)\n"
+        "- Оформление и публикация протокола (ПП РФ №416, п.15; ПП РФ №1131, п.19)\n"
+        "- Оспаривание решения собрания (ЖК РФ, ст.46(6); срок 6 месяцев)\n"
+        "- Полномочия совета дома и председателя (ЖК РФ, ст.161.1)\n"
+        "Судебная практика:\n"
+        "- Определение ВС РФ №XXX-ЭСXX-XXXX — краткая позиция суда\n"
+        "Если судебных решений нет: 'Судебная практика по данному вопросу в базе отсутствует'.\n"
+        "Ключевые нормативные акты:\n"
+        "- ЖК РФ (Глава 6, ст.44-48; ст.161.1)\n"
+        "- ПП РФ №416 «Об утверждении Правил проведения общих собраний…»\n"
+        "- ПП РФ №1131 (ГИС ЖКХ и электронное голосование)\n"
+        "- ГПК РФ / КАС РФ (оспаривание решений)\n"
+        "{penalty_block}{role_instruction}"
+    )
+    PENALTY_BLOCK = (
+        "\n**Расчёт пени (если упомянут):**\n"
+        "- Формула: Пени = Сумма долга × Дни просрочки × (Ключевая ставка ЦБ РФ / 300 / 100)\n"
+        "- Основание: [ЖК РФ, ст.155.1], [ФЗ №44-ФЗ], [ПП РФ №329]\n"
+        "- Ограничение: не более 9.5% годовых до 2027 года\n"
+        "- Пример: 10 000 руб., просрочка 30 дней → 95 руб.\n"
+        "- Начало начисления: с 31-го дня после окончания срока оплаты\n"
+    )
 
 # ---------------------------
 # MetaAgent — координатор мультиагентного диалога
@@ -10782,11 +6780,12 @@ class MetaAgent:
             return fallback, []
 
         # Выбираем основного агента по количеству совпадений ключевых слов
-        def match_score(agent: RAGAgent, qry: str) -> int:
-            q_words = set(re.findall(r'\b[а-яёa-z0-9]+\b', qry.lower()))
-            return sum(1 for kw in agent.keywords if kw in q_words)
+        q_words = set(re.findall(r'\b[а-яёa-z0-9]+\b', query.lower()))
 
-        primary_agent = max(primary_candidates, key=lambda a: match_score(a, query))
+        def match_score(agent: RAGAgent) -> int:
+            return len(q_words & agent.keyword_set)
+
+        primary_agent = max(primary_candidates, key=match_score)
 
         # Определяем вспомогательных агентов на основе типа основного агента
         # Это эвристика, основанная на типичных комбинациях вопросов из FAQ
@@ -10888,6 +6887,12 @@ class RAGSystem:
         self.max_context_tokens = int(self.model_ctx_tokens * 0.8)
         self.chunk_embeddings = None
         self.enable_clarification = False
+        # KV-кэш модели для неизменных начал промтов агентов: текст начала -> (токены, кэш)
+        self._prefix_kv_cache: "OrderedDict[str, Tuple[torch.Tensor, DynamicCache]]" = OrderedDict()
+        self.prefix_kv_cache_size = 8
+        # Запросы Gradio обрабатываются в параллельных потоках: чтение с перестановкой, вставка
+        # и вытеснение записей _prefix_kv_cache — под этой блокировкой
+        self._prefix_kv_lock = threading.Lock()
 
         self.agents = [
             TariffAgent(),
@@ -11119,9 +7124,10 @@ class RAGSystem:
             if any(kw in q_lower for kw in kws):
                 matched_themes.add(theme)
         if matched_themes:
+            matched_lower = {m.lower() for m in matched_themes}
             for c in self.chunks_data:
                 tags = [t.lower() for t in c.get("tags", [])]
-                if any(t in [m.lower() for m in matched_themes] for t in tags):
+                if any(t in matched_lower for t in tags):
                     if c not in [x[0] for x in context_chunks]:
                         context_chunks.append((c, 0.95))
         return context_chunks
@@ -11144,7 +7150,8 @@ class RAGSystem:
             "к сожалению", "увы", "к сожалению, я не могу", "не имею информации"
         ]
     
-        if any(trigger in answer.lower() for trigger in hallucination_triggers):
+        answer_lower = answer.lower()
+        if any(trigger in answer_lower for trigger in hallucination_triggers):
             return (
                 "⚠️ Похоже, в моей базе знаний пока нет точной информации по вашему запросу. "
                 "Пожалуйста, переформулируйте вопрос или обратитесь в управляющую компанию напрямую. "
@@ -11158,14 +7165,14 @@ class RAGSystem:
     
         return answer.strip()
 
-    def _llm_complete(self, query: str,  agent: RAGAgent, context_text: str, role: str = "смешанная", max_tokens: int = 2048, temperature: float = 0.1) -> str:
+    def _llm_complete(self, query: str,  agent: RAGAgent, context_text: str, role: str = "смешанная", max_tokens: int = 2048, temperature: float = 0.1, top_chunk: Optional[str] = None) -> str:
         """
         Генерация ответа с Saiga/LLaMA-3 8B.
         Формирует system prompt через _build_prompt и user prompt через query.
         """
         try:
             # --- Формируем system prompt с контентом ---
-            system_prompt = agent._build_prompt(summary=query, context_text=context_text, role=role)
+            system_prompt = agent._build_prompt(summary=query, context_text=context_text, role=role, top_chunk=top_chunk)
     
             # --- Применяем шаблон чата Saiga ---
             prompt = self.tokenizer.apply_chat_template([
@@ -11177,6 +7184,11 @@ class RAGSystem:
             data = self.tokenizer(prompt, return_tensors="pt", add_special_tokens=False)
             data = {k: v.to(self.model.device) for k, v in data.items()}
     
+            # --- Префилл неизменного начала промта берём из кэша ---
+            prefix_kv = self._get_prefix_kv(agent, prompt, data["input_ids"])
+            if prefix_kv is not None:
+                data["past_key_values"] = prefix_kv
+    
             # --- Генерация ---
             with torch.no_grad():
                 output_ids = self.model.generate(
@@ -11202,6 +7214,46 @@ class RAGSystem:
             return "Извините, не удалось сгенерировать ответ."
 
 
+    def _get_prefix_kv(self, agent: RAGAgent, prompt: str, input_ids: torch.Tensor) -> Optional[DynamicCache]:
+        """
+        Копия KV-кэша для начала промта до конца agent.prompt_prefix() (шаблон чата, заголовок, правила агента).
+        Это начало одинаково у всех запросов к агенту, поэтому его префилл считается один раз,
+        а generate обрабатывает только контекст, веб-результаты и вопрос.
+        """
+        prefix = agent.prompt_prefix()
+        start = prompt.find(prefix) if prefix else -1
+        if start < 0:
+            return None
+        prefix_text = prompt[:start + len(prefix)]
+
+        with self._prefix_kv_lock:
+            entry = self._prefix_kv_cache.get(prefix_text)
+            if entry is not None:
+                self._prefix_kv_cache.move_to_end(prefix_text)
+        if entry is None:
+            prefix_ids = self.tokenizer(prefix_text, return_tensors="pt", add_special_tokens=False)["input_ids"]
+            # Последний токен может слиться с началом подставленного текста — в кэш его не берём
+            prefix_ids = prefix_ids[:, :-1].to(input_ids.device)
+            if prefix_ids.shape[1] == 0:
+                return None
+            # Префилл — вне блокировки: он долгий, а другие потоки тем временем берут готовые записи
+            prefix_cache = DynamicCache()
+            with torch.no_grad():
+                self.model(input_ids=prefix_ids, past_key_values=prefix_cache, use_cache=True)
+            entry = (prefix_ids, prefix_cache)
+            with self._prefix_kv_lock:
+                self._prefix_kv_cache[prefix_text] = entry
+                self._prefix_kv_cache.move_to_end(prefix_text)
+                if len(self._prefix_kv_cache) > self.prefix_kv_cache_size:
+                    self._prefix_kv_cache.popitem(last=False)
+
+        prefix_ids, prefix_cache = entry
+        n = prefix_ids.shape[1]
+        if input_ids.shape[1] <= n or not torch.equal(input_ids[:, :n], prefix_ids):
+            return None
+        # generate дописывает кэш — отдаём копию, исходный остаётся для следующих запросов
+        return copy.deepcopy(prefix_cache)
+
     # ➕ Новый метод: генерация контекста для другого агента
     def generate_context_for_agent(self, query: str, agent: RAGAgent, role: str = "смешанная") -> str:
         """Генерирует контекст специально для другого агента (без полного ответа)"""
@@ -11247,7 +7299,9 @@ class RAGSystem:
             agent=primary_agent,
             role=user_role,
             max_tokens=max_tokens,
-            temperature=0.3
+            temperature=0.3,
+            # Чанки отсортированы по релевантности — по первому решается, нужен ли веб-поиск
+            top_chunk=truncated[0][0]['content'].strip() if truncated else None
         )
     
         # --- Шаг 3: Дополнительная очистка ---
@@ -11386,4 +7440,6 @@ with gr.Blocks(title="RAG-Ассистент по ЖКХ с обучением 
         outputs=[msg, chatbot, state, rating_slider, submit_rating]
     )
 
-demo.launch(share=True, server_name="0.0.0.0", server_port=7860)
\ No newline at end of file
+# Публичная ссылка открывается только при запуске скрипта, а не при импорте модуля
+if __name__ == "__main__":
+    demo.launch(share=True, server_name="0.0.0.0", server_port=7860)
\ No newline at end of file
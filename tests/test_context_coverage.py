@@ -0,0 +1,57 @@
+from context_coverage import COVERAGE_THRESHOLD, question_coverage
+
+QUESTION = "Как рассчитывается плата за холодную воду без счетчика?"
+
+# Чанки обычного для базы знаний размера (абзац нормативного текста)
+WATER_CHUNK = (
+    "Пункт 42 Правил предоставления коммунальных услуг (ПП РФ № 354). При отсутствии индивидуального прибора "
+    "учёта холодной воды, горячей воды и электрической энергии размер платы за коммунальную услугу, "
+    "предоставленную потребителю в жилом помещении, определяется по формуле 4 приложения № 2 исходя из "
+    "норматива потребления коммунальной услуги с применением повышающего коэффициента. Норматив потребления "
+    "холодной воды устанавливается органом государственной власти субъекта Российской Федерации. Тариф на "
+    "холодную воду утверждается региональной службой по тарифам. Плата рассчитывается исходя из количества "
+    "постоянно и временно проживающих граждан."
+)
+METER_CHUNK = (
+    "Межповерочный интервал индивидуального прибора учёта устанавливается изготовителем и указывается в паспорте "
+    "счётчика. Для счётчиков горячей воды он, как правило, составляет 4 года, для счётчиков холодной воды — 6 лет. "
+    "Поверку счётчика организует собственник помещения за свой счёт. По истечении срока поверки прибор считается "
+    "вышедшим из строя, и в течение трёх расчётных периодов плата определяется по среднемесячному объёму "
+    "потребления, а затем — исходя из норматива."
+)
+PENALTY_CHUNK = (
+    "Часть 14 статьи 155 Жилищного кодекса РФ: лица, несвоевременно и (или) не полностью внёсшие плату за жилое "
+    "помещение и коммунальные услуги, обязаны уплатить кредитору пени в размере одной трёхсотой ставки "
+    "рефинансирования Центрального банка РФ от не выплаченной в срок суммы за каждый день просрочки начиная с "
+    "тридцать первого дня, следующего за днём наступления установленного срока оплаты. Суд вправе снизить "
+    "неустойку по статье 333 ГК РФ."
+)
+ROOF_CHUNK = (
+    "Согласно Правилам содержания общего имущества в многоквартирном доме (ПП РФ № 491) крыша относится к общему "
+    "имуществу собственников помещений. Текущий ремонт кровли, устранение протечек и очистка крыши от снега "
+    "входят в обязанности управляющей организации и оплачиваются в составе платы за содержание жилого помещения."
+)
+# Склеенный контекст из десятков чанков, как его собирает generate_answer_chat
+LONG_CONTEXT = "".join([WATER_CHUNK, METER_CHUNK, PENALTY_CHUNK, ROOF_CHUNK] * 8)
+
+
+def test_focused_top_chunk_covers_question():
+    assert question_coverage(QUESTION.lower(), WATER_CHUNK) >= COVERAGE_THRESHOLD
+
+
+def test_unrelated_top_chunk_does_not_cover_question():
+    # Слова «плата», «воды», «счётчик» в чанке есть, но он о поверке, а не о расчёте платы
+    assert question_coverage(QUESTION.lower(), METER_CHUNK) < COVERAGE_THRESHOLD
+    assert question_coverage(QUESTION.lower(), PENALTY_CHUNK) < COVERAGE_THRESHOLD
+    assert question_coverage(QUESTION.lower(), ROOF_CHUNK) < COVERAGE_THRESHOLD
+    assert question_coverage("Какая пени за долг по квартплате?".lower(), WATER_CHUNK) < COVERAGE_THRESHOLD
+
+
+def test_long_context_is_not_a_relevance_signal():
+    # В длинной склейке слова вопроса есть всегда — поэтому сравнивается только лучший чанк
+    assert question_coverage(QUESTION.lower(), LONG_CONTEXT) >= COVERAGE_THRESHOLD
+
+
+def test_short_or_empty_input_covers_nothing():
+    assert question_coverage("счётчик", WATER_CHUNK) == 0.0
+    assert question_coverage(QUESTION.lower(), "") == 0.0